@@ -0,0 +1,88 @@
+"""
+Benchmark the response size and end-to-end latency (request, transfer and decoding on
+the client) of the precomputed annotations endpoint for JSON and binary responses,
+on a local annotation file with 10^5 lines.
+
+Usage: python scripts/benchmark_annotation_response.py [num_lines]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from zetta_utils.db_annotations.precomp_annotations import (
+    LineAnnotation,
+    build_annotation_layer,
+)
+from zetta_utils.geometry import Vec3D
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from web_api.app.precomputed_annotations import api  # pylint: disable=wrong-import-position
+
+RESOLUTION = Vec3D(8, 8, 40)
+DATASET_SIZE = (4096, 4096, 256)
+
+
+def decode_binary(data: bytes) -> tuple[np.ndarray, np.ndarray]:
+    count = int(np.frombuffer(data, dtype="<u8", count=1)[0])
+    coords = np.frombuffer(data, dtype="<f4", count=count * 6, offset=8).reshape(count, 2, 3)
+    ids = np.frombuffer(data, dtype="<u8", count=count, offset=8 + count * 24)
+    return ids, coords
+
+
+def run_benchmark(num_lines):
+    rng = np.random.default_rng(0)
+    starts = rng.uniform(0, 1, size=(num_lines, 3)) * (np.array(DATASET_SIZE) - 10)
+    ends = starts + rng.uniform(0, 10, size=(num_lines, 3))
+    lines = [
+        LineAnnotation(i + 1, start.tolist(), end.tolist())
+        for i, (start, end) in enumerate(zip(starts, ends))
+    ]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "lines")
+        layer = build_annotation_layer(
+            path,
+            resolution=RESOLUTION,
+            dataset_size=DATASET_SIZE,
+            voxel_offset=(0, 0, 0),
+            mode="write",
+        )
+        layer.write_annotations(lines)
+
+        client = TestClient(api)
+        params = {
+            "path": path,
+            "bbox_start": [0, 0, 0],
+            "bbox_end": list(DATASET_SIZE),
+            "resolution": list(RESOLUTION),
+        }
+        start = time.perf_counter()
+        response = client.get("/annotations", params=params)
+        response.raise_for_status()
+        json_result = json.loads(response.content)
+        json_elapsed = time.perf_counter() - start
+        print(
+            f"{'json':>8}: {len(response.content) / 2**20:8.2f} MiB, {json_elapsed:6.2f}s, "
+            f"{len(json_result)} lines"
+        )
+
+        start = time.perf_counter()
+        response = client.get(
+            "/annotations", params=params, headers={"Accept": "application/octet-stream"}
+        )
+        response.raise_for_status()
+        ids, _ = decode_binary(response.content)
+        binary_elapsed = time.perf_counter() - start
+        print(
+            f"{'binary':>8}: {len(response.content) / 2**20:8.2f} MiB, {binary_elapsed:6.2f}s, "
+            f"{len(ids)} lines"
+        )
+        assert len(ids) == len(json_result)
+
+
+if __name__ == "__main__":
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,65 @@
+"""
+Benchmark CPU inference throughput of ``BatchedInferenceEngine`` against batch size and
+number of threads, with ``load_and_run_model`` on one sample per call as the baseline.
+Uses a small convolutional network saved as TorchScript to a temporary file.
+
+Usage: python scripts/benchmark_batched_inference.py [num_samples]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import torch
+
+from zetta_utils.convnet import BatchedInferenceEngine
+from zetta_utils.convnet.utils import load_and_run_model
+
+SAMPLE_SHAPE = (1, 64, 64)
+BATCH_SIZES = (1, 4, 16, 64)
+NUM_THREADS = (1, 4)
+
+
+def make_model_file(path):
+    model = torch.nn.Sequential(
+        torch.nn.Conv2d(1, 16, 3, padding=1),
+        torch.nn.ReLU(),
+        torch.nn.Conv2d(16, 16, 3, padding=1),
+        torch.nn.ReLU(),
+        torch.nn.Conv2d(16, 1, 3, padding=1),
+    ).eval()
+    torch.jit.save(torch.jit.script(model), path)
+
+
+def run_benchmark(num_samples):
+    rng = np.random.default_rng(0)
+    data = [rng.random(SAMPLE_SHAPE, dtype=np.float32) for _ in range(num_samples)]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "model.jit")
+        make_model_file(path)
+
+        load_and_run_model(path, data[0][np.newaxis], device="cpu")
+        start = time.perf_counter()
+        ref = [load_and_run_model(path, e[np.newaxis], device="cpu")[0] for e in data]
+        ref_sps = num_samples / (time.perf_counter() - start)
+        print(f"load_and_run_model, one sample per call: {ref_sps:8.1f} samples/s")
+
+        for num_threads in NUM_THREADS:
+            for batch_size in BATCH_SIZES:
+                engine = BatchedInferenceEngine(
+                    path, batch_size=batch_size, device="cpu", num_threads=num_threads
+                )
+                engine.run_batched(data[:batch_size])
+                start = time.perf_counter()
+                result = engine.run_batched(data)
+                sps = num_samples / (time.perf_counter() - start)
+                max_diff = max(np.abs(a - b).max() for a, b in zip(ref, result))
+                print(
+                    f"batch size {batch_size:3d}, {num_threads} threads: {sps:8.1f} samples/s | "
+                    f"{sps / ref_sps:5.2f}x | max diff {max_diff:.2e}"
+                )
+
+
+if __name__ == "__main__":
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 512)
@@ -0,0 +1,65 @@
+"""
+Benchmark BBoxIndex build and query times against a brute-force scan.
+
+Usage: python scripts/benchmark_bbox_index.py [max_boxes]
+(max_boxes defaults to 10**7; memory use is roughly 200 bytes per box.)
+"""
+import sys
+import time
+
+import numpy as np
+
+from zetta_utils.geometry import BBoxIndex
+
+QUERIES = 1000
+
+
+def make_boxes(count: int, rng: np.random.Generator):
+    lower = rng.uniform(0, 100_000, (count, 3))
+    upper = lower + rng.uniform(0, 200, (count, 3))
+    return lower, upper
+
+
+def run_benchmark(count: int):
+    rng = np.random.default_rng(0)
+    lower, upper = make_boxes(count, rng)
+    q_lower = rng.uniform(0, 99_000, (QUERIES, 3))
+    q_upper = q_lower + 1000
+
+    start = time.perf_counter()
+    index = BBoxIndex(lower, upper)
+    build_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for q_lo, q_hi in zip(q_lower, q_upper):
+        index.query(q_lo, q_hi)
+    query_s = (time.perf_counter() - start) / QUERIES
+
+    start = time.perf_counter()
+    index.query_many(q_lower, q_upper)
+    batch_s = (time.perf_counter() - start) / QUERIES
+
+    scan_queries = 10
+    start = time.perf_counter()
+    for q_lo, q_hi in zip(q_lower[:scan_queries], q_upper[:scan_queries]):
+        np.nonzero(((lower <= q_hi) & (upper >= q_lo)).all(axis=1))
+    scan_s = (time.perf_counter() - start) / scan_queries
+
+    start = time.perf_counter()
+    for point in q_lower[:100]:
+        index.nearest(point, k=10)
+    nearest_s = (time.perf_counter() - start) / 100
+
+    print(
+        f"{count:>10}: build {build_s:8.3f} s | query {query_s * 1e6:9.1f} us "
+        f"| query_many {batch_s * 1e6:9.1f} us/query | scan {scan_s * 1e6:11.1f} us "
+        f"| nearest(k=10) {nearest_s * 1e6:9.1f} us"
+    )
+
+
+if __name__ == "__main__":
+    max_boxes = int(sys.argv[1]) if len(sys.argv) > 1 else 10**7
+    n = 10**5
+    while n <= max_boxes:
+        run_benchmark(n)
+        n *= 10
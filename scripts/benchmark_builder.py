@@ -0,0 +1,72 @@
+"""
+Benchmark building a spec with dozens of remote layers with the serial builder and
+each of the parallel builder modes. Opening a remote layer is simulated by a fixed
+latency, standing in for fetching its ``info`` file, and each layer is nested in a
+cheap wrapper object so that the specs have several levels.
+
+Usage: python scripts/benchmark_builder.py [num_layers]
+"""
+import sys
+import time
+
+from zetta_utils import builder
+
+INFO_FETCH_LATENCY = 0.2
+
+
+@builder.register("benchmark_remote_layer")
+def build_remote_layer(path: str, index_procs: list | None = None) -> dict:
+    time.sleep(INFO_FETCH_LATENCY)
+    return {"path": path, "index_procs": index_procs}
+
+
+@builder.register("benchmark_layer_wrapper")
+def build_layer_wrapper(layer: dict, name: str) -> dict:
+    return {"name": name, **layer}
+
+
+def make_spec(num_layers: int) -> dict:
+    return {
+        "layers": {
+            f"layer_{i}": {
+                "@type": "benchmark_layer_wrapper",
+                "name": f"layer_{i}",
+                "layer": {
+                    "@type": "benchmark_remote_layer",
+                    "path": f"gs://bucket/dataset/layer_{i}",
+                    # Every other layer is an extra level deep
+                    "index_procs": (
+                        [{"@type": "benchmark_remote_layer", "path": f"gs://bucket/mask_{i}"}]
+                        if i % 2
+                        else []
+                    ),
+                },
+            }
+            for i in range(num_layers)
+        }
+    }
+
+
+def run_benchmark(num_layers):
+    spec = make_spec(num_layers)
+    configs = [
+        ("serial", {"parallel": False}),
+        ("stages", {"parallel": True, "parallel_mode": "stages"}),
+        ("threads", {"parallel": True, "parallel_mode": "threads"}),
+        ("processes", {"parallel": True, "parallel_mode": "processes"}),
+    ]
+    expected = None
+    for name, kwargs in configs:
+        # Warm up the persistent pools
+        builder.build(make_spec(1), **kwargs)
+        start = time.perf_counter()
+        result = builder.build(spec, **kwargs)
+        elapsed = time.perf_counter() - start
+        if expected is None:
+            expected = result
+        assert result == expected
+        print(f"{name:>10}: {elapsed:7.2f}s")
+
+
+if __name__ == "__main__":
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 48)
@@ -0,0 +1,41 @@
+"""
+Benchmark the startup time of the ``zetta`` CLI with ``--load_mode lazy`` against
+``--load_mode all``, for ``zetta show_registry`` and a minimal ``zetta run`` spec.
+The registry manifest is generated beforehand, as when building an image.
+
+Usage: python scripts/benchmark_cli_startup.py [num_repeats]
+"""
+import json
+import subprocess
+import sys
+import time
+
+MINIMAL_SPEC = json.dumps({"@type": "np.sum", "a": [1, 2, 3]})
+COMMANDS = {
+    "show_registry": ["show_registry"],
+    "run": ["run", "--no-main-run-process", "-s", MINIMAL_SPEC],
+}
+LOAD_MODES = ("all", "lazy")
+
+
+def measure(args, num_repeats):
+    times = []
+    for _ in range(num_repeats):
+        start = time.perf_counter()
+        subprocess.run(args, check=True, capture_output=True)
+        times.append(time.perf_counter() - start)
+    return min(times), sum(times) / len(times)
+
+
+def run_benchmark(num_repeats):
+    subprocess.run(["zetta", "generate_registry_manifest"], check=True, capture_output=True)
+    base_min, base_mean = measure([sys.executable, "-c", "import zetta_utils"], num_repeats)
+    print(f"import zetta_utils: min {base_min:6.2f} s | mean {base_mean:6.2f} s")
+    for name, command in COMMANDS.items():
+        for load_mode in LOAD_MODES:
+            t_min, t_mean = measure(["zetta", "-l", load_mode] + command, num_repeats)
+            print(f"zetta {name}, {load_mode:>4}: min {t_min:6.2f} s | mean {t_mean:6.2f} s")
+
+
+if __name__ == "__main__":
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 3)
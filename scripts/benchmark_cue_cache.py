@@ -0,0 +1,62 @@
+"""
+Benchmark the latency of ``parsing.cue.loads`` and ``parsing.cue.load`` without a cache,
+with the in-memory cache and with only the on-disk cache (as seen by a new process),
+on a generated spec of a few hundred fields.
+
+Usage: python scripts/benchmark_cue_cache.py [num_repeats]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from zetta_utils.parsing import cue
+
+
+def make_spec(num_layers=200):
+    lines = ['import "strings"', "#BASE: {resolution: [4, 4, 40], path: string}"]
+    for i in range(num_layers):
+        lines.append(
+            f'layer_{i}: #BASE & {{path: strings.ToLower("GS://BUCKET/LAYER_{i}"), index: {i}}}'
+        )
+    return "\n".join(lines)
+
+
+def measure(fn, num_repeats):
+    start = time.perf_counter()
+    for _ in range(num_repeats):
+        fn()
+    return (time.perf_counter() - start) / num_repeats
+
+
+def run_benchmark(num_repeats):
+    spec = make_spec()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        spec_path = os.path.join(tmp_dir, "spec.cue")
+        with open(spec_path, "w", encoding="utf8") as f:
+            f.write(spec)
+        cache_dir = os.path.join(tmp_dir, "cache")
+
+        parse_fns = {"loads": lambda: cue.loads(spec), "load": lambda: cue.load(spec_path)}
+        for name, fn in parse_fns.items():
+            cue.configure_cache(maxsize=0)
+            uncached_t = measure(fn, num_repeats)
+
+            cue.configure_cache(cache_dir=cache_dir)
+            fn()
+            memory_t = measure(fn, num_repeats)
+
+            def from_disk(fn=fn):
+                cue.configure_cache(cache_dir=cache_dir)
+                fn()
+
+            disk_t = measure(from_disk, num_repeats)
+            print(
+                f"{name}: uncached {uncached_t * 1e3:8.2f} ms | memory {memory_t * 1e3:8.3f} ms | "
+                f"disk {disk_t * 1e3:8.3f} ms"
+            )
+    cue.configure_cache()
+
+
+if __name__ == "__main__":
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
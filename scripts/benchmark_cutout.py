@@ -0,0 +1,113 @@
+"""
+Benchmark the latency and peak memory of the painting ``/cutout`` endpoints on a local
+``file://`` layer, against the previous implementation, which built a layer for every
+request, compressed the whole region at once and decompressed the whole upload before
+writing it.
+
+Usage: python scripts/benchmark_cutout.py [size_xy]
+"""
+import gzip
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import einops
+import numpy as np
+from fastapi.testclient import TestClient
+
+from zetta_utils.geometry import BBox3D, Vec3D
+from zetta_utils.layer.volumetric import VolumetricIndex
+from zetta_utils.layer.volumetric.cloudvol import build_cv_layer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from web_api.app.painting import api  # pylint: disable=wrong-import-position
+
+RESOLUTION = Vec3D(4, 4, 40)
+SIZE_Z = 64
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+def read_cutout_reference(path, bbox_start, bbox_end):
+    index = VolumetricIndex.from_coords(bbox_start, bbox_end, RESOLUTION)
+    layer = build_cv_layer(path, readonly=True)
+    data = np.ascontiguousarray(layer[index])
+    data = einops.rearrange(data, "C X Y Z -> Z Y X C")
+    return gzip.compress(data.tobytes())
+
+
+def write_cutout_reference(path, bbox_start, bbox_end, body):
+    index = VolumetricIndex.from_coords(bbox_start, bbox_end, RESOLUTION)
+    layer = build_cv_layer(path, cv_kwargs={"non_aligned_writes": True})
+    shape = [layer.backend.num_channels, *(np.array(bbox_end) - np.array(bbox_start))]
+    data_arr = np.frombuffer(gzip.decompress(body), dtype=layer.backend.dtype)
+    layer[index] = einops.rearrange(data_arr.reshape(shape[::-1]), "Z Y X C -> C X Y Z")
+
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def run_benchmark(size_xy):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = f"file://{tmp_dir}/layer"
+        shape = (size_xy, size_xy, SIZE_Z)
+        layer = build_cv_layer(
+            path=path,
+            info_type="segmentation",
+            info_data_type="uint32",
+            info_num_channels=1,
+            info_chunk_size=[128, 128, 16],
+            info_bbox=BBox3D.from_coords((0, 0, 0), shape, RESOLUTION),
+            info_encoding="raw",
+            info_scales=[RESOLUTION],
+        )
+        rng = np.random.default_rng(0)
+        volume = rng.integers(0, 16, size=(1, *shape), dtype=np.uint32)
+        layer[VolumetricIndex.from_coords((0, 0, 0), shape, RESOLUTION)] = volume
+
+        bbox_start, bbox_end = (0, 0, 0), shape
+        params = {
+            "path": path,
+            "bbox_start": list(bbox_start),
+            "bbox_end": list(bbox_end),
+            "resolution": list(RESOLUTION),
+        }
+        client = TestClient(api)
+        print(f"region {shape}, {volume.nbytes / 2**20:.0f} MiB")
+
+        expected, elapsed, peak = measure(
+            lambda: read_cutout_reference(path, bbox_start, bbox_end)
+        )
+        print(f"{'GET reference':>16}: {elapsed:6.2f}s, peak {peak / 2**20:7.1f} MiB")
+        client.get("/cutout", params=params)  # warm up the layer cache
+        response, elapsed, peak = measure(lambda: client.get("/cutout", params=params))
+        print(f"{'GET streaming':>16}: {elapsed:6.2f}s, peak {peak / 2**20:7.1f} MiB")
+        assert gzip.decompress(response.content) == gzip.decompress(expected)
+
+        body = expected
+        _, elapsed, peak = measure(
+            lambda: write_cutout_reference(path, bbox_start, bbox_end, body)
+        )
+        print(f"{'POST reference':>16}: {elapsed:6.2f}s, peak {peak / 2**20:7.1f} MiB")
+
+        def upload():
+            content = (
+                body[i : i + UPLOAD_CHUNK_SIZE] for i in range(0, len(body), UPLOAD_CHUNK_SIZE)
+            )
+            return client.post("/cutout", params=params, content=content)
+
+        response, elapsed, peak = measure(upload)
+        response.raise_for_status()
+        print(f"{'POST streaming':>16}: {elapsed:6.2f}s, peak {peak / 2**20:7.1f} MiB")
+
+
+if __name__ == "__main__":
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 1024)
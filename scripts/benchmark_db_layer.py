@@ -0,0 +1,80 @@
+"""
+Benchmark the throughput of keyed writes and reads on the Firestore and Datastore
+DBLayer backends, with batches sent one at a time against batches sent concurrently,
+and of many small writes with and without ``coalesce_writes``.
+
+Run against the local emulators, e.g.
+``gcloud beta emulators firestore start --host-port=localhost:8080`` with
+``FIRESTORE_EMULATOR_HOST=localhost:8080``, or
+``gcloud beta emulators datastore start --host-port=localhost:8081`` with
+``DATASTORE_EMULATOR_HOST=localhost:8081``.
+
+Usage: python scripts/benchmark_db_layer.py [firestore|datastore] [num_rows]
+"""
+import sys
+import time
+
+from zetta_utils.layer.db_layer import DBLayer
+from zetta_utils.layer.db_layer.datastore import DatastoreBackend
+from zetta_utils.layer.db_layer.firestore import FirestoreBackend
+
+PROJECT = "test-project"
+COLS = ("col_a", "col_b")
+NUM_SMALL_WRITES = 10_000
+
+
+def make_layer(kind: str, max_concurrent_requests: int) -> DBLayer:
+    if kind == "firestore":
+        backend = FirestoreBackend(
+            "benchmark", project=PROJECT, max_concurrent_requests=max_concurrent_requests
+        )
+    else:
+        backend = DatastoreBackend(
+            "benchmark", project=PROJECT, max_concurrent_requests=max_concurrent_requests
+        )
+    return DBLayer(backend)
+
+
+def _report(name: str, num_ops: int, elapsed: float):
+    print(f"{name:>36}: {elapsed:8.2f}s {num_ops / elapsed:10.0f} rows/s")
+
+
+def run_benchmark(kind: str, num_rows: int):
+    row_keys = [f"row{i}" for i in range(num_rows)]
+    data = [{"col_a": i, "col_b": str(i)} for i in range(num_rows)]
+
+    for concurrency in (1, 8):
+        layer = make_layer(kind, concurrency)
+        layer.clear()
+        start = time.perf_counter()
+        layer[(row_keys, COLS)] = data
+        _report(f"write, {concurrency} concurrent", num_rows, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        result = layer[(row_keys, COLS)]
+        _report(f"read, {concurrency} concurrent", num_rows, time.perf_counter() - start)
+        assert result == data
+
+    num_small_writes = min(num_rows, NUM_SMALL_WRITES)
+    layer = make_layer(kind, 8)
+    layer.clear()
+    start = time.perf_counter()
+    for i in range(num_small_writes):
+        layer[(row_keys[i], COLS)] = data[i]
+    _report("single-row writes", num_small_writes, time.perf_counter() - start)
+
+    backend = layer.backend
+    assert isinstance(backend, (FirestoreBackend, DatastoreBackend))
+    start = time.perf_counter()
+    with backend.coalesce_writes():
+        for i in range(num_small_writes):
+            layer[(row_keys[i], COLS)] = data[i]
+    _report("single-row writes, coalesced", num_small_writes, time.perf_counter() - start)
+    layer.clear()
+
+
+if __name__ == "__main__":
+    run_benchmark(
+        sys.argv[1] if len(sys.argv) > 1 else "firestore",
+        int(sys.argv[2]) if len(sys.argv) > 2 else 10_000,
+    )
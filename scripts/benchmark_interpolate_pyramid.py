@@ -0,0 +1,152 @@
+"""
+Benchmark mip pyramid generation: ``build_interpolate_flow`` (one flow per mip, each
+reading back the previous mip) against ``build_interpolate_pyramid_flow`` (all mips
+from a single read).  Reports wall time and bytes read, and checks that both produce
+identical output.  Also times ``tensor_ops.interpolate_pyramid`` against chained
+``tensor_ops.interpolate`` calls in memory.
+
+Usage: python scripts/benchmark_interpolate_pyramid.py [size_xy] [mode]
+"""
+import sys
+import tempfile
+import time
+
+import numpy as np
+from cloudfiles import CloudFiles
+
+from zetta_utils import mazepa, tensor_ops
+from zetta_utils.geometry import BBox3D, Vec3D
+from zetta_utils.layer.volumetric.cloudvol import build_cv_layer
+from zetta_utils.mazepa_layer_processing.common import (
+    build_interpolate_flow,
+    build_interpolate_pyramid_flow,
+)
+
+BASE_RES = (4, 4, 40)
+DEPTH = 4
+CHUNK = 64
+
+
+class ReadCounter:
+    """
+    Counts bytes downloaded through ``CloudFiles.get``, which CloudVolume uses for
+    every chunk read (tasks run in this process, so patching the class is enough).
+    """
+
+    def __init__(self):
+        self.bytes = 0
+        original_get = CloudFiles.get
+
+        def counting_get(cf_self, *args, **kwargs):
+            result = original_get(cf_self, *args, **kwargs)
+            for item in result if isinstance(result, list) else [result]:
+                content = item.get("content") if isinstance(item, dict) else item
+                if isinstance(content, bytes):
+                    self.bytes += len(content)
+            return result
+
+        CloudFiles.get = counting_get  # type: ignore
+
+
+READ_COUNTER = ReadCounter()
+
+
+def make_layer(path, mode, size, num_mips):
+    return build_cv_layer(
+        path=path,
+        info_type="segmentation" if mode == "segmentation" else "image",
+        info_data_type="uint64" if mode == "segmentation" else "uint8",
+        info_num_channels=1,
+        info_chunk_size=[CHUNK, CHUNK, 1],
+        info_bbox=BBox3D.from_coords((0, 0, 0), (size, size, DEPTH), BASE_RES),
+        info_encoding="raw",
+        # Disable the in-memory chunk cache, so that reads hit storage as they would
+        # on separate workers
+        cv_kwargs={"cache_bytes_limit": 0},
+        info_scales=[
+            [BASE_RES[0] * 2**i, BASE_RES[1] * 2**i, BASE_RES[2]] for i in range(num_mips + 1)
+        ],
+    )
+
+
+def run_flow(build_fn, mode, size, num_mips, data, **kwargs):
+    bbox = BBox3D.from_coords((0, 0, 0), (size, size, DEPTH), BASE_RES)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = f"file://{tmp}/layer"
+        make_layer(path, mode, size, num_mips)[Vec3D(*BASE_RES), bbox] = data
+        layer = make_layer(path, mode, size, num_mips)
+        dst_resolutions = [
+            [BASE_RES[0] * 2**i, BASE_RES[1] * 2**i, BASE_RES[2]]
+            for i in range(1, num_mips + 1)
+        ]
+        flow = build_fn(
+            src=layer,
+            dst=layer,
+            src_resolution=BASE_RES,
+            dst_resolutions=dst_resolutions,
+            mode=mode,
+            bbox=bbox,
+            **kwargs,
+        )
+        start = time.perf_counter()
+        start_bytes = READ_COUNTER.bytes
+        mazepa.execute(flow, show_progress=False, do_dryrun_estimation=False)
+        elapsed = time.perf_counter() - start
+        read_bytes = READ_COUNTER.bytes - start_bytes
+        top_res = Vec3D(*dst_resolutions[-1])
+        top = layer[top_res, bbox]
+        return elapsed, read_bytes, top
+
+
+def run_benchmark(size, mode):
+    rng = np.random.default_rng(0)
+    dtype = np.uint64 if mode == "segmentation" else np.uint8
+    data = rng.integers(0, 200, (1, size, size, DEPTH)).astype(dtype)
+    for num_mips in (4, 5, 6):
+        top_chunk = max(CHUNK, size >> num_mips)
+        per_mip_t, per_mip_bytes, per_mip_top = run_flow(
+            build_interpolate_flow,
+            mode,
+            size,
+            num_mips,
+            data,
+            processing_chunk_sizes=[[CHUNK * 2, CHUNK * 2, 1]],
+            skip_intermediaries=True,
+            expand_bbox_processing=True,
+        )
+        pyramid_t, pyramid_bytes, pyramid_top = run_flow(
+            build_interpolate_pyramid_flow,
+            mode,
+            size,
+            num_mips,
+            data,
+            processing_chunk_size=[top_chunk, top_chunk, 1],
+            expand_bbox_processing=True,
+        )
+        assert np.array_equal(per_mip_top, pyramid_top)
+        print(
+            f"{mode} {size}x{size}x{DEPTH} {num_mips} mips: per-mip flows {per_mip_t:6.2f} s "
+            f"{per_mip_bytes / 2**20:7.1f} MiB read | pyramid flow {pyramid_t:6.2f} s "
+            f"{pyramid_bytes / 2**20:7.1f} MiB read"
+        )
+
+    scale_factors = [(0.5**i, 0.5**i, 1) for i in range(1, 6)]
+    start = time.perf_counter()
+    level = data
+    for _ in scale_factors:
+        level = tensor_ops.interpolate(level, scale_factor=(0.5, 0.5, 1), mode=mode)
+    chained_t = time.perf_counter() - start
+    start = time.perf_counter()
+    tensor_ops.interpolate_pyramid(data, scale_factors=scale_factors, mode=mode)
+    pyramid_op_t = time.perf_counter() - start
+    print(
+        f"{mode} in memory, 5 mips: chained interpolate {chained_t * 1e3:7.1f} ms | "
+        f"interpolate_pyramid {pyramid_op_t * 1e3:7.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    run_benchmark(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 2048,
+        sys.argv[2] if len(sys.argv) > 2 else "img",
+    )
@@ -0,0 +1,76 @@
+"""
+Benchmark the vertical ``JointDataset`` index lookup with 1000 sub-datasets against
+the previous linear scan over the sub-datasets, for single-index ``__getitem__`` and
+for the batched ``locate`` lookup.
+
+Usage: python scripts/benchmark_joint_dataset.py [num_datasets]
+"""
+import sys
+import time
+
+import numpy as np
+
+from zetta_utils.training.datasets import JointDataset
+
+NUM_LOOKUPS = 100_000
+BATCH_SIZE = 256
+
+
+class RangeDataset:
+    def __init__(self, num_samples):
+        self.num_samples = num_samples
+
+    def __len__(self):
+        return self.num_samples
+
+    def __getitem__(self, idx):
+        return idx
+
+
+def getitem_reference(datasets, idx):
+    sum_num_samples = 0
+    for dset in datasets.values():
+        sum_num_samples_new = sum_num_samples + len(dset)
+        if idx < sum_num_samples_new:
+            return dset[idx - sum_num_samples]
+        sum_num_samples = sum_num_samples_new
+    raise IndexError(idx)
+
+
+def run_benchmark(num_datasets):
+    rng = np.random.default_rng(0)
+    lens = rng.integers(1, 500, num_datasets).tolist()
+    datasets = {f"dset{i}": RangeDataset(num) for i, num in enumerate(lens)}
+    jds = JointDataset("vertical", datasets)
+    indices = rng.integers(0, len(jds), NUM_LOOKUPS).tolist()
+
+    start = time.perf_counter()
+    ref = [getitem_reference(datasets, idx) for idx in indices]
+    ref_t = time.perf_counter() - start
+
+    start = time.perf_counter()
+    new = [jds[idx] for idx in indices]
+    new_t = time.perf_counter() - start
+    assert ref == new
+
+    start = time.perf_counter()
+    batched = []
+    for i in range(0, NUM_LOOKUPS, BATCH_SIZE):
+        batched += jds.__getitems__(indices[i : i + BATCH_SIZE])
+    batched_t = time.perf_counter() - start
+    assert ref == batched
+
+    start = time.perf_counter()
+    for i in range(0, NUM_LOOKUPS, BATCH_SIZE):
+        jds.locate(indices[i : i + BATCH_SIZE])
+    locate_t = time.perf_counter() - start
+
+    print(f"{num_datasets} datasets, {NUM_LOOKUPS} lookups (per lookup):")
+    print(f"  linear scan    {ref_t / NUM_LOOKUPS * 1e6:8.2f} us")
+    print(f"  bisect         {new_t / NUM_LOOKUPS * 1e6:8.2f} us")
+    print(f"  __getitems__   {batched_t / NUM_LOOKUPS * 1e6:8.2f} us")
+    print(f"  locate only    {locate_t / NUM_LOOKUPS * 1e6:8.2f} us")
+
+
+if __name__ == "__main__":
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
@@ -0,0 +1,84 @@
+"""
+Benchmark CPU inference of ``.onnx`` models through ``load_and_run_model`` with the
+``onnx2torch`` conversion (``onnx_backend="torch"``) against a native onnxruntime
+session (``onnx_backend="onnxruntime"``), on UNets from ``convnet.architecture``
+exported to a temporary directory, for a few intra-op thread counts.
+
+Usage: python scripts/benchmark_onnx_runtime.py [num_repeats]
+"""
+import os
+import sys
+import tempfile
+import time
+from functools import partial
+
+import numpy as np
+import torch
+
+from zetta_utils import convnet
+from zetta_utils.convnet.onnx_runtime import configure_onnxruntime
+from zetta_utils.convnet.utils import MODEL_CACHE, load_and_run_model
+
+UNETS = {
+    "unet2d": dict(
+        list_num_channels=[[1, 16, 16], [16, 32, 32], [32, 64, 64], [64, 32, 32], [32, 16, 1]],
+        kernel_sizes=[3, 3],
+        input_shape=(1, 1, 256, 256),
+    ),
+    "unet3d": dict(
+        list_num_channels=[[1, 8, 8], [8, 16, 16], [16, 8, 1]],
+        kernel_sizes=[3, 3, 3],
+        conv=torch.nn.Conv3d,
+        downsample=partial(torch.nn.AvgPool3d, kernel_size=(2, 2, 1)),
+        upsample=partial(torch.nn.Upsample, scale_factor=(2, 2, 1)),
+        input_shape=(1, 1, 64, 64, 16),
+    ),
+}
+INTRA_OP_THREADS = (1, 4, 0)
+
+
+def export_unet(path, input_shape, **kwargs):
+    unet = convnet.architecture.UNet(**kwargs).eval()
+    torch.onnx.export(unet, torch.zeros(input_shape), path)
+
+
+def measure(fn, num_repeats):
+    result = fn()
+    start = time.perf_counter()
+    for _ in range(num_repeats):
+        fn()
+    return (time.perf_counter() - start) / num_repeats, result
+
+
+def run_benchmark(num_repeats):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name, spec in UNETS.items():
+            kwargs = dict(spec)
+            input_shape = kwargs.pop("input_shape")
+            path = os.path.join(tmp_dir, f"{name}.onnx")
+            export_unet(path, input_shape, **kwargs)
+            data = np.random.default_rng(0).random(input_shape).astype(np.float32)
+
+            torch_t, ref = measure(
+                lambda: load_and_run_model(path, data, device="cpu", onnx_backend="torch"),
+                num_repeats,
+            )
+            print(f"{name} {input_shape}: onnx2torch {torch_t * 1e3:8.1f} ms")
+            for num_threads in INTRA_OP_THREADS:
+                configure_onnxruntime(intra_op_num_threads=num_threads)
+                MODEL_CACHE.clear()
+                native_t, result = measure(
+                    lambda: load_and_run_model(
+                        path, data, device="cpu", onnx_backend="onnxruntime"
+                    ),
+                    num_repeats,
+                )
+                print(
+                    f"  onnxruntime, {num_threads or 'default'} intra-op threads: "
+                    f"{native_t * 1e3:8.1f} ms | {torch_t / native_t:5.2f}x | "
+                    f"max diff {np.abs(ref - result).max():.2e}"
+                )
+
+
+if __name__ == "__main__":
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
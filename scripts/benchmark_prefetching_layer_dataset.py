@@ -0,0 +1,83 @@
+"""
+Benchmark ``PrefetchingLayerDataset`` against ``LayerDataset`` on a layer set whose
+layers have a fixed per-read latency, as with remote storage, for a few latencies.
+Reports samples per second for the first epoch and for a second epoch served
+from the raw sample cache.
+
+Usage: python scripts/benchmark_prefetching_layer_dataset.py [num_samples]
+"""
+import sys
+import time
+
+import numpy as np
+
+from zetta_utils.layer import Backend, Layer, build_layer_set
+from zetta_utils.training.datasets import LayerDataset, PrefetchingLayerDataset
+from zetta_utils.training.datasets.sample_indexers import SampleIndexer
+
+LATENCIES = (0.005, 0.02, 0.05)
+NUM_LAYERS = 3
+SAMPLE_SHAPE = (1, 128, 128, 8)
+
+
+class SlowBackend(Backend):
+    def __init__(self, latency):
+        self.latency = latency
+
+    @property
+    def name(self):
+        return "slow"
+
+    def read(self, idx):
+        time.sleep(self.latency)
+        return np.full(SAMPLE_SHAPE, idx, dtype=np.float32)
+
+    def write(self, idx, data):
+        raise NotImplementedError()
+
+    def with_changes(self, **kwargs):
+        return self
+
+
+class RangeIndexer(SampleIndexer):
+    def __init__(self, num_samples):
+        self.num_samples = num_samples
+
+    def __len__(self):
+        return self.num_samples
+
+    def __call__(self, idx):
+        return idx
+
+
+def measure_epoch(dset):
+    start = time.perf_counter()
+    for i in range(len(dset)):
+        dset[i]
+    return len(dset) / (time.perf_counter() - start)
+
+
+def run_benchmark(num_samples):
+    indexer = RangeIndexer(num_samples)
+    for latency in LATENCIES:
+        layer = build_layer_set(
+            {f"layer{i}": Layer(backend=SlowBackend(latency)) for i in range(NUM_LAYERS)}
+        )
+        ref = LayerDataset(layer=layer, sample_indexer=indexer)
+        new = PrefetchingLayerDataset(
+            layer=layer, sample_indexer=indexer, prefetch=8, cache_bytes=2 ** 30
+        )
+        for i in range(min(num_samples, 4)):
+            for k, v in ref[i].items():
+                assert (v == new[i][k]).all()
+        ref_sps = measure_epoch(ref)
+        new_sps = measure_epoch(new)
+        cached_sps = measure_epoch(new)
+        print(
+            f"latency {latency * 1e3:5.1f} ms: LayerDataset {ref_sps:8.1f} samples/s | "
+            f"prefetching {new_sps:8.1f} samples/s | cached epoch {cached_sps:8.1f} samples/s"
+        )
+
+
+if __name__ == "__main__":
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 64)
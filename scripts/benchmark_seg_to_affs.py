@@ -0,0 +1,67 @@
+"""
+Benchmark ``tensor_ops.label.seg_to_affs`` against one ``seg_to_aff`` call per edge, for
+the short and long range edges of a typical affinity training sample, with and without
+a mask.  Reports samples/sec for the numpy and torch paths.
+
+Usage: python scripts/benchmark_seg_to_affs.py [size_xy] [size_z]
+"""
+import sys
+import time
+
+import numpy as np
+import torch
+
+from zetta_utils.tensor_ops.label import seg_to_aff, seg_to_affs
+
+EDGES = [
+    [1, 0, 0],
+    [0, 1, 0],
+    [0, 0, 1],
+    [4, 0, 0],
+    [0, 4, 0],
+    [0, 0, 2],
+    [8, 0, 0],
+    [0, 8, 0],
+    [0, 0, 3],
+    [16, 0, 0],
+    [0, 16, 0],
+    [0, 0, 4],
+]
+DURATION_SEC = 3.0
+
+
+def samples_per_sec(fn):
+    fn()  # warm up
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < DURATION_SEC:
+        fn()
+        count += 1
+    return count / (time.perf_counter() - start)
+
+
+def run_benchmark(size_xy, size_z):
+    rng = np.random.default_rng(0)
+    seg_np = rng.integers(0, 50, (1, size_xy, size_xy, size_z)).astype(np.uint32)
+    mask_np = (rng.random(seg_np.shape) > 0.1).astype(np.float32)
+    for name, seg, mask in [
+        ("numpy", seg_np, mask_np),
+        ("torch", torch.from_numpy(seg_np.astype(np.int32)), torch.from_numpy(mask_np)),
+    ]:
+        for use_mask in (False, True):
+            mask_arg = mask if use_mask else None
+            per_edge = samples_per_sec(
+                lambda: [seg_to_aff(seg, edge=edge, mask=mask_arg) for edge in EDGES]
+            )
+            fused = samples_per_sec(lambda: seg_to_affs(seg, edges=EDGES, mask=mask_arg))
+            print(
+                f"{name} {size_xy}x{size_xy}x{size_z}, {len(EDGES)} edges, mask={use_mask}: "
+                f"per-edge {per_edge:7.1f} samples/s | seg_to_affs {fused:7.1f} samples/s"
+            )
+
+
+if __name__ == "__main__":
+    run_benchmark(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 256,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 20,
+    )
@@ -0,0 +1,113 @@
+"""
+Benchmark the adaptive tuning of semaphore limits against fixed limits, with worker
+processes running simulated I/O-bound tasks (sleeping while holding the ``read``
+semaphore) and CPU-bound tasks (a busy loop while holding the ``cpu`` semaphore).
+The optimal limit is the maximum limit for I/O-bound tasks, and the number of
+cores for CPU-bound tasks.
+
+Usage: python scripts/benchmark_semaphore_controller.py [duration_sec]
+"""
+import multiprocessing
+import os
+import sys
+import time
+
+from zetta_utils.mazepa import configure_semaphores, semaphore
+from zetta_utils.mazepa.semaphore_controller import SemaphorePolicyName
+
+NUM_CORES = os.cpu_count() or 1
+NUM_WORKERS = 4 * NUM_CORES
+MAX_LIMIT = 3 * NUM_CORES
+IO_LATENCY_SEC = 0.05
+CPU_WORK_ITERATIONS = 200_000
+TUNING_INTERVAL_SEC = 0.5
+
+
+def io_task():
+    with semaphore("read"):
+        time.sleep(IO_LATENCY_SEC)
+
+
+def cpu_task():
+    with semaphore("cpu"):
+        total = 0
+        for i in range(CPU_WORK_ITERATIONS):
+            total += i
+
+
+TASKS = {"read": io_task, "cpu": cpu_task}
+
+
+def work(sema_type, completed, finished):
+    task = TASKS[sema_type]
+    while not finished.is_set():
+        task()
+        with completed.get_lock():
+            completed.value += 1
+
+
+def measure_throughput(
+    sema_type,
+    limit,
+    duration_sec,
+    semaphores_bounds=None,
+    semaphores_policy: SemaphorePolicyName = "aimd",
+):
+    """
+    Runs the workers for ``duration_sec`` and returns the throughput over the last
+    third of the run, after the tuning had time to converge.
+    """
+    ctx = multiprocessing.get_context("fork")
+    completed = ctx.Value("l", 0)
+    finished = ctx.Event()
+    spec = {"read": 1, "write": 1, "cuda": 1, "cpu": 1}
+    spec[sema_type] = limit
+    with configure_semaphores(
+        spec,
+        semaphores_bounds=semaphores_bounds,
+        semaphores_policy=semaphores_policy,
+        semaphores_tuning_interval_sec=TUNING_INTERVAL_SEC,
+    ):
+        workers = [
+            ctx.Process(target=work, args=(sema_type, completed, finished))
+            for _ in range(NUM_WORKERS)
+        ]
+        for worker in workers:
+            worker.start()
+        time.sleep(duration_sec * 2 / 3)
+        start_count = completed.value
+        start = time.perf_counter()
+        time.sleep(duration_sec / 3)
+        result = (completed.value - start_count) / (time.perf_counter() - start)
+        finished.set()
+        for worker in workers:
+            worker.join()
+    return result
+
+
+def run_benchmark(duration_sec):
+    print(f"{NUM_CORES} cores, {NUM_WORKERS} workers, limits within [1, {MAX_LIMIT}]")
+    for sema_type, kind in (("read", "I/O-bound"), ("cpu", "CPU-bound")):
+        print(f"\n{kind} tasks under the `{sema_type}` semaphore:")
+        fixed = {}
+        for limit in sorted({1, NUM_CORES // 2 or 1, NUM_CORES, 2 * NUM_CORES, MAX_LIMIT}):
+            fixed[limit] = measure_throughput(sema_type, limit, duration_sec)
+            print(f"  fixed limit {limit:4d}: {fixed[limit]:8.1f} tasks/s")
+        best = max(fixed.values())
+        for policy in ("aimd", "hill_climbing"):
+            for initial_limit in (1, MAX_LIMIT):
+                throughput = measure_throughput(
+                    sema_type,
+                    initial_limit,
+                    duration_sec,
+                    semaphores_bounds={sema_type: [1, MAX_LIMIT]},
+                    semaphores_policy=policy,  # type: ignore[arg-type]
+                )
+                print(
+                    f"  {policy:>13} from {initial_limit:4d}: {throughput:8.1f} tasks/s "
+                    f"({throughput / best:.0%} of the best fixed limit)"
+                )
+
+
+if __name__ == "__main__":
+    run_benchmark(float(sys.argv[1]) if len(sys.argv) > 1 else 30.0)
@@ -0,0 +1,71 @@
+"""
+Benchmark TensorOpPipeline against calling the same read procs one after another,
+on 1k x 1k x N tensors.  Reports mean time and peak traced allocation per call.
+
+Usage: python scripts/benchmark_tensor_op_pipeline.py [N ...]
+"""
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from zetta_utils import builder
+from zetta_utils.tensor_ops import TensorOpPipeline
+
+REPEATS = 5
+
+CHAINS = {
+    "normalize": [
+        {"@type": "rearrange", "@mode": "partial", "pattern": "C X Y Z -> C X Y Z"},
+        {"@type": "divide", "@mode": "partial", "value": 255.0},
+        {"@type": "add", "@mode": "partial", "value": -0.5},
+        {"@type": "multiply", "@mode": "partial", "value": 2.0},
+        {"@type": "crop", "@mode": "partial", "crop": [64, 64, 0]},
+    ],
+    "mask": [
+        {"@type": "multiply", "@mode": "partial", "value": 1.5},
+        {"@type": "abs", "@mode": "partial"},
+        {"@type": "crop_center", "@mode": "partial", "size": [768, 768, 1]},
+        {"@type": "compare", "@mode": "partial", "mode": ">", "value": 0.5},
+    ],
+    "interpolate_pad": [
+        {"@type": "interpolate", "@mode": "partial", "scale_factor": [0.5, 0.5, 1]},
+        {"@type": "multiply", "@mode": "partial", "value": 0.5},
+        {"@type": "add", "@mode": "partial", "value": 1.0},
+        {"@type": "pad_center_to", "@mode": "partial", "shape": [576, 576, 1]},
+    ],
+}
+
+
+def measure(pipeline, data):
+    pipeline(data)  # warm up
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        pipeline(data)
+    elapsed = (time.perf_counter() - start) / REPEATS
+    tracemalloc.start()
+    pipeline(data)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def run_benchmark(depth: int):
+    data = np.random.rand(1, 1024, 1024, depth).astype(np.float32)
+    for name, steps in CHAINS.items():
+        if name == "interpolate_pad" and depth != 1:
+            continue
+        fused = builder.build({"@type": "TensorOpPipeline", "steps": steps})
+        sequential = TensorOpPipeline(steps=fused.steps, fuse=False)
+        seq_t, seq_mem = measure(sequential, data)
+        fused_t, fused_mem = measure(fused, data)
+        print(
+            f"N={depth:<3} {name:<16} sequential {seq_t * 1e3:8.1f} ms {seq_mem / 2**20:7.1f} MiB"
+            f" | fused {fused_t * 1e3:8.1f} ms {fused_mem / 2**20:7.1f} MiB"
+        )
+
+
+if __name__ == "__main__":
+    for n in [int(e) for e in sys.argv[1:]] or [1, 8, 32]:
+        run_benchmark(n)
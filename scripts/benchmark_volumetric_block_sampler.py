@@ -0,0 +1,73 @@
+"""
+Benchmark the bytes fetched from storage per epoch when sampling a
+``VolumetricStridedIndexer`` with ``VolumetricBlockSampler`` against a uniform
+``RandomSampler``.  Each DataLoader worker is modelled as an LRU cache of backend
+chunks; a sample fetches every chunk it overlaps that is not in its worker's cache.
+
+Usage: python scripts/benchmark_volumetric_block_sampler.py [cache_chunks]
+"""
+import sys
+from collections import OrderedDict
+from itertools import product
+
+import numpy as np
+import torch
+
+from zetta_utils.geometry import BBox3D, IntVec3D, Vec3D
+from zetta_utils.training.datasets.sample_indexers import VolumetricStridedIndexer
+from zetta_utils.training.sampler import VolumetricBlockSampler
+
+BACKEND_CHUNK_SIZE = (256, 256, 16)
+BYTES_PER_VOXEL = 1
+NUM_WORKERS = 4
+BATCH_SIZE = 8
+BLOCK_SIZES = ((2, 2, 1), (4, 4, 2), (8, 8, 4))
+
+
+def count_fetched_bytes(indexer, order, cache_chunks):
+    caches = [OrderedDict() for _ in range(NUM_WORKERS)]
+    chunk_bytes = int(np.prod(BACKEND_CHUNK_SIZE)) * BYTES_PER_VOXEL
+    fetched = 0
+    for i, sample_idx in enumerate(order):
+        # DataLoader workers take whole batches in turn
+        cache = caches[(i // BATCH_SIZE) % NUM_WORKERS]
+        idx = indexer(sample_idx)
+        ranges = [
+            range(start // size, (stop - 1) // size + 1)
+            for start, stop, size in zip(idx.start, idx.stop, BACKEND_CHUNK_SIZE)
+        ]
+        for chunk in product(*ranges):
+            if chunk in cache:
+                cache.move_to_end(chunk)
+            else:
+                fetched += chunk_bytes
+                cache[chunk] = None
+                if len(cache) > cache_chunks:
+                    cache.popitem(last=False)
+    return fetched
+
+
+def run_benchmark(cache_chunks):
+    indexer = VolumetricStridedIndexer(
+        bbox=BBox3D.from_coords(
+            start_coord=Vec3D(0, 0, 0), end_coord=Vec3D(4096, 4096, 128), resolution=Vec3D(1, 1, 1)
+        ),
+        chunk_size=IntVec3D(256, 256, 16),
+        resolution=Vec3D(1, 1, 1),
+        stride=IntVec3D(128, 128, 8),
+    )
+    uniform = list(torch.utils.data.RandomSampler(range(len(indexer))))
+    uniform_bytes = count_fetched_bytes(indexer, uniform, cache_chunks)
+    print(f"{len(indexer)} samples, {cache_chunks} cached chunks per worker")
+    print(f"  uniform          {uniform_bytes / 2 ** 30:8.2f} GiB")
+    for block_size in BLOCK_SIZES:
+        sampler = VolumetricBlockSampler(indexer, block_size=block_size, num_replicas=1, rank=0)
+        block_bytes = count_fetched_bytes(indexer, list(sampler), cache_chunks)
+        print(
+            f"  blocks {block_size}  {block_bytes / 2 ** 30:8.2f} GiB | "
+            f"{uniform_bytes / block_bytes:5.2f}x less"
+        )
+
+
+if __name__ == "__main__":
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 64)
@@ -0,0 +1,72 @@
+# pylint: disable=missing-docstring
+import pickle
+import threading
+
+import pytest
+
+from zetta_utils.common import metrics
+
+
+def test_histogram_observe():
+    histogram = metrics.Histogram(bounds=(1.0, 2.0))
+    for value in [0.5, 1.0, 1.5, 3.0]:
+        histogram.observe(value)
+    assert histogram.bucket_counts == [2, 1, 1]
+    assert histogram.count == 4
+    assert histogram.total == 6.0
+    assert histogram.mean == 1.5
+    assert histogram.quantile(0.5) == 1.0
+    assert histogram.quantile(0.75) == 2.0
+    assert histogram.quantile(1.0) == float("inf")
+
+
+def test_histogram_merge():
+    histogram = metrics.Histogram(bounds=(1.0,))
+    other = metrics.Histogram(bounds=(1.0,))
+    histogram.observe(0.5)
+    other.observe(2.0)
+    histogram.merge(other)
+    assert histogram.bucket_counts == [1, 1]
+    assert histogram.count == 2
+    with pytest.raises(ValueError):
+        histogram.merge(metrics.Histogram(bounds=(2.0,)))
+
+
+def test_collect_metrics():
+    metrics.increment("ignored")
+    with metrics.collect_metrics() as outer:
+        with metrics.collect_metrics() as inner:
+            metrics.increment("count", 2)
+            with metrics.record_time("duration"):
+                pass
+        metrics.increment("count")
+    snapshot = outer.snapshot()
+    assert snapshot.counters == {"count": 3}
+    assert snapshot.histograms["duration"].count == 1
+    assert inner.snapshot().counters == {"count": 2}
+
+
+def test_collect_metrics_from_threads():
+    with metrics.collect_metrics() as recorder:
+        threads = [
+            threading.Thread(target=lambda: [metrics.observe("x", 0.1) for _ in range(100)])
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert recorder.snapshot().histograms["x"].count == 400
+
+
+def test_snapshot_merge_and_pickle():
+    with metrics.collect_metrics() as recorder:
+        metrics.increment("count")
+        metrics.observe("duration", 0.5)
+    snapshot = pickle.loads(pickle.dumps(recorder.snapshot()))
+    merged = metrics.MetricsSnapshot()
+    merged.merge(snapshot)
+    merged.merge(snapshot)
+    assert merged.counters == {"count": 2}
+    assert merged.histograms["duration"].count == 2
+    assert snapshot.histograms["duration"].count == 1
@@ -0,0 +1,94 @@
+# pylint: disable=missing-docstring
+import pickle
+import threading
+import time
+
+from zetta_utils.common import tracing
+
+
+def test_span_noop_without_trace():
+    with tracing.span("ignored"):
+        pass
+    assert tracing._active_trace is None  # pylint: disable=protected-access
+
+
+def test_trace_task_span_tree():
+    with tracing.trace_task("task-0", "Op") as trace:
+        with tracing.span("read"):
+            with tracing.span("backend.read"):
+                pass
+        with tracing.span("write"):
+            pass
+    assert [span.name for span in trace.spans] == ["Op", "read", "backend.read", "write"]
+    assert [span.parent for span in trace.spans] == [None, 0, 1, 0]
+    assert all(span.end_ts is not None for span in trace.spans)
+    assert trace.spans[0].duration >= trace.spans[1].duration
+
+
+def test_spans_from_other_threads_attach_to_root():
+    def in_thread():
+        with tracing.span("in_thread"):
+            pass
+
+    with tracing.trace_task("task-0", "Op") as trace:
+        with tracing.span("outer"):
+            thread = threading.Thread(target=in_thread)
+            thread.start()
+            thread.join()
+    in_thread = [span for span in trace.spans if span.name == "in_thread"][0]
+    assert in_thread.parent == 0
+    assert in_thread.thread_id != trace.spans[0].thread_id
+
+
+def test_cprofile():
+    def profiled_fn():
+        return sum(range(1000))
+
+    with tracing.trace_task("task-0", "Op", profile="cprofile") as trace:
+        profiled_fn()
+    assert trace.profile_stats is not None
+    assert any(key[2] == "profiled_fn" for key in trace.profile_stats)
+
+
+def test_stack_samples():
+    def sleeping_fn():
+        time.sleep(0.1)
+
+    with tracing.trace_task(
+        "task-0", "Op", profile="stack", stack_sample_interval_sec=0.005
+    ) as trace:
+        sleeping_fn()
+    assert trace.stack_samples is not None
+    assert len(trace.stack_samples.stacks) > 0
+    assert any("sleeping_fn" in stack[-1] for stack in trace.stack_samples.stacks)
+
+
+def test_pickle():
+    with tracing.trace_task("task-0", "Op") as trace:
+        with tracing.span("read"):
+            pass
+    restored = pickle.loads(pickle.dumps(trace))
+    assert restored.spans == trace.spans
+    with tracing.trace_task("task-1", "Op"):
+        restored.open_span("after", parent=0)
+
+
+def test_span_cap():
+    with tracing.trace_task("task-0", "Op") as trace:
+        trace.max_spans = 3
+        for _ in range(5):
+            with tracing.span("read"):
+                pass
+    assert len(trace.spans) == 3
+    assert trace.dropped_spans == 3
+    assert trace.spans[0].end_ts is not None
+
+
+def test_stack_sample_cap():
+    with tracing.trace_task(
+        "task-0", "Op", profile="stack", stack_sample_interval_sec=0.001
+    ) as trace:
+        assert trace.stack_samples is not None
+        trace.stack_samples.max_samples = 5
+        time.sleep(0.1)
+    assert len(trace.stack_samples.stacks) == 5
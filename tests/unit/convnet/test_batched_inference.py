@@ -0,0 +1,93 @@
+# pylint: disable=missing-docstring,redefined-outer-name,unused-argument,pointless-statement,line-too-long,protected-access,unsubscriptable-object
+import pickle
+
+import numpy as np
+import pytest
+import torch
+
+from zetta_utils.convnet import BatchedInferenceEngine
+
+from ..helpers import assert_array_equal
+
+
+class Doubler(torch.nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.batch_sizes: list[int] = []
+
+    def forward(self, x):
+        self.batch_sizes.append(x.shape[0])
+        return torch.cat([x * 2, x * 2], 1)
+
+
+@pytest.fixture
+def model(mocker):
+    result = Doubler()
+    mocker.patch("zetta_utils.convnet.utils.load_model", return_value=result)
+    return result
+
+
+def make_engine(**kwargs):
+    return BatchedInferenceEngine("dummy_path", device="cpu", autocast=False, **kwargs)
+
+
+def test_run_batched(model):
+    data = [np.full((1, 4, 4), i, dtype=np.float32) for i in range(5)] + [torch.ones((1, 3, 3))]
+    result = make_engine(batch_size=2).run_batched(data)
+    for e, res in zip(data, result):
+        assert type(res) is type(e)
+        np.testing.assert_array_equal(np.asarray(res), np.concatenate([e * 2, e * 2]))
+    assert sorted(model.batch_sizes) == [1, 1, 2, 2]
+
+
+def test_submit(model):
+    data = [np.full((1, 4, 4), i, dtype=np.float32) for i in range(5)]
+    with make_engine(batch_size=2) as engine:
+        futures = [engine.submit(e) for e in data]
+        assert futures[3].done() and not futures[4].done()
+    for e, future in zip(data, futures):
+        assert_array_equal(future.result(), np.concatenate([e * 2, e * 2]))
+    assert model.batch_sizes == [2, 2, 1]
+
+
+def test_submit_exc(mocker):
+    mocker.patch("zetta_utils.convnet.utils.load_model", side_effect=RuntimeError)
+    engine = make_engine(batch_size=2)
+    future = engine.submit(np.zeros((1, 2, 2), dtype=np.float32))
+    engine.flush()
+    with pytest.raises(RuntimeError):
+        future.result()
+
+
+@pytest.mark.parametrize("blend", ["linear", "constant"])
+@pytest.mark.parametrize("num_threads", [1, 3])
+@pytest.mark.parametrize(
+    "shape, tile_size, overlap",
+    [
+        [(1, 10, 7), (4, 4), (2, 1)],
+        [(2, 9, 9, 3), (4, 4, 3), (1, 1, 0)],
+        [(1, 4, 4), (4, 4), (0, 0)],
+    ],
+)
+def test_run_tiled(model, blend, num_threads, shape, tile_size, overlap):
+    data = torch.rand(shape)
+    engine = make_engine(batch_size=2, num_threads=num_threads)
+    result = engine.run_tiled(data, tile_size=tile_size, overlap=overlap, blend=blend)
+    torch.testing.assert_close(result, torch.cat([data * 2, data * 2]))
+
+
+@pytest.mark.parametrize(
+    "tile_size, overlap",
+    [[(4,), (0,)], [(11, 4), (0, 0)], [(4, 4), (4, 0)]],
+)
+def test_run_tiled_exc(model, tile_size, overlap):
+    with pytest.raises(ValueError):
+        make_engine().run_tiled(torch.zeros((1, 10, 7)), tile_size=tile_size, overlap=overlap)
+
+
+def test_pickle():
+    engine = make_engine(batch_size=3)
+    engine.submit(np.zeros((1, 2, 2), dtype=np.float32))
+    restored = pickle.loads(pickle.dumps(engine))
+    assert restored == make_engine(batch_size=3)
+    assert restored._pending == []
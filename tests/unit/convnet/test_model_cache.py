@@ -0,0 +1,161 @@
+# pylint: disable=missing-docstring,redefined-outer-name,unused-argument,pointless-statement,line-too-long,protected-access,unsubscriptable-object
+import threading
+
+import fsspec
+import pytest
+import torch
+
+from zetta_utils.convnet.utils import ModelCache, _get_model_nbytes
+
+
+def save_jit(path, num_channels):
+    model = torch.nn.Conv2d(1, num_channels, 3)
+    with fsspec.open(path, "wb") as f:
+        torch.jit.save(torch.jit.script(model), f)
+    return _get_model_nbytes(model)
+
+
+@pytest.fixture
+def model_paths(tmp_path):
+    paths = [str(tmp_path / f"model{i}.jit") for i in range(3)]
+    nbytes = [save_jit(path, 8) for path in paths]
+    return paths, nbytes[0]
+
+
+def test_hits_across_three_models(model_paths):
+    paths, nbytes = model_paths
+    cache = ModelCache(max_bytes=3 * nbytes)
+    for _ in range(3):
+        models = [cache.get(path) for path in paths]
+    assert cache.stats.loads == 3
+    assert cache.stats.misses == 3
+    assert cache.stats.hits == 6
+    assert cache.stats.load_seconds > 0
+    assert [cache.get(path) for path in paths] == models
+
+
+def test_byte_budget_eviction(model_paths):
+    paths, nbytes = model_paths
+    cache = ModelCache(max_bytes=2 * nbytes)
+    for path in paths + paths[:1]:
+        cache.get(path)
+    assert cache.stats.loads == 4
+    cache.get(paths[2])
+    assert cache.stats.loads == 4
+
+
+def test_too_large_not_cached(model_paths):
+    paths, nbytes = model_paths
+    cache = ModelCache(max_bytes=nbytes - 1)
+    cache.get(paths[0])
+    cache.get(paths[0])
+    assert cache.stats.loads == 2
+
+
+def test_dtype_key(model_paths):
+    paths, _ = model_paths
+    cache = ModelCache()
+    model_fp32 = cache.get(paths[0])
+    model_fp64 = cache.get(paths[0], dtype=torch.float64)
+    assert next(model_fp32.parameters()).dtype == torch.float32
+    assert next(model_fp64.parameters()).dtype == torch.float64
+    assert cache.get(paths[0], dtype=torch.float64) is model_fp64
+    assert cache.stats.loads == 2
+
+
+def load_conv(path, device, *args):
+    return torch.nn.Conv2d(1, 8, 3).to(device)
+
+
+def test_device_placement_reuses_host_copy(mocker):
+    mocker.patch("zetta_utils.convnet.utils._load_model", side_effect=load_conv)
+    paths = ["model.json"]
+    cache = ModelCache()
+    host_model = cache.get(paths[0], "cpu")
+    # "meta" stands in for an accelerator device
+    device_model = cache.get(paths[0], "meta")
+    assert device_model is not host_model
+    assert next(device_model.parameters()).device == torch.device("meta")
+    assert next(host_model.parameters()).device == torch.device("cpu")
+    assert cache.get(paths[0], "meta") is device_model
+    assert cache.stats.loads == 1
+    assert cache.stats.misses == 2
+    assert cache.stats.hits == 1
+
+
+def test_single_device_no_host_copy(mocker):
+    load_model = mocker.patch("zetta_utils.convnet.utils._load_model", side_effect=load_conv)
+    cache = ModelCache()
+    device_model = cache.get("model.json", "meta")
+    assert next(device_model.parameters()).device == torch.device("meta")
+    assert load_model.call_args.args[1] == "meta"
+    assert len(cache._get_device_cache("cpu")) == 0
+    assert cache.get("model.json", "meta") is device_model
+
+
+def test_host_copy_for_several_devices(mocker):
+    mocker.patch("zetta_utils.convnet.utils._load_model", side_effect=load_conv)
+    cache = ModelCache()
+    # Stands in for the model having been requested on another accelerator device
+    cache._devices[("model.json", None, "torch")] = {"cuda:1"}
+    device_model = cache.get("model.json", "meta")
+    assert next(device_model.parameters()).device == torch.device("meta")
+    assert len(cache._get_device_cache("cpu")) == 1
+    assert cache.stats.loads == 1
+    assert cache.stats.placement_seconds > 0
+
+
+def test_loads_do_not_block_other_models(mocker):
+    release = threading.Event()
+    started = threading.Event()
+
+    def load(path, device, *args):
+        if path == "slow.json":
+            started.set()
+            assert release.wait(10)
+        return load_conv(path, device)
+
+    load_model = mocker.patch("zetta_utils.convnet.utils._load_model", side_effect=load)
+    cache = ModelCache()
+    fast_model = cache.get("fast.json")
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get("slow.json")))
+        for _ in range(2)
+    ]
+    for thread in threads:
+        thread.start()
+    assert started.wait(10)
+    # A hit and a load of another model do not wait for the slow load
+    assert cache.get("fast.json") is fast_model
+    cache.get("other.json")
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert results[0] is results[1]
+    assert [e.args[0] for e in load_model.call_args_list].count("slow.json") == 1
+
+
+def test_configure_keeps_unset_settings(tmp_path):
+    cache = ModelCache(max_bytes=100, local_dir=str(tmp_path))
+    cache.configure(max_bytes=200)
+    assert cache.max_bytes == 200
+    assert cache.local_dir == str(tmp_path)
+    cache.configure(local_dir=str(tmp_path / "other"))
+    assert cache.max_bytes == 200
+    assert cache.local_dir == str(tmp_path / "other")
+
+
+def test_local_dir(tmp_path):
+    path = "memory://models/remote.jit"
+    save_jit(path, 4)
+    cache = ModelCache(local_dir=str(tmp_path / "local"))
+    cache.get(path)
+    local_files = list((tmp_path / "local").iterdir())
+    assert len(local_files) == 1
+    assert local_files[0].name.endswith("_remote.jit")
+
+    cache.configure(local_dir=str(tmp_path / "local"))
+    fsspec.filesystem("memory").rm(path)
+    cache.get(path)
+    assert cache.stats.loads == 2
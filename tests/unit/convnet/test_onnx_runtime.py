@@ -0,0 +1,71 @@
+# pylint: disable=missing-docstring,redefined-outer-name,unused-argument,pointless-statement,line-too-long,protected-access,unsubscriptable-object
+from functools import partial
+
+import numpy as np
+import pytest
+import torch
+
+from zetta_utils import convnet
+from zetta_utils.convnet.onnx_runtime import OnnxRuntimeModule, OnnxRuntimeOptions
+from zetta_utils.convnet.utils import ModelCache, load_and_run_model, load_model
+
+
+@pytest.fixture
+def onnx_path(tmp_path):
+    unet = convnet.architecture.UNet(
+        list_num_channels=[[1, 4, 4], [4, 8, 4], [4, 4, 2]],
+        kernel_sizes=[3, 3],
+        downsample=partial(torch.nn.AvgPool2d, kernel_size=2),
+        upsample=partial(torch.nn.Upsample, scale_factor=2),
+    ).eval()
+    path = str(tmp_path / "unet.onnx")
+    torch.onnx.export(
+        unet,
+        torch.zeros((1, 1, 16, 16)),
+        path,
+        input_names=["input"],
+        output_names=["output"],
+        dynamic_axes={"input": {0: "batch", 2: "x", 3: "y"}},
+    )
+    return path
+
+
+@pytest.mark.parametrize("dtype", [np.float32, np.float64])
+def test_matches_torch_backend(onnx_path, dtype):
+    data = np.random.default_rng(0).random((2, 1, 32, 32)).astype(dtype)
+    expected = load_model(onnx_path, onnx_backend="torch")(torch.from_numpy(data).float())
+    result = load_and_run_model(
+        onnx_path, data, device="cpu", use_cache=False, onnx_backend="onnxruntime"
+    )
+    assert isinstance(result, np.ndarray)
+    assert result.dtype == dtype
+    np.testing.assert_allclose(result, expected.detach().numpy(), rtol=1e-4, atol=1e-5)
+
+
+def test_session_options(onnx_path):
+    model = OnnxRuntimeModule(
+        onnx_path, OnnxRuntimeOptions(intra_op_num_threads=2, inter_op_num_threads=1)
+    )
+    session_options = model.session.get_session_options()
+    assert session_options.intra_op_num_threads == 2
+    assert session_options.inter_op_num_threads == 1
+
+
+def test_num_inputs_exc(onnx_path):
+    model = OnnxRuntimeModule(onnx_path)
+    with pytest.raises(ValueError):
+        model(torch.zeros((1, 1, 16, 16)), torch.zeros((1, 1, 16, 16)))
+
+
+def test_gpu_exc(onnx_path):
+    with pytest.raises(ValueError):
+        load_model(onnx_path, device="cuda", onnx_backend="onnxruntime")
+
+
+def test_cache_key(onnx_path):
+    cache = ModelCache()
+    native = cache.get(onnx_path, onnx_backend="onnxruntime")
+    converted = cache.get(onnx_path, onnx_backend="torch")
+    assert isinstance(native, OnnxRuntimeModule)
+    assert not isinstance(converted, OnnxRuntimeModule)
+    assert cache.get(onnx_path, onnx_backend="onnxruntime") is native
@@ -1,12 +1,21 @@
+import itertools
 import os
+import random
 import shutil
+import tempfile
+import tracemalloc
 
+import fsspec
 import pytest
 
+from zetta_utils import mazepa
 from zetta_utils.db_annotations import precomp_annotations
 from zetta_utils.db_annotations.precomp_annotations import (
     AnnotationLayer,
+    AxisAlignedBoundingBoxAnnotation,
+    EllipsoidAnnotation,
     LineAnnotation,
+    PointAnnotation,
 )
 from zetta_utils.geometry import BBox3D, Vec3D
 from zetta_utils.layer.volumetric.index import VolumetricIndex
@@ -158,6 +167,263 @@ def test_single_level():
     assert precomp_annotations.count_lines_in_file(chunk_path) == 2
 
 
+@pytest.mark.parametrize(
+    "annotation_type, annotations, expected_strict_ids",
+    [
+        [
+            "POINT",
+            [
+                PointAnnotation(point_id=1, position=(1640.0, 1308.0, 61.0)),
+                PointAnnotation(point_id=2, position=(254.0, 68.0, 575.0)),
+                PointAnnotation(point_id=3, position=(1061.0, 657.0, 507.0)),
+            ],
+            [2],
+        ],
+        [
+            "AXIS_ALIGNED_BOUNDING_BOX",
+            [
+                AxisAlignedBoundingBoxAnnotation(
+                    bbox_id=1, start=(1640.0, 1308.0, 61.0), end=(1644.0, 1304.0, 57.0)
+                ),
+                AxisAlignedBoundingBoxAnnotation(
+                    bbox_id=2, start=(490.0, 68.0, 575.0), end=(510.0, 72.0, 580.0)
+                ),
+                AxisAlignedBoundingBoxAnnotation(
+                    bbox_id=3, start=(1061.0, 657.0, 507.0), end=(1063.0, 653.0, 502.0)
+                ),
+            ],
+            [],
+        ],
+        [
+            "ELLIPSOID",
+            [
+                EllipsoidAnnotation(
+                    ellipsoid_id=1, center=(1640.0, 1308.0, 61.0), radii=(4.0, 4.0, 1.0)
+                ),
+                EllipsoidAnnotation(
+                    ellipsoid_id=2, center=(500.0, 68.0, 575.0), radii=(10.0, 2.0, 2.0)
+                ),
+                EllipsoidAnnotation(
+                    ellipsoid_id=3, center=(1061.0, 657.0, 507.0), radii=(2.0, 2.0, 2.0)
+                ),
+            ],
+            [],
+        ],
+    ],
+)
+def test_round_trip_annotation_types(annotation_type, annotations, expected_strict_ids):
+    temp_dir = os.path.expanduser("~/temp/test_precomp_anno")
+    os.makedirs(temp_dir, exist_ok=True)
+    file_dir = os.path.join(temp_dir, f"round_trip_{annotation_type.lower()}")
+
+    index = VolumetricIndex.from_coords([0, 0, 0], [2000, 2000, 600], Vec3D(10, 10, 40))
+    chunk_sizes = [[2000, 2000, 600], [500, 500, 300]]
+    sf = AnnotationLayer(file_dir, index, chunk_sizes, annotation_type)
+    sf.clear()
+    sf.write_annotations(annotations, all_levels=False)
+    sf.post_process()
+
+    sf = AnnotationLayer(file_dir)
+    assert sf.annotation_type == annotation_type
+    assert sf.annotation_class == type(annotations[0])
+    annotations_read = sf.read_all()
+    assert len(annotations_read) == len(annotations)
+    for anno in annotations:
+        assert anno in annotations_read
+    assert len(sf.read_all(spatial_level=0)) == len(annotations)
+
+    # annotation 2 lies within (or, for boxes and ellipsoids, straddles) this roi
+    roi = BBox3D.from_coords((0, 0, 0), (500, 1000, 600), Vec3D(10, 10, 40))
+    assert 2 in [x.id for x in sf.read_in_bounds(roi, strict=False)]
+    assert [x.id for x in sf.read_in_bounds(roi, strict=True)] == expected_strict_ids
+    for strict in (False, True):
+        expected = sf.read_in_bounds(roi, Vec3D(20, 20, 40), strict=strict)
+        values, ids = sf.read_arrays_in_bounds(roi, Vec3D(20, 20, 40), strict=strict)
+        assert ids.tolist() == [x.id for x in expected]
+        decoded = precomp_annotations.decode_annotations(
+            b"".join(precomp_annotations.iter_encoded_annotations(values, ids)), annotation_type
+        )
+        assert [x.id for x in decoded] == ids.tolist()
+
+    with pytest.raises(TypeError):
+        sf.write_annotations([LineAnnotation(line_id=9, start=(0, 0, 0), end=(1, 1, 1))])
+
+    shutil.rmtree(file_dir)
+
+
+def test_annotation_type_mismatch():
+    temp_dir = os.path.expanduser("~/temp/test_precomp_anno")
+    os.makedirs(temp_dir, exist_ok=True)
+    file_dir = os.path.join(temp_dir, "type_mismatch")
+
+    index = VolumetricIndex.from_coords([0, 0, 0], [100, 100, 10], Vec3D(10, 10, 40))
+    precomp_annotations.build_annotation_layer(
+        file_dir, index=index, mode="replace", annotation_type="POINT"
+    )
+    sf = precomp_annotations.build_annotation_layer(file_dir, mode="update")
+    assert sf.annotation_type == "POINT"
+    with pytest.raises(ValueError):
+        precomp_annotations.build_annotation_layer(file_dir, mode="update", annotation_type="LINE")
+
+    shutil.rmtree(file_dir)
+
+
+def test_annotation_missing_override_exc():
+    class IncompleteAnnotation(precomp_annotations.PrecomputedAnnotation):
+        def extent(self):
+            return [0.0, 0.0, 0.0], [0.0, 0.0, 0.0]
+
+    with pytest.raises(TypeError):
+        IncompleteAnnotation()  # pylint: disable=abstract-class-instantiated
+
+
+def test_encode_decode():
+    points = [PointAnnotation(i, (i, 2.0 * i, 3.0 * i)) for i in range(10)]
+    data = precomp_annotations.encode_annotations(points)
+    assert len(data) == 8 + len(points) * (PointAnnotation.BYTES_PER_ENTRY + 8)
+    assert precomp_annotations.decode_annotations(data, "POINT") == points
+    assert precomp_annotations.line_count_from_file_size(len(data), "POINT") == len(points)
+    assert precomp_annotations.decode_annotations(precomp_annotations.encode_annotations([])) == []
+
+    ellipsoid = EllipsoidAnnotation(1, (10.0, 10.0, 10.0), (2.0, 2.0, 2.0))
+    converted = ellipsoid.with_converted_coordinates(Vec3D(10, 10, 40), Vec3D(20, 20, 20))
+    assert converted.center == (5.0, 5.0, 20.0)
+    assert converted.radii == (1.0, 1.0, 4.0)
+    assert ellipsoid.center == (10.0, 10.0, 10.0)
+
+
+def _random_lines(count, seed=0):
+    rng = random.Random(seed)
+    lines = []
+    for i in range(count):
+        start = (rng.uniform(0, 2000), rng.uniform(0, 2000), rng.uniform(0, 600))
+        end = (start[0] + rng.uniform(-20, 20), start[1] + rng.uniform(-20, 20), start[2])
+        end = (min(max(end[0], 0), 1999), min(max(end[1], 0), 1999), end[2])
+        lines.append(LineAnnotation(line_id=i + 1, start=start, end=end))
+    return lines
+
+
+def _chunk_ids(sf, level):
+    level_dir = os.path.join(sf.path, f"spatial{level}")
+    return {
+        name: sorted(x.id for x in precomp_annotations.read_lines(os.path.join(level_dir, name)))
+        for name in sorted(os.listdir(level_dir))
+    }
+
+
+def _write_random_layer(file_dir, count):
+    index = VolumetricIndex.from_coords([0, 0, 0], [2000, 2000, 600], Vec3D(10, 10, 40))
+    chunk_sizes = [[2000, 2000, 600], [1000, 1000, 300], [300, 300, 200]]
+    sf = AnnotationLayer(file_dir, index, chunk_sizes)
+    sf.clear()
+    sf.write_annotations(_random_lines(count), all_levels=False)
+    return sf
+
+
+def test_post_process_streaming():
+    temp_dir = os.path.expanduser("~/temp/test_precomp_anno")
+    file_dir = os.path.join(temp_dir, "post_process_streaming")
+    sf = _write_random_layer(file_dir, 1000)
+
+    sf.post_process()
+    expected = [_chunk_ids(sf, level) for level in range(2)]
+    expected_info = precomp_annotations.read_info(file_dir)[3]
+    for level in range(2):
+        shutil.rmtree(os.path.join(file_dir, f"spatial{level}"))
+
+    sf.post_process_streaming()
+    for level in range(2):
+        assert _chunk_ids(sf, level) == expected[level]
+    info = precomp_annotations.read_info(file_dir)[3]
+    assert [se.limit for se in info] == [se.limit for se in expected_info]
+
+    shutil.rmtree(file_dir)
+
+
+def test_post_process_streaming_sampled():
+    temp_dir = os.path.expanduser("~/temp/test_precomp_anno")
+    file_dir = os.path.join(temp_dir, "post_process_streaming_sampled")
+    sf = _write_random_layer(file_dir, 1000)
+
+    sample_limit = 50
+    sf.post_process_streaming(sample_limit=sample_limit)
+    info = precomp_annotations.read_info(file_dir)[3]
+    assert info[0].limit == sample_limit
+    assert info[1].limit == sample_limit
+
+    # the top-level sample is made of the lowest-priority ids overall,
+    # and is consistent with the samples at the level below
+    all_ids = {x.id for x in sf.read_all()}
+    top_ids = _chunk_ids(sf, 0)["0_0_0"]
+    assert top_ids == sorted(sorted(all_ids, key=precomp_annotations.sample_priority)[:50])
+    mid_ids = set(itertools.chain(*_chunk_ids(sf, 1).values()))
+    assert set(top_ids) <= mid_ids
+
+    shutil.rmtree(file_dir)
+
+
+def test_post_process_flow():
+    temp_dir = os.path.expanduser("~/temp/test_precomp_anno")
+    file_dir = os.path.join(temp_dir, "post_process_flow")
+    sf = _write_random_layer(file_dir, 500)
+    sf.post_process()
+    expected = [_chunk_ids(sf, level) for level in range(2)]
+    for level in range(2):
+        shutil.rmtree(os.path.join(file_dir, f"spatial{level}"))
+
+    mazepa.execute(
+        precomp_annotations.post_process_annotation_layer_flow(
+            sf, streaming=True, chunks_per_task=3
+        ),
+        do_dryrun_estimation=False,
+        show_progress=False,
+    )
+    for level in range(2):
+        assert _chunk_ids(sf, level) == expected[level]
+
+    shutil.rmtree(file_dir)
+
+
+def test_stream_chunk_remote():
+    temp_dir = os.path.expanduser("~/temp/test_precomp_anno")
+    file_dir = os.path.join(temp_dir, "stream_chunk_remote")
+    sf = _write_random_layer(file_dir, 1000)
+    target = sf.chunk_index(0, (0, 0, 0))
+    local_path = os.path.join(temp_dir, "stream_chunk_remote_expected")
+    remote_path = "memory://stream_chunk_remote/spatial0/0_0_0"
+    with tempfile.TemporaryDirectory() as spill_dir:
+        sf._stream_chunk(1, target, local_path, spill_dir)  # pylint: disable=protected-access
+        sf._stream_chunk(1, target, remote_path, spill_dir)  # pylint: disable=protected-access
+
+    with open(local_path, "rb") as f:
+        expected = f.read()
+    with fsspec.open(remote_path, "rb") as f:
+        assert f.read() == expected
+    assert len(precomp_annotations.decode_annotations(expected)) == 1000
+
+    fsspec.filesystem("memory").rm("stream_chunk_remote", recursive=True)
+    os.remove(local_path)
+    shutil.rmtree(file_dir)
+
+
+def test_post_process_streaming_memory():
+    temp_dir = os.path.expanduser("~/temp/test_precomp_anno")
+    file_dir = os.path.join(temp_dir, "post_process_streaming_memory")
+    sf = _write_random_layer(file_dir, 3000)
+
+    tracemalloc.start()
+    sf.read_all()
+    read_all_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.reset_peak()
+    sf.post_process_streaming()
+    streaming_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    # streaming never holds more than one finer-level chunk in memory at a time
+    assert streaming_peak < read_all_peak / 2
+
+    shutil.rmtree(file_dir)
+
+
 def test_edge_cases():
     with pytest.raises(ValueError):
         precomp_annotations.path_join()
@@ -0,0 +1,119 @@
+# pylint: disable=missing-docstring
+import numpy as np
+import pytest
+
+from zetta_utils.geometry import BBox3D, BBoxIndex
+from zetta_utils.geometry.bbox_index import _hilbert_keys
+
+
+def _random_boxes(count: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    lower = rng.uniform(0, 1000, (count, 3))
+    upper = lower + rng.uniform(0, 30, (count, 3))
+    return lower, upper
+
+
+def _scan(lower, upper, q_lower, q_upper, strict=False):
+    if strict:
+        hit = (lower < q_upper) & (upper > q_lower)
+    else:
+        hit = (lower <= q_upper) & (upper >= q_lower)
+    return np.nonzero(hit.all(axis=1))[0]
+
+
+def test_hilbert_keys_adjacent():
+    grid = np.stack(np.meshgrid(*[np.arange(8)] * 3, indexing="ij"), axis=-1).reshape(-1, 3)
+    keys = _hilbert_keys(grid.astype(np.uint64), bits=3)
+    assert len(np.unique(keys)) == len(grid)
+    steps = np.abs(np.diff(grid[np.argsort(keys)], axis=0)).sum(axis=1)
+    assert (steps == 1).all()
+
+
+@pytest.mark.parametrize("count", [1, 15, 16, 17, 5000])
+@pytest.mark.parametrize("strict", [False, True])
+def test_query_matches_scan(count, strict):
+    lower, upper = _random_boxes(count)
+    index = BBoxIndex(lower, upper)
+    assert len(index) == count
+    rng = np.random.default_rng(1)
+    for _ in range(20):
+        q_lower = rng.uniform(-50, 1000, 3)
+        q_upper = q_lower + rng.uniform(0, 200, 3)
+        expected = _scan(lower, upper, q_lower, q_upper, strict)
+        np.testing.assert_array_equal(index.query(q_lower, q_upper, strict=strict), expected)
+
+
+def test_query_many_matches_query():
+    lower, upper = _random_boxes(3000)
+    index = BBoxIndex(lower, upper, node_size=4)
+    rng = np.random.default_rng(2)
+    q_lower = rng.uniform(0, 1000, (100, 3))
+    q_upper = q_lower + 60
+    results = index.query_many(q_lower, q_upper)
+    assert len(results) == 100
+    for result, q_lo, q_hi in zip(results, q_lower, q_upper):
+        np.testing.assert_array_equal(result, index.query(q_lo, q_hi))
+
+
+def test_query_bbox():
+    bboxes = [
+        BBox3D(bounds=((0, 10), (0, 10), (0, 10))),
+        BBox3D(bounds=((10, 20), (0, 10), (0, 10))),
+        BBox3D(bounds=((50, 60), (50, 60), (50, 60))),
+    ]
+    index = BBoxIndex.from_bboxes(bboxes)
+    query = BBox3D(bounds=((5, 10), (5, 10), (5, 10)))
+    np.testing.assert_array_equal(index.query_bbox(query), [0, 1])
+    strict = index.query_bbox(query, strict=True)
+    np.testing.assert_array_equal(strict, [i for i, b in enumerate(bboxes) if b.intersects(query)])
+
+
+def test_from_lines():
+    starts = np.array([[0, 0, 0], [10, 10, 10]])
+    ends = np.array([[5, 5, 5], [2, 2, 2]])
+    index = BBoxIndex.from_lines(starts, ends)
+    np.testing.assert_array_equal(index.query([3, 3, 3], [4, 4, 4]), [0, 1])
+    np.testing.assert_array_equal(index.query([8, 8, 8], [9, 9, 9]), [1])
+
+
+@pytest.mark.parametrize("k", [1, 7])
+def test_nearest(k):
+    lower, upper = _random_boxes(2000)
+    index = BBoxIndex(lower, upper)
+    point = np.array([500.0, 400.0, 300.0])
+    gap = np.maximum(np.maximum(lower - point, point - upper), 0)
+    dist = np.sqrt((gap * gap).sum(axis=1))
+    result = index.nearest(point, k=k)
+    np.testing.assert_allclose(dist[result], np.sort(dist)[:k])
+    assert len(index.nearest(point, k=k, max_distance=0)) == 0
+
+
+def test_empty():
+    index = BBoxIndex(np.zeros((0, 3)), np.zeros((0, 3)))
+    assert len(index) == 0
+    assert len(index.query([0, 0, 0], [1, 1, 1])) == 0
+    assert [len(r) for r in index.query_many(np.zeros((2, 3)), np.ones((2, 3)))] == [0, 0]
+    assert len(index.nearest([0, 0, 0])) == 0
+
+
+@pytest.mark.parametrize("count", [1, 100])
+def test_flat_centers(count):
+    lower, upper = _random_boxes(count)
+    lower[:, 2] = 5
+    upper[:, 2] = 5
+    with np.errstate(all="raise"):
+        index = BBoxIndex(lower, upper)
+    assert sorted(index.order) == list(range(count))
+    q_lower, q_upper = np.array([0, 0, 0]), np.array([500, 500, 10])
+    np.testing.assert_array_equal(
+        index.query(q_lower, q_upper), _scan(lower, upper, q_lower, q_upper)
+    )
+
+
+@pytest.mark.parametrize(
+    "lower, upper, node_size",
+    [[np.zeros((2, 3)), np.zeros((3, 3)), 16], [np.zeros((2, 3)), np.zeros((2, 3)), 1]],
+)
+def test_exc(lower, upper, node_size):
+    with pytest.raises(ValueError):
+        BBoxIndex(lower, upper, node_size=node_size)
@@ -1,4 +1,4 @@
-# pylint: disable=redefined-outer-name
+# pylint: disable=redefined-outer-name,protected-access
 
 import math
 import pickle
@@ -153,3 +153,33 @@ def test_pickle(datastore_emulator) -> None:
     assert layer_backend2.namespace == layer_backend.namespace
     assert layer_backend2.exclude_from_indexes == layer_backend.exclude_from_indexes
     assert layer_backend2.name == layer_backend.name
+
+
+def test_large_read_write(datastore_emulator) -> None:
+    layer = build_datastore_layer(datastore_emulator, datastore_emulator)
+    layer.clear()
+    # More entities than fit in a single request
+    row_keys = [f"key{i}" for i in range(1234)]
+    data: DBDataT = [{"col0": i} for i in range(len(row_keys))]
+    layer[(row_keys, ("col0",))] = data
+    assert layer[(row_keys, ("col0",))] == data
+
+    layer.clear()
+    assert len(layer.query()) == 0
+
+
+def test_coalesce_writes(datastore_emulator) -> None:
+    layer = build_datastore_layer(datastore_emulator, datastore_emulator)
+    layer.clear()
+    backend = cast(DatastoreBackend, layer.backend)
+    with backend.coalesce_writes():
+        layer[("key0", ("col0",))] = {"col0": "val0"}
+        layer[("key0", ("col1",))] = {"col1": "val1"}
+        layer[("key1", ("col0",))] = {"col0": "val2"}
+        assert backend._write_buffer is not None
+        assert len(backend._write_buffer.rows) == 2
+        # reads send the pending writes first
+        assert layer[("key0", ("col0", "col1"))] == {"col0": "val0", "col1": "val1"}
+        layer[("key1", ("col0",))] = {"col0": "val3"}
+    assert backend._write_buffer is None
+    assert layer[("key1", "col0")] == "val3"
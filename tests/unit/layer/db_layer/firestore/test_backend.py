@@ -1,4 +1,4 @@
-# pylint: disable=redefined-outer-name
+# pylint: disable=redefined-outer-name,protected-access
 
 import math
 import pickle
@@ -179,3 +179,40 @@ def test_pickle(firestore_emulator) -> None:
     assert layer_backend2.project == layer_backend.project
     assert layer_backend2.collection == layer_backend.collection
     assert layer_backend2.name == layer_backend.name
+
+
+def test_large_read_write(firestore_emulator) -> None:
+    layer = build_firestore_layer("test_large", project=firestore_emulator)
+    layer.clear()
+    # More rows than fit in a single request
+    row_keys = [f"key{i}" for i in range(1234)]
+    data: DBDataT = [{"col0": i} for i in range(len(row_keys))]
+    layer[(row_keys, ("col0",))] = data
+    assert layer[(row_keys, ("col0",))] == data
+    assert len(layer.query()) == len(row_keys)
+
+    layer.clear()
+    assert len(layer.query()) == 0
+
+
+def test_coalesce_writes(firestore_emulator) -> None:
+    layer = build_firestore_layer("test", project=firestore_emulator)
+    layer.clear()
+    backend = cast(FirestoreBackend, layer.backend)
+    with backend.coalesce_writes():
+        layer[("key0", ("col0",))] = {"col0": "val0"}
+        layer[("key0", ("col1",))] = {"col1": "val1"}
+        layer[("key1", ("col0",))] = {"col0": "val2"}
+        assert backend._write_buffer is not None
+        assert len(backend._write_buffer.rows) == 2
+        # reads send the pending writes first
+        assert layer[("key0", ("col0", "col1"))] == {"col0": "val0", "col1": "val1"}
+        layer[("key1", ("col0",))] = {"col0": "val3"}
+    assert backend._write_buffer is None
+    assert layer[("key1", "col0")] == "val3"
+
+
+def test_shared_client(firestore_emulator) -> None:
+    backend = FirestoreBackend("test", project=firestore_emulator)
+    backend2 = backend.with_changes(collection="test2", project=firestore_emulator)
+    assert backend2.client is backend.client
@@ -0,0 +1,85 @@
+# pylint: disable=missing-docstring
+import threading
+import time
+
+from zetta_utils.layer.db_layer import DBIndex
+from zetta_utils.layer.db_layer.batching import (
+    WriteBuffer,
+    WriteCoalescingMixin,
+    dispatch_batches,
+    get_shared_client,
+    split_into_batches,
+)
+
+
+def test_split_into_batches():
+    assert split_into_batches(list(range(5)), 2) == [[0, 1], [2, 3], [4]]
+    assert not split_into_batches([], 2)
+
+
+def test_dispatch_batches_ordered_and_concurrent():
+    active = []
+    max_active = []
+    lock = threading.Lock()
+
+    def fn(batch):
+        with lock:
+            active.append(1)
+            max_active.append(len(active))
+        time.sleep(0.05)
+        with lock:
+            active.pop()
+        return sum(batch)
+
+    batches = split_into_batches(list(range(10)), 2)
+    assert dispatch_batches(fn, batches, max_workers=4) == [1, 5, 9, 13, 17]
+    assert 1 < max(max_active) <= 4
+
+
+class DummyClient:
+    def __init__(self, project=None):
+        self.project = project
+
+
+def test_get_shared_client():
+    client = get_shared_client(DummyClient, project="a")
+    assert get_shared_client(DummyClient, project="a") is client
+    assert get_shared_client(DummyClient, project="b") is not client
+
+
+def test_write_buffer_merges_rows():
+    buffer = WriteBuffer(max_rows=2)
+    assert not buffer.add(DBIndex({"r0": ("a",)}), [{"a": 1}])
+    assert not buffer.add(DBIndex({"r0": ("b",)}), [{"b": 2}])
+    assert not buffer.add(DBIndex({"r0": ("a",)}), [{"a": 3}])
+    assert buffer.add(DBIndex({"r1": ("a",)}), [{"a": 4}])
+
+    idx, data = buffer.pop_all()
+    assert idx == DBIndex({"r0": ("a", "b"), "r1": ("a",)})
+    assert data == [{"a": 3, "b": 2}, {"a": 4}]
+    assert not buffer.rows
+
+
+class RecordingBackend(WriteCoalescingMixin):
+    def __init__(self):
+        self._write_buffer = None
+        self.writes = []
+
+    def _write(self, idx, data):
+        self.writes.append((idx, data))
+
+
+def test_write_coalescing_mixin():
+    backend = RecordingBackend()
+    backend.write(DBIndex({"r0": ("a",)}), [{"a": 1}])
+    assert len(backend.writes) == 1
+    with backend.coalesce_writes(max_buffered_rows=2):
+        backend.write(DBIndex({"r0": ("a",)}), [{"a": 2}])
+        backend.write(DBIndex({"r0": ("a",)}), [{"a": 3}])
+        assert len(backend.writes) == 1
+        backend.write(DBIndex({"r1": ("a",)}), [{"a": 4}])
+        assert backend.writes[-1] == (DBIndex({"r0": ("a",), "r1": ("a",)}), [{"a": 3}, {"a": 4}])
+        backend.write(DBIndex({"r2": ("a",)}), [{"a": 5}])
+        assert len(backend.writes) == 2
+    assert backend.writes[-1] == (DBIndex({"r2": ("a",)}), [{"a": 5}])
+    assert backend._write_buffer is None  # pylint: disable=protected-access
@@ -0,0 +1,169 @@
+# pylint: disable=missing-docstring,redefined-outer-name,protected-access
+import pickle
+import time
+from collections import Counter
+
+import attrs
+import pytest
+
+from zetta_utils.layer.db_layer import (
+    CachedDBBackend,
+    DBBackend,
+    DBIndex,
+    DBLayer,
+    build_db_layer,
+)
+
+
+@attrs.mutable
+class MemoryBackend(DBBackend):
+    rows: dict = attrs.field(factory=dict)
+    calls: Counter = attrs.field(factory=Counter)
+
+    @property
+    def name(self):
+        return "memory"
+
+    def __contains__(self, idx):
+        self.calls["contains"] += 1
+        return idx in self.rows
+
+    def __len__(self):
+        self.calls["len"] += 1
+        return len(self.rows)
+
+    def read(self, idx):
+        self.calls["read"] += 1
+        return [
+            {k: v for k, v in self.rows.get(row_key, {}).items() if k in col_keys}
+            for row_key, col_keys in idx.row_col_keys.items()
+        ]
+
+    def write(self, idx, data):
+        self.calls["write"] += 1
+        for row_key, row_data in zip(idx.row_keys, data):
+            self.rows.setdefault(row_key, {}).update(row_data)
+
+    def clear(self, idx=None):
+        if idx is None:
+            self.rows.clear()
+        else:
+            for row_key in idx.row_keys:
+                self.rows.pop(row_key, None)
+
+    def keys(self, column_filter=None, union=True):
+        self.calls["keys"] += 1
+        return list(self.query(column_filter).keys())
+
+    def query(self, column_filter=None, return_columns=(), union=True):
+        self.calls["query"] += 1
+        return {
+            k: dict(v)
+            for k, v in self.rows.items()
+            if not column_filter
+            or any(v.get(col) in values for col, values in column_filter.items())
+        }
+
+    def get_batch(self, batch_number, avg_rows_per_batch, return_columns=()):
+        self.calls["get_batch"] += 1
+        keys = sorted(self.rows)[
+            batch_number * avg_rows_per_batch : (batch_number + 1) * avg_rows_per_batch
+        ]
+        return {k: dict(self.rows[k]) for k in keys}
+
+    def with_changes(self, **kwargs):
+        return attrs.evolve(self, **kwargs)
+
+
+@pytest.fixture
+def memory_backend():
+    return MemoryBackend(
+        rows={"a": {"col": 1, "tag": "x"}, "b": {"col": 2, "tag": "y"}, "c": {"col": 3}}
+    )
+
+
+def test_query_cached(memory_backend):
+    backend = CachedDBBackend(memory_backend)
+    result = backend.query({"tag": ["x", "y"]})
+    assert set(result) == {"a", "b"}
+    # Filters are normalized
+    assert backend.query({"tag": ["y", "x", "x"]}) == result
+    assert memory_backend.calls["query"] == 1
+    assert backend.stats.hits == 1
+    assert backend.stats.misses == 1
+    assert backend.stats.hit_rate == 0.5
+    assert backend.stats.saved_seconds >= 0
+
+
+def test_results_are_copies(memory_backend):
+    backend = CachedDBBackend(memory_backend)
+    result = backend.query()
+    result["a"]["col"] = 100
+    assert backend.query()["a"]["col"] == 1
+
+
+def test_write_invalidates(memory_backend):
+    layer = DBLayer(backend=CachedDBBackend(memory_backend))
+    assert layer[("a", "col")] == 1
+    assert layer[("b", "col")] == 2
+    assert len(layer.query()) == 3
+    layer[("a", ("col",))] = {"col": 10}
+
+    assert layer[("a", "col")] == 10
+    assert len(layer.query()) == 3
+    # Reads of other rows are kept
+    assert layer[("b", "col")] == 2
+    assert memory_backend.calls["read"] == 3
+    assert memory_backend.calls["query"] == 2
+
+
+def test_clear_invalidates(memory_backend):
+    layer = DBLayer(backend=CachedDBBackend(memory_backend))
+    assert "a" in layer
+    assert len(layer.query()) == 3
+    del layer["a"]
+    assert "a" not in layer
+    assert len(layer.query()) == 2
+    layer.clear()
+    assert len(layer.query()) == 0
+
+
+def test_ttl(memory_backend):
+    backend = CachedDBBackend(memory_backend, ttl=0.1)
+    backend.get_batch(0, 2)
+    backend.get_batch(0, 2)
+    assert memory_backend.calls["get_batch"] == 1
+    time.sleep(0.2)
+    backend.get_batch(0, 2)
+    assert memory_backend.calls["get_batch"] == 2
+
+
+def test_max_bytes(memory_backend):
+    backend = CachedDBBackend(memory_backend, max_bytes=1)
+    backend.query()
+    backend.query()
+    assert memory_backend.calls["query"] == 2
+    assert len(backend._cache) == 0
+
+
+def test_pickle_drops_cache(memory_backend):
+    backend = CachedDBBackend(memory_backend)
+    backend.keys()
+    restored = pickle.loads(pickle.dumps(backend))
+    assert len(restored._cache) == 0
+    assert restored.stats.misses == 0
+    assert restored.keys() == backend.keys()
+
+
+def test_read_index_key(memory_backend):
+    backend = CachedDBBackend(memory_backend)
+    assert backend.read(DBIndex({"a": ("col",)})) == [{"col": 1}]
+    assert backend.read(DBIndex({"a": ("col", "tag")})) == [{"col": 1, "tag": "x"}]
+    assert memory_backend.calls["read"] == 2
+
+
+def test_build_db_layer(memory_backend):
+    layer = build_db_layer(memory_backend, cache_ttl=5)
+    assert isinstance(layer.backend, CachedDBBackend)
+    assert layer.backend.ttl == 5
+    assert not isinstance(build_db_layer(memory_backend).backend, CachedDBBackend)
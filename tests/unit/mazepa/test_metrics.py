@@ -0,0 +1,69 @@
+# pylint: disable=missing-docstring
+import json
+import urllib.request
+
+from zetta_utils.common import metrics
+from zetta_utils.mazepa import concurrent_flow, execute, taskable_operation
+from zetta_utils.mazepa.metrics import MetricsAggregator, serve_prometheus_metrics
+from zetta_utils.mazepa.task_outcome import TaskOutcome
+
+
+@taskable_operation(operation_name="MetricsOp")
+def metrics_op(nbytes: int) -> None:
+    metrics.increment("backend_read_bytes", nbytes)
+    with metrics.record_time("backend_read_seconds"):
+        pass
+
+
+def test_task_outcome_metrics():
+    outcome = metrics_op.make_task(nbytes=10)()
+    assert outcome.operation_name == "MetricsOp"
+    assert outcome.metrics is not None
+    assert outcome.metrics.counters == {"backend_read_bytes": 10}
+    assert outcome.metrics.histograms["backend_read_seconds"].count == 1
+    assert outcome.metrics.histograms["task_execution_seconds"].count == 1
+
+
+def test_aggregator():
+    aggregator = MetricsAggregator()
+    for nbytes in [10, 20]:
+        aggregator.add_outcome(metrics_op.make_task(nbytes=nbytes)())
+    aggregator.add_outcome(TaskOutcome())
+
+    summary = aggregator.get_summary()
+    assert summary["MetricsOp"]["tasks_completed"] == 2
+    assert summary["MetricsOp"]["counters"] == {"backend_read_bytes": 30}
+    assert summary["MetricsOp"]["histograms"]["task_execution_seconds"]["count"] == 2
+    assert summary["unknown"]["tasks_completed"] == 1
+
+    text = aggregator.get_prometheus_text()
+    assert "# TYPE mazepa_backend_read_bytes_total counter" in text
+    assert 'mazepa_backend_read_bytes_total{operation="MetricsOp"} 30.0' in text
+    assert "# TYPE mazepa_task_execution_seconds histogram" in text
+    assert 'mazepa_task_execution_seconds_bucket{operation="MetricsOp",le="+Inf"} 2' in text
+    assert 'mazepa_task_execution_seconds_count{operation="MetricsOp"} 2' in text
+
+
+def test_serve_prometheus_metrics():
+    aggregator = MetricsAggregator()
+    aggregator.add_outcome(metrics_op.make_task(nbytes=10)())
+    with serve_prometheus_metrics(aggregator, port=0, host="127.0.0.1") as server:
+        port = server.server_address[1]
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as response:
+            assert response.read().decode() == aggregator.get_prometheus_text()
+
+
+def test_execute_writes_summary(tmp_path):
+    path = str(tmp_path / "metrics.json")
+    execute(
+        concurrent_flow([metrics_op.make_task(nbytes=i) for i in range(3)]),
+        metrics_summary_path=path,
+        do_dryrun_estimation=False,
+        show_progress=False,
+        checkpoint_interval_sec=None,
+    )
+    with open(path) as f:
+        summary = json.load(f)
+    assert summary["MetricsOp"]["tasks_completed"] == 3
+    assert summary["MetricsOp"]["counters"] == {"backend_read_bytes": 3}
+    assert summary["MetricsOp"]["histograms"]["backend_read_seconds"]["count"] == 3
@@ -0,0 +1,236 @@
+# pylint: disable=missing-docstring
+import attrs
+import pytest
+
+from zetta_utils.mazepa.semaphore_controller import (
+    AIMDPolicy,
+    HillClimbingPolicy,
+    SemaphoreController,
+    SemaphoreObservation,
+    SemaphoreUsage,
+    get_semaphore_policy,
+)
+
+INTERVAL_SEC = 10.0
+
+
+def io_hold_sec(limit: int) -> float:  # pylint: disable=unused-argument
+    return 0.1
+
+
+def cpu_hold_sec(limit: int, num_cores: int = 8) -> float:
+    # Oversubscribed cores share time and pay for context switches
+    extra = max(0, limit - num_cores)
+    return 0.1 * max(1.0, limit / num_cores) * (1 + 0.1 * extra)
+
+
+def simulate(hold_sec_fn, limit: int, num_workers: int) -> SemaphoreObservation:
+    """Steady state of ``num_workers`` workers repeatedly holding the semaphore."""
+    active = min(limit, num_workers)
+    hold_sec = hold_sec_fn(active)
+    releases = round(active * INTERVAL_SEC / hold_sec)
+    mean_wait_sec = (num_workers - active) * hold_sec / active
+    return SemaphoreObservation(
+        duration_sec=INTERVAL_SEC,
+        limit=limit,
+        releases=releases,
+        wait_sec=releases * mean_wait_sec,
+        hold_sec=releases * hold_sec,
+    )
+
+
+def run_policy(policy, hold_sec_fn, num_workers, initial_limit, max_limit, steps=100):
+    limit = initial_limit
+    observations = []
+    for _ in range(steps):
+        observation = simulate(hold_sec_fn, limit, num_workers)
+        observations.append(observation)
+        limit, _ = policy.decide(observation, 1, max_limit)
+    return observations
+
+
+def test_observation():
+    observation = SemaphoreObservation(
+        duration_sec=10.0, limit=4, releases=100, wait_sec=5.0, hold_sec=20.0
+    )
+    assert observation.throughput == 10.0
+    assert observation.utilization == 0.5
+    assert observation.mean_wait_sec == 0.05
+    assert observation.mean_hold_sec == 0.2
+    assert not observation.is_constrained(0.8, 0.05)
+
+
+def test_observation_empty():
+    observation = SemaphoreObservation(
+        duration_sec=0.0, limit=4, releases=0, wait_sec=0.0, hold_sec=0.0
+    )
+    assert observation.throughput == 0.0
+    assert observation.utilization == 0.0
+    assert observation.mean_wait_sec == 0.0
+    assert observation.mean_hold_sec == 0.0
+
+
+@pytest.mark.parametrize("policy_name", ["aimd", "hill_climbing"])
+def test_io_bound_converges_to_demand(policy_name):
+    observations = run_policy(
+        get_semaphore_policy(policy_name), io_hold_sec, 12, initial_limit=1, max_limit=32
+    )
+    assert observations[-1].limit == 12
+    assert observations[-1].throughput == pytest.approx(120.0)
+
+
+@pytest.mark.parametrize("policy_name", ["aimd", "hill_climbing"])
+@pytest.mark.parametrize("initial_limit", [1, 32])
+def test_cpu_bound_converges_near_cores(policy_name, initial_limit):
+    observations = run_policy(
+        get_semaphore_policy(policy_name),
+        cpu_hold_sec,
+        40,
+        initial_limit=initial_limit,
+        max_limit=32,
+    )
+    tail = observations[-20:]
+    optimal_throughput = 80.0
+    assert all(6 <= e.limit <= 12 for e in tail)
+    assert sum(e.throughput for e in tail) / len(tail) >= 0.85 * optimal_throughput
+
+
+def test_aimd_decreases_when_increase_does_not_pay_off():
+    policy = AIMDPolicy()
+    observation = simulate(io_hold_sec, 4, 16)
+    assert policy.decide(observation, 1, 8)[0] == 5
+    observation = attrs.evolve(simulate(io_hold_sec, 4, 16), limit=5)
+    assert policy.decide(observation, 1, 8)[0] == 3
+
+
+def test_aimd_probes_from_maximum():
+    policy = AIMDPolicy(probe_interval=3)
+    observation = simulate(io_hold_sec, 4, 16)
+    assert [policy.decide(observation, 1, 4)[0] for _ in range(3)] == [4, 4, 3]
+    assert policy.decide(observation, 4, 4) == (4, "hold: at maximum")
+
+
+def test_policies_hold_without_releases():
+    observation = SemaphoreObservation(
+        duration_sec=10.0, limit=3, releases=0, wait_sec=0.0, hold_sec=0.0
+    )
+    assert AIMDPolicy().decide(observation, 1, 8) == (3, "no releases")
+    assert HillClimbingPolicy().decide(observation, 1, 8) == (3, "no releases")
+
+
+def test_invalid_policy_exc():
+    with pytest.raises(ValueError):
+        get_semaphore_policy("nonsense")  # type: ignore
+
+
+class FakeBusyError(Exception):
+    pass
+
+
+class FakeSemaphore:
+    def __init__(self, value: int):
+        self.value = value
+
+    def acquire(self, timeout=None):
+        assert timeout == 0
+        if self.value == 0:
+            raise FakeBusyError()
+        self.value -= 1
+
+    def release(self):
+        self.value += 1
+
+
+class FixedPolicy:
+    def __init__(self, limits):
+        self.limits = list(limits)
+
+    def decide(self, observation, min_limit, max_limit):  # pylint: disable=unused-argument
+        return self.limits.pop(0), "fixed"
+
+
+def make_controller(sema, limits, usage=SemaphoreUsage(), initial_limit=2):
+    return SemaphoreController(
+        name="read",
+        sema=sema,
+        read_usage=lambda: usage,
+        policy=FixedPolicy(limits),
+        min_limit=1,
+        max_limit=8,
+        initial_limit=initial_limit,
+        interval_sec=3600,
+        busy_error_cls=FakeBusyError,
+    )
+
+
+def test_controller_applies_limits():
+    sema = FakeSemaphore(8)
+    controller = make_controller(sema, [5, 1, 8])
+    controller.start()
+    try:
+        assert controller.limit == 2
+        assert sema.value == 2
+        controller.step()
+        assert controller.limit == 5
+        assert sema.value == 5
+        controller.step()
+        assert controller.limit == 1
+        assert sema.value == 1
+        controller.step()
+        assert controller.limit == 8
+        assert sema.value == 8
+        assert [e.limit for e in controller.decisions] == [5, 1, 8]
+        assert [e.observation.limit for e in controller.decisions] == [2, 5, 1]
+    finally:
+        controller.stop()
+    assert sema.value == 8
+
+
+def test_controller_waits_for_busy_permits():
+    sema = FakeSemaphore(8)
+    controller = make_controller(sema, [1, 1])
+    # Permits in use by workers
+    sema.value = 3
+    controller.start()
+    try:
+        assert controller.limit == 5
+        assert sema.value == 0
+        sema.release()
+        sema.release()
+        controller.step()
+        assert controller.limit == 3
+        sema.value += 3
+        controller.step()
+        assert controller.limit == 1
+        assert sema.value == 1
+    finally:
+        controller.stop()
+    assert sema.value == 8
+
+
+def test_controller_observes_usage_deltas():
+    sema = FakeSemaphore(8)
+    usages = [SemaphoreUsage(10, 1.0, 2.0), SemaphoreUsage(30, 5.0, 10.0)]
+    controller = SemaphoreController(
+        name="cpu",
+        sema=sema,
+        read_usage=lambda: usages.pop(0),
+        policy=FixedPolicy([2]),
+        min_limit=1,
+        max_limit=8,
+        initial_limit=2,
+        interval_sec=3600,
+        busy_error_cls=FakeBusyError,
+    )
+    controller.start()
+    controller.step()
+    controller.stop()
+    observation = controller.decisions[0].observation
+    assert observation.releases == 20
+    assert observation.wait_sec == 4.0
+    assert observation.hold_sec == 8.0
+
+
+def test_controller_invalid_limits_exc():
+    with pytest.raises(ValueError):
+        make_controller(FakeSemaphore(8), [], initial_limit=9)
@@ -6,9 +6,11 @@ from typing import List
 import posix_ipc
 import pytest
 
+from zetta_utils.mazepa import semaphores
 from zetta_utils.mazepa.semaphores import (
     DummySemaphore,
     SemaphoreType,
+    SharedSemaphoreUsage,
     configure_semaphores,
     name_to_posix_name,
     semaphore,
@@ -154,3 +156,55 @@ def test_missing_semaphore_type_exc(semaphore_spec):
     with pytest.raises(ValueError):
         with configure_semaphores(semaphore_spec):
             pass
+
+
+def test_tuned_semaphore():
+    spec: dict[SemaphoreType, int] = {"read": 2, "write": 1, "cuda": 1, "cpu": 1}
+    with configure_semaphores(
+        spec, semaphores_bounds={"read": [1, 4]}, semaphores_tuning_interval_sec=3600
+    ):
+        sema = posix_ipc.Semaphore(name_to_posix_name("read", os.getpid()))
+        assert sema.value == 2
+        with semaphore("read"):
+            assert sema.value == 1
+        with semaphore("write"):
+            pass
+        usage = SharedSemaphoreUsage("read", os.getpid()).read()
+        assert usage.releases == 1
+        assert usage.hold_sec >= 0
+        with pytest.raises(posix_ipc.ExistentialError):
+            SharedSemaphoreUsage("write", os.getpid())
+    with pytest.raises(posix_ipc.ExistentialError):
+        SharedSemaphoreUsage("read", os.getpid())
+
+
+def test_tuned_semaphore_usage_lock_recovery(monkeypatch):
+    monkeypatch.setattr(semaphores, "USAGE_LOCK_TIMEOUT_SEC", 0.01)
+    spec: dict[SemaphoreType, int] = {"read": 2, "write": 1, "cuda": 1, "cpu": 1}
+    with configure_semaphores(
+        spec, semaphores_bounds={"read": [1, 4]}, semaphores_tuning_interval_sec=3600
+    ):
+        usage = SharedSemaphoreUsage("read", os.getpid())
+        # A worker killed while updating the counters leaves them locked
+        usage._lock.acquire()  # pylint: disable=protected-access
+        with semaphore("read"):
+            pass
+        assert usage.read().releases == 0
+        with semaphore("read"):
+            pass
+        assert usage.read().releases == 1
+
+
+@pytest.mark.parametrize(
+    "semaphores_bounds",
+    [
+        {"read": [0, 4]},
+        {"read": [4, 2]},
+        {"read": [1, 2, 3]},
+        {"nonsense": [1, 2]},
+    ],
+)
+def test_invalid_semaphore_bounds_exc(semaphores_bounds):
+    with pytest.raises(ValueError):
+        with configure_semaphores(semaphores_bounds=semaphores_bounds):
+            pass
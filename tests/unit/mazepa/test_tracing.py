@@ -0,0 +1,108 @@
+# pylint: disable=missing-docstring
+import json
+import os
+import pstats
+
+import pytest
+
+from zetta_utils.common import tracing
+from zetta_utils.mazepa import concurrent_flow, execute, taskable_operation
+from zetta_utils.mazepa.tasks import TaskTraceSettings
+from zetta_utils.mazepa.tracing import TraceCollector, should_trace_task
+from zetta_utils.mazepa_addons.configurations.execute_locally import execute_locally
+from zetta_utils.message_queues import serialization
+
+
+@taskable_operation(operation_name="TracedOp")
+def traced_op(i: int) -> None:
+    with tracing.span("backend.read"):
+        pass
+    with tracing.span("op"):
+        sum(range(i * 100))
+
+
+def test_should_trace_task():
+    ids = [f"task-{i}" for i in range(1000)]
+    assert not any(should_trace_task(e, 0.0) for e in ids)
+    assert all(should_trace_task(e, 1.0) for e in ids)
+    assert 50 < sum(should_trace_task(e, 0.1) for e in ids) < 150
+
+
+def test_untraced_by_default():
+    outcome = traced_op.make_task(i=1)()
+    assert outcome.trace is None
+
+
+def test_collector_exports():
+    collector = TraceCollector(profile="cprofile")
+    for i in range(3):
+        task = traced_op.make_task(i=i)
+        collector.sample_task(task)
+        collector.add_outcome(task())
+
+    chrome_trace = collector.get_chrome_trace()
+    names = [e["name"] for e in chrome_trace["traceEvents"] if e["ph"] == "X"]
+    assert names.count("TracedOp") == 3
+    assert names.count("op") == 3
+
+    speedscope = collector.get_speedscope()
+    assert len(speedscope["profiles"]) == 3
+    frames = [e["name"] for e in speedscope["shared"]["frames"]]
+    events = speedscope["profiles"][0]["events"]
+    assert [(e["type"], frames[e["frame"]]) for e in events] == [
+        ("O", "TracedOp"),
+        ("O", "backend.read"),
+        ("C", "backend.read"),
+        ("O", "op"),
+        ("C", "op"),
+        ("C", "TracedOp"),
+    ]
+    stats = collector.get_profile_stats()
+    assert stats is not None
+    assert len(stats.get_stats_profile().func_profiles) > 0
+
+
+@pytest.mark.parametrize("profile", ["cprofile", "stack"])
+def test_outcome_ships_trace_path(tmp_path, profile):
+    task = traced_op.make_task(i=1000)
+    task.trace_settings = TaskTraceSettings(
+        profile=profile, stack_sample_interval_sec=0.001, output_dir=str(tmp_path)
+    )
+    outcome = task()
+    assert outcome.trace is None
+    assert outcome.trace_path == os.path.join(tmp_path, f"{task.id_}.pkl")
+    assert len(serialization.serialize(outcome)) < 4096
+
+    collector = TraceCollector()
+    collector.add_outcome(outcome)
+    assert collector.traces == []
+    names = [e["name"] for e in collector.get_chrome_trace()["traceEvents"] if e["ph"] == "X"]
+    assert names.count("TracedOp") == 1
+
+
+def test_execute_requires_output_path():
+    with pytest.raises(ValueError):
+        execute(traced_op.make_task(i=1), trace_fraction=0.5)
+
+
+def test_execute_locally_writes_traces(tmp_path):
+    execute_locally(
+        concurrent_flow([traced_op.make_task(i=i) for i in range(4)]),
+        debug=True,
+        do_dryrun_estimation=False,
+        show_progress=False,
+        checkpoint_interval_sec=None,
+        trace_fraction=1.0,
+        trace_profile="cprofile",
+        trace_output_path=str(tmp_path),
+    )
+    with open(os.path.join(tmp_path, "trace.json")) as f:
+        chrome_trace = json.load(f)
+    task_ids = {
+        e["args"]["task_id"] for e in chrome_trace["traceEvents"] if e["name"] == "TracedOp"
+    }
+    assert len(task_ids) == 4
+    with open(os.path.join(tmp_path, "trace.speedscope.json")) as f:
+        assert len(json.load(f)["profiles"]) == 4
+    stats = pstats.Stats(os.path.join(tmp_path, "profile.pstats"))
+    assert len(stats.get_stats_profile().func_profiles) > 0
@@ -0,0 +1,77 @@
+# pylint: disable=missing-docstring
+import numpy as np
+import pytest
+
+from zetta_utils import mazepa
+from zetta_utils.geometry import BBox3D, Vec3D
+from zetta_utils.layer.volumetric.cloudvol import build_cv_layer
+from zetta_utils.mazepa_layer_processing.common import build_filter_cc3d_flow
+from zetta_utils.mazepa_layer_processing.common.filter_cc3d_flow import _union_find
+from zetta_utils.tensor_ops.mask import filter_cc3d
+
+RESOLUTION = Vec3D(4, 4, 40)
+SHAPE = (32, 32, 8)
+
+
+def _make_layer(layer_path):
+    return build_cv_layer(
+        path=layer_path,
+        info_type="segmentation",
+        info_data_type="uint8",
+        info_num_channels=1,
+        info_chunk_size=[8, 8, 2],
+        info_bbox=BBox3D.from_coords((0, 0, 0), SHAPE, RESOLUTION),
+        info_encoding="raw",
+        info_scales=[RESOLUTION],
+    )
+
+
+def _make_volume(seed):
+    rng = np.random.default_rng(seed)
+    volume = (rng.random(SHAPE) > 0.6).astype(np.uint8)
+    # A long component spanning every chunk along x
+    volume[:, 3, 1] = 1
+    return volume[np.newaxis]
+
+
+@pytest.mark.parametrize(
+    "mode, thr, connectivity_3d",
+    [
+        ["keep_small", 5, 6],
+        ["keep_large", 5, 6],
+        ["keep_large", 20, 18],
+        ["keep_small", 10, 26],
+    ],
+)
+def test_filter_cc3d_flow(tmp_path, mode, thr, connectivity_3d):
+    volume = _make_volume(seed=thr)
+    bbox = BBox3D.from_coords((0, 0, 0), SHAPE, RESOLUTION)
+    src = _make_layer(f"file://{tmp_path}/src")
+    src[RESOLUTION, bbox] = volume
+    dst = _make_layer(f"file://{tmp_path}/dst")
+
+    mazepa.execute(
+        build_filter_cc3d_flow(
+            src=src,
+            dst=dst,
+            dst_resolution=RESOLUTION,
+            processing_chunk_size=[8, 16, 4],
+            tmp_dir=f"file://{tmp_path}/tmp",
+            mode=mode,
+            thr=thr,
+            connectivity_3d=connectivity_3d,
+            bbox=bbox,
+        ),
+        do_dryrun_estimation=False,
+        show_progress=False,
+    )
+
+    expected = filter_cc3d(volume, mode=mode, thr=thr, connectivity_3d=connectivity_3d)
+    np.testing.assert_array_equal(dst[RESOLUTION, bbox], expected)
+
+
+def test_union_find():
+    ids = np.array([1, 2, 3, 5, 8, 9], dtype=np.uint64)
+    edges = np.array([[9, 2], [3, 5], [5, 8], [2, 8]], dtype=np.uint64)
+    np.testing.assert_array_equal(_union_find(ids, edges), [1, 2, 2, 2, 2, 2])
+    np.testing.assert_array_equal(_union_find(ids, np.zeros((0, 2), dtype=np.uint64)), ids)
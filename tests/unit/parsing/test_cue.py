@@ -1,5 +1,6 @@
-# pylint: disable=missing-docstring,unspecified-encoding,invalid-name
+# pylint: disable=missing-docstring,unspecified-encoding,invalid-name,redefined-outer-name,unused-argument,protected-access
 import pathlib
+import shutil
 
 import pytest
 
@@ -36,3 +37,80 @@ def test_load_fp():
 def test_load_nonexist(inp):
     with pytest.raises(Exception):
         cue.load(inp)
+
+
+@pytest.fixture
+def fresh_cache(monkeypatch):
+    monkeypatch.delenv("ZETTA_CUE_CACHE_DIR", raising=False)
+    cue.configure_cache()
+    yield
+    cue.configure_cache()
+
+
+def test_loads_cached(fresh_cache, mocker):
+    export_spy = mocker.spy(cue, "_export")
+    result = cue.loads('{"a": [1, 2]}')
+    result["a"].append(3)
+    assert cue.loads('{"a": [1, 2]}') == {"a": [1, 2]}
+    assert cue.load(TEST_FILE_PATH) == cue.load(TEST_FILE_PATH)
+    assert export_spy.call_count == 2
+
+
+def test_cache_invalidation(fresh_cache, mocker, tmp_path, monkeypatch):
+    export_spy = mocker.spy(cue, "_export")
+    spec_path = tmp_path / "spec.cue"
+    spec_path.write_text('a: "x"')
+    assert cue.load_local(str(spec_path)) == {"a": "x"}
+    spec_path.write_text('a: "y"')
+    assert cue.load_local(str(spec_path)) == {"a": "y"}
+    assert export_spy.call_count == 2
+
+    # A different CUE executable
+    exe_copy = tmp_path / "cue"
+    shutil.copy2(shutil.which(cue.cue_exe), exe_copy)
+    monkeypatch.setattr(cue, "cue_exe", str(exe_copy))
+    assert cue.load_local(str(spec_path)) == {"a": "y"}
+    assert export_spy.call_count == 3
+
+
+def test_disk_cache(fresh_cache, mocker, tmp_path):
+    export_spy = mocker.spy(cue, "_export")
+    cue.configure_cache(cache_dir=str(tmp_path))
+    assert cue.loads("a: 1") == {"a": 1}
+    cue.configure_cache(cache_dir=str(tmp_path))
+    assert cue.loads("a: 1") == {"a": 1}
+    assert export_spy.call_count == 1
+    assert len(list(tmp_path.glob("*.json"))) == 1
+
+
+def test_disk_cache_from_env(fresh_cache, mocker, tmp_path, monkeypatch):
+    export_spy = mocker.spy(cue, "_export")
+    monkeypatch.setenv("ZETTA_CUE_CACHE_DIR", str(tmp_path))
+    cue.configure_cache()
+    assert cue.loads("a: 1") == {"a": 1}
+    cue.configure_cache()
+    assert cue.loads("a: 1") == {"a": 1}
+    assert export_spy.call_count == 1
+    assert len(list(tmp_path.glob("*.json"))) == 1
+
+
+def test_cache_disabled(fresh_cache, mocker):
+    export_spy = mocker.spy(cue, "_export")
+    cue.configure_cache(maxsize=0)
+    cue.loads("a: 1")
+    cue.loads("a: 1")
+    assert export_spy.call_count == 2
+
+
+@pytest.mark.parametrize(
+    "spec, expected",
+    [
+        ['import "strings"\na: strings.ToUpper("x")', False],
+        ['import (\n\t"list"\n\tm "math"\n)\na: 1', False],
+        ['import "example.com/pkg"\na: pkg.x', True],
+        ['import (\n\t"list"\n\t"example.com/pkg"\n)\na: 1', True],
+        ['a: "import \\"example.com/pkg\\""', False],
+    ],
+)
+def test_has_non_std_imports(spec, expected):
+    assert cue._has_non_std_imports(spec) == expected
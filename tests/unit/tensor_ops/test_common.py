@@ -612,6 +612,77 @@ def test_interpolate_exc(data_name, mode, kwargs, request, expected_exc):
         common.interpolate(data, mode=mode, **kwargs)
 
 
+@pytest.mark.parametrize(
+    "data, mode, scale_factors, kwargs",
+    [
+        [
+            np.random.default_rng(0).random((1, 3, 16, 16, 5)).astype(np.float32),
+            "img",
+            [(0.5, 0.5, 1), (0.25, 0.25, 1), (0.125, 0.125, 1)],
+            {},
+        ],
+        [
+            np.random.default_rng(0).integers(0, 5, (1, 1, 16, 16, 4)).astype(np.uint64),
+            "segmentation",
+            [(0.5, 0.5, 1), (0.25, 0.25, 1), (0.125, 0.125, 1)],
+            {"num_threads": 3},
+        ],
+        [
+            torch.randint(0, 5, (1, 2, 8, 8, 2)).int(),
+            "segmentation",
+            [(0.5, 0.5, 1), (0.25, 0.25, 1)],
+            {},
+        ],
+        [
+            np.random.default_rng(0).random((1, 2, 8, 8, 8)).astype(np.float32),
+            "img",
+            [0.5, 0.25],
+            {"num_threads": 1},
+        ],
+        [
+            np.random.default_rng(0).random((3, 8, 8)) > 0.5,
+            "mask",
+            [(0.5, 0.5), (0.25, 0.25)],
+            {"unsqueeze_input_to": 4},
+        ],
+        [
+            torch.rand((2, 2, 8, 8)),
+            "field",
+            [0.5, 0.25],
+            {"unsqueeze_input_to": 4},
+        ],
+    ],
+)
+def test_interpolate_pyramid(data, mode, scale_factors, kwargs):
+    result = common.interpolate_pyramid(data, scale_factors=scale_factors, mode=mode, **kwargs)
+    assert len(result) == len(scale_factors)
+    unsqueeze_input_to = kwargs.get("unsqueeze_input_to", 5)
+    level = data
+    last_factor = 1.0
+    for scale_factor, result_level in zip(scale_factors, result):
+        relative_factor = np.array(scale_factor) / np.array(last_factor)
+        level = common.interpolate(
+            level,
+            scale_factor=relative_factor.tolist(),
+            mode=mode,
+            unsqueeze_input_to=unsqueeze_input_to,
+        )
+        last_factor = scale_factor
+        assert type(result_level) == type(data)  # pylint: disable=unidiomatic-typecheck
+        assert_array_equal(result_level, level)
+
+
+def test_interpolate_pyramid_empty():
+    assert common.interpolate_pyramid(np.ones((1, 1, 2, 2, 1)), scale_factors=[]) == []
+
+
+def test_interpolate_pyramid_exc():
+    with pytest.raises(RuntimeError):
+        common.interpolate_pyramid(
+            np.ones((1, 1, 4, 4, 1)), scale_factors=[(0.5, 0.5, 1), (0.125 / 3, 0.125, 1)]
+        )
+
+
 @pytest.mark.parametrize(
     "data, mode, operand, kwargs, expected",
     [
@@ -1,6 +1,11 @@
+import numpy as np
+import pytest
 import torch
 
-from zetta_utils.tensor_ops.label import seg_to_aff, seg_to_rgb
+from zetta_utils.tensor_ops import convert
+from zetta_utils.tensor_ops.common import squeeze_to
+from zetta_utils.tensor_ops.label import _get_disp_slices
+from zetta_utils.tensor_ops.label import seg_to_aff, seg_to_affs, seg_to_rgb
 
 from ..helpers import assert_array_equal
 
@@ -51,3 +56,39 @@ def test_convert_seg_to_rgb():
     assert rgb[:, :, :1].abs().sum() == 0
     assert (rgb[:, -1, -1, 0] == rgb[:, -1, -1, 2]).all()
     assert (rgb[:, -1, -1, 0] != rgb[:, -1, -1, 1]).all()
+
+
+EDGES = [[1, 0, 0], [0, 1, 0], [0, 0, 1], [-2, 0, 0], [0, 3, -1]]
+
+
+@pytest.mark.parametrize(
+    "seg, mask",
+    [
+        [
+            np.random.default_rng(0).integers(0, 4, (1, 6, 7, 5)).astype(np.uint64),
+            np.random.default_rng(1).random((1, 6, 7, 5)) > 0.3,
+        ],
+        [
+            torch.randint(0, 4, (6, 7, 5)).float(),
+            (torch.rand((6, 7, 5)) > 0.3).float(),
+        ],
+        [
+            torch.randint(0, 4, (1, 6, 7, 5)).int(),
+            torch.rand((1, 6, 7, 5)) > 0.3,
+        ],
+    ],
+)
+def test_seg_to_affs(seg, mask):
+    aff, aff_mask = seg_to_affs(seg, edges=EDGES, mask=mask)
+    aff_only = seg_to_affs(seg, edges=EDGES)
+    assert aff.shape == (len(EDGES),) + tuple(seg.shape[-3:])
+    assert_array_equal(aff, aff_only)
+    for i, edge in enumerate(EDGES):
+        expected_aff, expected_mask = seg_to_aff(seg, edge=edge, mask=mask)
+        slices, _ = _get_disp_slices(seg.shape[-3:], edge)
+        assert_array_equal(aff[i][slices], squeeze_to(expected_aff, 3))
+        assert_array_equal(aff_mask[i][slices], squeeze_to(expected_mask, 3))
+        outside = np.ones(seg.shape[-3:], dtype=bool)
+        outside[slices] = False
+        assert (convert.to_np(aff[i])[outside] == 0).all()
+        assert (convert.to_np(aff_mask[i])[outside] == 0).all()
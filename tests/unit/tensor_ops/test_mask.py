@@ -1,4 +1,6 @@
 # pylint: disable=missing-docstring,invalid-name
+import cc3d
+import fastremap
 import numpy as np
 import pytest
 import skimage
@@ -353,3 +355,79 @@ def test_combine_mask_fns():
 def test_combine_mask_fns_exc():
     with pytest.raises(ValueError):
         mask.combine_mask_fns(data=torch.zeros((10, 10)), fns=[])
+
+
+def filter_cc_reference(data, mode, thr):
+    # Original implementation, labeling each section with cc3d in turn
+    result = np.zeros_like(data)
+    for z in range(data.shape[-1]):
+        section = data[0, :, :, z]
+        if (section != 0).sum() > 0:
+            cc_labels = cc3d.connected_components(section != 0)
+            segids, counts = np.unique(cc_labels, return_counts=True)
+            if mode == "keep_large":
+                segids = [segid for segid, ct in zip(segids, counts) if ct > thr]
+            else:
+                segids = [segid for segid, ct in zip(segids, counts) if ct <= thr]
+            filtered_mask = fastremap.mask_except(cc_labels, segids, in_place=True) != 0
+            result[0, :, :, z][filtered_mask] = section[filtered_mask]
+    return result
+
+
+@pytest.mark.parametrize("mode", ["keep_small", "keep_large"])
+def test_filter_cc_sections(mode):
+    rng = np.random.default_rng(0)
+    a = ((rng.random((1, 32, 32, 12)) > 0.55) * rng.integers(1, 4, (1, 32, 32, 12))).astype(
+        np.uint8
+    )
+    a[..., 3] = 0
+    expected = filter_cc_reference(a, mode=mode, thr=4)
+    assert expected.any()
+    for num_threads in [1, 4]:
+        result = mask.filter_cc(a, mode=mode, thr=4, num_threads=num_threads)
+        assert_array_equal(result, expected)
+
+
+FILTER_CC_SECTIONS = [
+    [
+        [1, 1, 0, 0, 0],
+        [1, 1, 0, 0, 4],
+        [0, 0, 0, 0, 0],
+        [0, 0, 0, 0, 0],
+        [2, 2, 0, 0, 0],
+    ],
+    [
+        [0, 0, 0, 0, 0],
+        [0, 0, 3, 3, 3],
+        [0, 0, 3, 3, 3],
+        [0, 0, 0, 0, 0],
+        [0, 0, 0, 0, 5],
+    ],
+]
+
+
+@pytest.mark.parametrize(
+    "mode, kept_values",
+    [
+        ["keep_small", [2, 4, 5]],
+        ["keep_large", [1, 3]],
+    ],
+)
+def test_filter_cc_fixed(mode, kept_values):
+    a = np.stack(FILTER_CC_SECTIONS, axis=-1)[np.newaxis].astype(np.uint8)
+    expected = np.where(np.isin(a, kept_values), a, 0)
+    result = mask.filter_cc(a, mode=mode, thr=2)
+    assert_array_equal(result, expected)
+
+
+@pytest.mark.parametrize(
+    "fn", [mask.kornia_opening, mask.kornia_closing, mask.kornia_erosion, mask.kornia_dilation]
+)
+def test_kornia_section_batch_size(fn):
+    a = (torch.rand((1, 16, 16, 7)) > 0.5).to(torch.uint8)
+    a[..., 2] = 0
+    a[..., 5] = 0
+    expected = torch.cat([fn(a[..., z : z + 1]) for z in range(a.shape[-1])], dim=-1)
+    for section_batch_size in [None, 1, 2]:
+        result = fn(a, section_batch_size=section_batch_size)
+        assert_array_equal(result, expected)
@@ -0,0 +1,139 @@
+# pylint: disable=missing-docstring,invalid-name
+import functools
+import tracemalloc
+
+import numpy as np
+import pytest
+import torch
+
+from zetta_utils import builder
+from zetta_utils.tensor_ops import TensorOpPipeline, common
+
+from ..helpers import assert_array_equal
+
+STEP_SPECS = [
+    {"@type": "multiply", "@mode": "partial", "value": 2.0},
+    {"@type": "add", "@mode": "partial", "value": -1},
+    {"@type": "crop", "@mode": "partial", "crop": [2, 2, 0]},
+    {"@type": "abs", "@mode": "partial"},
+    {"@type": "compare", "@mode": "partial", "mode": ">", "value": 0.5},
+    {"@type": "rearrange", "@mode": "partial", "pattern": "C X Y Z -> Z C X Y"},
+]
+
+
+def _build(steps, fuse=True):
+    return builder.build({"@type": "TensorOpPipeline", "steps": steps, "fuse": fuse})
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        np.random.rand(1, 16, 16, 3).astype(np.float32),
+        np.random.randint(0, 200, (1, 16, 16, 3)).astype(np.uint8),
+        torch.rand(1, 16, 16, 3),
+        torch.randint(0, 200, (1, 16, 16, 3)).byte(),
+    ],
+)
+@pytest.mark.parametrize("num_steps", [2, 4, 5, 6])
+def test_matches_sequential(data, num_steps):
+    original = data.copy() if isinstance(data, np.ndarray) else data.clone()
+    steps = STEP_SPECS[:num_steps]
+    expected = data
+    for step in _build(steps).steps:
+        expected = step(expected)
+    result = _build(steps)(data)
+    assert result.dtype == expected.dtype
+    assert_array_equal(result, expected)
+    assert_array_equal(data, original)
+
+
+def test_plan():
+    pipeline = _build(STEP_SPECS)
+    kinds = [step.kind for step in pipeline._plan]  # pylint: disable=protected-access
+    assert kinds == ["crop", "inplace", "inplace", "inplace", "pointwise", "other"]
+    unfused = _build(STEP_SPECS, fuse=False)
+    assert [step.op_name for step in unfused._plan] == [  # pylint: disable=protected-access
+        "multiply",
+        "add",
+        "crop",
+        "abs",
+        "compare",
+        "rearrange",
+    ]
+
+
+def test_functools_partial_and_then():
+    pipeline = TensorOpPipeline(steps=[functools.partial(common.multiply, value=3)]).then(
+        functools.partial(common.add, value=1), lambda x: x[0]
+    )
+    data = np.arange(8, dtype=np.float32).reshape(2, 4)
+    assert_array_equal(pipeline(data), data[0] * 3 + 1)
+    assert [step.kind for step in pipeline._plan] == [  # pylint: disable=protected-access
+        "inplace",
+        "inplace",
+        "other",
+    ]
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        np.random.rand(1, 16, 16, 3).astype(np.float32),
+        torch.rand(1, 16, 16, 3),
+    ],
+)
+def test_tensor_value_not_reordered(value):
+    data = np.random.rand(1, 16, 16, 3).astype(np.float32)
+    if isinstance(value, torch.Tensor):
+        data = torch.from_numpy(data)
+    steps = [
+        functools.partial(common.multiply, value=value),
+        functools.partial(common.add, value=value),
+        functools.partial(common.crop, crop=[2, 2, 0]),
+    ]
+    pipeline = TensorOpPipeline(steps=steps)
+    assert [step.kind for step in pipeline._plan] == [  # pylint: disable=protected-access
+        "other",
+        "other",
+        "crop",
+    ]
+    assert_array_equal(pipeline(data), common.crop((data * value) + value, crop=[2, 2, 0]))
+
+
+def test_dtype_promotion_not_in_place():
+    pipeline = TensorOpPipeline(
+        steps=[
+            functools.partial(common.add, value=1),
+            functools.partial(common.divide, value=2),
+        ]
+    )
+    data = np.arange(6, dtype=np.uint8).reshape(2, 3)
+    result = pipeline(data)
+    assert result.dtype == ((data + 1) / 2).dtype
+    assert_array_equal(result, (data + 1) / 2)
+
+
+def test_dict():
+    pipeline = TensorOpPipeline(steps=[functools.partial(common.multiply, value=2)])
+    result = pipeline({"a": np.ones(3), "b": torch.ones(3)})
+    assert_array_equal(result["a"], np.full(3, 2.0))
+    assert_array_equal(result["b"], torch.full((3,), 2.0))
+
+
+def test_fewer_allocations():
+    steps = [
+        functools.partial(common.multiply, value=2.0),
+        functools.partial(common.add, value=1.0),
+        functools.partial(common.divide, value=4.0),
+        functools.partial(common.power, value=2.0),
+    ]
+    data = np.ones((256, 256, 16), dtype=np.float32)
+
+    def peak(pipeline):
+        tracemalloc.start()
+        pipeline(data)
+        result = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return result
+
+    assert peak(TensorOpPipeline(steps=steps)) < peak(TensorOpPipeline(steps=steps, fuse=False))
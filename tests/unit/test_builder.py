@@ -2,6 +2,7 @@
 import os
 import tempfile
 import time
+import uuid
 from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 from typing import Any
@@ -11,6 +12,7 @@ import pytest
 
 from zetta_utils import builder
 from zetta_utils.builder import SPECIAL_KEYS, BuilderPartial
+from zetta_utils.parsing import json
 
 
 @dataclass
@@ -147,6 +149,110 @@ def test_sleeper_parallel(register_sleeper_func):
     assert time_ellapsed < SLEEP_TIME * 3
 
 
+RENDEZVOUS_TIMEOUT_SEC = 30
+
+
+def rendezvous_function(rendezvous_dir: str, parties: int, **kwargs):
+    """Returns once ``parties`` objects with the same ``rendezvous_dir`` are being
+    built at the same time."""
+    for _, v in kwargs.items():
+        assert v is True
+    os.makedirs(rendezvous_dir, exist_ok=True)
+    with open(os.path.join(rendezvous_dir, uuid.uuid4().hex), "w", encoding="utf-8"):
+        pass
+    deadline = time.time() + RENDEZVOUS_TIMEOUT_SEC
+    while len(os.listdir(rendezvous_dir)) < parties:
+        if time.time() > deadline:
+            raise TimeoutError(f"Only {len(os.listdir(rendezvous_dir))} of {parties} arrived.")
+        time.sleep(0.01)
+    return True
+
+
+@pytest.fixture
+def register_rendezvous_func():
+    builder.register("rendezvous_func", versions=">=0.0.0")(rendezvous_function)
+    yield
+    builder.unregister(name="rendezvous_func", fn=rendezvous_function)
+
+
+def _rendezvous_spec(rendezvous_dir, parties, **kwargs):
+    return {
+        "@type": "rendezvous_func",
+        "rendezvous_dir": str(rendezvous_dir),
+        "parties": parties,
+        **kwargs,
+    }
+
+
+@pytest.mark.parametrize("parallel_mode", ["threads", "processes"])
+def test_graph_parallel(parallel_mode, register_rendezvous_func, tmp_path):
+    if parallel_mode == "processes" and (os.cpu_count() or 1) < 2:
+        pytest.skip("The process pool has a single worker.")
+    # The two arguments are only built if they are built at the same time
+    spec = _rendezvous_spec(
+        tmp_path / "top",
+        1,
+        arg1=_rendezvous_spec(tmp_path / "args", 2),
+        arg2=_rendezvous_spec(tmp_path / "args", 2),
+    )
+    result = builder.build(spec=spec, parallel=True, parallel_mode=parallel_mode)
+    assert result is True
+
+
+def test_graph_no_stage_barrier(register_rendezvous_func, tmp_path):
+    # The short branch's parent has to be built while the long branch's child is
+    spec = {
+        "long": _rendezvous_spec(
+            tmp_path / "long", 1, arg=_rendezvous_spec(tmp_path / "overlap", 2)
+        ),
+        "short": _rendezvous_spec(
+            tmp_path / "overlap", 2, arg=_rendezvous_spec(tmp_path / "short", 1)
+        ),
+    }
+    result = builder.build(spec=spec, parallel=True, parallel_mode="threads")
+    assert result == {"long": True, "short": True}
+
+
+def build_spec_function(**kwargs):
+    return {"spec": builder.get_current_build_spec(), **kwargs}
+
+
+@pytest.fixture
+def register_build_spec_funcs():
+    builder.register("build_spec_func", versions=">=0.0.0")(build_spec_function)
+    builder.register("build_spec_func_nonparallel", allow_parallel=False, versions=">=0.0.0")(
+        build_spec_function
+    )
+    yield
+    builder.unregister(name="build_spec_func", fn=build_spec_function)
+    builder.unregister(
+        name="build_spec_func_nonparallel",
+        fn=build_spec_function,
+        allow_parallel=False,
+        versions=">=0.0.0",
+    )
+
+
+def test_graph_current_build_spec(register_build_spec_funcs):
+    spec = {
+        "@type": "build_spec_func_nonparallel",
+        "a": {"@type": "build_spec_func", "b": {"@type": "build_spec_func"}},
+        "c": {"@type": "build_spec_func_nonparallel"},
+    }
+    expected = builder.build(spec)
+    assert expected["spec"] == json.dumps(spec)
+    assert expected["a"]["b"]["spec"] == json.dumps(spec["a"]["b"])
+    assert builder.build(spec, parallel=True) == expected
+    for parallel_mode in ["threads", "processes"]:
+        assert builder.build(spec, parallel=True, parallel_mode=parallel_mode) == expected
+
+
+def test_graph_kwargs_in_spec_order(register_dummy_a):
+    spec = {"x": {"@type": "dummy_a", "a": 1}, "y": 2, "z": {"@type": "dummy_a", "a": 3}}
+    result = builder.build(spec, parallel=True, parallel_mode="threads")
+    assert list(result.keys()) == ["x", "y", "z"]
+
+
 @pytest.mark.parametrize(
     "value",
     [
@@ -238,6 +344,10 @@ def test_build_unversioned(
     assert result_serial == expected
     assert builder.get_initial_builder_spec(result_parallel) == spec
     assert builder.get_initial_builder_spec(result_serial) == spec
+    for parallel_mode in ["threads", "processes"]:
+        result_graph = builder.build(spec, parallel=True, parallel_mode=parallel_mode)
+        assert result_graph == expected
+        assert builder.get_initial_builder_spec(result_graph) == spec
 
 
 @pytest.mark.parametrize(
@@ -0,0 +1,123 @@
+# pylint: disable=missing-docstring,protected-access,unused-argument,redefined-outer-name
+import importlib
+import sys
+
+import pytest
+
+from zetta_utils import builder
+from zetta_utils.builder import lazy_registry
+from zetta_utils.builder.registry import LAZY_REGISTRY, REGISTERING_MODULES
+
+LAZY_MODULE = """
+from zetta_utils import builder
+
+
+def helper(name):
+    builder.register(name)(lambda: name)
+
+
+@builder.register("lazy_dummy")
+def lazy_dummy():
+    return "lazy"
+
+
+helper("lazy_dummy_helper")
+"""
+
+
+VERSIONED_MODULE = """
+from zetta_utils import builder
+
+
+@builder.register("lazy_versioned", versions=">=0.0.2")
+def lazy_versioned():
+    return "current"
+"""
+
+DEPRECATED_VERSIONED_MODULE = """
+from zetta_utils import builder
+
+
+@builder.register("lazy_versioned", versions="<=0.0.1")
+def lazy_versioned():
+    return "deprecated"
+"""
+
+
+@pytest.fixture
+def lazy_module(tmp_path, monkeypatch):
+    (tmp_path / "lazy_dummy_module.py").write_text(LAZY_MODULE)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    names = ["lazy_dummy", "lazy_dummy_helper"]
+    for name in names:
+        LAZY_REGISTRY[name] = ["lazy_dummy_module"]
+    yield
+    for name in names:
+        LAZY_REGISTRY.pop(name)
+        builder.REGISTRY.pop(name, None)
+        REGISTERING_MODULES.pop(name, None)
+    sys.modules.pop("lazy_dummy_module", None)
+
+
+def test_lazy_import(lazy_module):
+    assert "lazy_dummy_module" not in sys.modules
+    assert builder.build({"@type": "lazy_dummy"}) == "lazy"
+    assert "lazy_dummy_module" in sys.modules
+    assert builder.build({"@type": "lazy_dummy_helper"}) == "lazy_dummy_helper"
+    assert REGISTERING_MODULES["lazy_dummy"] == ["lazy_dummy_module"]
+    assert REGISTERING_MODULES["lazy_dummy_helper"] == ["lazy_dummy_module"]
+
+
+@pytest.fixture
+def lazy_versioned_modules(tmp_path, monkeypatch):
+    (tmp_path / "lazy_versioned_module.py").write_text(VERSIONED_MODULE)
+    (tmp_path / "lazy_versioned_deprecated_module.py").write_text(DEPRECATED_VERSIONED_MODULE)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    modules = ["lazy_versioned_module", "lazy_versioned_deprecated_module"]
+    LAZY_REGISTRY["lazy_versioned"] = modules
+    yield
+    LAZY_REGISTRY.pop("lazy_versioned")
+    builder.REGISTRY.pop("lazy_versioned", None)
+    REGISTERING_MODULES.pop("lazy_versioned", None)
+    for module in modules:
+        sys.modules.pop(module, None)
+
+
+def test_lazy_import_deprecated_version(lazy_versioned_modules):
+    importlib.import_module("lazy_versioned_module")
+    assert builder.build({"@type": "lazy_versioned"}) == "current"
+    assert "lazy_versioned_deprecated_module" not in sys.modules
+    assert builder.build({"@type": "lazy_versioned", "@version": "0.0.1"}) == "deprecated"
+    assert "lazy_versioned_deprecated_module" in sys.modules
+
+
+def test_manifest(tmp_path, mocker):
+    load_all_m = mocker.patch("zetta_utils.load_all_modules")
+    path = str(tmp_path / "manifest" / "registry.json")
+    assert lazy_registry.load_manifest(path) is None
+
+    modules = lazy_registry.generate_manifest(path)
+    load_all_m.assert_called_once()
+    assert modules["lambda"] == ["zetta_utils.builder.built_in_registrations"]
+    assert modules["np.sum"] == ["zetta_utils.builder"]
+    assert lazy_registry.load_manifest(path) == modules
+
+    mocker.patch.object(lazy_registry, "get_package_fingerprint", return_value="stale")
+    assert lazy_registry.load_manifest(path) is None
+
+
+def test_fingerprint_of_installed_version(mocker):
+    walk_m = mocker.patch("os.walk")
+    mocker.patch.object(lazy_registry, "get_installed_version", return_value="1.2.3")
+    assert lazy_registry.get_package_fingerprint() == "version:1.2.3"
+    walk_m.assert_not_called()
+
+
+def test_enable_lazy_registry(tmp_path, mocker, monkeypatch):
+    monkeypatch.setenv(lazy_registry.MANIFEST_PATH_ENV, str(tmp_path / "registry.json"))
+    load_all_m = mocker.patch("zetta_utils.load_all_modules")
+    mocker.patch.dict(LAZY_REGISTRY)
+    modules = lazy_registry.enable_lazy_registry()
+    assert LAZY_REGISTRY["lambda"] == modules["lambda"]
+    lazy_registry.enable_lazy_registry()
+    load_all_m.assert_called_once()
@@ -1,6 +1,11 @@
 # pylint: disable=missing-docstring,redefined-outer-name,unused-argument,pointless-statement,line-too-long,protected-access,unsubscriptable-object
+import numpy as np
+import pytest
+
 from zetta_utils.training.datasets import JointDataset
 
+from ...helpers import assert_array_equal
+
 
 def test_joint_dataset_constructor(mocker):
     layer_dataset1_m = mocker.Mock()
@@ -42,3 +47,33 @@ def test_joint_dataset_getitem(mocker):
 
     assert jds_h[0] == {"lds1": 42, "lds2": 57}
     assert [jds_v[i] for i in range(5)] == [42, 42, 57, 57, 57]
+
+
+def test_joint_dataset_vertical_lookup(mocker):
+    lens = [2, 0, 3, 1]
+    dsets = {}
+    for i, num in enumerate(lens):
+        dset_m = mocker.MagicMock()
+        dset_m.__len__.return_value = num
+        dset_m.__getitem__.side_effect = lambda idx, i=i: (i, idx)
+        dsets[f"lds{i}"] = dset_m
+
+    jds_v = JointDataset("vertical", dsets)
+    expected = [(0, 0), (0, 1), (2, 0), (2, 1), (2, 2), (3, 0)]
+    assert [jds_v[i] for i in range(6)] == expected
+    assert jds_v.__getitems__([5, 0, 3]) == [expected[5], expected[0], expected[3]]
+
+    dataset_ids, inner_indices = jds_v.locate(np.arange(6))
+    assert_array_equal(dataset_ids, np.array([0, 0, 2, 2, 2, 3]))
+    assert_array_equal(inner_indices, np.array([0, 1, 0, 1, 2, 0]))
+
+
+@pytest.mark.parametrize("idx", [-1, 6])
+def test_joint_dataset_vertical_out_of_range_exc(mocker, idx):
+    dataset_m = mocker.MagicMock()
+    dataset_m.__len__.return_value = 6
+    jds_v = JointDataset("vertical", {"lds": dataset_m})
+    with pytest.raises(IndexError):
+        jds_v[idx]
+    with pytest.raises(IndexError):
+        jds_v.locate([0, idx])
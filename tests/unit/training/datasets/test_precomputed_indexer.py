@@ -0,0 +1,88 @@
+# pylint: disable=missing-docstring,redefined-outer-name,unused-argument,pointless-statement,line-too-long,protected-access,unsubscriptable-object
+import pickle
+
+import numpy as np
+import pytest
+
+from zetta_utils.geometry import BBox3D, IntVec3D, Vec3D
+from zetta_utils.training.datasets.sample_indexers import (
+    ChainIndexer,
+    PrecomputedIndexer,
+    SampleIndexer,
+    VolumetricNGLIndexer,
+    VolumetricStridedIndexer,
+    compile_sample_indexer,
+)
+
+
+@pytest.fixture
+def strided_indexer():
+    return VolumetricStridedIndexer(
+        bbox=BBox3D.from_coords(
+            start_coord=Vec3D(3, 0, 1), end_coord=Vec3D(67, 37, 9), resolution=Vec3D(4, 4, 45)
+        ),
+        chunk_size=IntVec3D(16, 16, 2),
+        resolution=Vec3D(8.6, 8.6, 45),
+        stride=IntVec3D(8, 8, 1),
+    )
+
+
+@pytest.fixture
+def ngl_indexer(mocker):
+    mocker.patch(
+        "zetta_utils.parsing.ngl_state.read_remote_annotations",
+        return_value=[Vec3D(158515.2, 510771.2, 1440), Vec3D(0, 0, 0), Vec3D(-10.5, 3, 90)],
+    )
+    return VolumetricNGLIndexer(
+        "dummy_path", chunk_size=Vec3D[int](1024, 1024, 1), resolution=Vec3D(34.4, 34.4, 45)
+    )
+
+
+def assert_same_samples(indexer, precomputed):
+    assert len(precomputed) == len(indexer)
+    for i in range(len(indexer)):
+        assert precomputed(i) == indexer(i)
+
+
+def test_strided(strided_indexer, tmp_path):
+    path = str(tmp_path / "strided.npy")
+    assert_same_samples(strided_indexer, compile_sample_indexer(strided_indexer, path))
+    assert_same_samples(strided_indexer, PrecomputedIndexer(path))
+
+
+def test_ngl(ngl_indexer, tmp_path):
+    path = str(tmp_path / "ngl")
+    assert_same_samples(ngl_indexer, compile_sample_indexer(ngl_indexer, path))
+
+
+def test_chain(strided_indexer, ngl_indexer, tmp_path):
+    chain = ChainIndexer([strided_indexer, ngl_indexer])
+    path = str(tmp_path / "chain.npy")
+    assert_same_samples(chain, compile_sample_indexer(chain, path))
+
+
+def test_pickle_remaps(strided_indexer, tmp_path):
+    precomputed = compile_sample_indexer(strided_indexer, str(tmp_path / "idx.npy"))
+    restored = pickle.loads(pickle.dumps(precomputed))
+    assert isinstance(restored.records, np.memmap)
+    assert_same_samples(strided_indexer, restored)
+
+
+class StringIndexer(SampleIndexer):
+    def __len__(self):
+        return 1
+
+    def __call__(self, idx):
+        return "index"
+
+
+def test_non_volumetric_exc(tmp_path):
+    with pytest.raises(TypeError):
+        compile_sample_indexer(StringIndexer(), str(tmp_path / "idx.npy"))
+
+
+def test_invalid_file_exc(tmp_path):
+    path = str(tmp_path / "idx.npy")
+    np.save(path, np.zeros(10))
+    with pytest.raises(ValueError):
+        PrecomputedIndexer(path)
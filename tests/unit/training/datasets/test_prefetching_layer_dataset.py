@@ -0,0 +1,150 @@
+# pylint: disable=missing-docstring,redefined-outer-name,unused-argument,pointless-statement,line-too-long,protected-access,unsubscriptable-object
+import pickle
+import random
+import threading
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from zetta_utils.layer import Backend, Layer
+from zetta_utils.training.datasets import LayerDataset, PrefetchingLayerDataset
+from zetta_utils.training.datasets.sample_indexers import SampleIndexer
+
+from ...helpers import assert_array_equal
+
+
+class CountingBackend(Backend):
+    def __init__(self):
+        self.reads: Counter = Counter()
+        self.lock = threading.Lock()
+
+    @property
+    def name(self) -> str:
+        return "counting"
+
+    def read(self, idx):
+        with self.lock:
+            self.reads[idx] += 1
+        return {"data": np.full((2, 2), idx, dtype=np.float32)}
+
+    def write(self, idx, data):  # pragma: no cover
+        raise NotImplementedError()
+
+    def with_changes(self, **kwargs):  # pragma: no cover
+        return self
+
+    def __getstate__(self):
+        return {"reads": self.reads}
+
+    def __setstate__(self, state):
+        self.reads = state["reads"]
+        self.lock = threading.Lock()
+
+
+class RangeIndexer(SampleIndexer):
+    def __init__(self, num_samples: int):
+        self.num_samples = num_samples
+
+    def __len__(self) -> int:
+        return self.num_samples
+
+    def __call__(self, idx: int) -> int:
+        return idx * 10
+
+
+@pytest.fixture
+def backend():
+    return CountingBackend()
+
+
+def add_one(data):
+    return {"data": data["data"] + 1}
+
+
+def make_dataset(backend, **kwargs):
+    layer = Layer(backend=backend, read_procs=(add_one,))
+    return PrefetchingLayerDataset(layer=layer, sample_indexer=RangeIndexer(12), **kwargs)
+
+
+def test_matches_layer_dataset(backend):
+    dset = make_dataset(backend, prefetch=4)
+    ref = LayerDataset(layer=dset.layer, sample_indexer=dset.sample_indexer)
+    assert len(dset) == 12
+    for i in range(len(dset)):
+        assert_array_equal(dset[i]["data"], ref[i]["data"])
+
+
+def test_prefetched_reads_reused(backend):
+    dset = make_dataset(backend, prefetch=4)
+    for i in range(len(dset)):
+        dset[i]
+    dset._state.prefetch_pool.shutdown(wait=True)
+    # Every sample is read once, and the tail of the epoch prefetches the next head
+    assert backend.reads == Counter({i * 10: 2 if i < 4 else 1 for i in range(12)})
+
+
+def add_ten(idx):
+    return idx + 10
+
+
+def add_random_offset(idx):
+    return idx + random.randint(0, 9)
+
+
+def test_deterministic_index_procs_prefetched(backend):
+    layer = Layer(backend=backend, index_procs=(add_ten,), read_procs=(add_one,))
+    dset = PrefetchingLayerDataset(layer=layer, sample_indexer=RangeIndexer(12), prefetch=4)
+    for i in range(len(dset)):
+        assert_array_equal(dset[i]["data"], np.full((2, 2), i * 10 + 11, dtype=np.float32))
+    dset._state.prefetch_pool.shutdown(wait=True)
+    assert backend.reads == Counter({i * 10 + 10: 2 if i < 4 else 1 for i in range(12)})
+
+
+def test_random_index_procs_not_prefetched(backend):
+    layer = Layer(backend=backend, index_procs=(add_random_offset,), read_procs=(add_one,))
+    dset = PrefetchingLayerDataset(layer=layer, sample_indexer=RangeIndexer(12), prefetch=4)
+    ref = LayerDataset(layer=layer, sample_indexer=dset.sample_indexer)
+    random.seed(0)
+    expected = [ref[i]["data"] for i in range(len(ref))]
+    backend.reads.clear()
+    random.seed(0)
+    for i in range(len(dset)):
+        assert_array_equal(dset[i]["data"], expected[i])
+    assert not dset._state.is_predictable
+    assert sum(backend.reads.values()) == len(dset)
+
+
+@pytest.mark.parametrize("cache", ["memory", "dir"])
+def test_cache_serves_repeated_epochs(backend, tmp_path, cache):
+    if cache == "memory":
+        dset = make_dataset(backend, prefetch=0, cache_bytes=2 ** 20)
+    else:
+        dset = make_dataset(backend, prefetch=0, cache_dir=str(tmp_path))
+    for _ in range(3):
+        for i in range(len(dset)):
+            assert_array_equal(dset[i]["data"], np.full((2, 2), i * 10 + 1, dtype=np.float32))
+    assert backend.reads == Counter({i * 10: 1 for i in range(12)})
+
+
+def test_cache_returns_copies(backend):
+    dset = make_dataset(backend, prefetch=0, cache_bytes=2 ** 20)
+    dset[0]["data"][:] = -1
+    assert_array_equal(dset[0]["data"], np.ones((2, 2), dtype=np.float32))
+
+
+def test_cache_dir_bound(backend, tmp_path):
+    dset = make_dataset(backend, prefetch=0, cache_dir=str(tmp_path), cache_dir_bytes=1000)
+    for i in range(len(dset)):
+        dset[i]
+    total = sum(e.stat().st_size for e in tmp_path.iterdir())
+    assert 0 < total <= 1000
+
+
+def test_pickle_drops_state(backend):
+    dset = make_dataset(backend, prefetch=2)
+    dset[0]
+    assert dset._state is not None
+    restored = pickle.loads(pickle.dumps(dset))
+    assert restored._state is None
+    assert_array_equal(restored[1]["data"], np.full((2, 2), 11, dtype=np.float32))
@@ -1,7 +1,11 @@
+# pylint: disable=missing-docstring,redefined-outer-name
+import pytest
 from lightning_fabric import seed_everything
 from torch.utils.data import RandomSampler
 
-from zetta_utils.training.sampler import SamplerWrapper
+from zetta_utils.geometry import BBox3D, IntVec3D, Vec3D
+from zetta_utils.training.datasets.sample_indexers import VolumetricStridedIndexer
+from zetta_utils.training.sampler import SamplerWrapper, VolumetricBlockSampler
 
 
 def test_sampler_wrapper():
@@ -19,3 +23,64 @@ def test_sampler_wrapper():
     wrapper.set_epoch(1)
     seed_everything(42)
     assert list(wrapper) != epoch_0
+
+
+@pytest.fixture
+def strided_indexer():
+    return VolumetricStridedIndexer(
+        bbox=BBox3D.from_coords(
+            start_coord=Vec3D(0, 0, 0), end_coord=Vec3D(10, 7, 3), resolution=Vec3D(1, 1, 1)
+        ),
+        chunk_size=IntVec3D(1, 1, 1),
+        resolution=Vec3D(1, 1, 1),
+        stride=IntVec3D(1, 1, 1),
+    )
+
+
+def test_volumetric_block_sampler_blocks(strided_indexer):
+    sampler = VolumetricBlockSampler(strided_indexer, block_size=(4, 4, 1), num_replicas=1, rank=0)
+    order = list(sampler)
+    assert len(sampler) == len(order) == len(strided_indexer)
+    assert sorted(order) == list(range(len(strided_indexer)))
+
+    # Samples of each block are consecutive
+    block_of = [
+        tuple(int(e) // b for e, b in zip(strided_indexer(i).start, (4, 4, 1))) for i in order
+    ]
+    runs = [k for i, k in enumerate(block_of) if i == 0 or block_of[i - 1] != k]
+    assert len(runs) == len(set(block_of)) == 3 * 2 * 3
+
+
+def test_volumetric_block_sampler_epochs(strided_indexer):
+    sampler = VolumetricBlockSampler(strided_indexer, num_replicas=1, rank=0, seed=3)
+    sampler.set_epoch(0)
+    epoch_0 = list(sampler)
+    assert list(sampler) == epoch_0
+    sampler.set_epoch(1)
+    assert list(sampler) != epoch_0
+
+
+@pytest.mark.parametrize("drop_last", [True, False])
+def test_volumetric_block_sampler_shards(strided_indexer, drop_last):
+    shards = [
+        list(
+            VolumetricBlockSampler(
+                strided_indexer, block_size=(2, 2, 1), num_replicas=4, rank=i, drop_last=drop_last
+            )
+        )
+        for i in range(4)
+    ]
+    assert len({len(e) for e in shards}) == 1
+    samples = sum(shards, [])
+    if drop_last:
+        assert len(samples) == len(set(samples)) == 208
+    else:
+        assert set(samples) == set(range(210))
+        assert len(samples) == 212
+
+
+def test_volumetric_block_sampler_exc(strided_indexer):
+    with pytest.raises(ValueError):
+        VolumetricBlockSampler(strided_indexer, num_replicas=2, rank=2)
+    with pytest.raises(ValueError):
+        VolumetricBlockSampler(strided_indexer, block_size=(0, 1, 1))
@@ -0,0 +1,114 @@
+# pylint: disable=missing-docstring,wrong-import-position
+import gzip
+import os
+import sys
+
+import einops
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from zetta_utils.geometry import BBox3D, Vec3D
+from zetta_utils.layer.volumetric import VolumetricIndex
+from zetta_utils.layer.volumetric.cloudvol import build_cv_layer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", ".."))
+from web_api.app.painting import api
+
+RESOLUTION = Vec3D(4, 4, 40)
+SHAPE = (16, 16, 12)
+
+
+@pytest.fixture
+def layer_path(tmp_path):
+    path = f"file://{tmp_path}/layer"
+    build_cv_layer(
+        path=path,
+        info_type="segmentation",
+        info_data_type="uint32",
+        info_num_channels=1,
+        info_chunk_size=[8, 8, 4],
+        info_bbox=BBox3D.from_coords((0, 0, 0), SHAPE, RESOLUTION),
+        info_encoding="raw",
+        info_scales=[RESOLUTION],
+    )
+    return path
+
+
+def _params(path, bbox_start, bbox_end):
+    return {
+        "path": path,
+        "bbox_start": list(bbox_start),
+        "bbox_end": list(bbox_end),
+        "resolution": list(RESOLUTION),
+    }
+
+
+def _encode(volume):
+    return gzip.compress(
+        np.ascontiguousarray(einops.rearrange(volume, "C X Y Z -> Z Y X C")).tobytes()
+    )
+
+
+def _decode(body, shape):
+    data = np.frombuffer(gzip.decompress(body), dtype=np.uint32).reshape(shape[::-1])
+    return einops.rearrange(data, "Z Y X C -> C X Y Z")
+
+
+def _read_layer(path, bbox_start, bbox_end):
+    layer = build_cv_layer(path, readonly=True)
+    return layer[VolumetricIndex.from_coords(bbox_start, bbox_end, RESOLUTION)]
+
+
+def _upload(client, params, body, chunk_size=1000):
+    content = (body[i : i + chunk_size] for i in range(0, len(body), chunk_size))
+    return client.post("/cutout", params=params, content=content)
+
+
+@pytest.mark.parametrize(
+    "bbox_start, bbox_end",
+    [
+        [(0, 0, 0), (8, 8, 4)],
+        [(2, 3, 1), (14, 16, 11)],
+    ],
+)
+def test_cutout_round_trip(layer_path, bbox_start, bbox_end):
+    rng = np.random.default_rng(0)
+    shape = (1, *(e - s for s, e in zip(bbox_start, bbox_end)))
+    volume = rng.integers(1, 2**16, size=shape, dtype=np.uint32)
+    params = _params(layer_path, bbox_start, bbox_end)
+    client = TestClient(api)
+
+    response = _upload(client, params, _encode(volume))
+    assert response.status_code == 200
+    np.testing.assert_array_equal(_read_layer(layer_path, bbox_start, bbox_end), volume)
+
+    response = client.get("/cutout", params=params)
+    assert response.status_code == 200
+    np.testing.assert_array_equal(_decode(response.content, shape), volume)
+
+
+@pytest.mark.parametrize("cut", ["truncated", "short", "long"])
+def test_cutout_invalid_upload_writes_nothing(layer_path, cut):
+    bbox_start, bbox_end = (0, 0, 0), SHAPE
+    volume = np.ones((1, *SHAPE), dtype=np.uint32)
+    body = _encode(volume)
+    if cut == "truncated":
+        body = body[: len(body) // 2]
+    elif cut == "short":
+        body = _encode(volume[..., :-1])
+    else:
+        body = body + gzip.compress(b"\0" * 8)
+    client = TestClient(api, raise_server_exceptions=False)
+
+    response = _upload(client, _params(layer_path, bbox_start, bbox_end), body)
+    assert response.status_code == 500
+    assert (_read_layer(layer_path, bbox_start, bbox_end) == 0).all()
+
+
+def test_read_cutout_error_status(tmp_path):
+    client = TestClient(api, raise_server_exceptions=False)
+    response = client.get(
+        "/cutout", params=_params(f"file://{tmp_path}/missing", (0, 0, 0), SHAPE)
+    )
+    assert response.status_code != 200
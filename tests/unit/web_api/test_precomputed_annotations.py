@@ -0,0 +1,102 @@
+# pylint: disable=missing-docstring,redefined-outer-name,wrong-import-position
+import os
+import random
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+
+from zetta_utils.db_annotations import precomp_annotations
+from zetta_utils.db_annotations.precomp_annotations import (
+    LineAnnotation,
+    build_annotation_layer,
+)
+from zetta_utils.geometry import BBox3D, Vec3D
+from zetta_utils.layer.volumetric import VolumetricIndex
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", ".."))
+from web_api.app.precomputed_annotations import api
+from web_api.app.utils import prefers_media_type
+
+RESOLUTION = Vec3D(10, 10, 40)
+QUERY_RESOLUTION = Vec3D(20, 20, 40)
+
+
+@pytest.fixture
+def layer_path(tmp_path):
+    path = str(tmp_path / "annotations")
+    index = VolumetricIndex.from_coords([0, 0, 0], [1000, 1000, 100], RESOLUTION)
+    layer = build_annotation_layer(
+        path, index=index, chunk_sizes=[[1000, 1000, 100], [250, 250, 50]], mode="replace"
+    )
+    rng = random.Random(0)
+    lines = []
+    for i in range(300):
+        start = (rng.uniform(0, 990), rng.uniform(0, 990), rng.uniform(0, 99))
+        end = (start[0] + rng.uniform(0, 10), start[1] + rng.uniform(0, 10), start[2])
+        lines.append(LineAnnotation(line_id=i + 1, start=start, end=end))
+    layer.write_annotations(lines)
+    return path
+
+
+def _params(path):
+    return {
+        "path": path,
+        "bbox_start": [50, 50, 10],
+        "bbox_end": [300, 400, 90],
+        "resolution": list(QUERY_RESOLUTION),
+    }
+
+
+def test_read_in_bounds_binary(layer_path):
+    client = TestClient(api)
+    expected = client.get("/annotations", params=_params(layer_path)).json()
+    assert len(expected) > 0
+
+    response = client.get(
+        "/annotations",
+        params=_params(layer_path),
+        headers={"Accept": "application/octet-stream"},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/octet-stream"
+    assert response.headers["x-annotation-type"] == "LINE"
+    assert response.headers["x-annotation-count"] == str(len(expected))
+    lines = precomp_annotations.decode_annotations(response.content, "LINE")
+    assert [line.id for line in lines] == [int(e["id"]) for e in expected]
+
+    layer = build_annotation_layer(layer_path, mode="read")
+    bbox = BBox3D.from_coords([50, 50, 10], [300, 400, 90], QUERY_RESOLUTION)
+    expected_lines = layer.read_in_bounds(bbox, QUERY_RESOLUTION, strict=True)
+    for line, expected_line in zip(lines, expected_lines):
+        assert line.start == pytest.approx(expected_line.start)
+        assert line.end == pytest.approx(expected_line.end)
+
+
+@pytest.mark.parametrize(
+    "accept",
+    ["application/json", "*/*", "application/octet-stream;q=0, application/json"],
+)
+def test_read_in_bounds_json(layer_path, accept):
+    client = TestClient(api)
+    response = client.get("/annotations", params=_params(layer_path), headers={"Accept": accept})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+
+
+@pytest.mark.parametrize(
+    "accept, expected",
+    [
+        ["", False],
+        ["*/*", False],
+        ["application/octet-stream", True],
+        ["application/octet-stream;q=0", False],
+        ["application/octet-stream; q=0.0, */*", False],
+        ["application/json;q=0.5, application/octet-stream", True],
+        ["application/json, application/octet-stream;q=0.5", False],
+        ["application/*, application/json;q=0.1", True],
+        ["text/html", False],
+    ],
+)
+def test_prefers_media_type(accept, expected):
+    assert prefers_media_type(accept, "application/octet-stream", "application/json") == expected
@@ -1,15 +1,19 @@
 # pylint: disable=all # type: ignore
-import gzip
-from io import BytesIO
-from typing import Annotated
+import tempfile
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Annotated, Iterator
 
+import cachetools
 import einops
 import numpy as np
 from fastapi import FastAPI, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import StreamingResponse
 
 from zetta_utils.geometry import Vec3D
-from zetta_utils.layer.volumetric import VolumetricIndex
+from zetta_utils.layer.volumetric import VolumetricIndex, VolumetricLayer
 from zetta_utils.layer.volumetric.cloudvol import build_cv_layer
 from zetta_utils.layer.volumetric.cloudvol.backend import _cv_cache, _get_cv_cached
 
@@ -17,12 +21,113 @@ from .utils import generic_exception_handler
 
 api = FastAPI()
 
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+COMPRESSION_LEVEL = 6
+
+# Layers by path and settings, so that the info file is not fetched on every request
+_layer_cache: cachetools.LRUCache = cachetools.LRUCache(maxsize=64)
+_layer_cache_lock = threading.Lock()
+
 
 @api.exception_handler(Exception)
 async def generic_handler(request: Request, exc: Exception):
     return generic_exception_handler(request, exc)
 
 
+def get_layer(path: str, readonly: bool) -> VolumetricLayer:
+    key = (path, readonly)
+    with _layer_cache_lock:
+        if key in _layer_cache:
+            return _layer_cache[key]
+    if readonly:
+        layer = build_cv_layer(path, readonly=True)
+    else:
+        layer = build_cv_layer(path, cv_kwargs={"non_aligned_writes": True})
+    with _layer_cache_lock:
+        _layer_cache[key] = layer
+    return layer
+
+
+def get_slab_bounds(start: int, end: int, chunk_size: int, offset: int) -> list[tuple[int, int]]:
+    """Splits [start, end) at the chunk boundaries of a layer along one axis."""
+    bounds = []
+    slab_start = start
+    while slab_start < end:
+        slab_end = min(end, offset + ((slab_start - offset) // chunk_size + 1) * chunk_size)
+        bounds.append((slab_start, slab_end))
+        slab_start = slab_end
+    return bounds
+
+
+def get_slab_index(
+    bbox_start: tuple[int, int, int],
+    bbox_end: tuple[int, int, int],
+    resolution: Vec3D,
+    axis: int,
+    bounds: tuple[int, int],
+) -> VolumetricIndex:
+    start = list(bbox_start)
+    end = list(bbox_end)
+    start[axis], end[axis] = bounds
+    return VolumetricIndex.from_coords(start, end, resolution)
+
+
+def get_slab_axis(is_fortran: bool, num_channels: int) -> int | None:
+    """The axis along which slabs are contiguous in the serialized array, if any.
+    Fortran order data is serialized as (Z, Y, X, C), and C order data as (C, X, Y, Z)."""
+    if is_fortran:
+        return 2
+    if num_channels == 1:
+        return 0
+    return None
+
+
+def get_slab_indices(
+    layer: VolumetricLayer,
+    bbox_start: tuple[int, int, int],
+    bbox_end: tuple[int, int, int],
+    resolution: Vec3D,
+    is_fortran: bool,
+) -> list[VolumetricIndex]:
+    """Splits the region into slabs along the outermost serialized axis, aligned to the
+    layer chunks."""
+    axis = get_slab_axis(is_fortran, layer.backend.num_channels)
+    if axis is None:
+        return [VolumetricIndex.from_coords(bbox_start, bbox_end, resolution)]
+    chunk_size = layer.backend.get_chunk_size(resolution)
+    voxel_offset = layer.backend.get_voxel_offset(resolution)
+    return [
+        get_slab_index(bbox_start, bbox_end, resolution, axis, bounds)
+        for bounds in get_slab_bounds(
+            bbox_start[axis], bbox_end[axis], chunk_size[axis], voxel_offset[axis]
+        )
+    ]
+
+
+def iter_compressed_slabs(
+    layer: VolumetricLayer,
+    slab_indices: list[VolumetricIndex],
+    first_slab: np.ndarray,
+    is_fortran: bool,
+) -> Iterator[bytes]:
+    """Yields a single gzip stream of the serialized slabs, starting from the already
+    read first slab. The next slab is read while the current one is compressed."""
+    compressor = zlib.compressobj(COMPRESSION_LEVEL, zlib.DEFLATED, GZIP_WBITS)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        data = first_slab
+        for i in range(len(slab_indices)):
+            if i > 0:
+                data = future.result()
+            if i + 1 < len(slab_indices):
+                future = executor.submit(layer.__getitem__, slab_indices[i + 1])
+            if is_fortran:
+                data = einops.rearrange(data, "C X Y Z -> Z Y X C")
+            chunk = compressor.compress(np.ascontiguousarray(data).tobytes())
+            if chunk:
+                yield chunk
+    yield compressor.flush()
+
+
 @api.get("/cutout")
 async def read_cutout(
     path: Annotated[str, Query()],
@@ -31,23 +136,38 @@ async def read_cutout(
     resolution: Annotated[tuple[float, float, float], Query()],
     is_fortran: Annotated[bool, Query()] = True,
 ):
-    index = VolumetricIndex.from_coords(bbox_start, bbox_end, Vec3D(*resolution))
-    layer = build_cv_layer(path, readonly=True)
+    layer = await run_in_threadpool(get_layer, path, True)
+    slab_indices = get_slab_indices(layer, bbox_start, bbox_end, Vec3D(*resolution), is_fortran)
+    # Read the first slab before the response starts, so that errors in opening or
+    # reading the layer are reported with an error status
+    first_slab = await run_in_threadpool(layer.__getitem__, slab_indices[0])
+    return StreamingResponse(
+        iter_compressed_slabs(layer, slab_indices, first_slab, is_fortran),
+        media_type="application/gzip",
+    )
 
-    data = np.ascontiguousarray(layer[index])
-    if is_fortran:
-        data = einops.rearrange(data, "C X Y Z -> Z Y X C")
-    data_bytes = data.tobytes()
-
-    def chunked_compress(data_bytes: bytes):
-        with BytesIO() as buffer:
-            with gzip.GzipFile(fileobj=buffer, mode="wb") as gzip_file:
-                gzip_file.write(data_bytes)
-            buffer.seek(0)
-            while chunk := buffer.read(64 * 1024):
-                yield chunk
 
-    return StreamingResponse(chunked_compress(data_bytes), media_type="application/gzip")
+class GzipStreamDecoder:
+    """Incrementally decompresses a gzip stream, which may have several members."""
+
+    def __init__(self):
+        self.decompressor = zlib.decompressobj(GZIP_WBITS)
+
+    def decode(self, data: bytes) -> bytes:
+        result = []
+        while data:
+            result.append(self.decompressor.decompress(data))
+            data = self.decompressor.unused_data
+            if data:
+                self.decompressor = zlib.decompressobj(GZIP_WBITS)
+        return b"".join(result)
+
+    def flush(self) -> bytes:
+        return self.decompressor.flush()
+
+    @property
+    def eof(self) -> bool:
+        return self.decompressor.eof
 
 
 @api.post("/cutout")
@@ -59,23 +179,70 @@ async def write_cutout(
     resolution: Annotated[tuple[float, float, float], Query()],
     is_fortran: Annotated[bool, Query()] = True,
 ):
-    index = VolumetricIndex.from_coords(bbox_start, bbox_end, Vec3D(*resolution))
-    cv_kwargs = {"non_aligned_writes": True}
-    layer = build_cv_layer(path, cv_kwargs=cv_kwargs)
-    shape = [layer.backend.num_channels, *(np.array(bbox_end) - np.array(bbox_start))]
-
-    data = await request.body()
-    data = gzip.decompress(data)
-
-    if not is_fortran:
-        data_arr = np.frombuffer(data, dtype=layer.backend.dtype).reshape(shape)
-    else:
-        data_arr = np.frombuffer(data, dtype=layer.backend.dtype).reshape(shape[::-1])
-        data_arr = einops.rearrange(data_arr, "Z Y X C -> C X Y Z")
+    res = Vec3D(*resolution)
+    layer = await run_in_threadpool(get_layer, path, False)
+    backend = layer.backend
+    num_channels = backend.num_channels
+    dtype = np.dtype(backend.dtype)
+    size = [e - s for s, e in zip(bbox_start, bbox_end)]
 
     # temporary hack to get non_aligned_writes to work.
-    cvol = _get_cv_cached(path, index.resolution, **layer.backend.cv_kwargs)  # type: ignore
+    cvol = _get_cv_cached(path, res, **backend.cv_kwargs)  # type: ignore
     cvol.non_aligned_writes = True
-    _cv_cache[(path, index.resolution)] = cvol
+    _cv_cache[(path, res)] = cvol
 
-    layer[index] = data_arr
+    axis = get_slab_axis(is_fortran, num_channels)
+    if axis is None:
+        slab_bounds = [(bbox_start[0], bbox_end[0])]
+        slab_axis = 0
+    else:
+        slab_axis = axis
+        slab_bounds = get_slab_bounds(
+            bbox_start[axis],
+            bbox_end[axis],
+            backend.get_chunk_size(res)[axis],
+            backend.get_voxel_offset(res)[axis],
+        )
+
+    def write_slab(slab_data: bytes, bounds: tuple[int, int]):
+        shape = [num_channels, *size]
+        shape[slab_axis + 1] = bounds[1] - bounds[0]
+        if is_fortran:
+            data_arr = np.frombuffer(slab_data, dtype=dtype).reshape(shape[::-1])
+            data_arr = einops.rearrange(data_arr, "Z Y X C -> C X Y Z")
+        else:
+            data_arr = np.frombuffer(slab_data, dtype=dtype).reshape(shape)
+        index = get_slab_index(bbox_start, bbox_end, res, slab_axis, bounds)
+        layer[index] = data_arr
+
+    slab_nbytes = [
+        (e - s) * num_channels * dtype.itemsize * int(np.prod(size)) // size[slab_axis]
+        for s, e in slab_bounds
+    ]
+    expected_nbytes = sum(slab_nbytes)
+    with tempfile.TemporaryFile() as spill_file:
+        # Spill the decoded upload, so that nothing is written unless it is complete
+        decoder = GzipStreamDecoder()
+        received_nbytes = 0
+        async for chunk in request.stream():
+            data = decoder.decode(chunk)
+            received_nbytes += len(data)
+            if received_nbytes > expected_nbytes:
+                break
+            await run_in_threadpool(spill_file.write, data)
+        else:
+            data = decoder.flush()
+            received_nbytes += len(data)
+            spill_file.write(data)
+        if received_nbytes != expected_nbytes:
+            raise ValueError(
+                f"Received {'more than ' if received_nbytes > expected_nbytes else ''}"
+                f"{received_nbytes} bytes, expected {expected_nbytes} bytes for the cutout."
+            )
+        if not decoder.eof:
+            raise ValueError("The cutout upload is a truncated gzip stream.")
+
+        spill_file.seek(0)
+        for bounds, nbytes in zip(slab_bounds, slab_nbytes):
+            slab_data = await run_in_threadpool(spill_file.read, nbytes)
+            await run_in_threadpool(write_slab, slab_data, bounds)
@@ -9,6 +9,7 @@ from typing import Annotated
 # pylint: disable=all # type: ignore
 from attrs import asdict
 from fastapi import FastAPI, Query, Request
+from fastapi.responses import StreamingResponse
 from neuroglancer.viewer_state import LineAnnotation
 
 from zetta_utils.db_annotations import precomp_annotations
@@ -20,10 +21,14 @@ from zetta_utils.db_annotations.precomp_annotations import (
 from zetta_utils.geometry import BBox3D, Vec3D
 from zetta_utils.layer.volumetric import VolumetricIndex
 
-from .utils import generic_exception_handler
+from .utils import generic_exception_handler, prefers_media_type
 
 api = FastAPI()
 
+BINARY_MEDIA_TYPE = "application/octet-stream"
+JSON_MEDIA_TYPE = "application/json"
+STREAM_CHUNK_SIZE = 64 * 1024
+
 
 @api.exception_handler(Exception)
 async def generic_handler(request: Request, exc: Exception):
@@ -32,6 +37,7 @@ async def generic_handler(request: Request, exc: Exception):
 
 @api.get("/annotations")
 async def read_in_bounds(
+    request: Request,
     path: Annotated[str, Query()],
     bbox_start: Annotated[tuple[int, int, int], Query()],
     bbox_end: Annotated[tuple[int, int, int], Query()],
@@ -40,12 +46,33 @@ async def read_in_bounds(
     """
     This endpoint retrieves all lines entirely within the given bounds.
     Coordinates are returned in units according to `resolution`.
+
+    By default, the lines are returned as a JSON list of annotation dicts. When the
+    request prefers `application/octet-stream` over JSON, they are instead streamed in the
+    Neuroglancer multiple annotation encoding (see `encode_annotations`): the count
+    as uint64le, the coordinates as float32le, then the IDs as uint64le. The
+    annotation type is given in the `X-Annotation-Type` header.
     """
     resolution_vec = Vec3D(*resolution)
     bbox = BBox3D.from_coords(bbox_start, bbox_end, resolution_vec)
     layer = build_annotation_layer(path, mode="read")
+    accept = request.headers.get("accept", "")
+    if prefers_media_type(accept, BINARY_MEDIA_TYPE, JSON_MEDIA_TYPE):
+        values, ids = layer.read_arrays_in_bounds(
+            bbox, strict=True, annotation_resolution=resolution_vec
+        )
+        return StreamingResponse(
+            precomp_annotations.iter_encoded_annotations(values, ids, STREAM_CHUNK_SIZE),
+            media_type=BINARY_MEDIA_TYPE,
+            headers={
+                "X-Annotation-Type": layer.annotation_type,
+                "X-Annotation-Count": str(len(ids)),
+            },
+        )
+
+    annotations = layer.read_in_bounds(bbox, strict=True, annotation_resolution=resolution_vec)
     response = []
-    for line in layer.read_in_bounds(bbox, strict=True, annotation_resolution=resolution_vec):
+    for line in annotations:
         annotation = AnnotationDBEntry(
             id=line.id,
             layer_group="",
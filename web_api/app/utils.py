@@ -9,6 +9,46 @@ from zetta_utils.log import get_logger
 logger = get_logger("web_api")
 
 
+def _get_media_type_quality(accept: str, media_type: str) -> float:
+    """
+    Returns the quality given to `media_type` by an `Accept` header, from its most
+    specific matching media range.
+    """
+    main_type = media_type.split("/")[0]
+    best_specificity, quality = -1, 0.0
+    for media_range in accept.split(","):
+        range_type, *params = [e.strip() for e in media_range.split(";")]
+        range_type = range_type.lower()
+        if range_type == media_type:
+            specificity = 2
+        elif range_type == f"{main_type}/*":
+            specificity = 1
+        elif range_type == "*/*":
+            specificity = 0
+        else:
+            continue
+        range_quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    range_quality = float(value)
+                except ValueError:
+                    range_quality = 0.0
+        if specificity > best_specificity:
+            best_specificity, quality = specificity, range_quality
+    return quality
+
+
+def prefers_media_type(accept: str, media_type: str, default_media_type: str) -> bool:
+    """
+    Returns whether an `Accept` header gives `media_type` a higher quality than
+    `default_media_type`.
+    """
+    quality = _get_media_type_quality(accept, media_type)
+    return quality > 0 and quality > _get_media_type_quality(accept, default_media_type)
+
+
 def generic_exception_handler(request: Request, exc: Exception):
     logger.error(traceback.format_exc())
     if isinstance(exc, KeyError):
@@ -4,12 +4,14 @@ from typing import List
 
 import numpy as np
 
-from . import built_in_registrations, constants
+from . import built_in_registrations, constants, lazy_registry
 from .building import (
     SPECIAL_KEYS,
     BuilderPartial,
     UnpicklableDict,
+    ParallelMode,
     build,
+    get_current_build_spec,
     get_initial_builder_spec,
 )
 from .registry import REGISTRY, get_matching_entry, register, unregister
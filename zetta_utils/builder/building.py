@@ -1,9 +1,19 @@
 """Bulding objects from nested specs."""
 from __future__ import annotations
 
+import contextlib
+import contextvars
+import os
 from collections import defaultdict
-from concurrent.futures import ProcessPoolExecutor
-from typing import Any, Callable, Final, Optional, cast
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from typing import Any, Callable, Final, Literal, Optional, cast
 
 import attrs
 import cachetools
@@ -23,6 +33,9 @@ SPECIAL_KEYS: Final = {
     "version": "@version",
 }
 BUILT_OBJECT_ID_REGISTRY: dict[int, JsonSerializableValue] = {}
+_CURRENT_BUILD_SPEC: contextvars.ContextVar[str | None] = contextvars.ContextVar(
+    "CURRENT_BUILD_SPEC", default=None
+)
 
 
 def get_initial_builder_spec(obj: Any) -> JsonSerializableValue:
@@ -35,11 +48,40 @@ def get_initial_builder_spec(obj: Any) -> JsonSerializableValue:
     return result
 
 
+def get_current_build_spec() -> str | None:
+    """Returns the spec of the object being built as a JSON string, or the
+    ``CURRENT_BUILD_SPEC`` environment variable when not called from within
+    a build. Unlike the environment variable, this is also set for objects
+    built in worker threads.
+    """
+    result = _CURRENT_BUILD_SPEC.get()
+    if result is None:
+        result = os.environ.get("CURRENT_BUILD_SPEC")
+    return result
+
+
+ParallelMode = Literal["stages", "threads", "processes"]
+
+
 @typechecked
-def build(spec: dict | list | None = None, path: str | None = None, parallel: bool = False) -> Any:
+def build(
+    spec: dict | list | None = None,
+    path: str | None = None,
+    parallel: bool = False,
+    parallel_mode: ParallelMode = "stages",
+) -> Any:
     """Build an object from the given spec.
 
     :param spec: Input dictionary.
+    :param path: Path to a CUE spec, used when ``spec`` is not given.
+    :param parallel: Whether to build objects that allow it in parallel.
+    :param parallel_mode: How to build in parallel. ``stages`` builds the objects at
+        each nesting depth together in a process pool, waiting for a whole depth to
+        finish before starting the next. ``threads`` and ``processes`` build each object
+        as soon as its arguments are built, in a thread pool (for I/O bound objects,
+        such as remote layers) or a process pool (for CPU bound objects) respectively.
+        As the environment is shared by all threads, ``threads`` does not set the
+        ``CURRENT_BUILD_SPEC`` environment variable; use ``get_current_build_spec``.
     :return: Object build according to the specification.
 
     """
@@ -52,15 +94,28 @@ def build(spec: dict | list | None = None, path: str | None = None, parallel: bo
         final_spec = parsing.cue.load(path)
 
     result = _build(
-        spec=final_spec, parallel=parallel, name_prefix="spec", version=constants.DEFAULT_VERSION
+        spec=final_spec,
+        parallel=parallel,
+        name_prefix="spec",
+        version=constants.DEFAULT_VERSION,
+        parallel_mode=parallel_mode,
     )
 
     return result
 
 
-def _build(spec: JsonSerializableValue, parallel: bool, version: str, name_prefix: str) -> Any:
+def _build(
+    spec: JsonSerializableValue,
+    parallel: bool,
+    version: str,
+    name_prefix: str,
+    parallel_mode: ParallelMode = "stages",
+) -> Any:
     stages = _parse_stages(spec, version=version, name_prefix=name_prefix, parallel=parallel)
-    result = _execute_build_stages(stages=stages, parallel=parallel)
+    if parallel and parallel_mode != "stages":
+        result = _execute_build_graph(stages=stages, parallel_mode=parallel_mode)
+    else:
+        result = _execute_build_stages(stages=stages, parallel=parallel)
     return result
 
 
@@ -75,6 +130,11 @@ def _get_process_pool():
     return ProcessPoolExecutor()
 
 
+@cachetools.cached(UnpicklableDict())
+def _get_thread_pool():
+    return ThreadPoolExecutor(thread_name_prefix="builder")
+
+
 @attrs.mutable
 class ObjectToBeBuilt:
     spec: JsonSerializableValue
@@ -86,11 +146,30 @@ class ObjectToBeBuilt:
     allow_parallel: bool = True
 
 
+@contextlib.contextmanager
+def _set_current_build_spec(spec_as_str: str):
+    token = _CURRENT_BUILD_SPEC.set(spec_as_str)
+    try:
+        yield
+    finally:
+        _CURRENT_BUILD_SPEC.reset(token)
+
+
 def _build_object(
-    fn: Callable, kwargs: dict[str, Any], spec: JsonSerializableValue, name_prefix: str
+    fn: Callable,
+    kwargs: dict[str, Any],
+    spec: JsonSerializableValue,
+    name_prefix: str,
+    set_env: bool = True,
 ) -> Any:
     spec_as_str = json.dumps(spec)
-    with ctx_managers.set_env_ctx_mngr(CURRENT_BUILD_SPEC=spec_as_str):
+    if set_env:
+        env_ctx = ctx_managers.set_env_ctx_mngr(CURRENT_BUILD_SPEC=spec_as_str)
+    else:
+        # The environment is shared by all threads, so it is left untouched while
+        # other objects are being built in worker threads
+        env_ctx = ctx_managers.noop_ctx_mngr()
+    with _set_current_build_spec(spec_as_str), env_ctx:
         try:
             result = fn(**kwargs)
         except Exception as e:  # pragma: no cover
@@ -112,16 +191,16 @@ class Stage:
     parallel_part: list[ObjectToBeBuilt] = attrs.field(factory=list)
 
 
+def _process_result(obj: ObjectToBeBuilt, result: Any):
+    BUILT_OBJECT_ID_REGISTRY[id(result)] = obj.spec
+    if obj.parent is not None:
+        assert obj.parent_kwarg_name is not None
+        obj.parent.kwargs[obj.parent_kwarg_name] = result
+
+
 def _execute_build_stages(stages: list[Stage], parallel: bool):
     assert len(stages) > 0
 
-    def _process_result(obj: ObjectToBeBuilt, result: Any):
-        # for obj, result in zip(objs, results):
-        BUILT_OBJECT_ID_REGISTRY[id(result)] = obj.spec
-        if obj.parent is not None:
-            assert obj.parent_kwarg_name is not None
-            obj.parent.kwargs[obj.parent_kwarg_name] = result
-
     for stage in stages:
         for obj in stage.sequential_part:
             obj_result = _build_object(
@@ -156,6 +235,79 @@ def _execute_build_stages(stages: list[Stage], parallel: bool):
     return obj_result
 
 
+def _get_ordered_kwargs(obj: ObjectToBeBuilt) -> dict[str, Any]:
+    """Returns the kwargs of the object in spec order, which does not depend on the
+    order in which the arguments finished building."""
+    if isinstance(obj.spec, dict):
+        return {k: obj.kwargs[k] for k in obj.spec if k in obj.kwargs}
+    return obj.kwargs
+
+
+def _execute_build_graph(stages: list[Stage], parallel_mode: Literal["threads", "processes"]):
+    """Builds each object as soon as all of its arguments are built. Objects that allow
+    parallel building are submitted to a persistent pool, while the rest are built
+    in the main thread."""
+    assert len(stages) > 0
+    pooled = {id(obj) for stage in stages for obj in stage.parallel_part}
+    objs = [obj for stage in stages for obj in stage.sequential_part + stage.parallel_part]
+    num_pending_args = {id(obj): 0 for obj in objs}
+    for obj in objs:
+        if obj.parent is not None:
+            num_pending_args[id(obj.parent)] += 1
+
+    pool: Executor
+    if parallel_mode == "threads":
+        pool = _get_thread_pool()
+    else:
+        pool = _get_process_pool()
+    set_env = parallel_mode != "threads"
+
+    ready = [obj for obj in objs if num_pending_args[id(obj)] == 0]
+    running: dict[Future, ObjectToBeBuilt] = {}
+    final_result: Any = None
+
+    def _on_built(obj: ObjectToBeBuilt, result: Any):
+        nonlocal final_result
+        _process_result(obj, result)
+        if obj.parent is None:
+            final_result = result
+        else:
+            num_pending_args[id(obj.parent)] -= 1
+            if num_pending_args[id(obj.parent)] == 0:
+                ready.append(obj.parent)
+
+    while ready or running:
+        # Start everything that can run in the pool before blocking the main thread
+        to_submit = [e for e in ready if id(e) in pooled]
+        ready = [e for e in ready if id(e) not in pooled]
+        for obj in to_submit:
+            future = pool.submit(
+                _build_object,
+                obj.fn,
+                _get_ordered_kwargs(obj),
+                obj.spec,
+                obj.name_prefix,
+                set_env,
+            )
+            running[future] = obj
+        if ready:
+            obj = ready.pop(0)
+            result = _build_object(
+                fn=obj.fn,
+                kwargs=_get_ordered_kwargs(obj),
+                spec=obj.spec,
+                name_prefix=obj.name_prefix,
+                set_env=set_env,
+            )
+            _on_built(obj, result)
+        elif running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                _on_built(running.pop(future), future.result())
+
+    return final_result
+
+
 def _build_list(**kwargs):
     return [value for _, value in sorted(kwargs.items(), key=lambda x: int(x[0]))]
 
@@ -384,7 +536,9 @@ class BuilderPartial:
         except TypeError:  # pragma: no cover
             spec_as_str = '{"error": "Unserializable Spec"}'
 
-        with ctx_managers.set_env_ctx_mngr(CURRENT_BUILD_SPEC=spec_as_str):
+        with _set_current_build_spec(spec_as_str), ctx_managers.set_env_ctx_mngr(
+            CURRENT_BUILD_SPEC=spec_as_str
+        ):
             version = cast(str, self.spec.get(SPECIAL_KEYS["version"], constants.DEFAULT_VERSION))
 
             fn = get_matching_entry(cast(str, self.spec[SPECIAL_KEYS["type"]]), version=version).fn
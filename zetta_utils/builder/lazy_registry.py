@@ -0,0 +1,122 @@
+"""Manifest of the modules that register each builder name, for importing them lazily."""
+from __future__ import annotations
+
+import hashlib
+import importlib.metadata
+import json
+import os
+from typing import Final
+
+from .registry import LAZY_REGISTRY, REGISTERING_MODULES, REGISTRY
+
+MANIFEST_PATH_ENV: Final = "ZETTA_REGISTRY_MANIFEST"
+DEFAULT_MANIFEST_PATH: Final = os.path.join(
+    os.path.expanduser("~"), ".cache", "zetta_utils", "registry_manifest.json"
+)
+PACKAGE_DIR: Final = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def get_manifest_path() -> str:
+    return os.environ.get(MANIFEST_PATH_ENV, DEFAULT_MANIFEST_PATH)
+
+
+def get_installed_version() -> str | None:
+    """Returns the version of ``zetta_utils`` if it was installed from a built
+    distribution, whose sources only change along with the version, and ``None`` for
+    editable installs and source checkouts.
+    """
+    try:
+        dist = importlib.metadata.distribution("zetta_utils")
+    except importlib.metadata.PackageNotFoundError:
+        return None
+    direct_url = dist.read_text("direct_url.json")
+    if direct_url is not None and json.loads(direct_url).get("dir_info", {}).get("editable"):
+        return None
+    dist_dir = os.path.realpath(str(dist.locate_file("")))
+    if os.path.commonpath([dist_dir, os.path.realpath(PACKAGE_DIR)]) != dist_dir:
+        return None
+    return dist.version
+
+
+def get_package_fingerprint() -> str:
+    """Returns the installed version of ``zetta_utils`` or, for editable installs and
+    source checkouts, a hash of the paths, sizes and modification times of its source
+    files, so that a manifest is regenerated whenever the package changes.
+    """
+    version = get_installed_version()
+    if version is not None:
+        return f"version:{version}"
+    hasher = hashlib.sha1()
+    for root, dirs, files in os.walk(PACKAGE_DIR):
+        dirs.sort()
+        for file in sorted(files):
+            if file.endswith(".py"):
+                stat = os.stat(os.path.join(root, file))
+                rel_path = os.path.relpath(os.path.join(root, file), PACKAGE_DIR)
+                hasher.update(f"{rel_path}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return hasher.hexdigest()
+
+
+def generate_manifest(path: str | None = None) -> dict[str, list[str]]:
+    """Import all of the modules of ``zetta_utils`` and write the modules that register
+    each builder name to the manifest at ``path``.
+
+    :param path: Path of the manifest; defaults to ``get_manifest_path()``.
+    :return: Mapping from registered names to modules.
+    """
+    import zetta_utils  # pylint: disable=import-outside-toplevel
+
+    zetta_utils.load_all_modules()
+    modules = {
+        name: [e for e in REGISTERING_MODULES[name] if e.startswith("zetta_utils")]
+        for name in sorted(REGISTRY)
+        if REGISTRY[name]
+    }
+    modules = {k: v for k, v in modules.items() if v}
+
+    if path is None:
+        path = get_manifest_path()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"fingerprint": get_package_fingerprint(), "modules": modules}, f, indent=1)
+    os.replace(tmp_path, path)
+    return modules
+
+
+def _read_manifest(path: str) -> dict | None:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def load_manifest(path: str | None = None) -> dict[str, list[str]] | None:
+    """Read the manifest at ``path``.
+
+    :param path: Path of the manifest; defaults to ``get_manifest_path()``.
+    :return: Mapping from registered names to modules, or ``None`` if the manifest
+        does not exist or was generated for different ``zetta_utils`` sources.
+    """
+    if path is None:
+        path = get_manifest_path()
+    manifest = _read_manifest(path)
+    if manifest is None or manifest.get("fingerprint") != get_package_fingerprint():
+        return None
+    return manifest["modules"]
+
+
+def enable_lazy_registry(path: str | None = None) -> dict[str, list[str]]:
+    """Make the builder import the modules that register a name when the name is first
+    looked up, instead of requiring all modules to be imported beforehand. The
+    manifest is generated, importing all modules once, if it is missing or stale.
+
+    :param path: Path of the manifest; defaults to ``get_manifest_path()``.
+    :return: Mapping from registered names to modules.
+    """
+    modules = load_manifest(path)
+    if modules is None:
+        modules = generate_manifest(path)
+    LAZY_REGISTRY.update(modules)
+    return modules
@@ -1,7 +1,10 @@
 """Bulding objects from nested specs."""
 from __future__ import annotations
 
+import importlib
+import sys
 from collections import defaultdict
+from types import FrameType
 from typing import Callable, TypeVar
 
 import attrs
@@ -14,6 +17,10 @@ T = TypeVar("T", bound=Callable)
 
 REGISTRY: dict[str, list[RegistryEntry]] = defaultdict(list)
 MUTLIPROCESSING_INCOMPATIBLE_CLASSES: set[str] = set()
+# Modules in which each name was registered, used to generate the lazy registry manifest
+REGISTERING_MODULES: dict[str, list[str]] = defaultdict(list)
+# Modules to import to register names that are not registered yet
+LAZY_REGISTRY: dict[str, list[str]] = {}
 
 
 @attrs.frozen
@@ -28,10 +35,13 @@ def get_matching_entry(
     name: str, version: str | Version = constants.DEFAULT_VERSION
 ) -> RegistryEntry:
     version_ = Version(str(version))
-    matches = []
-    for e in REGISTRY[name]:
-        if version_ in e.version_spec:
-            matches.append(e)
+    matches = [e for e in REGISTRY[name] if version_ in e.version_spec]
+    if not matches and name in LAZY_REGISTRY:
+        # Versions of a name may be registered in different modules, e.g. `deprecated/`,
+        # so all of them are imported when no imported version matches
+        for module in LAZY_REGISTRY[name]:
+            importlib.import_module(module)
+        matches = [e for e in REGISTRY[name] if version_ in e.version_spec]
     if len(matches) == 1:
         return matches[0]
     elif len(matches) > 1:
@@ -45,6 +55,16 @@ def get_matching_entry(
         )
 
 
+def _get_registering_module() -> str | None:
+    """Returns the name of the innermost module whose body is being executed."""
+    frame: FrameType | None = sys._getframe(2)  # pylint: disable=protected-access
+    while frame is not None:
+        if frame.f_code.co_name == "<module>":
+            return frame.f_globals.get("__name__")
+        frame = frame.f_back
+    return None  # pragma: no cover
+
+
 def register(
     name: str,
     allow_partial: bool = True,
@@ -59,6 +79,9 @@ def register(
     """
 
     version_spec = SpecifierSet(str(versions))
+    module = _get_registering_module()
+    if module is not None and module not in REGISTERING_MODULES[name]:
+        REGISTERING_MODULES[name].append(module)
 
     # Check if the same name with the same version spec is already present
     for e in REGISTRY[name]:
@@ -3,12 +3,13 @@ import pprint
 import subprocess
 import sys
 from tempfile import NamedTemporaryFile
-from typing import Optional
+from typing import Optional, get_args
 
 import click
 
 import zetta_utils
 from zetta_utils import log
+from zetta_utils.builder import ParallelMode
 from zetta_utils.run import run_ctx_manager
 from zetta_utils.run.cli import run_info_cli
 
@@ -18,7 +19,13 @@ logger = log.get_logger("zetta_utils")
 @click.group()
 @click.option("-v", "--verbose", count=True, default=2)
 @click.option(
-    "--load_mode", "-l", type=click.Choice(["all", "inference", "training", "try"]), default="all"
+    "--load_mode",
+    "-l",
+    type=click.Choice(["lazy", "all", "inference", "training", "try"]),
+    default="all",
+    help="Which modules to import for their builder registrations. `lazy` imports the "
+    "modules registering each `@type` when it is first built instead, using a manifest "
+    "that is generated on first use.",
 )
 def cli(verbose, load_mode):  # pragma: no cover # no logic, delegation
     verbosity_map = {
@@ -73,6 +80,13 @@ def validate_py_path(ctx, param, value):  # pylint: disable=unused-argument
     is_flag=True,
     help="Whether to pass `parallel` flag to builder.",
 )
+@click.option(
+    "--parallel_mode",
+    type=click.Choice(get_args(ParallelMode)),
+    default="stages",
+    show_default=True,
+    help="How the builder builds in parallel when `--parallel_builder` is set.",
+)
 @click.option(
     "--extra_import",
     "-i",
@@ -96,6 +110,7 @@ def run(
     run_id: Optional[str],
     pdb: bool,
     parallel_builder: bool,
+    parallel_mode: ParallelMode,
     extra_imports: tuple[str],
     main_run_process: bool,
 ):
@@ -118,7 +133,9 @@ def run(
             f.write(str_spec)
             os.environ["ZETTA_RUN_SPEC_PATH"] = f.name
 
-    if load_mode == "all":
+    if load_mode == "lazy":
+        zetta_utils.builder.lazy_registry.enable_lazy_registry()
+    elif load_mode == "all":
         zetta_utils.load_all_modules()
     elif load_mode == "inference":  # pragma: no cover
         zetta_utils.load_inference_modules()
@@ -138,7 +155,9 @@ def run(
         zetta_utils.builder.PARALLEL_BUILD_ALLOWED = True
 
     with run_ctx_manager(spec=spec, run_id=run_id, main_run_process=main_run_process):
-        result = zetta_utils.builder.build(spec, parallel=parallel_builder)
+        result = zetta_utils.builder.build(
+            spec, parallel=parallel_builder, parallel_mode=parallel_mode
+        )
         logger.debug(f"Outcome: {pprint.pformat(result, indent=4)}")
         if pdb:
             breakpoint()  # pylint: disable=forgotten-debug-statement # pragma: no cover
@@ -147,7 +166,28 @@ def run(
 @cli.command()
 def show_registry():
     """Display builder registry."""
-    logger.critical(pprint.pformat(zetta_utils.builder.REGISTRY, indent=4))
+    ctx = click.get_current_context()
+    load_mode = ctx.obj.get("load_mode", "all") if ctx and ctx.obj else "all"
+    if load_mode == "lazy":
+        # Show the registering modules instead of importing them
+        modules = zetta_utils.builder.lazy_registry.enable_lazy_registry()
+        logger.critical(pprint.pformat(modules, indent=4))
+    else:
+        logger.critical(pprint.pformat(zetta_utils.builder.REGISTRY, indent=4))
+
+
+@cli.command()
+@click.option(
+    "--path",
+    type=str,
+    default=None,
+    help="Path of the manifest. Defaults to `$ZETTA_REGISTRY_MANIFEST` or "
+    "`~/.cache/zetta_utils/registry_manifest.json`.",
+)
+def generate_registry_manifest(path: Optional[str]):
+    """Generate the manifest used by `--load_mode lazy`, e.g. when building an image."""
+    modules = zetta_utils.builder.lazy_registry.generate_manifest(path)
+    logger.info(f"Wrote the registering modules of {len(modules)} builder names.")
 
 
 for cmd in run_info_cli.commands.values():
@@ -13,6 +13,7 @@ from kubernetes.dynamic import DynamicClient
 from kubernetes import client as k8s_client
 from zetta_utils import builder, log, run
 from zetta_utils.mazepa import SemaphoreType
+from zetta_utils.mazepa.semaphore_controller import SemaphorePolicyName
 
 from .eks import eks_cluster_data
 from .gke import gke_cluster_data
@@ -67,8 +68,10 @@ def get_mazepa_worker_command(
     num_procs: int = 1,
     semaphores_spec: dict[SemaphoreType, int] | None = None,
     idle_timeout: int = 60,
+    semaphores_bounds: dict[SemaphoreType, list[int]] | None = None,
+    semaphores_policy: SemaphorePolicyName = "aimd",
 ):
-    if num_procs == 1 and semaphores_spec is None:
+    if num_procs == 1 and semaphores_spec is None and semaphores_bounds is None:
         command = "mazepa.run_worker"
         num_procs_line = ""
         semaphores_line = ""
@@ -77,6 +80,11 @@ def get_mazepa_worker_command(
         command = "mazepa.run_worker_manager"
         num_procs_line = f"num_procs: {num_procs}\n"
         semaphores_line = f"semaphores_spec: {json.dumps(semaphores_spec)}\n"
+        if semaphores_bounds is not None:
+            semaphores_line += (
+                f"semaphores_bounds: {json.dumps(semaphores_bounds)}\n"
+                f"semaphores_policy: {json.dumps(semaphores_policy)}\n"
+            )
         idle_timeout_line = f"idle_timeout: {idle_timeout}\n"
 
     result = f"zetta -vv -l try run -r {run.RUN_ID} --no-main-run-process -p -s '{{"
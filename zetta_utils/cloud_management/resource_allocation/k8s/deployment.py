@@ -10,6 +10,7 @@ from typing import Any, Dict, List, Literal, Optional
 from kubernetes import client as k8s_client
 from zetta_utils import builder, log
 from zetta_utils.mazepa import SemaphoreType
+from zetta_utils.mazepa.semaphore_controller import SemaphorePolicyName
 from zetta_utils.run import (
     Resource,
     ResourceTypes,
@@ -89,6 +90,8 @@ def get_mazepa_worker_deployment(  # pylint: disable=too-many-locals
     provisioning_model: Literal["standard", "spot"] = "spot",
     gpu_accelerator_type: str | None = None,
     adc_available: bool = False,
+    semaphores_bounds: dict[SemaphoreType, list[int]] | None = None,
+    semaphores_policy: SemaphorePolicyName = "aimd",
 ):
     if labels is None:
         labels_final = {"run_id": run_id}
@@ -96,7 +99,12 @@ def get_mazepa_worker_deployment(  # pylint: disable=too-many-locals
         labels_final = labels
 
     worker_command = get_mazepa_worker_command(
-        task_queue_spec, outcome_queue_spec, num_procs, semaphores_spec
+        task_queue_spec,
+        outcome_queue_spec,
+        num_procs,
+        semaphores_spec,
+        semaphores_bounds=semaphores_bounds,
+        semaphores_policy=semaphores_policy,
     )
     logger.debug(f"Making a deployment with worker command: '{worker_command}'")
 
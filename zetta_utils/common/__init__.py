@@ -11,3 +11,4 @@ from .path import abspath, is_local
 from .pprint import lrpad
 from .signal_handlers import custom_signal_handler_ctx
 from .timer import RepeatTimer
+from . import metrics, tracing
@@ -0,0 +1,160 @@
+"""
+Lightweight in-process metrics: counters and fixed-bucket histograms, recorded into
+the recorders activated with ``collect_metrics``. Recording is a no-op when no
+recorder is active.
+"""
+from __future__ import annotations
+
+import contextlib
+import copy
+import threading
+import time
+from typing import Generator
+
+import attrs
+
+# Exponential buckets from 1ms to ~17min, suitable for both I/O and compute timings
+DEFAULT_BUCKET_BOUNDS: tuple[float, ...] = tuple(0.001 * 2**i for i in range(21))
+
+
+@attrs.mutable
+class Histogram:
+    """
+    Histogram with fixed bucket upper bounds, mergeable across processes.
+
+    :param bounds: Increasing upper bounds of the buckets; values above the last bound
+        are counted in an overflow bucket.
+    """
+
+    bounds: tuple[float, ...] = DEFAULT_BUCKET_BOUNDS
+    bucket_counts: list[int] = attrs.field()
+    total: float = 0.0
+    count: int = 0
+
+    @bucket_counts.default
+    def _default_bucket_counts(self) -> list[int]:
+        return [0] * (len(self.bounds) + 1)
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                self.bucket_counts[i] += 1
+                break
+        else:
+            self.bucket_counts[-1] += 1
+        self.total += value
+        self.count += 1
+
+    def merge(self, other: Histogram) -> None:
+        if other.bounds != self.bounds:
+            raise ValueError("Cannot merge histograms with different bucket bounds.")
+        for i, bucket_count in enumerate(other.bucket_counts):
+            self.bucket_counts[i] += bucket_count
+        self.total += other.total
+        self.count += other.count
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count > 0 else 0.0
+
+    def quantile(self, q: float) -> float:
+        """Approximate quantile, given as the upper bound of the bucket that contains it."""
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for bound, bucket_count in zip(self.bounds, self.bucket_counts):
+            cumulative += bucket_count
+            if cumulative >= rank:
+                return bound
+        return float("inf")
+
+
+@attrs.mutable
+class MetricsSnapshot:
+    """
+    Counters and histograms, keyed by metric name.
+    """
+
+    counters: dict[str, float] = attrs.field(factory=dict)
+    histograms: dict[str, Histogram] = attrs.field(factory=dict)
+
+    def merge(self, other: MetricsSnapshot) -> None:
+        for name, value in other.counters.items():
+            self.counters[name] = self.counters.get(name, 0) + value
+        for name, histogram in other.histograms.items():
+            if name not in self.histograms:
+                self.histograms[name] = Histogram(bounds=histogram.bounds)
+            self.histograms[name].merge(histogram)
+
+
+@attrs.mutable
+class MetricsRecorder:
+    """
+    Thread safe accumulator of metrics.
+    """
+
+    data: MetricsSnapshot = attrs.field(factory=MetricsSnapshot)
+    _lock: threading.Lock = attrs.field(factory=threading.Lock, repr=False, eq=False)
+
+    def increment(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self.data.counters[name] = self.data.counters.get(name, 0) + value
+
+    def observe(self, name: str, value: float) -> None:
+        with self._lock:
+            if name not in self.data.histograms:
+                self.data.histograms[name] = Histogram()
+            self.data.histograms[name].observe(value)
+
+    def snapshot(self) -> MetricsSnapshot:
+        with self._lock:
+            return copy.deepcopy(self.data)
+
+
+# Recorders are process wide rather than context local, so that metrics recorded from
+# the thread pools used by the backends are accounted to the running task. The tuple is
+# replaced rather than modified, so that it can be iterated without locking.
+_active_recorders: tuple[MetricsRecorder, ...] = ()
+_active_recorders_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def collect_metrics() -> Generator[MetricsRecorder, None, None]:
+    """
+    Collects all metrics recorded in the process while the context is active.
+    """
+    global _active_recorders  # pylint: disable=global-statement
+    recorder = MetricsRecorder()
+    with _active_recorders_lock:
+        _active_recorders = _active_recorders + (recorder,)
+    try:
+        yield recorder
+    finally:
+        with _active_recorders_lock:
+            _active_recorders = tuple(e for e in _active_recorders if e is not recorder)
+
+
+def increment(name: str, value: float = 1) -> None:
+    for recorder in _active_recorders:
+        recorder.increment(name, value)
+
+
+def observe(name: str, value: float) -> None:
+    for recorder in _active_recorders:
+        recorder.observe(name, value)
+
+
+@contextlib.contextmanager
+def record_time(name: str) -> Generator[None, None, None]:
+    """
+    Records the duration of the context into the histogram ``name``.
+    """
+    if not _active_recorders:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start)
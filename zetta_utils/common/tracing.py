@@ -0,0 +1,237 @@
+"""
+Opt-in tracing of the execution of a single task: a tree of timed spans, optionally
+complemented by a ``cProfile`` profile or by stack samples of the tracing thread.
+Spans are only recorded while a trace is active, and are a no-op otherwise.
+The number of spans and stack samples per trace is capped, so that the traces of
+long running tasks stay bounded in size.
+"""
+from __future__ import annotations
+
+import contextlib
+import cProfile
+import os
+import pickle
+import socket
+import sys
+import threading
+import time
+from typing import Generator, Literal
+
+import attrs
+import fsspec
+
+ProfileMode = Literal["cprofile", "stack"]
+
+DEFAULT_STACK_SAMPLE_INTERVAL_SEC = 0.01
+MAX_SPANS = 10_000
+MAX_STACK_SAMPLES = 6_000
+
+
+@attrs.mutable
+class Span:
+    """
+    A timed section of a task.
+
+    :param name: Name of the section.
+    :param start_ts: Start, as seconds since the epoch.
+    :param end_ts: End, as seconds since the epoch; ``None`` while the span is open.
+    :param thread_id: Identifier of the thread the span ran in.
+    :param parent: Index of the parent span in the trace, ``None`` for roots.
+    """
+
+    name: str
+    start_ts: float
+    end_ts: float | None = None
+    thread_id: int = 0
+    parent: int | None = None
+
+    @property
+    def duration(self) -> float:
+        return (self.end_ts if self.end_ts is not None else self.start_ts) - self.start_ts
+
+
+@attrs.mutable
+class StackSamples:
+    """
+    Stacks of the tracing thread, sampled at a fixed interval, outermost frame first.
+    Sampling stops after ``max_samples``.
+    """
+
+    interval_sec: float
+    timestamps: list[float] = attrs.field(factory=list)
+    stacks: list[tuple[str, ...]] = attrs.field(factory=list)
+    max_samples: int = MAX_STACK_SAMPLES
+
+
+@attrs.mutable
+class TaskTrace:
+    """
+    Spans and profiles recorded during the execution of a task.
+
+    :param profile_stats: ``cProfile`` statistics, in the format of ``pstats.Stats.stats``.
+    :param dropped_spans: Number of spans not recorded once ``max_spans`` was reached.
+    """
+
+    task_id: str
+    operation_name: str
+    host: str = attrs.field(factory=socket.gethostname)
+    pid: int = attrs.field(factory=os.getpid)
+    spans: list[Span] = attrs.field(factory=list)
+    profile_stats: dict | None = None
+    stack_samples: StackSamples | None = None
+    max_spans: int = MAX_SPANS
+    dropped_spans: int = 0
+    _lock: threading.Lock = attrs.field(init=False, factory=threading.Lock, repr=False, eq=False)
+
+    def __getstate__(self) -> dict:
+        return {
+            field.name: getattr(self, field.name)
+            for field in attrs.fields(type(self))
+            if field.init
+        }
+
+    def __setstate__(self, state: dict) -> None:
+        for k, v in state.items():
+            object.__setattr__(self, k, v)
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    def open_span(self, name: str, parent: int | None) -> int | None:
+        span = Span(
+            name=name, start_ts=time.time(), thread_id=threading.get_ident(), parent=parent
+        )
+        with self._lock:
+            if len(self.spans) >= self.max_spans:
+                self.dropped_spans += 1
+                return None
+            self.spans.append(span)
+            return len(self.spans) - 1
+
+    def close_span(self, span_id: int) -> None:
+        self.spans[span_id].end_ts = time.time()
+
+
+# The active trace is process wide, so that spans from the thread pools used by the
+# backends are recorded; the parent of a span is tracked per thread.
+_active_trace: TaskTrace | None = None
+_span_stacks = threading.local()
+
+
+def _get_span_stack() -> list[int]:
+    if not hasattr(_span_stacks, "stack"):
+        _span_stacks.stack = []
+    return _span_stacks.stack
+
+
+@contextlib.contextmanager
+def span(name: str) -> Generator[None, None, None]:
+    """
+    Records the context as a span of the active trace, if any.
+    """
+    trace = _active_trace
+    if trace is None:
+        yield
+        return
+    stack = _get_span_stack()
+    # Spans in threads started within the task are attached to the root span
+    parent = stack[-1] if stack else (0 if trace.spans else None)
+    span_id = trace.open_span(name, parent)
+    if span_id is None:
+        yield
+        return
+    stack.append(span_id)
+    try:
+        yield
+    finally:
+        stack.pop()
+        trace.close_span(span_id)
+
+
+def _format_frame(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})"
+
+
+class _StackSampler(threading.Thread):
+    def __init__(self, thread_id: int, samples: StackSamples):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.samples = samples
+        self.finished = threading.Event()
+
+    def run(self):
+        while not self.finished.wait(self.samples.interval_sec):
+            if len(self.samples.stacks) >= self.samples.max_samples:
+                break
+            frame = sys._current_frames().get(  # pylint: disable=protected-access
+                self.thread_id
+            )
+            stack = []
+            while frame is not None:
+                stack.append(_format_frame(frame))
+                frame = frame.f_back
+            self.samples.timestamps.append(time.time())
+            self.samples.stacks.append(tuple(reversed(stack)))
+
+
+@contextlib.contextmanager
+def trace_task(
+    task_id: str,
+    operation_name: str,
+    profile: ProfileMode | None = None,
+    stack_sample_interval_sec: float = DEFAULT_STACK_SAMPLE_INTERVAL_SEC,
+) -> Generator[TaskTrace, None, None]:
+    """
+    Traces the context as the execution of a task, with a root span named after the
+    operation.
+
+    :param profile: Whether to also profile the calling thread with ``cProfile``, or
+        by sampling its stack every ``stack_sample_interval_sec``.
+    """
+    global _active_trace  # pylint: disable=global-statement
+    trace = TaskTrace(task_id=task_id, operation_name=operation_name)
+    profiler = None
+    sampler = None
+    if profile == "cprofile":
+        profiler = cProfile.Profile()
+    elif profile == "stack":
+        trace.stack_samples = StackSamples(interval_sec=stack_sample_interval_sec)
+        sampler = _StackSampler(threading.get_ident(), trace.stack_samples)
+
+    previous_trace = _active_trace
+    previous_stack = _get_span_stack()
+    _active_trace = trace
+    _span_stacks.stack = []
+    try:
+        with span(operation_name):
+            if profiler is not None:
+                try:
+                    profiler.enable()
+                except ValueError:  # pragma: no cover # another profiler is active
+                    profiler = None
+            if sampler is not None:
+                sampler.start()
+            try:
+                yield trace
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+                if sampler is not None:
+                    sampler.finished.set()
+                    sampler.join()
+    finally:
+        _active_trace = previous_trace
+        _span_stacks.stack = previous_stack
+    if profiler is not None:
+        profiler.create_stats()
+        trace.profile_stats = profiler.stats  # type: ignore # set by create_stats
+
+
+def write_trace(trace: TaskTrace, path: str) -> None:
+    """Writes the trace to the given local or remote path."""
+    with fsspec.open(path, "wb") as f:
+        pickle.dump(trace, f)
+
+
+def read_trace(path: str) -> TaskTrace:
+    with fsspec.open(path, "rb") as f:
+        return pickle.load(f)
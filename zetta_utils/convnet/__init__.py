@@ -1 +1,2 @@
-from . import architecture, utils, simple_inference_runner
+from . import architecture, utils, simple_inference_runner, batched_inference
+from .batched_inference import BatchedInferenceEngine
@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import itertools
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Literal, Sequence
+
+import attrs
+import torch
+from typeguard import typechecked
+
+from zetta_utils import builder, convnet, tensor_ops
+from zetta_utils.tensor_typing import Tensor
+
+
+def _get_tile_starts(size: int, tile: int, step: int) -> list[int]:
+    starts = list(range(0, size - tile + 1, step))
+    if starts[-1] != size - tile:
+        starts.append(size - tile)
+    return starts
+
+
+def _get_blend_weights(
+    tile_size: Sequence[int], overlap: Sequence[int], blend: Literal["linear", "constant"]
+) -> torch.Tensor:
+    result = torch.ones(tuple(tile_size), dtype=torch.float32)
+    if blend == "constant":
+        return result
+    for dim, (tile, ovl) in enumerate(zip(tile_size, overlap)):
+        if ovl == 0:
+            continue
+        pos = torch.arange(tile, dtype=torch.float32) + 0.5
+        ramp = torch.minimum(pos, tile - pos).div(ovl).clamp(max=1.0)
+        shape = [1] * len(tile_size)
+        shape[dim] = tile
+        result = result * ramp.reshape(shape)
+    return result
+
+
+@builder.register("BatchedInferenceEngine")
+@typechecked
+@attrs.mutable
+class BatchedInferenceEngine:
+    """
+    Runs a model on many inputs in batches. Inputs can either be given
+    all at once with ``run_batched``, collected from many calls with ``submit``, or
+    obtained by tiling one large input with overlap with ``run_tiled``. Inputs and
+    outputs are single samples, i.e. without the batch dimension.
+
+    Batches are run under ``torch.inference_mode`` and, optionally, ``torch.autocast``,
+    as in ``load_and_run_model``. With ``num_threads > 1``, batches are run concurrently
+    in a thread pool, which is useful for CPU inference.
+
+    :param model_path: Path to the model, loaded with ``load_model`` on first use.
+    :param batch_size: Maximum number of samples per batch.
+    :param device: Device to run the model on. Defaults to CUDA when available.
+    :param use_cache: Whether to use the model cache of ``load_model``.
+    :param autocast: Whether to run the model under ``torch.autocast``.
+    :param num_threads: Number of batches that are run concurrently.
+    """
+
+    # Don't create the model during initialization for efficient serialization
+    model_path: str
+    batch_size: int = 16
+    device: str | torch.device | None = None
+    use_cache: bool = True
+    autocast: bool = True
+    num_threads: int = 1
+    _pending: list[tuple[Tensor, Future]] = attrs.field(
+        init=False, factory=list, repr=False, eq=False
+    )
+    _lock: threading.Lock = attrs.field(
+        init=False, factory=threading.Lock, repr=False, eq=False
+    )
+
+    def __attrs_post_init__(self):
+        if self.batch_size < 1:
+            raise ValueError(f"`batch_size` must be positive, got {self.batch_size}.")
+        if self.num_threads < 1:
+            raise ValueError(f"`num_threads` must be positive, got {self.num_threads}.")
+
+    def __getstate__(self) -> dict:
+        # The queue and its lock are local to the process
+        return {
+            field.name: getattr(self, field.name)
+            for field in attrs.fields(type(self))
+            if field.init
+        }
+
+    def __setstate__(self, state: dict) -> None:
+        for k, v in state.items():
+            object.__setattr__(self, k, v)
+        object.__setattr__(self, "_pending", [])
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    def _get_device(self) -> str | torch.device:
+        if self.device is None:
+            return "cuda" if torch.cuda.is_available() else "cpu"
+        return self.device
+
+    def _run_batch(self, batch: torch.Tensor) -> torch.Tensor:
+        device = self._get_device()
+        model = convnet.utils.load_model(self.model_path, device=device, use_cache=self.use_cache)
+        autocast_device = device.type if isinstance(device, torch.device) else str(device)
+        with torch.inference_mode():  # uses less memory when used with JITs
+            with torch.autocast(device_type=autocast_device, enabled=self.autocast):
+                return model(batch.to(device))
+
+    def _run_batches(self, data: torch.Tensor) -> list[torch.Tensor]:
+        """Runs the model on stacked samples in batches of ``batch_size``."""
+        batches = list(torch.split(data, self.batch_size))
+        if self.num_threads > 1 and len(batches) > 1:
+            with ThreadPoolExecutor(max_workers=self.num_threads) as executor:
+                return list(executor.map(self._run_batch, batches))
+        return [self._run_batch(batch) for batch in batches]
+
+    def run_batched(self, data: Sequence[Tensor]) -> list[Tensor]:
+        """Runs the model on each of the given samples.
+
+        :param data: Samples. Samples of the same shape are batched together.
+        :return: Outputs for each sample, of the type and dtype of the sample.
+        """
+        result: list[Tensor | None] = [None] * len(data)
+        groups: dict[tuple, list[int]] = {}
+        for i, e in enumerate(data):
+            groups.setdefault((tuple(e.shape), str(e.dtype)), []).append(i)
+        for group in groups.values():
+            stacked = torch.stack([tensor_ops.convert.to_torch(data[i]) for i in group])
+            outputs = torch.cat(self._run_batches(stacked))
+            for i, output in zip(group, outputs):
+                result[i] = tensor_ops.convert.astype(output, reference=data[i], cast=True)
+        return result  # type: ignore[return-value]
+
+    def submit(self, data: Tensor) -> Future:
+        """Queues a sample, running the queued samples once there is a full batch.
+
+        :param data: Sample.
+        :return: Future for the output of the sample. Call ``flush`` to run the
+            samples left in the queue.
+        """
+        future: Future = Future()
+        pending: list[tuple[Tensor, Future]] | None = None
+        with self._lock:
+            self._pending.append((data, future))
+            if len(self._pending) >= self.batch_size:
+                pending, self._pending = self._pending, []
+        if pending is not None:
+            self._run_pending(pending)
+        return future
+
+    def flush(self) -> None:
+        """Runs all of the queued samples."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if pending:
+            self._run_pending(pending)
+
+    def _run_pending(self, pending: list[tuple[Tensor, Future]]) -> None:
+        try:
+            outputs = self.run_batched([data for data, _ in pending])
+        except Exception as e:  # pylint: disable=broad-except
+            for _, future in pending:
+                future.set_exception(e)
+        else:
+            for (_, future), output in zip(pending, outputs):
+                future.set_result(output)
+
+    def __enter__(self) -> BatchedInferenceEngine:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.flush()
+
+    def run_tiled(
+        self,
+        data: Tensor,
+        tile_size: Sequence[int],
+        overlap: Sequence[int],
+        blend: Literal["linear", "constant"] = "linear",
+    ) -> Tensor:
+        """Runs the model on overlapping tiles of a large sample and blends the tile outputs.
+        The model is expected to preserve the spatial shape of its input.
+
+        :param data: Sample of shape (C, *spatial).
+        :param tile_size: Spatial shape of the tiles.
+        :param overlap: Overlap between neighbouring tiles along each spatial dimension.
+        :param blend: ``linear`` weighs the overlapping regions of the tiles with a linear
+            ramp towards the tile edges; ``constant`` averages them.
+        :return: Output of shape (C', *spatial), of the type and dtype of the sample.
+        """
+        spatial_shape = tuple(data.shape[1:])
+        if not len(tile_size) == len(overlap) == len(spatial_shape):
+            raise ValueError(
+                f"`tile_size` {tuple(tile_size)} and `overlap` {tuple(overlap)} must match "
+                f"the number of spatial dimensions of data of shape {tuple(data.shape)}."
+            )
+        if any(t > s for t, s in zip(tile_size, spatial_shape)):
+            raise ValueError(
+                f"`tile_size` {tuple(tile_size)} is larger than the spatial shape {spatial_shape}."
+            )
+        if any(not 0 <= o < t for t, o in zip(tile_size, overlap)):
+            raise ValueError(f"`overlap` {tuple(overlap)} must be in [0, `tile_size`).")
+
+        data_torch = tensor_ops.convert.to_torch(data)
+        tile_slices = [
+            tuple(slice(start, start + t) for start, t in zip(starts, tile_size))
+            for starts in itertools.product(
+                *(
+                    _get_tile_starts(s, t, t - o)
+                    for s, t, o in zip(spatial_shape, tile_size, overlap)
+                )
+            )
+        ]
+        weights = _get_blend_weights(tile_size, overlap, blend)
+
+        result: torch.Tensor | None = None
+        weight_sum: torch.Tensor | None = None
+        # Only keep the tiles of the batches that are run concurrently in memory
+        step = self.batch_size * self.num_threads
+        for chunk_start in range(0, len(tile_slices), step):
+            chunk_slices = tile_slices[chunk_start : chunk_start + step]
+            tiles = torch.stack([data_torch[(slice(None),) + e] for e in chunk_slices])
+            outputs = torch.cat(self._run_batches(tiles))
+            if result is None or weight_sum is None:
+                weights = weights.to(outputs.device)
+                result = torch.zeros(
+                    (outputs.shape[1],) + spatial_shape, dtype=torch.float32, device=outputs.device
+                )
+                weight_sum = torch.zeros(spatial_shape, dtype=torch.float32, device=outputs.device)
+            for slices, output in zip(chunk_slices, outputs):
+                result[(slice(None),) + slices] += output.float() * weights
+                weight_sum[slices] += weights
+
+        assert result is not None and weight_sum is not None
+        return tensor_ops.convert.astype(result / weight_sum, reference=data, cast=True)
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+from typing import Any
+
+import attrs
+import fsspec
+import torch
+from typeguard import typechecked
+
+from zetta_utils import builder
+
+_ONNX_TO_TORCH_DTYPE = {
+    "tensor(float)": torch.float32,
+    "tensor(double)": torch.float64,
+    "tensor(float16)": torch.float16,
+    "tensor(uint8)": torch.uint8,
+    "tensor(int8)": torch.int8,
+    "tensor(int32)": torch.int32,
+    "tensor(int64)": torch.int64,
+    "tensor(bool)": torch.bool,
+}
+
+
+@attrs.mutable
+class OnnxRuntimeOptions:
+    """
+    Session options for ``.onnx`` models loaded with the ``onnxruntime`` backend.
+
+    :param intra_op_num_threads: Number of threads used within operators; 0 lets
+        onnxruntime pick one thread per physical core.
+    :param inter_op_num_threads: Number of threads used to run independent operators
+        in parallel; 0 lets onnxruntime decide.
+    :param parallel_execution: Whether to run independent operators in parallel.
+    """
+
+    intra_op_num_threads: int = 0
+    inter_op_num_threads: int = 0
+    parallel_execution: bool = False
+
+
+ONNX_RUNTIME_OPTIONS = OnnxRuntimeOptions()
+
+
+@builder.register("configure_onnxruntime")
+@typechecked
+def configure_onnxruntime(
+    intra_op_num_threads: int = 0,
+    inter_op_num_threads: int = 0,
+    parallel_execution: bool = False,
+) -> None:
+    """Set the session options of models loaded with the ``onnxruntime`` backend
+    afterwards. Models already in the model cache keep their options.
+
+    :param intra_op_num_threads: Number of threads used within operators; 0 lets
+        onnxruntime pick one thread per physical core.
+    :param inter_op_num_threads: Number of threads used to run independent operators
+        in parallel; 0 lets onnxruntime decide.
+    :param parallel_execution: Whether to run independent operators in parallel.
+    """
+    ONNX_RUNTIME_OPTIONS.intra_op_num_threads = intra_op_num_threads
+    ONNX_RUNTIME_OPTIONS.inter_op_num_threads = inter_op_num_threads
+    ONNX_RUNTIME_OPTIONS.parallel_execution = parallel_execution
+
+
+class OnnxRuntimeModule(torch.nn.Module):
+    """
+    Runs an ``.onnx`` model in a CPU onnxruntime session with all graph optimizations
+    enabled, so that it can be used in place of the ``onnx2torch`` conversion.
+    Inputs are bound to the session without copies when they are contiguous CPU
+    tensors of the dtype expected by the model; outputs are returned on the device
+    of the first input.
+
+    :param path: Path to the ``.onnx`` file.
+    :param options: Session options; defaults to the ones set with ``configure_onnxruntime``.
+    """
+
+    def __init__(self, path: str, options: OnnxRuntimeOptions | None = None):
+        super().__init__()
+        import onnxruntime  # pylint: disable=import-outside-toplevel
+
+        if options is None:
+            options = ONNX_RUNTIME_OPTIONS
+        with fsspec.open(path, "rb") as f:
+            model_bytes = f.read()
+        self.nbytes = len(model_bytes)
+
+        session_options = onnxruntime.SessionOptions()
+        session_options.intra_op_num_threads = options.intra_op_num_threads
+        session_options.inter_op_num_threads = options.inter_op_num_threads
+        session_options.execution_mode = (
+            onnxruntime.ExecutionMode.ORT_PARALLEL
+            if options.parallel_execution
+            else onnxruntime.ExecutionMode.ORT_SEQUENTIAL
+        )
+        session_options.graph_optimization_level = (
+            onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        )
+        self.session = onnxruntime.InferenceSession(
+            model_bytes, sess_options=session_options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = [e.name for e in self.session.get_inputs()]
+        self.input_dtypes = [_ONNX_TO_TORCH_DTYPE.get(e.type) for e in self.session.get_inputs()]
+        self.output_names = [e.name for e in self.session.get_outputs()]
+
+    def forward(self, *args: torch.Tensor) -> Any:  # pylint: disable=arguments-differ
+        if len(args) != len(self.input_names):
+            raise ValueError(f"Expected {len(self.input_names)} inputs, got {len(args)}.")
+        binding = self.session.io_binding()
+        # Keep references to the bound inputs until the session has run
+        inputs = []
+        for name, dtype, arg in zip(self.input_names, self.input_dtypes, args):
+            tensor = arg.detach().to(device="cpu", dtype=dtype).contiguous()
+            inputs.append(tensor)
+            binding.bind_input(
+                name=name,
+                device_type="cpu",
+                device_id=0,
+                element_type=tensor.numpy().dtype,
+                shape=tuple(tensor.shape),
+                buffer_ptr=tensor.data_ptr(),
+            )
+        for name in self.output_names:
+            binding.bind_output(name, "cpu")
+        self.session.run_with_iobinding(binding)
+        outputs = [
+            torch.from_numpy(e).to(args[0].device) for e in binding.copy_outputs_to_cpu()
+        ]
+        if len(outputs) == 1:
+            return outputs[0]
+        return tuple(outputs)
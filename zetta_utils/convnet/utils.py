@@ -1,8 +1,15 @@
 from __future__ import annotations
 
+import copy
+import hashlib
 import io
+import os
+import threading
+import time
+from concurrent.futures import Future
 from typing import Literal, Optional, Sequence, Union, overload
 
+import attrs
 import cachetools
 import fsspec
 import onnx
@@ -13,23 +20,37 @@ from typeguard import typechecked
 
 from zetta_utils import builder, log, tensor_ops
 
+from .onnx_runtime import OnnxRuntimeModule
+
+OnnxBackend = Literal["torch", "onnxruntime"]
+
 logger = log.get_logger("zetta_utils")
 
 
 @builder.register("load_model")
 @typechecked
 def load_model(
-    path: str, device: Union[str, torch.device] = "cpu", use_cache: bool = False
+    path: str,
+    device: Union[str, torch.device] = "cpu",
+    use_cache: bool = False,
+    dtype: torch.dtype | None = None,
+    onnx_backend: OnnxBackend = "torch",
 ) -> torch.nn.Module:  # pragma: no cover
+    if onnx_backend == "onnxruntime" and path.endswith(".onnx"):
+        if torch.device(device).type != "cpu":
+            raise ValueError("The `onnxruntime` backend only supports CPU execution.")
     if use_cache:
-        result = _load_model_cached(path, device)
+        result = MODEL_CACHE.get(path, device, dtype, onnx_backend)
     else:
-        result = _load_model(path, device)
+        result = _load_model(path, device, dtype, onnx_backend)
     return result
 
 
 def _load_model(
-    path: str, device: Union[str, torch.device] = "cpu"
+    path: str,
+    device: Union[str, torch.device] = "cpu",
+    dtype: torch.dtype | None = None,
+    onnx_backend: OnnxBackend = "torch",
 ) -> torch.nn.Module:  # pragma: no cover
     logger.debug(f"Loading model from '{path}'")
     if path.endswith(".json"):
@@ -37,15 +58,199 @@ def _load_model(
     elif path.endswith(".jit"):
         with fsspec.open(path, "rb") as f:
             result = torch.jit.load(f, map_location=device)
+    elif path.endswith(".onnx") and onnx_backend == "onnxruntime":
+        result = OnnxRuntimeModule(path)
     elif path.endswith(".onnx"):
         with fsspec.open(path, "rb") as f:
             result = onnx2torch.convert(onnx.load(f)).to(device)
     else:
         raise ValueError(f"Unsupported file format: {path}")
+    if dtype is not None:
+        result = result.to(dtype)
     return result
 
 
-_load_model_cached = cachetools.cached(cachetools.LRUCache(maxsize=2))(_load_model)
+def _get_model_nbytes(model: torch.nn.Module) -> int:
+    if isinstance(model, OnnxRuntimeModule):
+        return model.nbytes
+    return sum(e.element_size() * e.numel() for e in model.parameters()) + sum(
+        e.element_size() * e.numel() for e in model.buffers()
+    )
+
+
+@attrs.mutable
+class ModelCacheStats:
+    """Counters of a ``ModelCache``.
+
+    :param hits: Number of requests served from the cache of the requested device.
+    :param misses: Number of requests that were not.
+    :param loads: Number of models read from storage.
+    :param load_seconds: Total time spent reading models from storage.
+    :param placement_seconds: Total time spent copying models to other devices.
+    """
+
+    hits: int = 0
+    misses: int = 0
+    loads: int = 0
+    load_seconds: float = 0.0
+    placement_seconds: float = 0.0
+
+
+@attrs.mutable
+class ModelCache:
+    """
+    Cache of loaded models, keyed by (path, device, dtype), with a separate LRU cache
+    bounded by ``max_bytes`` of parameters and buffers for each device.
+
+    Models are read from storage onto the requested device. Once a model has been
+    requested on several devices, a CPU copy is kept, and the model is copied from it
+    to the other devices instead of being read again. Each model is loaded by a single
+    thread at a time, while requests for other models proceed. Optionally, remote
+    ``.jit`` and ``.onnx`` files are kept in ``local_dir``, so that they are downloaded
+    once per machine; the local copies are keyed by path, so a path should not be
+    overwritten with different weights.
+
+    :param max_bytes: Size of the cache of each device.
+    :param local_dir: Local directory for copies of remote model files.
+    """
+
+    max_bytes: int = 8 * 2 ** 30
+    local_dir: str | None = None
+    stats: ModelCacheStats = attrs.field(init=False, factory=ModelCacheStats)
+    _caches: dict[str, cachetools.LRUCache] = attrs.field(init=False, factory=dict)
+    # Devices each model has been requested on
+    _devices: dict[tuple, set[str]] = attrs.field(init=False, factory=dict)
+    # Loads in progress, keyed by (device, model)
+    _pending: dict[tuple, Future] = attrs.field(init=False, factory=dict)
+    # Only guards the bookkeeping, and is not held while loading
+    _lock: threading.Lock = attrs.field(init=False, factory=threading.Lock)
+
+    def get(
+        self,
+        path: str,
+        device: Union[str, torch.device] = "cpu",
+        dtype: torch.dtype | None = None,
+        onnx_backend: OnnxBackend = "torch",
+    ) -> torch.nn.Module:
+        return self._get((path, dtype, onnx_backend), str(torch.device(device)), request=True)
+
+    def _get(self, key: tuple, device_key: str, request: bool = False) -> torch.nn.Module:
+        with self._lock:
+            model = self._get_device_cache(device_key).get(key)
+            if request:
+                self._devices.setdefault(key, set()).add(device_key)
+                if model is not None:
+                    self.stats.hits += 1
+                else:
+                    self.stats.misses += 1
+            if model is not None:
+                return model
+            future = self._pending.get((device_key, key))
+            is_loading = future is None
+            if is_loading:
+                future = Future()
+                self._pending[(device_key, key)] = future
+        assert future is not None
+        if not is_loading:
+            # Another thread is loading the same model onto the same device
+            return future.result()
+        try:
+            model = self._load(key, device_key)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._pending[(device_key, key)]
+        future.set_result(model)
+        return model
+
+    def _load(self, key: tuple, device_key: str) -> torch.nn.Module:
+        path, dtype, onnx_backend = key
+        with self._lock:
+            host_model = self._get_device_cache("cpu").get(key)
+            use_host_model = device_key != "cpu" and (
+                host_model is not None or len(self._devices.get(key, ())) > 1
+            )
+        if use_host_model:
+            if host_model is None:
+                host_model = self._get(key, "cpu")
+            start = time.perf_counter()
+            result = copy.deepcopy(host_model).to(device_key)
+            with self._lock:
+                self.stats.placement_seconds += time.perf_counter() - start
+        else:
+            start = time.perf_counter()
+            result = _load_model(self._get_local_path(path), device_key, dtype, onnx_backend)
+            with self._lock:
+                self.stats.loads += 1
+                self.stats.load_seconds += time.perf_counter() - start
+        with self._lock:
+            self._put(self._get_device_cache(device_key), key, result)
+        return result
+
+    def _get_device_cache(self, device_key: str) -> cachetools.LRUCache:
+        if device_key not in self._caches:
+            self._caches[device_key] = cachetools.LRUCache(
+                maxsize=self.max_bytes, getsizeof=_get_model_nbytes
+            )
+        return self._caches[device_key]
+
+    def _put(self, cache: cachetools.LRUCache, key: tuple, model: torch.nn.Module) -> None:
+        # Models larger than the cache are not cached
+        if _get_model_nbytes(model) <= self.max_bytes:
+            cache[key] = model
+
+    def _get_local_path(self, path: str) -> str:
+        protocol, _ = fsspec.core.split_protocol(path)
+        if self.local_dir is None or protocol in (None, "file") or path.endswith(".json"):
+            return path
+        local_path = os.path.join(
+            self.local_dir,
+            hashlib.sha1(path.encode()).hexdigest()[:16] + "_" + os.path.basename(path),
+        )
+        if not os.path.exists(local_path):
+            os.makedirs(self.local_dir, exist_ok=True)
+            tmp_path = f"{local_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with fsspec.open(path, "rb") as src, open(tmp_path, "wb") as dst:
+                dst.write(src.read())
+            os.replace(tmp_path, local_path)
+        return local_path
+
+    def configure(self, max_bytes: int | None = None, local_dir: str | None = None) -> None:
+        """Updates the given settings, and empties the cache."""
+        with self._lock:
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+            if local_dir is not None:
+                self.local_dir = local_dir
+            self._caches.clear()
+            self._devices.clear()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._caches.clear()
+            self._devices.clear()
+
+
+MODEL_CACHE = ModelCache()
+
+
+@builder.register("configure_model_cache")
+@typechecked
+def configure_model_cache(max_bytes: int | None = None, local_dir: str | None = None) -> None:
+    """Configure the cache used by ``load_model(..., use_cache=True)``, emptying it.
+    Settings that are not given are left unchanged.
+
+    :param max_bytes: Size of the cache of each device.
+    :param local_dir: Local directory for copies of remote model files.
+    """
+    MODEL_CACHE.configure(max_bytes=max_bytes, local_dir=local_dir)
+
+
+def get_model_cache_stats() -> ModelCacheStats:
+    """Returns the counters of the cache used by ``load_model(..., use_cache=True)``."""
+    return MODEL_CACHE.stats
 
 
 @typechecked
@@ -97,6 +302,7 @@ def load_and_run_model(
     data_in: torch.Tensor,
     device: Union[Literal["cpu", "cuda"], torch.device, None] = ...,
     use_cache: bool = ...,
+    onnx_backend: OnnxBackend = ...,
 ) -> torch.Tensor:
     ...
 
@@ -107,17 +313,22 @@ def load_and_run_model(
     data_in: npt.NDArray,
     device: Union[Literal["cpu", "cuda"], torch.device, None] = ...,
     use_cache: bool = ...,
+    onnx_backend: OnnxBackend = ...,
 ) -> npt.NDArray:
     ...
 
 
 @typechecked
-def load_and_run_model(path, data_in, device=None, use_cache=True):  # pragma: no cover
+def load_and_run_model(
+    path, data_in, device=None, use_cache=True, onnx_backend="torch"
+):  # pragma: no cover
 
     if device is None:
-        device = "cuda" if torch.cuda.is_available() else "cpu"
+        # The onnxruntime backend is CPU only
+        native_onnx = onnx_backend == "onnxruntime" and path.endswith(".onnx")
+        device = "cuda" if torch.cuda.is_available() and not native_onnx else "cpu"
 
-    model = load_model(path=path, device=device, use_cache=use_cache)
+    model = load_model(path=path, device=device, use_cache=use_cache, onnx_backend=onnx_backend)
 
     autocast_device = device.type if isinstance(device, torch.device) else str(device)
     with torch.inference_mode():  # uses less memory when used with JITs
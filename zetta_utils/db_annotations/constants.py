@@ -5,3 +5,7 @@ from zetta_utils import constants
 
 PROJECT = constants.DEFAULT_PROJECT
 DATABASE = os.environ.get("ANNOTATIONS_DB_NAME", "annotations-fs")
+# Seconds for which collection, layer group and layer lookups are cached; 0 (the
+# default) disables the cache. Writes made through this process invalidate the cache
+# immediately, but writes from other processes stay invisible for up to this long.
+CACHE_TTL = float(os.environ.get("ANNOTATIONS_DB_CACHE_TTL", "0"))
@@ -20,6 +20,7 @@ LAYERS_DB = build_firestore_layer(
     DB_NAME,
     project=constants.PROJECT,
     database=constants.DATABASE,
+    cache_ttl=constants.CACHE_TTL or None,
 )
 
 
@@ -19,6 +19,7 @@ LAYER_GROUPS_DB = build_firestore_layer(
     DB_NAME,
     project=constants.PROJECT,
     database=constants.DATABASE,
+    cache_ttl=constants.CACHE_TTL or None,
 )
 
 
@@ -1,3 +1,4 @@
+# pylint: disable=too-many-lines
 """
 Module to support writing of annotations in precomputed format.
 
@@ -11,24 +12,32 @@ References:
 	https://github.com/google/neuroglancer/blob/master/src/datasource/precomputed/annotations.md
 """
 
-import io
+import heapq
 import itertools
 import json
 import os
+import shutil
 import struct
+import tempfile
+from abc import ABC, abstractmethod
 from math import ceil
 from random import shuffle
-from typing import IO, Literal, Optional, Sequence
+from typing import IO, Iterator, Literal, Optional, Sequence
 
+import fsspec
+import numpy as np
 from cloudfiles import CloudFile, CloudFiles
 
 from zetta_utils import builder, log, mazepa
-from zetta_utils.geometry import BBox3D, Vec3D
+from zetta_utils.geometry import BBox3D, BBoxIndex, Vec3D
 from zetta_utils.geometry.vec import VEC3D_PRECISION
 from zetta_utils.layer.volumetric.index import VolumetricIndex
+from zetta_utils.mazepa import Dependency
 
 logger = log.get_logger("zetta_utils")
 
+NO_CACHE_CONTROL = "no-cache, no-store, max-age=0, must-revalidate"
+
 
 def is_local_filesystem(path: str) -> bool:
     return path.startswith("file://") or "://" not in path
@@ -47,7 +56,156 @@ def path_join(*paths: str):
         return os.path.join(*paths)
 
 
-class LineAnnotation:
+AnnotationType = Literal["LINE", "POINT", "AXIS_ALIGNED_BOUNDING_BOX", "ELLIPSOID"]
+
+
+class PrecomputedAnnotation(ABC):
+    """
+    Base class for the annotation types that can be stored in a precomputed
+    annotation file.  Each annotation has an integer ID plus some geometry,
+    stored as a fixed number of 3-element coordinate tuples (named by
+    COORD_FIELDS, in the order in which they are encoded).
+
+    Subclasses must define ANNOTATION_TYPE, COORD_FIELDS, BYTES_PER_ENTRY,
+    and the extent, in_bounds, contained_in and contained_in_mask methods.
+    """
+
+    ANNOTATION_TYPE: AnnotationType
+    COORD_FIELDS: tuple[str, ...] = ()
+    BYTES_PER_ENTRY = 0
+
+    id: int
+
+    def coords(self) -> list[Sequence[float]]:
+        """
+        Return the coordinate tuples of this annotation, in encoding order.
+        """
+        return [getattr(self, field) for field in self.COORD_FIELDS]
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, type(self))
+            and self.id == other.id
+            and self.coords() == other.coords()
+        )
+
+    @classmethod
+    def from_values(cls, annotation_id: int, values: Sequence[float]):
+        """
+        Create an annotation from its ID and a flat sequence of coordinate values
+        (as found in the binary encoding).
+        """
+        return cls(  # type: ignore[call-arg] # pylint: disable=too-many-function-args
+            annotation_id,
+            *(tuple(values[i : i + 3]) for i in range(0, len(values), 3)),
+        )
+
+    def write(self, output: IO[bytes]):
+        """
+        Write this annotation in binary format to the given output writer.
+        """
+        output.write(
+            struct.pack(f"<{self.BYTES_PER_ENTRY // 4}f", *itertools.chain(*self.coords()))
+        )
+
+    @classmethod
+    def read(cls, in_stream: IO[bytes]):
+        """
+        Read an annotation in binary format from the given input reader.
+        """
+        values = struct.unpack(
+            f"<{cls.BYTES_PER_ENTRY // 4}f", in_stream.read(cls.BYTES_PER_ENTRY)
+        )
+        return cls.from_values(0, values)  # (ID will be filled in later)
+
+    @abstractmethod
+    def extent(self) -> tuple[list[float], list[float]]:
+        """
+        Return the (lower, upper) corners of the axis-aligned box containing
+        this annotation.
+        """
+        ...
+
+    @abstractmethod
+    def in_bounds(self, bounds: VolumetricIndex) -> bool:
+        """
+        Return whether any part of this annotation is in the given bounds.
+        (Assumes our coordinates match that of the given VolumetricIndex.)
+        """
+        ...
+
+    @abstractmethod
+    def contained_in(self, bounds: VolumetricIndex) -> bool:
+        """
+        Return whether this annotation is entirely within the given bounds.
+        (Assumes our coordinates match that of the given VolumetricIndex.)
+        """
+        ...
+
+    @classmethod
+    @abstractmethod
+    def contained_in_mask(cls, values: np.ndarray, bounds: VolumetricIndex) -> np.ndarray:
+        """
+        Vectorized version of contained_in, for annotations given as rows of
+        coordinate values (as found in the binary encoding).
+        """
+        ...
+
+    def convert_coordinates(self, from_res: Vec3D, to_res: Vec3D):
+        """
+        Convert our coordinates from one resolution to another.
+        Mutates the current instance.
+        """
+        for field in self.COORD_FIELDS:
+            value = getattr(self, field)
+            setattr(self, field, tuple(round(Vec3D(*value) * from_res / to_res, VEC3D_PRECISION)))
+
+    def with_converted_coordinates(self, from_res: Vec3D, to_res: Vec3D):
+        """
+        Return a new annotation instance with converted coordinates.
+        Does not mutate the current instance.
+        """
+        result = self.from_values(self.id, list(itertools.chain(*self.coords())))
+        result.convert_coordinates(from_res, to_res)
+        return result
+
+
+def _box_intersects(
+    bounds: VolumetricIndex, lower: Sequence[float], upper: Sequence[float]
+) -> bool:
+    # bounds are semi-inclusive, as in VolumetricIndex.contains
+    start = bounds.start
+    stop = bounds.stop
+    return all(lower[i] < stop[i] and upper[i] >= start[i] for i in range(3))
+
+
+def _box_contained_in(
+    bounds: VolumetricIndex, lower: Sequence[float], upper: Sequence[float]
+) -> bool:
+    start = bounds.start
+    stop = bounds.stop
+    return all(lower[i] >= start[i] and upper[i] <= stop[i] for i in range(3))
+
+
+def _points_contained_mask(values: np.ndarray, bounds: VolumetricIndex) -> np.ndarray:
+    # Whether all the points of each row are in the bounds, as in VolumetricIndex.contains
+    points_nm = values.reshape(len(values), -1, 3).astype(np.float64) * np.asarray(
+        bounds.resolution
+    )
+    lower_nm = np.array([b[0] for b in bounds.bbox.bounds])
+    upper_nm = np.array([b[1] for b in bounds.bbox.bounds])
+    return ((points_nm >= lower_nm) & (points_nm < upper_nm)).all(axis=(1, 2))
+
+
+def _boxes_contained_mask(
+    bounds: VolumetricIndex, lower: np.ndarray, upper: np.ndarray
+) -> np.ndarray:
+    return ((lower >= np.asarray(bounds.start)) & (upper <= np.asarray(bounds.stop))).all(axis=1)
+
+
+class LineAnnotation(PrecomputedAnnotation):
+    ANNOTATION_TYPE = "LINE"
+    COORD_FIELDS = ("start", "end")
     BYTES_PER_ENTRY = 24  # start (3 floats), end (3 floats)
 
     def __init__(self, line_id: int, start: Sequence[float], end: Sequence[float]):
@@ -72,57 +230,188 @@ class LineAnnotation:
         """
         return f"LineAnnotation(line_id={self.id}, start={self.start}, end={self.end})"
 
-    def __eq__(self, other):
-        return (
-            isinstance(other, LineAnnotation)
-            and self.id == other.id
-            and self.start == other.start
-            and self.end == other.end
-        )
+    def extent(self) -> tuple[list[float], list[float]]:
+        lower = [min(a, b) for a, b in zip(self.start, self.end)]
+        upper = [max(a, b) for a, b in zip(self.start, self.end)]
+        return lower, upper
 
-    def write(self, output: IO[bytes]):
+    def in_bounds(self, bounds: VolumetricIndex):
         """
-        Write this annotation in binary format to the given output writer.
+        Return whether either end of this line is in the given bounds.
+        (Assumes our coordinates match that of the given VolumetricIndex.)
         """
-        output.write(struct.pack("<3f", *self.start))
-        output.write(struct.pack("<3f", *self.end))
-        # NOTE: if you change or add to the above, be sure to also
-        # change BYTES_PER_ENTRY accordingly.
+        return bounds.line_intersects(self.start, self.end)
 
-    @staticmethod
-    def read(in_stream: IO[bytes]):
+    def contained_in(self, bounds: VolumetricIndex):
         """
-        Read an annotation in binary format from the given input reader.
+        Return whether both ends of this line are in the given bounds.
         """
-        return LineAnnotation(
-            0,  # (ID will be filled in later)
-            struct.unpack("<3f", in_stream.read(12)),
-            struct.unpack("<3f", in_stream.read(12)),
-        )
+        return bounds.contains(self.start) and bounds.contains(self.end)
 
-    def in_bounds(self, bounds: VolumetricIndex):
+    @classmethod
+    def contained_in_mask(cls, values: np.ndarray, bounds: VolumetricIndex) -> np.ndarray:
+        return _points_contained_mask(values, bounds)
+
+
+class PointAnnotation(PrecomputedAnnotation):
+    ANNOTATION_TYPE = "POINT"
+    COORD_FIELDS = ("position",)
+    BYTES_PER_ENTRY = 12  # position (3 floats)
+
+    def __init__(self, point_id: int, position: Sequence[float]):
         """
-        Return whether either end of this line is in the given bounds.
-        (Assumes our coordinates match that of the given VolumetricIndex.)
+        Initialize a PointAnnotation instance.
+
+        :param point_id: An integer representing the ID of the annotation.
+        :param position: A tuple of three floats representing the point (x, y, z).
         """
-        return bounds.line_intersects(self.start, self.end)
+        self.position = position
+        self.id = point_id
 
-    def convert_coordinates(self, from_res: Vec3D, to_res: Vec3D):
+    def __repr__(self):
+        return f"PointAnnotation(point_id={self.id}, position={self.position})"
+
+    def extent(self) -> tuple[list[float], list[float]]:
+        return list(self.position), list(self.position)
+
+    def in_bounds(self, bounds: VolumetricIndex):
+        return bounds.contains(self.position)
+
+    def contained_in(self, bounds: VolumetricIndex):
+        return bounds.contains(self.position)
+
+    @classmethod
+    def contained_in_mask(cls, values: np.ndarray, bounds: VolumetricIndex) -> np.ndarray:
+        return _points_contained_mask(values, bounds)
+
+
+class AxisAlignedBoundingBoxAnnotation(PrecomputedAnnotation):
+    ANNOTATION_TYPE = "AXIS_ALIGNED_BOUNDING_BOX"
+    COORD_FIELDS = ("start", "end")
+    BYTES_PER_ENTRY = 24  # start (3 floats), end (3 floats)
+
+    def __init__(self, bbox_id: int, start: Sequence[float], end: Sequence[float]):
         """
-        Convert our start and end coordinates from one resolution to another.
-        Mutates the current instance.
+        Initialize an AxisAlignedBoundingBoxAnnotation instance.
+
+        :param bbox_id: An integer representing the ID of the annotation.
+        :param start: A tuple of three floats representing one corner (x, y, z).
+        :param end: A tuple of three floats representing the opposite corner (x, y, z).
         """
-        self.start = tuple(round(Vec3D(*self.start) * from_res / to_res, VEC3D_PRECISION))
-        self.end = tuple(round(Vec3D(*self.end) * from_res / to_res, VEC3D_PRECISION))
+        self.start = start
+        self.end = end
+        self.id = bbox_id
 
-    def with_converted_coordinates(self, from_res: Vec3D, to_res: Vec3D):
+    def __repr__(self):
+        return (
+            f"AxisAlignedBoundingBoxAnnotation(bbox_id={self.id}, "
+            f"start={self.start}, end={self.end})"
+        )
+
+    def extent(self) -> tuple[list[float], list[float]]:
+        lower = [min(a, b) for a, b in zip(self.start, self.end)]
+        upper = [max(a, b) for a, b in zip(self.start, self.end)]
+        return lower, upper
+
+    def in_bounds(self, bounds: VolumetricIndex):
+        return _box_intersects(bounds, *self.extent())
+
+    def contained_in(self, bounds: VolumetricIndex):
+        return _box_contained_in(bounds, *self.extent())
+
+    @classmethod
+    def contained_in_mask(cls, values: np.ndarray, bounds: VolumetricIndex) -> np.ndarray:
+        values = values.astype(np.float64)
+        lower = np.minimum(values[:, :3], values[:, 3:])
+        upper = np.maximum(values[:, :3], values[:, 3:])
+        return _boxes_contained_mask(bounds, lower, upper)
+
+
+class EllipsoidAnnotation(PrecomputedAnnotation):
+    ANNOTATION_TYPE = "ELLIPSOID"
+    COORD_FIELDS = ("center", "radii")
+    BYTES_PER_ENTRY = 24  # center (3 floats), radii (3 floats)
+
+    def __init__(self, ellipsoid_id: int, center: Sequence[float], radii: Sequence[float]):
         """
-        Return a new LineAnnotation instance with converted coordinates.
-        Does not mutate the current instance.
+        Initialize an EllipsoidAnnotation instance.
+
+        :param ellipsoid_id: An integer representing the ID of the annotation.
+        :param center: A tuple of three floats representing the center (x, y, z).
+        :param radii: A tuple of three floats representing the radius along each axis.
+
+        Note that for spatial indexing, an ellipsoid is treated as its bounding box.
         """
-        new_start = tuple(round(Vec3D(*self.start) * from_res / to_res, VEC3D_PRECISION))
-        new_end = tuple(round(Vec3D(*self.end) * from_res / to_res, VEC3D_PRECISION))
-        return LineAnnotation(self.id, new_start, new_end)
+        self.center = center
+        self.radii = radii
+        self.id = ellipsoid_id
+
+    def __repr__(self):
+        return (
+            f"EllipsoidAnnotation(ellipsoid_id={self.id}, "
+            f"center={self.center}, radii={self.radii})"
+        )
+
+    def extent(self) -> tuple[list[float], list[float]]:
+        lower = [c - abs(r) for c, r in zip(self.center, self.radii)]
+        upper = [c + abs(r) for c, r in zip(self.center, self.radii)]
+        return lower, upper
+
+    def in_bounds(self, bounds: VolumetricIndex):
+        return _box_intersects(bounds, *self.extent())
+
+    def contained_in(self, bounds: VolumetricIndex):
+        return _box_contained_in(bounds, *self.extent())
+
+    @classmethod
+    def contained_in_mask(cls, values: np.ndarray, bounds: VolumetricIndex) -> np.ndarray:
+        values = values.astype(np.float64)
+        center, radii = values[:, :3], np.abs(values[:, 3:])
+        return _boxes_contained_mask(bounds, center - radii, center + radii)
+
+
+ANNOTATION_CLASSES: dict[str, type[PrecomputedAnnotation]] = {
+    "LINE": LineAnnotation,
+    "POINT": PointAnnotation,
+    "AXIS_ALIGNED_BOUNDING_BOX": AxisAlignedBoundingBoxAnnotation,
+    "ELLIPSOID": EllipsoidAnnotation,
+}
+
+
+# Slack added to index queries, so that the candidate set is a superset of
+# what in_bounds accepts even after its conversion to nm and rounding.
+_INDEX_QUERY_PAD = 1e-3
+
+
+def _extent_index(annotations: Sequence[PrecomputedAnnotation]) -> BBoxIndex:
+    """
+    Build a spatial index over the extents of the given annotations.
+    """
+    extents = [anno.extent() for anno in annotations]
+    return BBoxIndex([e[0] for e in extents], [e[1] for e in extents])
+
+
+def _candidates(index: BBoxIndex, start: Sequence[float], stop: Sequence[float]) -> np.ndarray:
+    """
+    Return the indices of annotations whose extents touch the box from start to stop.
+    """
+    return index.query(
+        np.asarray(start, dtype=float) - _INDEX_QUERY_PAD,
+        np.asarray(stop, dtype=float) + _INDEX_QUERY_PAD,
+    )
+
+
+def _annotations_in_bounds(
+    annotations: Sequence[PrecomputedAnnotation],
+    index: BBoxIndex,
+    bounds: VolumetricIndex,
+) -> list[PrecomputedAnnotation]:
+    """
+    Return the annotations that are in the given bounds, using the index to
+    avoid an exact in_bounds test on all of them.
+    """
+    candidates = _candidates(index, tuple(bounds.start), tuple(bounds.stop))
+    return [annotations[i] for i in candidates.tolist() if annotations[i].in_bounds(bounds)]
 
 
 class SpatialEntry:
@@ -170,59 +459,120 @@ def write_bytes(file_or_gs_path: str, data: bytes):
     if "//" not in file_or_gs_path:
         file_or_gs_path = "file://" + file_or_gs_path
     cf = CloudFile(file_or_gs_path)
-    cf.put(data, cache_control="no-cache, no-store, max-age=0, must-revalidate")
+    cf.put(data, cache_control=NO_CACHE_CONTROL)
 
 
-def write_lines(file_or_gs_path: str, lines: Sequence[LineAnnotation], randomize: bool = True):
+def encode_annotations(annotations: Sequence[PrecomputedAnnotation]) -> bytes:
+    """
+    Encode a set of annotations (all of the same type) in 'multiple annotation
+    encoding' format:
+            1. Annotation count (uint64le)
+            2. Data for each annotation (excluding ID), one after the other
+            3. The annotation IDs (also as uint64le)
+
+    All the geometry and IDs are packed in a single call, rather than one
+    annotation at a time.
     """
-    Write a set of lines to the given file, in 'multiple annotation encoding' format:
+    count = len(annotations)
+    if count == 0:
+        return struct.pack("<Q", 0)
+    floats_per_entry = annotations[0].BYTES_PER_ENTRY // 4
+    values = [v for anno in annotations for coord in anno.coords() for v in coord]
+    ids = [anno.id for anno in annotations]
+    return struct.pack(f"<Q{count * floats_per_entry}f{count}Q", count, *values, *ids)
+
+
+def iter_encoded_annotations(
+    values: np.ndarray, ids: np.ndarray, chunk_size: int = 64 * 1024
+) -> Iterator[bytes]:
+    """
+    Encode a set of annotations given as arrays (see decode_annotation_arrays) in
+    'multiple annotation encoding' format, in pieces of about chunk_size bytes.
+    """
+    yield struct.pack("<Q", len(ids))
+    for array, dtype in ((values, "<f4"), (ids, "<u8")):
+        row_nbytes = max(1, array[:1].astype(dtype).nbytes)
+        rows_per_chunk = max(1, chunk_size // row_nbytes)
+        for i in range(0, len(array), rows_per_chunk):
+            yield array[i : i + rows_per_chunk].astype(dtype).tobytes()
+
+
+def decode_annotation_arrays(
+    data: bytes, annotation_type: AnnotationType = "LINE"
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Decode a set of annotations of the given type from data in 'multiple
+    annotation encoding' format (see encode_annotations), without creating an
+    object per annotation.
+
+    :return: coordinate values as float32, one row per annotation in encoding
+        order, and the IDs as uint64.
+    """
+    floats_per_entry = ANNOTATION_CLASSES[annotation_type].BYTES_PER_ENTRY // 4
+    if not data:
+        return np.zeros((0, floats_per_entry), dtype=np.float32), np.zeros(0, dtype=np.uint64)
+    count = int(np.frombuffer(data, dtype="<u8", count=1)[0])
+    values = np.frombuffer(data, dtype="<f4", count=count * floats_per_entry, offset=8)
+    ids = np.frombuffer(data, dtype="<u8", count=count, offset=8 + values.nbytes)
+    return values.reshape(count, floats_per_entry), ids
+
+
+def decode_annotations(
+    data: bytes, annotation_type: AnnotationType = "LINE"
+) -> list[PrecomputedAnnotation]:
+    """
+    Decode a set of annotations of the given type from data in
+    'multiple annotation encoding' format (see encode_annotations).
+    """
+    if not data:
+        return []
+    cls = ANNOTATION_CLASSES[annotation_type]
+    count = struct.unpack_from("<Q", data)[0]
+    ids_offset = 8 + count * cls.BYTES_PER_ENTRY
+    ids = struct.unpack_from(f"<{count}Q", data, ids_offset)
+    entries = struct.iter_unpack(f"<{cls.BYTES_PER_ENTRY // 4}f", data[8:ids_offset])
+    return [cls.from_values(anno_id, values) for anno_id, values in zip(ids, entries)]
+
+
+def write_lines(
+    file_or_gs_path: str, lines: Sequence[PrecomputedAnnotation], randomize: bool = True
+):
+    """
+    Write a set of lines (or other annotations, all of the same type) to the
+    given file, in 'multiple annotation encoding' format:
             1. Line count (uint64le)
             2. Data for each line (excluding ID), one after the other
             3. The line IDs (also as uint64le)
 
     :param file_path: local file or GS path of file to write
-    :param lines: iterable of LineAnnotation objects
+    :param lines: iterable of LineAnnotation (or other PrecomputedAnnotation) objects
     :param randomize: if True, the lines will be written in random
             order (without mutating the lines parameter)
     """
     lines = list(lines)
     if randomize:
-        lines = lines[:]
         shuffle(lines)
+    write_bytes(file_or_gs_path, encode_annotations(lines))
 
-    buffer = io.BytesIO()
-    # first write the count
-    buffer.write(struct.pack("<Q", len(lines)))
-
-    # then write the line data
-    for line in lines:
-        line.write(buffer)
-
-    # finally write the ids at the end of the buffer
-    for line in lines:
-        buffer.write(struct.pack("<Q", line.id))
 
-    buffer.seek(0)  # Rewind buffer to the beginning
-    write_bytes(file_or_gs_path, buffer.getvalue())
-
-
-def line_count_from_file_size(file_size: int) -> int:
+def line_count_from_file_size(file_size: int, annotation_type: AnnotationType = "LINE") -> int:
     """
-    Provide a count (or at least a very good estimate) of the number of lines in
-    a line chunk file of the given size in bytes.
+    Provide a count (or at least a very good estimate) of the number of lines
+    (or other annotations of the given type) in a chunk file of the given size in bytes.
     """
-    return round((file_size - 8) / (LineAnnotation.BYTES_PER_ENTRY + 8))
+    return round((file_size - 8) / (ANNOTATION_CLASSES[annotation_type].BYTES_PER_ENTRY + 8))
 
 
-def count_lines_in_file(file_or_gs_path: str) -> int:
+def count_lines_in_file(file_or_gs_path: str, annotation_type: AnnotationType = "LINE") -> int:
     """
-    Provide a count (or at least a very good estimate) of the number of lines in
-    the given line chunk file, as quickly as possible.
+    Provide a count (or at least a very good estimate) of the number of lines
+    (or other annotations of the given type) in the given chunk file, as quickly
+    as possible.
     """
     # We could open the file and read the count in the first 8 bytes.
     # But even faster is to just calculate it from the file length.
     cf = CloudFile(file_or_gs_path)
-    return line_count_from_file_size(cf.size() or 0)
+    return line_count_from_file_size(cf.size() or 0, annotation_type)
 
 
 def read_bytes(file_or_gs_path: str):
@@ -238,36 +588,24 @@ def read_bytes(file_or_gs_path: str):
     return cf.get()
 
 
-def read_lines(file_or_gs_path: str) -> list[LineAnnotation]:
+def read_lines(
+    file_or_gs_path: str, annotation_type: AnnotationType = "LINE"
+) -> list[PrecomputedAnnotation]:
     """
-    Read a set of lines from the given file, which should be in
-    'multiple annotation encoding' as defined in write_lines above.
+    Read a set of lines (or other annotations of the given type) from the given
+    file, which should be in 'multiple annotation encoding' as defined in
+    write_lines above.
     """
-    data = read_bytes(file_or_gs_path)
-    lines: list[LineAnnotation] = []
-    if data is None or len(data) == 0:
-        return lines
-    with io.BytesIO(data) as buffer:
-        # first read the count
-        line_count = struct.unpack("<Q", buffer.read(8))[0]
-
-        # then read the line data
-        for _ in range(line_count):
-            line = LineAnnotation.read(buffer)
-            lines.append(line)
+    return decode_annotations(read_bytes(file_or_gs_path), annotation_type)
 
-        # finally read the ids at the end of the buffer
-        for i in range(line_count):
-            line_id = struct.unpack("<Q", buffer.read(8))[0]
-            lines[i].id = line_id
-    return lines
 
-
-def format_info(dimensions, lower_bound, upper_bound, spatial_data):
+def format_info(
+    dimensions, lower_bound, upper_bound, spatial_data, annotation_type: AnnotationType = "LINE"
+):
     spatial_json = "    " + ",\n        ".join([se.to_json() for se in spatial_data])
     return f"""{{
     "@type" : "neuroglancer_annotations_v1",
-    "annotation_type" : "LINE",
+    "annotation_type" : "{annotation_type}",
     "by_id" : {{ "key" : "by_id" }},
     "dimensions" : {str(dimensions).replace("'", '"')},
     "lower_bound" : {list(lower_bound)},
@@ -281,7 +619,14 @@ def format_info(dimensions, lower_bound, upper_bound, spatial_data):
 """
 
 
-def write_info(dir_path, dimensions, lower_bound, upper_bound, spatial_data):
+def write_info(
+    dir_path,
+    dimensions,
+    lower_bound,
+    upper_bound,
+    spatial_data,
+    annotation_type: AnnotationType = "LINE",
+):
     """
     Write out the info (JSON) file describing a precomputed annotation file
     into the given directory.
@@ -291,9 +636,10 @@ def write_info(dir_path, dimensions, lower_bound, upper_bound, spatial_data):
     :lower_bound: start of the data volume (in voxels)
     :upper_bound: end of the data volume (in voxels)
     :spatial_data: list of SpatialEntry objects
+    :annotation_type: type of annotation stored in the file, e.g. "LINE" or "POINT"
     """
     file_path = path_join(dir_path, "info")  # (note: not info.json as you would expect)
-    info_content = format_info(dimensions, lower_bound, upper_bound, spatial_data)
+    info_content = format_info(dimensions, lower_bound, upper_bound, spatial_data, annotation_type)
     write_bytes(file_path, info_content.encode("utf-8"))
 
 
@@ -334,9 +680,28 @@ def read_info(dir_path):
     return parse_info(data.decode("utf-8"))
 
 
-def read_data(dir_path, spatial_entry):
+def read_annotation_type(dir_path) -> Optional[AnnotationType]:
+    """
+    Read the info file within the given directory, and return the annotation
+    type it declares (e.g. "LINE" or "POINT"), or None if the file is empty
+    or does not exist.
+    """
+    file_path = path_join(dir_path, "info")  # (note: not info.json as you would expect)
+    try:
+        data = read_bytes(file_path)
+    except NotADirectoryError:
+        data = None
+    if data is None or len(data) == 0:
+        return None
+    annotation_type = json.loads(data.decode("utf-8")).get("annotation_type", "LINE")
+    if annotation_type not in ANNOTATION_CLASSES:
+        raise ValueError(f"Unsupported annotation type '{annotation_type}' in {file_path}")
+    return annotation_type
+
+
+def read_data(dir_path, spatial_entry, annotation_type: AnnotationType = "LINE"):
     """
-    Read all the line annotations in the given precomputed file hierarchy
+    Read all the annotations in the given precomputed file hierarchy
     which are under the given spatial entry.  Normally this would be the
     finest spatial entry (smallest chunk_size, biggest grid_shape), as that's
     the only one guaranteed to contain all the data.  But it's up to the
@@ -349,11 +714,23 @@ def read_data(dir_path, spatial_entry):
             for z in range(0, se.grid_shape[2]):
                 level_dir = path_join(dir_path, se.key)
                 anno_file_path = path_join(level_dir, f"{x}_{y}_{z}")
-                result += read_lines(anno_file_path)
+                result += read_lines(anno_file_path, annotation_type)
     return result
 
 
-# pylint: disable=too-many-locals,too-many-nested-blocks,cell-var-from-loop
+def sample_priority(annotation_id: int) -> int:
+    """
+    Return a pseudo-random but deterministic 64-bit priority for the given
+    annotation ID (the splitmix64 finalizer), used for consistent sampling of
+    annotations into higher spatial levels.
+    """
+    x = (annotation_id + 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & 0xFFFFFFFFFFFFFFFF
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & 0xFFFFFFFFFFFFFFFF
+    return x ^ (x >> 31)
+
+
+# pylint: disable=too-many-locals,too-many-nested-blocks
 def subdivide(data, bounds: VolumetricIndex, chunk_sizes, write_to_dir=None, levels_to_write=None):
     """
     Subdivide the given data and bounds into chunks and subchunks of
@@ -368,6 +745,7 @@ def subdivide(data, bounds: VolumetricIndex, chunk_sizes, write_to_dir=None, lev
         levels_to_write = range(0, len(chunk_sizes))
     spatial_entries = []
     bounds_size = bounds.shape
+    index = _extent_index(data)
     for level, chunk_size_seq in enumerate(chunk_sizes):
         chunk_size: Vec3D = Vec3D(*chunk_size_seq)
         limit = 0
@@ -377,23 +755,7 @@ def subdivide(data, bounds: VolumetricIndex, chunk_sizes, write_to_dir=None, lev
         # total_qty = grid_shape[0] * grid_shape[1] * grid_shape[2]
         qty_done = 0
         for x in range(grid_shape[0]):
-            x_start = bounds.start[0] + x * chunk_size[0]
-            x_end = x_start + chunk_size[0]
-            x_idx = VolumetricIndex.from_coords(
-                (x_start, bounds.start[1], bounds.start[2]),
-                (x_end, bounds.stop[1], bounds.stop[2]),
-                bounds.resolution,
-            )
-            data_within_x = list(filter(lambda d: d.in_bounds(x_idx), data))
             for y in range(grid_shape[1]):
-                y_start = bounds.start[1] + y * chunk_size[1]
-                y_end = y_start + chunk_size[1]
-                y_idx = VolumetricIndex.from_coords(
-                    (x_start, y_start, bounds.start[2]),
-                    (x_end, y_end, bounds.stop[2]),
-                    bounds.resolution,
-                )
-                data_within_xy = list(filter(lambda d: d.in_bounds(y_idx), data_within_x))
                 for z in range(grid_shape[2]):
                     qty_done += 1
                     chunk_start = bounds.start + Vec3D(x, y, z) * chunk_size
@@ -401,9 +763,8 @@ def subdivide(data, bounds: VolumetricIndex, chunk_sizes, write_to_dir=None, lev
                     chunk_bounds = VolumetricIndex.from_coords(
                         chunk_start, chunk_end, bounds.resolution
                     )
-                    # pylint: disable=cell-var-from-loop
-                    chunk_data: Sequence[LineAnnotation] = list(
-                        filter(lambda d: d.in_bounds(chunk_bounds), data_within_xy)
+                    chunk_data: Sequence[PrecomputedAnnotation] = _annotations_in_bounds(
+                        data, index, chunk_bounds
                     )
                     # logger.info(f'spatial{level}/{x}_{y}_{z} contains {len(chunk_data)} lines')
                     limit = max(limit, len(chunk_data))
@@ -431,6 +792,9 @@ class AnnotationLayer:
     each subdirectory, there is a binary file for each chunk, named by its position
     within the grid, e.g. "1_2_0".  This class manages all that so you shouldn't
     have to worry about it.
+
+    All annotations in one file are of the same type (lines, points, axis-aligned
+    bounding boxes, or ellipsoids), as recorded in the info file.
     """
 
     def __init__(
@@ -438,6 +802,7 @@ class AnnotationLayer:
         path: str,
         index: Optional[VolumetricIndex] = None,
         chunk_sizes: Optional[Sequence[Sequence[int]]] = None,
+        annotation_type: Optional[AnnotationType] = None,
     ):
         """
         Initialize an AnnotationLayer.
@@ -446,11 +811,14 @@ class AnnotationLayer:
         :param index: bounding box and resolution defining volume containing the data
         :param chunk_sizes: list of 3-element tuples/lists defining chunk sizes,
             in voxels (defaults to a single chunk containing the entire bounds)
+        :param annotation_type: type of annotations stored in this file: "LINE",
+            "POINT", "AXIS_ALIGNED_BOUNDING_BOX", or "ELLIPSOID"
 
         Note that index may be omitted ONLY if this is an existing file, in which case
         it will be inferred from the info file on disk.  But chunk_sizes may be omitted
         even for new files; in this case, the chunk size will be set to the full bounds
-        (so you get only one spatial level).
+        (so you get only one spatial level).  Likewise, annotation_type is inferred
+        from the info file when index is omitted, and otherwise defaults to "LINE".
         """
         assert path, "path parameter is required"
         if index is None:
@@ -467,19 +835,28 @@ class AnnotationLayer:
             chunk_sizes = [se.chunk_size for se in spatial_entries]
             logger.info(f"Inferred resolution: {resolution}")
             logger.info(f"Inferred chunk sizes: {chunk_sizes}")
+            if annotation_type is None:
+                annotation_type = read_annotation_type(path)
 
         if chunk_sizes is None:
             chunk_sizes = [tuple(index.shape)]
+        if annotation_type is None:
+            annotation_type = "LINE"
         self.path = os.path.expanduser(path)
         self.index = index
         self.chunk_sizes = chunk_sizes
+        self.annotation_type: AnnotationType = annotation_type
 
     def __repr__(self):
         return (
             f"AnnotationLayer(path='{self.path}', index={self.index}, "
-            f"chunk_sizes={self.chunk_sizes})"
+            f"chunk_sizes={self.chunk_sizes}, annotation_type='{self.annotation_type}')"
         )
 
+    @property
+    def annotation_class(self) -> type[PrecomputedAnnotation]:
+        return ANNOTATION_CLASSES[self.annotation_type]
+
     def exists(self) -> bool:
         """
         Return whether this spatial file (more specifically, its info file) already exists.
@@ -553,20 +930,32 @@ class AnnotationLayer:
             lower_bound=self.index.start,
             upper_bound=self.index.stop,
             spatial_data=spatial_data,
+            annotation_type=self.annotation_type,
         )
 
+    def _check_annotation_types(self, annotations: Sequence[PrecomputedAnnotation]):
+        wrong_types = {
+            type(x).__name__ for x in annotations if not isinstance(x, self.annotation_class)
+        }
+        if wrong_types:
+            raise TypeError(
+                f"Cannot write {', '.join(sorted(wrong_types))} to an AnnotationLayer "
+                f"of type {self.annotation_type}"
+            )
+
     def write_annotations(
         self,
-        annotations: Sequence[LineAnnotation],
+        annotations: Sequence[PrecomputedAnnotation],
         annotation_resolution: Optional[Vec3D] = None,
         all_levels: bool = True,
         clearing_bbox: Optional[BBox3D] = None,
     ):
         """
-        Write a set of line annotations to the file, adding to any already there.
+        Write a set of annotations to the file, adding to any already there.
 
-        :param annotations: sequence of LineAnnotations to add.
-        :param annotation_resolution: resolution of given LineAnnotation coordinates;
+        :param annotations: sequence of annotations to add; these must match the
+            annotation_type of this file (e.g. LineAnnotation for "LINE").
+        :param annotation_resolution: resolution of given annotation coordinates;
         if not specified, assumes native coordinates (i.e. self.index.resolution)
         :param all_levels: if true, write to all spatial levels (chunk sizes).
             If false, write only to the lowest level (smallest chunks).
@@ -575,6 +964,7 @@ class AnnotationLayer:
         if not annotations:
             logger.info("write_annotations called with 0 annotations to write")
             return
+        self._check_annotation_types(annotations)
         if annotation_resolution and annotation_resolution != self.index.resolution:
             annotations = [
                 x.with_converted_coordinates(annotation_resolution, self.index.resolution)
@@ -583,6 +973,9 @@ class AnnotationLayer:
         qty_levels = len(self.chunk_sizes)
         levels = range(0, qty_levels) if all_levels else [qty_levels - 1]
         bounds_size = self.index.shape
+        index_start = tuple(self.index.start)
+        index_stop = tuple(self.index.stop)
+        index = _extent_index(annotations)
 
         clearing_idx: Optional[VolumetricIndex] = None
         if clearing_bbox:
@@ -602,85 +995,38 @@ class AnnotationLayer:
             if is_local_filesystem(self.path):
                 os.makedirs(level_dir, exist_ok=True)
 
-            # Yes, there are terser ways to do this 3D iteration in Python,
-            # but they result in having to filter the full set of annotations
-            # for every chunk, which turns out to be very slow.  Much faster
-            # is to do one level at a time, filtering at each level, so that
-            # the final filters don't have to wade through as much data.
+            # Walk the grid one slab at a time, so that whole empty X slabs and XY
+            # columns are skipped with a single index query each; only the
+            # candidates found for a chunk get the exact in_bounds test.
             for x in range(grid_shape[0]):
                 logger.debug(f"x = {x} of {grid_shape[0]}")
-                split_by_x = VolumetricIndex.from_coords(
-                    (
-                        self.index.start[0] + x * chunk_size[0],
-                        self.index.start[1],
-                        self.index.start[2],
-                    ),
-                    (
-                        self.index.start[0] + (x + 1) * chunk_size[0],
-                        self.index.stop[1],
-                        self.index.stop[2],
-                    ),
-                    self.index.resolution,
-                )
-                # pylint: disable=cell-var-from-loop
-                split_data_by_x: list[LineAnnotation] = list(
-                    filter(lambda d: d.in_bounds(split_by_x), annotations)
-                )
-                logger.debug(f":  {len(split_data_by_x)} lines")
-                if not split_data_by_x:
+                x_start = index_start[0] + x * chunk_size[0]
+                x_stop = x_start + chunk_size[0]
+                slab = _candidates(index, (x_start, *index_start[1:]), (x_stop, *index_stop[1:]))
+                if slab.size == 0:
                     continue
                 for y in range(grid_shape[1]):
                     logger.debug(f"    y = {y} of {grid_shape[1]}")
-                    split_by_y = VolumetricIndex.from_coords(
-                        (
-                            self.index.start[0] + x * chunk_size[0],
-                            self.index.start[1] + y * chunk_size[1],
-                            self.index.start[2],
-                        ),
-                        (
-                            self.index.start[0] + (x + 1) * chunk_size[0],
-                            self.index.start[1] + (y + 1) * chunk_size[1],
-                            self.index.stop[2],
-                        ),
-                        self.index.resolution,
-                    )
-                    # pylint: disable=cell-var-from-loop
-                    split_data_by_y: list[LineAnnotation] = list(
-                        filter(lambda d: d.in_bounds(split_by_y), split_data_by_x)
+                    y_start = index_start[1] + y * chunk_size[1]
+                    y_stop = y_start + chunk_size[1]
+                    column = _candidates(
+                        index, (x_start, y_start, index_start[2]), (x_stop, y_stop, index_stop[2])
                     )
-                    logger.debug(f":  {len(split_data_by_y)} lines")
-                    if not split_data_by_y:
+                    if column.size == 0:
                         continue
                     for z in range(grid_shape[2]):
-                        split_by_z = VolumetricIndex.from_coords(
-                            (
-                                self.index.start[0] + x * chunk_size[0],
-                                self.index.start[1] + y * chunk_size[1],
-                                self.index.start[2] + z * chunk_size[2],
-                            ),
-                            (
-                                self.index.start[0] + (x + 1) * chunk_size[0],
-                                self.index.start[1] + (y + 1) * chunk_size[1],
-                                self.index.start[2] + (z + 1) * chunk_size[2],
-                            ),
-                            self.index.resolution,
-                        )
-                        # Sanity check: manually compute the single-chunk bounds.
-                        # It should be equal to split_by_z.
                         chunk_start = self.index.start + Vec3D(x, y, z) * chunk_size
                         chunk_end = chunk_start + chunk_size
                         chunk_bounds = VolumetricIndex.from_coords(
                             chunk_start, chunk_end, self.index.resolution
                         )
-                        assert chunk_bounds == split_by_z
-                        # pylint: disable=cell-var-from-loop
-                        chunk_data: list[LineAnnotation] = list(
-                            filter(lambda d: d.in_bounds(chunk_bounds), split_data_by_y)
+                        chunk_data: list[PrecomputedAnnotation] = _annotations_in_bounds(
+                            annotations, index, chunk_bounds
                         )
                         if not chunk_data:
                             continue
                         anno_file_path = path_join(level_dir, f"{x}_{y}_{z}")
-                        old_data = read_lines(anno_file_path)
+                        old_data = read_lines(anno_file_path, self.annotation_type)
                         if clearing_idx:
                             old_data = list(
                                 filter(lambda d: not d.in_bounds(clearing_idx), old_data)
@@ -718,7 +1064,7 @@ class AnnotationLayer:
                 for z in range(0, grid_shape[2]):
                     chunks_read += 1
                     anno_file_path = path_join(level_dir, f"{x}_{y}_{z}")
-                    result += read_lines(anno_file_path)
+                    result += read_lines(anno_file_path, self.annotation_type)
         if filter_duplicates:
             result_dict = {line.id: line for line in result}
             result = list(result_dict.values())
@@ -748,7 +1094,7 @@ class AnnotationLayer:
         ]
         file_sizes = cf.size(file_paths)
         max_file_size = max(x or 0 for x in file_sizes.values())
-        return line_count_from_file_size(max_file_size)
+        return line_count_from_file_size(max_file_size, self.annotation_type)
 
     def read_in_bounds(
         self, roi: BBox3D, annotation_resolution: Optional[Vec3D] = None, strict: bool = False
@@ -757,36 +1103,19 @@ class AnnotationLayer:
         Return all annotations within the given bounds (index).
 
         :param roi: region of interest
-        :param annotation_resolution: resolution of returned LineAnnotation coordinates;
+        :param annotation_resolution: resolution of returned annotation coordinates;
         if not specified, uses native coordinates (i.e. self.index.resolution)
         :param strict: if True, return ONLY annotations entirely within the given bounds;
         if False, then you may also get some annotations that are partially or entirely
         outside the given bounds
-        :return: list of LineAnnotation objects
+        :return: list of annotation objects (e.g. LineAnnotation)
         """
-        level = len(self.chunk_sizes) - 1
+        roi_index = self._roi_index(roi)
         result = []
-        bounds_size_vx = self.index.shape
-        chunk_size_vx = Vec3D(*self.chunk_sizes[level])
-        grid_shape = ceil(bounds_size_vx / chunk_size_vx)
-        level_key = f"spatial{level}"
-        level_dir = path_join(self.path, level_key)
-
-        roi_start_vx = round(roi.start / self.index.resolution)
-        roi_end_vx = round(roi.end / self.index.resolution)
-        roi_index = VolumetricIndex.from_coords(roi_start_vx, roi_end_vx, self.index.resolution)
-
-        start_chunk = (roi_index.start - self.index.start) // chunk_size_vx
-        end_chunk = (roi_index.stop - self.index.start) // chunk_size_vx
-        for x in range(max(0, start_chunk[0]), min(grid_shape[0], end_chunk[0] + 1)):
-            for y in range(max(0, start_chunk[1]), min(grid_shape[1], end_chunk[1] + 1)):
-                for z in range(max(0, start_chunk[2]), min(grid_shape[2], end_chunk[2] + 1)):
-                    anno_file_path = path_join(level_dir, f"{x}_{y}_{z}")
-                    result += read_lines(anno_file_path)
+        for anno_file_path in self._chunk_paths_in_bounds(roi_index):
+            result += read_lines(anno_file_path, self.annotation_type)
         if strict:
-            result = list(
-                filter(lambda x: roi_index.contains(x.start) and roi_index.contains(x.end), result)
-            )
+            result = list(filter(lambda x: x.contained_in(roi_index), result))
         result_dict = {line.id: line for line in result}
         result = list(result_dict.values())
         if annotation_resolution:
@@ -794,6 +1123,56 @@ class AnnotationLayer:
                 line.convert_coordinates(self.index.resolution, annotation_resolution)
         return result
 
+    def read_arrays_in_bounds(
+        self, roi: BBox3D, annotation_resolution: Optional[Vec3D] = None, strict: bool = False
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Equivalent to read_in_bounds, but return the annotations as arrays (see
+        decode_annotation_arrays), without creating an object per annotation.
+        """
+        roi_index = self._roi_index(roi)
+        chunks = [
+            decode_annotation_arrays(read_bytes(anno_file_path), self.annotation_type)
+            for anno_file_path in self._chunk_paths_in_bounds(roi_index)
+        ]
+        floats_per_entry = self.annotation_class.BYTES_PER_ENTRY // 4
+        values = np.concatenate(
+            [np.zeros((0, floats_per_entry), dtype=np.float32)] + [e[0] for e in chunks]
+        )
+        ids = np.concatenate([np.zeros(0, dtype=np.uint64)] + [e[1] for e in chunks])
+        if strict:
+            mask = self.annotation_class.contained_in_mask(values, roi_index)
+            values, ids = values[mask], ids[mask]
+        # keep the first occurrence of each ID, in order
+        first = np.sort(np.unique(ids, return_index=True)[1])
+        values, ids = values[first], ids[first]
+        if annotation_resolution:
+            num_points = floats_per_entry // 3
+            from_res = np.tile(np.asarray(self.index.resolution, dtype=float), num_points)
+            to_res = np.tile(np.asarray(annotation_resolution, dtype=float), num_points)
+            values = np.round(values.astype(np.float64) * from_res / to_res, VEC3D_PRECISION)
+        return values, ids
+
+    def _roi_index(self, roi: BBox3D) -> VolumetricIndex:
+        roi_start_vx = round(roi.start / self.index.resolution)
+        roi_end_vx = round(roi.end / self.index.resolution)
+        return VolumetricIndex.from_coords(roi_start_vx, roi_end_vx, self.index.resolution)
+
+    def _chunk_paths_in_bounds(self, roi_index: VolumetricIndex) -> list[str]:
+        # Paths of the finest-level chunks overlapping the given bounds.
+        level = len(self.chunk_sizes) - 1
+        chunk_size_vx = Vec3D(*self.chunk_sizes[level])
+        grid_shape = ceil(self.index.shape / chunk_size_vx)
+        level_dir = path_join(self.path, f"spatial{level}")
+        start_chunk = (roi_index.start - self.index.start) // chunk_size_vx
+        end_chunk = (roi_index.stop - self.index.start) // chunk_size_vx
+        return [
+            path_join(level_dir, f"{x}_{y}_{z}")
+            for x in range(max(0, start_chunk[0]), min(grid_shape[0], end_chunk[0] + 1))
+            for y in range(max(0, start_chunk[1]), min(grid_shape[1], end_chunk[1] + 1))
+            for z in range(max(0, start_chunk[2]), min(grid_shape[2], end_chunk[2] + 1))
+        ]
+
     def post_process(self):
         """
         Read all our data from the lowest-level chunks on disk, then rewrite:
@@ -826,9 +1205,224 @@ class AnnotationLayer:
         # rewrite the info file, with the updated spatial entries
         self.write_info_file(spatial_entries)
 
+    def grid_shape(self, level: int) -> Vec3D[int]:
+        """
+        Return the number of chunks in each dimension at the given spatial level.
+        """
+        return ceil(self.index.shape / Vec3D(*self.chunk_sizes[level]))
+
+    def chunk_count(self, level: int) -> int:
+        """
+        Return the total number of chunks at the given spatial level.
+        """
+        grid_shape = self.grid_shape(level)
+        return grid_shape[0] * grid_shape[1] * grid_shape[2]
+
+    def chunk_index(self, level: int, chunk: Sequence[int]) -> VolumetricIndex:
+        """
+        Return the bounds of the given chunk (grid position) at the given level.
+        """
+        chunk_size = Vec3D(*self.chunk_sizes[level])
+        chunk_start = self.index.start + Vec3D(*chunk) * chunk_size
+        return VolumetricIndex.from_coords(
+            chunk_start, chunk_start + chunk_size, self.index.resolution
+        )
+
+    def post_process_chunk_range(
+        self,
+        level: int,
+        start: int,
+        stop: int,
+        sample_limit: Optional[int] = None,
+        temp_dir: Optional[str] = None,
+    ):
+        """
+        Rebuild chunks [start, stop) of the given spatial level (numbered in x, y, z
+        order, with z varying fastest) from the chunks of the next finer level, which
+        must already be complete.  Unlike post_process, this streams the finer chunks
+        one at a time, so memory use does not depend on the total annotation count.
+
+        :param level: level to rebuild; must not be the finest level.
+        :param start: first chunk number to rebuild.
+        :param stop: chunk number after the last one to rebuild.
+        :param sample_limit: if given, write at most this many annotations to each
+            chunk, keeping those with the smallest (pseudo-random) hash of their ID.
+            This sample is consistent across levels, so an annotation sampled into a
+            coarse chunk is also sampled into the finer chunks beneath it.
+            If None, all annotations are written, spilling them to local temporary
+            files while a chunk is being assembled.
+        :param temp_dir: local directory for temporary files (defaults to the system
+            temp directory).
+        """
+        assert 0 <= level < len(self.chunk_sizes) - 1, "cannot rebuild the finest level"
+        grid_shape = self.grid_shape(level)
+        level_dir = path_join(self.path, f"spatial{level}")
+        if is_local_filesystem(self.path):
+            os.makedirs(level_dir, exist_ok=True)
+        chunks = itertools.islice(itertools.product(*(range(n) for n in grid_shape)), start, stop)
+        with tempfile.TemporaryDirectory(dir=temp_dir) as spill_dir:
+            for chunk in chunks:
+                anno_file_path = path_join(level_dir, "_".join(str(e) for e in chunk))
+                target = self.chunk_index(level, chunk)
+                if sample_limit is None:
+                    self._stream_chunk(level + 1, target, anno_file_path, spill_dir)
+                else:
+                    sample = self._sample_chunk(level + 1, target, sample_limit)
+                    write_lines(anno_file_path, sample)
+
+    def post_process_streaming(
+        self, sample_limit: Optional[int] = None, temp_dir: Optional[str] = None
+    ):
+        """
+        Equivalent to post_process, but builds each higher level from the level just
+        below it, one chunk at a time, using bounded memory.  See
+        post_process_chunk_range for the meaning of the parameters.
+        For parallel execution, use post_process_annotation_layer_flow instead.
+        """
+        for level in reversed(range(len(self.chunk_sizes) - 1)):
+            self.post_process_chunk_range(
+                level, 0, self.chunk_count(level), sample_limit, temp_dir
+            )
+        self.write_post_processed_info_file()
+
+    def write_post_processed_info_file(self):
+        """
+        Rewrite the info file, with limits for each level found from the
+        sizes of the chunk files on disk.
+        """
+        spatial_entries = self.get_spatial_entries()
+        for level, entry in enumerate(spatial_entries):
+            entry.limit = self.find_max_size(level)
+        self.write_info_file(spatial_entries)
+
+    def _source_chunks(self, source_level: int, target: VolumetricIndex) -> list[tuple[int, ...]]:
+        # Chunks at source_level overlapping the target bounds, in x, y, z order.
+        chunk_size = Vec3D(*self.chunk_sizes[source_level])
+        grid_shape = self.grid_shape(source_level)
+        lo = (target.start - self.index.start) // chunk_size
+        hi = (target.stop - self.index.start - 1) // chunk_size
+        return list(
+            itertools.product(
+                *(range(max(0, lo[i]), min(grid_shape[i], hi[i] + 1)) for i in range(3))
+            )
+        )
+
+    def _is_first_chunk(
+        self,
+        anno: PrecomputedAnnotation,
+        source_level: int,
+        chunk: tuple[int, ...],
+        source_chunks: list[tuple[int, ...]],
+        index_start: tuple[int, ...],
+    ) -> bool:
+        # Whether `chunk` is the first of `source_chunks` holding `anno`, so that an
+        # annotation spanning several source chunks is written out only once.
+        chunk_size = self.chunk_sizes[source_level]
+        lower, upper = anno.extent()
+        lo = [
+            min(
+                max(int((lower[i] - index_start[i]) // chunk_size[i]), source_chunks[0][i]),
+                chunk[i],
+            )
+            for i in range(3)
+        ]
+        hi = [
+            max(
+                min(int((upper[i] - index_start[i]) // chunk_size[i]), source_chunks[-1][i]),
+                chunk[i],
+            )
+            for i in range(3)
+        ]
+        if lo == hi:
+            return True
+        for candidate in itertools.product(*(range(lo[i], hi[i] + 1) for i in range(3))):
+            if candidate == chunk:
+                return True
+            if anno.in_bounds(self.chunk_index(source_level, candidate)):
+                return False
+        return True  # pragma: no cover # chunk is always among the candidates
+
+    def _read_source_chunk(
+        self, source_level: int, chunk: tuple[int, ...], target: VolumetricIndex
+    ) -> list[PrecomputedAnnotation]:
+        # Annotations in the given source chunk that fall within the target bounds.
+        source_path = path_join(
+            self.path, f"spatial{source_level}", "_".join(str(e) for e in chunk)
+        )
+        annotations = read_lines(source_path, self.annotation_type)
+        if self.chunk_index(source_level, chunk).contained_in(target):
+            return annotations
+        return [anno for anno in annotations if anno.in_bounds(target)]
+
+    def _stream_chunk(
+        self, source_level: int, target: VolumetricIndex, anno_file_path: str, spill_dir: str
+    ):
+        source_chunks = self._source_chunks(source_level, target)
+        index_start = tuple(self.index.start)
+        geometry_path = os.path.join(spill_dir, "geometry")
+        ids_path = os.path.join(spill_dir, "ids")
+        count = 0
+        with open(geometry_path, "wb") as geometry_file, open(ids_path, "wb") as ids_file:
+            for chunk in source_chunks:
+                annotations = [
+                    anno
+                    for anno in self._read_source_chunk(source_level, chunk, target)
+                    if self._is_first_chunk(anno, source_level, chunk, source_chunks, index_start)
+                ]
+                if not annotations:
+                    continue
+                # Reuse the chunk file encoding, minus the count header and the ids.
+                data = encode_annotations(annotations)
+                ids_offset = 8 + len(annotations) * annotations[0].BYTES_PER_ENTRY
+                geometry_file.write(data[8:ids_offset])
+                ids_file.write(data[ids_offset:])
+                count += len(annotations)
+
+        output_path = os.path.join(spill_dir, "output")
+        with open(output_path, "wb") as output_file:
+            output_file.write(struct.pack("<Q", count))
+            for part_path in (geometry_path, ids_path):
+                with open(part_path, "rb") as part_file:
+                    shutil.copyfileobj(part_file, output_file)
+        if is_local_filesystem(anno_file_path):
+            local_path = anno_file_path
+            if local_path.startswith("file://"):
+                local_path = local_path[len("file://") :]
+            shutil.copyfile(output_path, local_path)
+        else:
+            # Upload from the spill file, without reading the whole chunk into memory.
+            fs, fs_path = fsspec.core.url_to_fs(anno_file_path)
+            protocols = (fs.protocol,) if isinstance(fs.protocol, str) else fs.protocol
+            open_kwargs = {}
+            if "gs" in protocols:  # pragma: no cover
+                open_kwargs["fixed_key_metadata"] = {"cache_control": NO_CACHE_CONTROL}
+            with open(output_path, "rb") as output_file:
+                with fs.open(fs_path, "wb", **open_kwargs) as remote_file:
+                    shutil.copyfileobj(output_file, remote_file)
+
+    def _sample_chunk(
+        self, source_level: int, target: VolumetricIndex, sample_limit: int
+    ) -> list[PrecomputedAnnotation]:
+        # max-heap (by negated priority) of the sample_limit lowest-priority annotations
+        heap: list[tuple[int, int, PrecomputedAnnotation]] = []
+        sampled_ids: set[int] = set()
+        for chunk in self._source_chunks(source_level, target):
+            for anno in self._read_source_chunk(source_level, chunk, target):
+                if anno.id in sampled_ids:
+                    continue
+                priority = sample_priority(anno.id)
+                if len(heap) < sample_limit:
+                    heapq.heappush(heap, (-priority, anno.id, anno))
+                    sampled_ids.add(anno.id)
+                elif priority < -heap[0][0]:
+                    _, dropped_id, _ = heapq.heapreplace(heap, (-priority, anno.id, anno))
+                    sampled_ids.discard(dropped_id)
+                    sampled_ids.add(anno.id)
+        return [anno for _, _, anno in heap]
+
 
 @builder.register("build_annotation_layer")
-def build_annotation_layer(  # pylint: disable=too-many-locals, too-many-branches
+def build_annotation_layer(  # pylint: disable=too-many-locals, too-many-branches, too-many-statements
     path: str,
     resolution: Sequence[float] | None = None,
     dataset_size: Sequence[int] | None = None,
@@ -836,6 +1430,7 @@ def build_annotation_layer(  # pylint: disable=too-many-locals, too-many-branche
     index: VolumetricIndex | None = None,
     chunk_sizes: Sequence[Sequence[int]] | None = None,
     mode: Literal["read", "write", "replace", "update"] = "write",
+    annotation_type: AnnotationType | None = None,
 ) -> AnnotationLayer:  # pragma: no cover # trivial conditional, delegation only
     """Build an AnnotationLayer (spatially indexed annotations in precomputed file format).
 
@@ -853,12 +1448,16 @@ def build_annotation_layer(  # pylint: disable=too-many-locals, too-many-branche
        "write": for writing; throws error if file exists.
        "replace": for writing; if file exists, it is cleared of all data.
        "update": for writing additional data; throws error if file does not exist.
+    :annotation_type: Type of annotations in the file ("LINE", "POINT",
+      "AXIS_ALIGNED_BOUNDING_BOX", or "ELLIPSOID"); defaults to "LINE" for new
+      files (or the existing type for existing files).
     """
     dims, lower_bound, upper_bound, spatial_entries = read_info(path)
     file_exists = spatial_entries is not None
     file_resolution = []
     file_index = None
     file_chunk_sizes = []
+    file_annotation_type = None
     if file_exists:
         for i in [0, 1, 2]:
             numAndUnit = dims["xyz"[i]]
@@ -867,6 +1466,7 @@ def build_annotation_layer(  # pylint: disable=too-many-locals, too-many-branche
         # pylint: disable=E1120
         file_index = VolumetricIndex.from_coords(lower_bound, upper_bound, Vec3D(*file_resolution))
         file_chunk_sizes = [se.chunk_size for se in spatial_entries]
+        file_annotation_type = read_annotation_type(path)
 
     if mode in ("read", "update") and not file_exists:
         raise IOError(
@@ -912,8 +1512,15 @@ def build_annotation_layer(  # pylint: disable=too-many-locals, too-many-branche
                 f'opened file for "update" with chunk_sizes {chunk_sizes}, '
                 f"but existing file chunk_sizes is {file_chunk_sizes}"
             )
+        if annotation_type is not None and annotation_type != file_annotation_type:
+            raise ValueError(
+                f'opened file for "update" with annotation_type {annotation_type}, '
+                f"but existing file annotation_type is {file_annotation_type}"
+            )
 
-    sf = AnnotationLayer(path, index, chunk_sizes)
+    if annotation_type is None and mode in ("read", "update"):
+        annotation_type = file_annotation_type
+    sf = AnnotationLayer(path, index, chunk_sizes, annotation_type)
     if mode in ("write", "replace"):
         sf.clear()
     return sf
@@ -924,7 +1531,51 @@ def post_process_annotation_layer_op(target: AnnotationLayer):  # pragma: no cov
     target.post_process()
 
 
+@mazepa.taskable_operation
+def post_process_annotation_chunk_range_op(
+    target: AnnotationLayer,
+    level: int,
+    start: int,
+    stop: int,
+    sample_limit: Optional[int] = None,
+):
+    target.post_process_chunk_range(level, start, stop, sample_limit)
+
+
+@mazepa.taskable_operation
+def write_post_processed_info_op(target: AnnotationLayer):
+    target.write_post_processed_info_file()
+
+
 @builder.register("post_process_annotation_layer_flow")
 @mazepa.flow_schema
-def post_process_annotation_layer_flow(target: AnnotationLayer):  # pragma: no cover
-    yield post_process_annotation_layer_op.make_task(target)
+def post_process_annotation_layer_flow(
+    target: AnnotationLayer,
+    streaming: bool = False,
+    sample_limit: Optional[int] = None,
+    chunks_per_task: int = 16,
+):
+    """
+    Post-process the given AnnotationLayer (see AnnotationLayer.post_process).
+
+    :param target: the layer to post-process.
+    :param streaming: if True, rebuild the higher levels bottom-up with bounded
+        memory, as parallel tasks over ranges of chunks; otherwise, run
+        post_process as a single task.
+    :param sample_limit: (streaming only) maximum number of annotations per
+        chunk in the higher levels; see AnnotationLayer.post_process_chunk_range.
+    :param chunks_per_task: (streaming only) number of chunks rebuilt by each task.
+    """
+    if not streaming:
+        yield post_process_annotation_layer_op.make_task(target)
+        return
+    for level in reversed(range(len(target.chunk_sizes) - 1)):
+        chunk_count = target.chunk_count(level)
+        yield [
+            post_process_annotation_chunk_range_op.make_task(
+                target, level, start, min(start + chunks_per_task, chunk_count), sample_limit
+            )
+            for start in range(0, chunk_count, chunks_per_task)
+        ]
+        yield Dependency()
+    yield write_post_processed_info_op.make_task(target)
@@ -0,0 +1,244 @@
+"""
+Static spatial index over large collections of axis-aligned boxes.
+
+The index is a packed Hilbert R-tree: items are sorted by the Hilbert key
+of their centers and grouped bottom-up into fixed-size nodes, so the tree
+is built in a single vectorized pass and every level is stored as a pair
+of contiguous ``(n, 3)`` arrays.  Queries descend level by level with all
+surviving nodes tested at once.
+"""
+from __future__ import annotations
+
+import heapq
+from typing import Optional, Sequence
+
+import numpy as np
+import numpy.typing as npt
+
+from .bbox import BBox3D
+
+HILBERT_BITS = 16
+
+
+def _hilbert_keys(coords: npt.NDArray[np.uint64], bits: int = HILBERT_BITS) -> npt.NDArray:
+    """
+    Return the Hilbert curve distance for each row of ``coords``, a ``(n, 3)``
+    array of integer coordinates in ``[0, 2**bits)``.  This is Skilling's
+    transpose algorithm (AIP Conf. Proc. 707, 2004), applied to all rows at once.
+    """
+    x = coords.astype(np.uint64).T.copy()
+    one = np.uint64(1)
+    m = one << np.uint64(bits - 1)
+    # Inverse undo of the excess work
+    q = m
+    while q > one:
+        p = q - one
+        for i in range(3):
+            flip = (x[i] & q) != 0
+            x[0] = np.where(flip, x[0] ^ p, x[0])
+            t = np.where(flip, np.uint64(0), (x[0] ^ x[i]) & p)
+            x[0] ^= t
+            x[i] ^= t
+        q >>= one
+    # Gray encode
+    for i in range(1, 3):
+        x[i] ^= x[i - 1]
+    t = np.zeros_like(x[0])
+    q = m
+    while q > one:
+        t = np.where((x[2] & q) != 0, t ^ (q - one), t)
+        q >>= one
+    x ^= t
+    # Interleave the transposed bits into a single key
+    key = np.zeros(x.shape[1], dtype=np.uint64)
+    for b in range(bits - 1, -1, -1):
+        for i in range(3):
+            key = (key << one) | ((x[i] >> np.uint64(b)) & one)
+    return key
+
+
+class BBoxIndex:
+    """
+    Packed Hilbert R-tree over ``n`` axis-aligned boxes, given as ``(n, 3)``
+    arrays of lower and upper corners in any consistent unit (e.g. nm for
+    ``BBox3D``, voxels for annotation coordinates).  Points are boxes of zero
+    size; line segments are indexed by their extents.
+
+    The index is immutable once built.  Query results are arrays of item
+    indices into the original input order, sorted ascending.
+
+    :param lower: ``(n, 3)`` array of lower corners.
+    :param upper: ``(n, 3)`` array of upper corners.
+    :param node_size: Maximum number of children per tree node.
+    """
+
+    def __init__(self, lower: npt.ArrayLike, upper: npt.ArrayLike, node_size: int = 16):
+        lower_arr = np.asarray(lower, dtype=np.float64).reshape(-1, 3)
+        upper_arr = np.asarray(upper, dtype=np.float64).reshape(-1, 3)
+        if lower_arr.shape != upper_arr.shape:
+            raise ValueError("`lower` and `upper` must have the same shape.")
+        if node_size < 2:
+            raise ValueError("`node_size` must be at least 2.")
+        lower_arr, upper_arr = np.minimum(lower_arr, upper_arr), np.maximum(lower_arr, upper_arr)
+        self.node_size = node_size
+
+        if len(lower_arr) == 0:
+            self.order = np.zeros(0, dtype=np.int64)
+            self.levels: list[tuple[npt.NDArray, npt.NDArray]] = [(lower_arr, upper_arr)]
+            return
+
+        centers = (lower_arr + upper_arr) / 2
+        c_min = centers.min(axis=0)
+        c_span = centers.max(axis=0) - c_min
+        # Axes along which all centers coincide do not contribute to the order
+        scale = np.divide(2**HILBERT_BITS - 1, c_span, out=np.zeros_like(c_span), where=c_span > 0)
+        quantized = ((centers - c_min) * scale).astype(np.uint64)
+        self.order = np.argsort(_hilbert_keys(quantized), kind="stable")
+
+        self.levels = [(lower_arr[self.order], upper_arr[self.order])]
+        while len(self.levels[-1][0]) > 1:
+            child_lower, child_upper = self.levels[-1]
+            starts = np.arange(0, len(child_lower), node_size)
+            self.levels.append(
+                (
+                    np.minimum.reduceat(child_lower, starts, axis=0),
+                    np.maximum.reduceat(child_upper, starts, axis=0),
+                )
+            )
+
+    @classmethod
+    def from_bboxes(cls, bboxes: Sequence[BBox3D], node_size: int = 16) -> BBoxIndex:
+        """
+        Build an index over the given ``BBox3D`` objects, in nm.
+        """
+        bounds = np.array([bbox.bounds for bbox in bboxes], dtype=np.float64).reshape((-1, 3, 2))
+        return cls(bounds[:, :, 0], bounds[:, :, 1], node_size=node_size)
+
+    @classmethod
+    def from_lines(
+        cls, starts: npt.ArrayLike, ends: npt.ArrayLike, node_size: int = 16
+    ) -> BBoxIndex:
+        """
+        Build an index over line segments given as ``(n, 3)`` arrays of end points.
+        Each segment is indexed by its extent, so queries return a superset of the
+        segments that actually cross the query box.
+        """
+        # The constructor orders each pair of corners, so end points can be passed as-is.
+        return cls(starts, ends, node_size=node_size)
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def _traverse(
+        self, q_lower: npt.NDArray, q_upper: npt.NDArray, strict: bool
+    ) -> tuple[npt.NDArray, npt.NDArray]:
+        """
+        Descend the tree for ``m`` query boxes at once, returning parallel arrays of
+        (query index, sorted item position) for every intersecting pair.
+        """
+        query_ids = np.arange(len(q_lower))
+        node_ids = np.zeros(len(q_lower), dtype=np.int64)
+        for level in range(len(self.levels) - 1, -1, -1):
+            lower, upper = self.levels[level]
+            if level < len(self.levels) - 1:
+                children = node_ids[:, np.newaxis] * self.node_size + np.arange(self.node_size)
+                valid = children < len(lower)
+                query_ids = np.broadcast_to(query_ids[:, np.newaxis], children.shape)[valid]
+                node_ids = children[valid]
+            if strict:
+                hit = (lower[node_ids] < q_upper[query_ids]) & (
+                    upper[node_ids] > q_lower[query_ids]
+                )
+            else:
+                hit = (lower[node_ids] <= q_upper[query_ids]) & (
+                    upper[node_ids] >= q_lower[query_ids]
+                )
+            keep = hit.all(axis=1)
+            query_ids = query_ids[keep]
+            node_ids = node_ids[keep]
+            if len(node_ids) == 0:
+                break
+        return query_ids, node_ids
+
+    def query(
+        self, lower: npt.ArrayLike, upper: npt.ArrayLike, strict: bool = False
+    ) -> npt.NDArray:
+        """
+        Return the indices of all items intersecting the box from ``lower`` to ``upper``.
+
+        :param lower: Lower corner of the query box.
+        :param upper: Upper corner of the query box.
+        :param strict: If False (default), boxes that merely touch count as intersecting;
+            if True, the overlap must have positive extent in every dimension (as in
+            ``BBox3D.intersects``).
+        """
+        if len(self) == 0:
+            return np.zeros(0, dtype=np.int64)
+        q_lower = np.asarray(lower, dtype=np.float64).reshape(1, 3)
+        q_upper = np.asarray(upper, dtype=np.float64).reshape(1, 3)
+        _, positions = self._traverse(q_lower, q_upper, strict)
+        return np.sort(self.order[positions])
+
+    def query_bbox(self, bbox: BBox3D, strict: bool = False) -> npt.NDArray:
+        """
+        Return the indices of all items intersecting the given ``BBox3D``.  The index
+        must have been built in nm for this to be meaningful.
+        """
+        return self.query([b[0] for b in bbox.bounds], [b[1] for b in bbox.bounds], strict=strict)
+
+    def query_many(
+        self, lower: npt.ArrayLike, upper: npt.ArrayLike, strict: bool = False
+    ) -> list[npt.NDArray]:
+        """
+        Query many boxes at once, given as ``(m, 3)`` arrays of corners.  All queries
+        descend the tree together, so this is much faster than calling ``query`` in a
+        loop when ``m`` is large.  Returns one sorted index array per query box.
+        """
+        q_lower = np.asarray(lower, dtype=np.float64).reshape(-1, 3)
+        q_upper = np.asarray(upper, dtype=np.float64).reshape(-1, 3)
+        if len(self) == 0:
+            return [np.zeros(0, dtype=np.int64) for _ in range(len(q_lower))]
+        query_ids, positions = self._traverse(q_lower, q_upper, strict)
+        sort = np.lexsort((self.order[positions], query_ids))
+        items = self.order[positions][sort]
+        splits = np.searchsorted(query_ids[sort], np.arange(1, len(q_lower)))
+        return np.split(items, splits)
+
+    def nearest(
+        self, point: npt.ArrayLike, k: int = 1, max_distance: Optional[float] = None
+    ) -> npt.NDArray:
+        """
+        Return the indices of the ``k`` items closest to ``point``, nearest first.
+        Distance is measured to the nearest point of each item's box, so any item
+        containing ``point`` has distance 0.
+
+        :param point: Query point, in the same unit as the index.
+        :param k: Number of items to return (fewer if the index is smaller).
+        :param max_distance: If given, ignore items farther away than this.
+        """
+        p = np.asarray(point, dtype=np.float64).reshape(3)
+        result: list[int] = []
+        if len(self) == 0 or k < 1:
+            return np.zeros(0, dtype=np.int64)
+        limit = np.inf if max_distance is None else max_distance
+
+        def distances(level: int, ids: npt.NDArray) -> npt.NDArray:
+            lower, upper = self.levels[level]
+            gap = np.maximum(np.maximum(lower[ids] - p, p - upper[ids]), 0)
+            return np.sqrt((gap * gap).sum(axis=1))
+
+        top = len(self.levels) - 1
+        # Entries are (distance, level, node); level 0 nodes are the items themselves.
+        heap: list[tuple[float, int, int]] = [(float(distances(top, np.array([0]))[0]), top, 0)]
+        while heap and len(result) < k:
+            dist, level, node = heapq.heappop(heap)
+            if dist > limit:
+                break
+            if level == 0:
+                result.append(int(self.order[node]))
+                continue
+            start = node * self.node_size
+            ids = np.arange(start, min(start + self.node_size, len(self.levels[level - 1][0])))
+            for d, i in zip(distances(level - 1, ids).tolist(), ids.tolist()):
+                heapq.heappush(heap, (d, level - 1, i))
+        return np.array(result, dtype=np.int64)
@@ -2,5 +2,6 @@ from .index import DBIndex
 from .backend import DBDataT, DBBackend, DBArrayValueT, DBValueT, DBRowDataT
 
 from .layer import DBLayer, UserDBIndex, ColIndex, DBDataProcT
+from .cached_backend import CachedDBBackend, DBCacheStats
 
 from .build import build_db_layer
@@ -0,0 +1,121 @@
+"""Helpers for batching DB backend requests."""
+from __future__ import annotations
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Generator, Optional, Sequence, TypeVar
+
+import attrs
+
+from . import DBDataT, DBIndex, DBRowDataT
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+_CLIENTS: dict[tuple, Any] = {}
+_CLIENTS_LOCK = threading.Lock()
+
+
+def get_shared_client(client_cls: Callable[..., T], **kwargs) -> T:
+    """Returns a client created with the given kwargs, shared by all backends in this
+    process that use the same settings. Emulator hosts are part of the settings, as
+    the clients read them on creation.
+    """
+    emulator_hosts = tuple(sorted((k, v) for k, v in os.environ.items() if k.endswith("_HOST")))
+    key = (client_cls, os.getpid(), tuple(sorted(kwargs.items())), emulator_hosts)
+    with _CLIENTS_LOCK:
+        if key not in _CLIENTS:
+            _CLIENTS[key] = client_cls(**kwargs)
+        return _CLIENTS[key]
+
+
+def split_into_batches(items: Sequence[T], batch_size: int) -> list[Sequence[T]]:
+    return [items[i : i + batch_size] for i in range(0, len(items), batch_size)]
+
+
+def dispatch_batches(
+    fn: Callable[[Sequence[T]], R], batches: Sequence[Sequence[T]], max_workers: int
+) -> list[R]:
+    """Calls ``fn`` on each batch, with up to ``max_workers`` calls in flight.
+
+    :return: Results in the order of ``batches``.
+    """
+    if len(batches) <= 1 or max_workers <= 1:
+        return [fn(batch) for batch in batches]
+    # A pool per call, as `fn` may dispatch batches itself
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(batches))) as executor:
+        return list(executor.map(fn, batches))
+
+
+@attrs.mutable
+class WriteBuffer:
+    """
+    Pending writes, merged by row so that only the last value written to each column
+    of a row is sent.
+
+    :param max_rows: Number of pending rows at which the buffer should be flushed.
+    """
+
+    max_rows: int
+    rows: dict[str, DBRowDataT] = attrs.field(factory=dict)
+    rows_col_keys: dict[str, dict[str, None]] = attrs.field(factory=dict)
+    lock: threading.Lock = attrs.field(factory=threading.Lock, repr=False, eq=False)
+
+    def add(self, idx: DBIndex, data: DBDataT) -> bool:
+        """Adds the writes to the buffer.
+
+        :return: Whether the buffer is full.
+        """
+        with self.lock:
+            for row_key, col_keys, row_data in zip(idx.row_keys, idx.rows_col_keys, data):
+                self.rows.setdefault(row_key, {}).update(row_data)
+                self.rows_col_keys.setdefault(row_key, {}).update(dict.fromkeys(col_keys))
+            return len(self.rows) >= self.max_rows
+
+    def pop_all(self) -> tuple[DBIndex, DBDataT]:
+        with self.lock:
+            rows, self.rows = self.rows, {}
+            rows_col_keys, self.rows_col_keys = self.rows_col_keys, {}
+        idx = DBIndex({row_key: tuple(rows_col_keys[row_key]) for row_key in rows})
+        return idx, list(rows.values())
+
+
+class WriteCoalescingMixin:
+    """
+    Mixin for DB backends buffering the writes made within ``coalesce_writes``. The
+    backend sends writes in ``_write``, keeps the buffer in a ``_write_buffer`` field
+    defaulting to ``None``, and calls ``_flush_writes`` before any other operation.
+    """
+
+    _write_buffer: Optional[WriteBuffer]
+
+    def _write(self, idx: DBIndex, data: DBDataT):  # pragma: no cover
+        raise NotImplementedError
+
+    @contextmanager
+    def coalesce_writes(self, max_buffered_rows: int = 10_000) -> Generator[None, None, None]:
+        """
+        Buffer the writes made within the context, merging writes to the same row,
+        and send them in batches when `max_buffered_rows` rows are pending and on exit.
+        Any other operation sends the pending writes first.
+        """
+        self._flush_writes()
+        self._write_buffer = WriteBuffer(max_rows=max_buffered_rows)
+        try:
+            yield
+        finally:
+            self._flush_writes()
+            self._write_buffer = None
+
+    def _flush_writes(self):
+        if self._write_buffer is not None and len(self._write_buffer.rows) > 0:
+            self._write(*self._write_buffer.pop_all())
+
+    def write(self, idx: DBIndex, data: DBDataT):
+        if self._write_buffer is not None:
+            if self._write_buffer.add(idx, data):
+                self._flush_writes()
+        else:
+            self._write(idx, data)
@@ -8,7 +8,7 @@ from typeguard import typechecked
 from zetta_utils import builder
 
 from .. import IndexProcessor
-from . import DBBackend, DBDataProcT, DBIndex, DBLayer
+from . import CachedDBBackend, DBBackend, DBDataProcT, DBIndex, DBLayer
 
 
 @typechecked
@@ -19,6 +19,8 @@ def build_db_layer(
     index_procs: Iterable[IndexProcessor[DBIndex]] = (),
     read_procs: Iterable[DBDataProcT] = (),
     write_procs: Iterable[DBDataProcT] = (),
+    cache_ttl: float | None = None,
+    cache_max_bytes: int = 64 * 2**20,
 ) -> DBLayer:
     """Build a DB Layer.
 
@@ -30,9 +32,15 @@ def build_db_layer(
         returning it to the user.
     :param write_procs: List of processors that will be applied to the data given by
         the user before writing it to the backend.
+    :param cache_ttl: If given, reads, queries and batches are cached for this many
+        seconds in a ``CachedDBBackend``. Writes through the layer invalidate the
+        affected entries.
+    :param cache_max_bytes: Memory budget of the cache.
     :return: Layer built according to the spec.
 
     """
+    if cache_ttl is not None:
+        backend = CachedDBBackend(backend, ttl=cache_ttl, max_bytes=cache_max_bytes)
     result = DBLayer(
         backend=backend,
         readonly=readonly,
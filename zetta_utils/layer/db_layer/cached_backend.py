@@ -0,0 +1,218 @@
+"""Read-through cache for DB backends."""
+from __future__ import annotations
+
+import copy
+import pickle
+import threading
+import time
+from typing import Any, Callable, Hashable
+
+import attrs
+import cachetools
+from typeguard import typechecked
+
+from zetta_utils import builder
+
+from . import DBBackend, DBDataT, DBIndex, DBRowDataT
+
+
+@attrs.mutable
+class DBCacheStats:
+    """
+    Statistics of a ``CachedDBBackend``.
+
+    :param hits: Number of reads served from the cache.
+    :param misses: Number of reads sent to the wrapped backend.
+    :param saved_seconds: Sum over the hits of the time that the wrapped backend took
+        to produce the cached result.
+    :param invalidations: Number of entries dropped because of writes through the cache.
+    """
+
+    hits: int = 0
+    misses: int = 0
+    saved_seconds: float = 0.0
+    invalidations: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total > 0 else 0.0
+
+
+@attrs.frozen
+class _CacheEntry:
+    value: Any
+    nbytes: int
+    fetch_seconds: float
+    row_keys: frozenset[str] | None
+
+
+def _get_entry_nbytes(entry: _CacheEntry) -> int:
+    return entry.nbytes
+
+
+def _normalize_filter(column_filter: dict[str, list] | None) -> tuple | None:
+    if not column_filter:
+        return None
+    return tuple(sorted((k, tuple(sorted(set(v), key=repr))) for k, v in column_filter.items()))
+
+
+@builder.register("CachedDBBackend")
+@typechecked
+@attrs.mutable
+class CachedDBBackend(DBBackend):
+    """
+    Wraps a DB backend with a read-through cache of the results of ``read``, ``query``,
+    ``keys``, ``get_batch`` and key lookups, keyed by the normalized filters and column
+    selection. Entries expire after ``ttl`` seconds, and the least recently used
+    entries are dropped to keep the cached results within ``max_bytes``. Writes and
+    deletes through this backend drop the entries they may affect; writes made
+    elsewhere are only seen once the entries expire.
+
+    Cached results are copied on the way out, so callers may modify them.
+
+    :param backend: Backend to cache the results of.
+    :param ttl: Seconds for which a result is served from the cache.
+    :param max_bytes: Budget for the cached results, measured by their pickled size.
+    """
+
+    backend: DBBackend
+    ttl: float = 60.0
+    max_bytes: int = 64 * 2**20
+    stats: DBCacheStats = attrs.field(init=False, factory=DBCacheStats)
+    _cache: cachetools.TTLCache = attrs.field(init=False, repr=False, eq=False)
+    _lock: threading.Lock = attrs.field(init=False, factory=threading.Lock, repr=False, eq=False)
+    # Incremented by invalidations, so that results fetched before a write are not cached
+    _generation: int = attrs.field(init=False, default=0, repr=False, eq=False)
+
+    def __attrs_post_init__(self):
+        self._cache = cachetools.TTLCache(
+            maxsize=self.max_bytes, ttl=self.ttl, getsizeof=_get_entry_nbytes
+        )
+
+    def __getstate__(self) -> dict:
+        # The cache is local to the process
+        return {
+            field.name: getattr(self, field.name)
+            for field in attrs.fields(type(self))
+            if field.init
+        }
+
+    def __setstate__(self, state: dict) -> None:
+        for k, v in state.items():
+            object.__setattr__(self, k, v)
+        object.__setattr__(self, "stats", DBCacheStats())
+        object.__setattr__(self, "_lock", threading.Lock())
+        object.__setattr__(self, "_generation", 0)
+        self.__attrs_post_init__()
+
+    @property
+    def name(self) -> str:  # pragma: no cover
+        return self.backend.name
+
+    def _get_or_fetch(
+        self, key: Hashable, fetch: Callable[[], Any], row_keys: frozenset[str] | None = None
+    ) -> Any:
+        with self._lock:
+            entry = self._cache.get(key)
+            generation = self._generation
+            if entry is not None:
+                self.stats.hits += 1
+                self.stats.saved_seconds += entry.fetch_seconds
+        if entry is None:
+            start = time.perf_counter()
+            value = fetch()
+            fetch_seconds = time.perf_counter() - start
+            entry = _CacheEntry(
+                value=value,
+                nbytes=len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)),
+                fetch_seconds=fetch_seconds,
+                row_keys=row_keys,
+            )
+            with self._lock:
+                self.stats.misses += 1
+                if entry.nbytes <= self.max_bytes and generation == self._generation:
+                    self._cache[key] = entry
+        return copy.deepcopy(entry.value)
+
+    def invalidate(self, row_keys: list[str] | None = None) -> None:
+        """Drop the cached results that may be affected by writes to the given rows.
+
+        :param row_keys: Rows that were written; ``None`` drops all cached results.
+        """
+        with self._lock:
+            if row_keys is None:
+                keys = list(self._cache.keys())
+            else:
+                written = set(row_keys)
+                # Results of queries may change with any write
+                keys = [
+                    k
+                    for k, v in self._cache.items()
+                    if v.row_keys is None or not v.row_keys.isdisjoint(written)
+                ]
+            for k in keys:
+                self._cache.pop(k, None)
+            self.stats.invalidations += len(keys)
+            self._generation += 1
+
+    def __contains__(self, idx: str) -> bool:
+        return self._get_or_fetch(
+            ("contains", idx), lambda: idx in self.backend, row_keys=frozenset((idx,))
+        )
+
+    def __len__(self) -> int:
+        return self._get_or_fetch(("len",), lambda: len(self.backend))
+
+    def read(self, idx: DBIndex) -> DBDataT:
+        key = ("read", tuple(idx.row_col_keys.items()), idx.col_keys)
+        return self._get_or_fetch(
+            key, lambda: self.backend.read(idx), row_keys=frozenset(idx.row_keys)
+        )
+
+    def write(self, idx: DBIndex, data: DBDataT):
+        try:
+            self.backend.write(idx, data)
+        finally:
+            self.invalidate(idx.row_keys)
+
+    def clear(self, idx: DBIndex | None = None) -> None:
+        try:
+            self.backend.clear(idx)
+        finally:
+            self.invalidate(None if idx is None else idx.row_keys)
+
+    def keys(
+        self,
+        column_filter: dict[str, list] | None = None,
+        union: bool = True,
+    ) -> list[str]:
+        key = ("keys", _normalize_filter(column_filter), union)
+        return self._get_or_fetch(key, lambda: self.backend.keys(column_filter, union=union))
+
+    def query(
+        self,
+        column_filter: dict[str, list] | None = None,
+        return_columns: tuple[str, ...] = (),
+        union: bool = True,
+    ) -> dict[str, DBRowDataT]:
+        key = ("query", _normalize_filter(column_filter), tuple(sorted(return_columns)), union)
+        return self._get_or_fetch(
+            key,
+            lambda: self.backend.query(column_filter, return_columns=return_columns, union=union),
+        )
+
+    def get_batch(
+        self, batch_number: int, avg_rows_per_batch: int, return_columns: tuple[str, ...] = ()
+    ) -> dict[str, DBRowDataT]:
+        key = ("get_batch", batch_number, avg_rows_per_batch, tuple(sorted(return_columns)))
+        return self._get_or_fetch(
+            key,
+            lambda: self.backend.get_batch(
+                batch_number, avg_rows_per_batch, return_columns=return_columns
+            ),
+        )
+
+    def with_changes(self, **kwargs) -> CachedDBBackend:
+        """Currently not typed. See `Layer.with_backend_changes()` for the reason."""
+        return attrs.evolve(self, backend=self.backend.with_changes(**kwargs))
@@ -6,7 +6,7 @@ import sys
 from collections import defaultdict
 from copy import deepcopy
 from itertools import chain
-from typing import Any, Optional, overload
+from typing import Any, Optional, Sequence, overload
 
 import attrs
 import numpy as np
@@ -22,21 +22,33 @@ from typeguard import typechecked
 
 from zetta_utils import builder
 from zetta_utils.layer.db_layer import DBBackend, DBDataT, DBIndex, DBRowDataT
+from zetta_utils.layer.db_layer.batching import (
+    WriteBuffer,
+    WriteCoalescingMixin,
+    dispatch_batches,
+    get_shared_client,
+    split_into_batches,
+)
 
 MAX_KEYS_PER_REQUEST = 1000
+MAX_ENTITIES_PER_WRITE = 500
 TENACITY_IGNORE_EXC = (KeyError, RuntimeError, TypeError, ValueError, GoogleAPICallError)
 
 
 @builder.register("DatastoreBackend")
 @typechecked
 @attrs.mutable
-class DatastoreBackend(DBBackend):
+class DatastoreBackend(WriteCoalescingMixin, DBBackend):
     """
     Backend for IO on a given google datastore `namespace`.
 
     `namespace` is similar to a database.
 
     `project` defaults to `gcloud config get-value project` if not specified.
+
+    `max_concurrent_requests` is the number of batches of a large read or write
+    that are sent concurrently. Reads and writes are split into batches within the
+    service limits, and the client is shared by all backends with the same settings.
     """
 
     namespace: str
@@ -44,12 +56,14 @@ class DatastoreBackend(DBBackend):
     database: Optional[str] = None
     _client: Optional[Client] = None
     _exclude_from_indexes: tuple[str, ...] = ()
+    max_concurrent_requests: int = 8
+    _write_buffer: Optional[WriteBuffer] = attrs.field(init=False, default=None)
 
     @property
     def client(self) -> Client:
         if self._client is None:
-            self._client = Client(
-                project=self.project, namespace=self.namespace, database=self.database
+            self._client = get_shared_client(
+                Client, project=self.project, namespace=self.namespace, database=self.database
             )
         return self._client
 
@@ -72,7 +86,7 @@ class DatastoreBackend(DBBackend):
 
         # Skip _client, because it's unpickleable
         for field in attrs.fields_dict(cls):
-            if field == "_client":
+            if field in ("_client", "_write_buffer"):
                 setattr(result, field, None)
             else:
                 value = getattr(self, field)
@@ -83,17 +97,20 @@ class DatastoreBackend(DBBackend):
     def __getstate__(self):
         state = attrs.asdict(self)
         state["_client"] = None
+        state["_write_buffer"] = None
         return state
 
     def __setstate__(self, state: dict[str, Any]):
         for field in attrs.fields_dict(self.__class__):
-            setattr(self, field, state[field])
+            setattr(self, field, state.get(field))
 
     def __contains__(self, idx: str) -> bool:
+        self._flush_writes()
         parent_key = self.client.key("Row", idx)
         return self.client.get(parent_key) is not None
 
     def __len__(self) -> int:  # pragma: no cover # no emulator support
+        self._flush_writes()
         count_query = self.client.aggregation_query(self.client.query(kind="Row")).count()
         for aggregation_results in count_query.fetch():
             for aggregation in aggregation_results:
@@ -147,14 +164,18 @@ class DatastoreBackend(DBBackend):
         wait=wait_exponential(multiplier=1, min=4, max=10),
     )
     def read(self, idx: DBIndex) -> DBDataT:
+        self._flush_writes()
         if len(idx) == 1:
             return self._read_single_entity(idx)
         keys, _ = self._get_keys_or_entities(idx)
-        keys_splits = [
-            keys[i : i + MAX_KEYS_PER_REQUEST] for i in range(0, len(keys), MAX_KEYS_PER_REQUEST)
-        ]
         entities = [
-            entity for keys_split in keys_splits for entity in self.client.get_multi(keys_split)
+            entity
+            for batch_entities in dispatch_batches(
+                self.client.get_multi,
+                split_into_batches(keys, MAX_KEYS_PER_REQUEST),
+                self.max_concurrent_requests,
+            )
+            for entity in batch_entities
         ]
         return _get_data_from_entities(idx.row_keys, entities)
 
@@ -163,28 +184,47 @@ class DatastoreBackend(DBBackend):
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=4, max=10),
     )
-    def write(self, idx: DBIndex, data: DBDataT):
+    def _write(self, idx: DBIndex, data: DBDataT):
         entities, parent_entities = self._get_keys_or_entities(idx, data=data)
         for parent in parent_entities:
             parent["_id_nonunique"] = np.random.randint(sys.maxsize)
         # must write parent entities for aggregation query to work on `Row` entities
-        self.client.put_multi(parent_entities + entities)
+        dispatch_batches(
+            self.client.put_multi,
+            split_into_batches(parent_entities + entities, MAX_ENTITIES_PER_WRITE),
+            self.max_concurrent_requests,
+        )
 
     def _get_row_col_keys(self, row_keys: list[str], ds_keys: bool = False) -> dict:
         """
         `ds_keys` if True, use datastore self.client.key keys, else use str|int.
 
-        This is an expensive operation.
+        This is an expensive operation, with one query per row; the queries are sent
+        concurrently.
         """
+
+        def _get_col_keys(batch_row_keys: Sequence[str]) -> list[tuple]:
+            batch_result = []
+            for _row_key in batch_row_keys:
+                row_key = self.client.key("Row", _row_key)
+                _query = self.client.query(kind="Column", ancestor=row_key)
+                _query.keys_only()
+                if ds_keys:
+                    batch_result.append((row_key, tuple(ent.key for ent in _query.fetch())))
+                else:
+                    batch_result.append(
+                        (_row_key, tuple(ent.key.id_or_name for ent in _query.fetch()))
+                    )
+            return batch_result
+
+        # One batch of rows per concurrent request
+        num_batches = max(1, min(self.max_concurrent_requests, len(row_keys)))
+        batch_size = max(1, -(-len(row_keys) // num_batches))
         result = {}
-        for _row_key in row_keys:
-            row_key = self.client.key("Row", _row_key)
-            _query = self.client.query(kind="Column", ancestor=row_key)
-            _query.keys_only()
-            if ds_keys:
-                result[row_key] = tuple(ent.key for ent in _query.fetch())
-            else:
-                result[_row_key] = tuple(ent.key.id_or_name for ent in _query.fetch())
+        for batch_result in dispatch_batches(
+            _get_col_keys, split_into_batches(row_keys, batch_size), self.max_concurrent_requests
+        ):
+            result.update(batch_result)
         return result
 
     @retry(
@@ -198,12 +238,12 @@ class DatastoreBackend(DBBackend):
         If index provided, delete rows from the index.
         Else delete all rows.
         """
+        self._flush_writes()
+        keys: list[Key] = []
         if idx is not None:
-            keys: list[Key] = []
             for _key, col_keys in self._get_row_col_keys(idx.row_keys, ds_keys=True).items():
                 keys.extend(col_keys)
                 keys.append(_key)
-            self.client.delete_multi(keys=keys)
         else:
             col_query = self.client.query(kind="Column")
             col_query.keys_only()
@@ -211,7 +251,12 @@ class DatastoreBackend(DBBackend):
             row_query.keys_only()
             col_iter = col_query.fetch()
             row_iter = row_query.fetch()
-            self.client.delete_multi(keys=[ent.key for ent in chain(col_iter, row_iter)])
+            keys = [ent.key for ent in chain(col_iter, row_iter)]
+        dispatch_batches(
+            self.client.delete_multi,
+            split_into_batches(keys, MAX_ENTITIES_PER_WRITE),
+            self.max_concurrent_requests,
+        )
 
     def keys(
         self,
@@ -223,6 +268,7 @@ class DatastoreBackend(DBBackend):
 
         `column_filter` is a dict of column names with list of values to filter.
         """
+        self._flush_writes()
         _query = self.client.query(kind="Column")
         _query.keys_only()
         if column_filter:
@@ -273,6 +319,7 @@ class DatastoreBackend(DBBackend):
         `return_columns` is a tuple of column names to read from rows.
             If provided, this can signifincantly improve performance based on the backend used.
         """
+        self._flush_writes()
         if len(self) == 0:
             return {}
 
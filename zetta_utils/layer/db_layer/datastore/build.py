@@ -17,6 +17,7 @@ def build_datastore_layer(
     database: str | None = None,
     exclude_from_indexes: tuple[str, ...] = (),
     readonly: bool = False,
+    cache_ttl: float | None = None,
 ) -> DBLayer:
     """Build a Datastore Layer.
 
@@ -25,6 +26,7 @@ def build_datastore_layer(
     :param database: GCP Datastore database to use.
     :param exclude_from_indexes: Tuple of column names to not be indexed.
     :param readonly: Whether layer is read only.
+    :param cache_ttl: If given, cache reads and queries for this many seconds.
 
     :return: Datastore Layer built according to the spec.
 
@@ -32,5 +34,5 @@ def build_datastore_layer(
 
     backend = DatastoreBackend(namespace, project=project, database=database)
     backend.exclude_from_indexes = exclude_from_indexes
-    result = build_db_layer(backend=backend, readonly=readonly)
+    result = build_db_layer(backend=backend, readonly=readonly, cache_ttl=cache_ttl)
     return result
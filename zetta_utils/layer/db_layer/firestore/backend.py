@@ -4,12 +4,12 @@ from __future__ import annotations
 
 import sys
 from copy import copy, deepcopy
-from typing import Any, Optional
+from typing import Any, Optional, Sequence
 
 import attrs
 import numpy as np
 from google.api_core.exceptions import GoogleAPICallError
-from google.cloud.firestore import And, Client, FieldFilter, Or
+from google.cloud.firestore import And, Client, DocumentReference, FieldFilter, Or
 from tenacity import (
     retry,
     retry_if_not_exception_type,
@@ -20,6 +20,13 @@ from typeguard import typechecked
 
 from zetta_utils import builder
 from zetta_utils.layer.db_layer import DBBackend, DBDataT, DBIndex, DBRowDataT
+from zetta_utils.layer.db_layer.batching import (
+    WriteBuffer,
+    WriteCoalescingMixin,
+    dispatch_batches,
+    get_shared_client,
+    split_into_batches,
+)
 
 MAX_KEYS_PER_REQUEST = 1000
 TENACITY_IGNORE_EXC = (KeyError, RuntimeError, TypeError, ValueError, GoogleAPICallError)
@@ -28,7 +35,7 @@ TENACITY_IGNORE_EXC = (KeyError, RuntimeError, TypeError, ValueError, GoogleAPIC
 @builder.register("FirestoreBackend")
 @typechecked
 @attrs.mutable
-class FirestoreBackend(DBBackend):
+class FirestoreBackend(WriteCoalescingMixin, DBBackend):
     """
     Backend for IO on a given `collection` in a google firestore `database` .
 
@@ -37,17 +44,24 @@ class FirestoreBackend(DBBackend):
     `database` the google firestore database id.
 
     `project` defaults to `gcloud config get-value project` if not specified.
+
+    `max_concurrent_requests` is the number of batches of a large read that are sent
+    concurrently. Reads are split into batches within the service limits, while writes
+    and deletes are batched and throttled by a `BulkWriter`. The client is shared by
+    all backends with the same settings.
     """
 
     collection: str
     database: Optional[str] = None
     project: Optional[str] = None
     _client: Optional[Client] = None
+    max_concurrent_requests: int = 8
+    _write_buffer: Optional[WriteBuffer] = attrs.field(init=False, default=None)
 
     @property
     def client(self) -> Client:
         if self._client is None:
-            self._client = Client(project=self.project, database=self.database)
+            self._client = get_shared_client(Client, project=self.project, database=self.database)
         return self._client
 
     @property
@@ -61,7 +75,7 @@ class FirestoreBackend(DBBackend):
 
         # Skip _client, because it's unpickleable
         for field in attrs.fields_dict(cls):
-            if field == "_client":
+            if field in ("_client", "_write_buffer"):
                 setattr(result, field, None)
             else:
                 value = getattr(self, field)
@@ -72,17 +86,20 @@ class FirestoreBackend(DBBackend):
     def __getstate__(self):
         state = attrs.asdict(self)
         state["_client"] = None
+        state["_write_buffer"] = None
         return state
 
     def __setstate__(self, state: dict[str, Any]):
         for field in attrs.fields_dict(self.__class__):
-            setattr(self, field, state[field])
+            setattr(self, field, state.get(field))
 
     def __contains__(self, idx: str) -> bool:
+        self._flush_writes()
         doc_ref = self.client.collection(self.collection).document(idx)
         return doc_ref.get().exists
 
     def __len__(self) -> int:  # pragma: no cover # no emulator support
+        self._flush_writes()
         collection_ref = self.client.collection(self.collection)
         count_query = collection_ref.count()
         results = count_query.get()
@@ -94,34 +111,60 @@ class FirestoreBackend(DBBackend):
         wait=wait_exponential(multiplier=1, min=4, max=10),
     )
     def read(self, idx: DBIndex) -> DBDataT:
-        if len(idx) == 1:
-            if idx.row_keys[0] not in self:
-                raise KeyError(idx.row_keys[0])
+        self._flush_writes()
         refs = [self.client.collection(self.collection).document(k) for k in idx.row_keys]
-        snapshots = self.client.get_all(refs, field_paths=idx.col_keys)
         results_map = {}
-        for snapshot in snapshots:
+        for snapshot in self._get_all(refs, field_paths=idx.col_keys):
             if snapshot.exists:
                 results_map[snapshot.id] = snapshot.to_dict()
                 results_map[snapshot.id].pop("_id_nonunique", None)
+        if len(idx) == 1 and idx.row_keys[0] not in results_map:
+            raise KeyError(idx.row_keys[0])
         results = []
         for rkey in idx.row_keys:
             results.append(results_map.get(rkey, {}))
         return results
 
+    def _get_all(
+        self, refs: Sequence[DocumentReference], field_paths: Sequence[str] | None = None
+    ) -> list:
+        return [
+            snapshot
+            for batch_snapshots in dispatch_batches(
+                lambda batch: list(self.client.get_all(batch, field_paths=field_paths)),
+                split_into_batches(refs, MAX_KEYS_PER_REQUEST),
+                self.max_concurrent_requests,
+            )
+            for snapshot in batch_snapshots
+        ]
+
+    def _commit_batches(self, ops: Sequence[tuple[DocumentReference, DBRowDataT | None]]):
+        """
+        Commits `(ref, row_data)` sets, or deletes when `row_data` is `None`, through a
+        `BulkWriter`, which sends them in concurrent batches with the 500/50/5 ramp-up
+        and retries each failed document on its own.
+        """
+        bulk_writer = self.client.bulk_writer()
+        for ref, row_data in ops:
+            if row_data is None:
+                bulk_writer.delete(ref)
+            else:
+                bulk_writer.set(ref, row_data, merge=True)
+        bulk_writer.flush()
+
     @retry(
         retry=retry_if_not_exception_type(TENACITY_IGNORE_EXC),
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=4, max=10),
     )
-    def write(self, idx: DBIndex, data: DBDataT):
+    def _write(self, idx: DBIndex, data: DBDataT):
         doc_refs = [self.client.collection(self.collection).document(k) for k in idx.row_keys]
-        bulk_writer = self.client.bulk_writer()
+        ops: list[tuple[DocumentReference, DBRowDataT | None]] = []
         for ref, row_data in zip(doc_refs, data):
             row_data = copy(row_data)
             row_data["_id_nonunique"] = np.random.randint(sys.maxsize)
-            bulk_writer.set(ref, row_data, merge=True)
-        bulk_writer.flush()
+            ops.append((ref, row_data))
+        self._commit_batches(ops)
 
     @retry(
         retry=retry_if_not_exception_type(TENACITY_IGNORE_EXC),
@@ -134,15 +177,13 @@ class FirestoreBackend(DBBackend):
 
         If index provided, delete rows from the index; else, delete all rows.
         """
-        bulk_writer = self.client.bulk_writer()
+        self._flush_writes()
         if idx is not None:
             doc_refs = [self.client.collection(self.collection).document(k) for k in idx.row_keys]
         else:
             collection_ref = self.client.collection(self.collection)
-            doc_refs = collection_ref.list_documents()
-        for ref in doc_refs:
-            bulk_writer.delete(ref)
-        bulk_writer.flush()
+            doc_refs = list(collection_ref.list_documents())
+        self._commit_batches([(ref, None) for ref in doc_refs])
 
     def keys(
         self,
@@ -171,6 +212,7 @@ class FirestoreBackend(DBBackend):
         `return_columns` is a tuple of column names to read from matched rows.
             If None, all columns are returned.
         """
+        self._flush_writes()
         collection_ref = self.client.collection(self.collection)
         if column_filter:
             _filters = []
@@ -192,8 +234,8 @@ class FirestoreBackend(DBBackend):
                     _q = collection_ref.where(filter=And(_filters))
             snapshots = list(_q.stream())
         else:
-            refs = collection_ref.list_documents()
-            snapshots = self.client.get_all(
+            refs = list(collection_ref.list_documents())
+            snapshots = self._get_all(
                 refs, field_paths=return_columns if len(return_columns) > 0 else None
             )
         result = {}
@@ -216,6 +258,7 @@ class FirestoreBackend(DBBackend):
         `avg_rows_per_batch` approximate number of rows returned per batch.
             Also used to determine the total number of batches.
         """
+        self._flush_writes()
         if len(self) == 0:
             return {}
 
@@ -16,6 +16,7 @@ def build_firestore_layer(
     database: str | None = None,
     project: str | None = None,
     readonly: bool = False,
+    cache_ttl: float | None = None,
 ) -> DBLayer:
     """Build a Firestore Layer.
 
@@ -23,11 +24,12 @@ def build_firestore_layer(
     :param database: GCP Firestore database to use.
     :param project: Google Cloud project ID.
     :param readonly: Whether layer is read only.
+    :param cache_ttl: If given, cache reads and queries for this many seconds.
 
     :return: Datastore Layer built according to the spec.
 
     """
 
     backend = FirestoreBackend(collection, database=database, project=project)
-    result = build_db_layer(backend=backend, readonly=readonly)
+    result = build_db_layer(backend=backend, readonly=readonly, cache_ttl=cache_ttl)
     return result
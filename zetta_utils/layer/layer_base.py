@@ -7,6 +7,8 @@ from typing import Any, Generic, Iterable, TypeVar, Union
 
 import attrs
 
+from zetta_utils.common import tracing
+
 from . import Backend, DataProcessor, IndexProcessor, JointIndexDataProcessor
 
 BackendIndexT = TypeVar("BackendIndexT")
@@ -50,15 +52,17 @@ class Layer(Generic[BackendIndexT, BackendDataT, BackendDataWriteT]):
                     idx_proced = e.process_index(idx=idx_proced, mode="read")
                     applied_joint_processors_idxs.add(i)
 
-        data_backend = self.backend.read(idx=idx_proced)
+        with tracing.span("backend.read"):
+            data_backend = self.backend.read(idx=idx_proced)
 
         data_proced = data_backend
-        for i, e in enumerate(self.read_procs):
-            if isinstance(e, JointIndexDataProcessor):
-                if i in applied_joint_processors_idxs:
-                    data_proced = e.process_data(data=data_proced, mode="read")
-            else:
-                data_proced = e(data_proced)
+        with tracing.span("read_procs"):
+            for i, e in enumerate(self.read_procs):
+                if isinstance(e, JointIndexDataProcessor):
+                    if i in applied_joint_processors_idxs:
+                        data_proced = e.process_data(data=data_proced, mode="read")
+                else:
+                    data_proced = e(data_proced)
 
         return data_proced
 
@@ -83,14 +87,16 @@ class Layer(Generic[BackendIndexT, BackendDataT, BackendDataWriteT]):
                     applied_joint_processors_idxs.add(i)
 
         data_proced = data
-        for i, e in enumerate(self.write_procs):
-            if isinstance(e, JointIndexDataProcessor):
-                if i in applied_joint_processors_idxs:
-                    data_proced = e.process_data(data=data_proced, mode="write")
-            else:
-                data_proced = e(data_proced)
-
-        self.backend.write(idx=idx_proced, data=data_proced)
+        with tracing.span("write_procs"):
+            for i, e in enumerate(self.write_procs):
+                if isinstance(e, JointIndexDataProcessor):
+                    if i in applied_joint_processors_idxs:
+                        data_proced = e.process_data(data=data_proced, mode="write")
+                else:
+                    data_proced = e(data_proced)
+
+        with tracing.span("backend.write"):
+            self.backend.write(idx=idx_proced, data=data_proced)
 
     @property
     def name(self) -> str:  # pragma: no cover
@@ -12,7 +12,7 @@ from cloudvolume import CloudVolume
 from cloudvolume.exceptions import ScaleUnavailableError
 from numpy import typing as npt
 
-from zetta_utils.common import abspath, is_local
+from zetta_utils.common import abspath, is_local, metrics
 from zetta_utils.geometry import Vec3D
 
 from ...precomputed import PrecomputedInfoSpec, get_info
@@ -204,11 +204,13 @@ class CVBackend(VolumetricBackend):  # pylint: disable=too-few-public-methods
 
     def read(self, idx: VolumetricIndex) -> npt.NDArray:
         # Data out: cxyz
-        cvol = _get_cv_cached(self.path, idx.resolution, **self.cv_kwargs)
-        data_raw = cvol[idx.to_slices()]
+        with metrics.record_time("backend_read_seconds"):
+            cvol = _get_cv_cached(self.path, idx.resolution, **self.cv_kwargs)
+            data_raw = cvol[idx.to_slices()]
 
-        result = np.transpose(data_raw, (3, 0, 1, 2))
-        return np.array(result)
+            result = np.array(np.transpose(data_raw, (3, 0, 1, 2)))
+        metrics.increment("backend_read_bytes", result.nbytes)
+        return result
 
     def write(self, idx: VolumetricIndex, data: npt.NDArray):
         # Data in: cxyz
@@ -235,7 +237,9 @@ class CVBackend(VolumetricBackend):  # pylint: disable=too-few-public-methods
             if data_final.min() < np.int64(0):
                 raise ValueError("Attempting to write negative values to a uint64 CloudVolume")
             data_final = data_final.astype(np.uint64)
-        cvol[slices] = data_final
+        with metrics.record_time("backend_write_seconds"):
+            cvol[slices] = data_final
+        metrics.increment("backend_write_bytes", np.asarray(data_final).nbytes)
         cvol.autocrop = False
 
     def with_changes(self, **kwargs) -> CVBackend:
@@ -14,7 +14,7 @@ from numpy import typing as npt
 from typeguard import suppress_type_checks
 
 from zetta_utils import tensor_ops
-from zetta_utils.common import abspath, is_local
+from zetta_utils.common import abspath, is_local, metrics
 from zetta_utils.geometry import Vec3D
 
 from ...precomputed import PrecomputedInfoSpec
@@ -205,7 +205,9 @@ class TSBackend(VolumetricBackend):  # pylint: disable=too-few-public-methods
             bounds = self.get_bounds(idx.resolution)
             idx_inbounds = bounds.intersection(idx)
 
-        data_raw = np.array(ts[idx_inbounds.to_slices()])
+        with metrics.record_time("backend_read_seconds"):
+            data_raw = np.array(ts[idx_inbounds.to_slices()])
+        metrics.increment("backend_read_bytes", data_raw.nbytes)
 
         if idx_inbounds != idx:
             with suppress_type_checks():
@@ -244,10 +246,12 @@ class TSBackend(VolumetricBackend):  # pylint: disable=too-few-public-methods
             with suppress_type_checks():
                 _, subindex = bounds.get_intersection_and_subindex(idx)
             slices = idx_inbounds.to_slices()
-            ts[slices] = data_final[subindex]
+            data_final = data_final[subindex]
         else:
             slices = idx.to_slices()
+        with metrics.record_time("backend_write_seconds"):
             ts[slices] = data_final
+        metrics.increment("backend_write_bytes", np.asarray(data_final).nbytes)
 
     def with_changes(self, **kwargs) -> TSBackend:
         """Currently untyped. Supports:
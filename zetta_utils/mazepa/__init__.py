@@ -27,6 +27,7 @@ from .execution_state import ExecutionState, InMemoryExecutionState
 
 from . import dryrun
 from .progress_tracker import progress_ctx_mngr
+from . import metrics, tracing
 from .execution import Executor, execute
 from .worker import run_worker
 from .semaphores import SemaphoreType, configure_semaphores, semaphore
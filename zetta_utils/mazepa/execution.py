@@ -13,6 +13,7 @@ from typeguard import typechecked
 
 from zetta_utils import log
 from zetta_utils.common import ComparablePartial
+from zetta_utils.common.tracing import ProfileMode
 from zetta_utils.mazepa.autoexecute_task_queue import AutoexecuteTaskQueue
 from zetta_utils.message_queues.base import PullMessageQueue, PushMessageQueue
 
@@ -20,9 +21,11 @@ from . import Flow, Task, dryrun, sequential_flow
 from .execution_checkpoint import EXECUTION_CHECKPOINT_PATH, record_execution_checkpoint
 from .execution_state import ExecutionState, InMemoryExecutionState
 from .id_generation import get_unique_id
+from .metrics import MetricsAggregator, serve_prometheus_metrics
 from .progress_tracker import progress_ctx_mngr
 from .task_outcome import OutcomeReport, TaskStatus
 from .tasks import _TaskableOperation
+from .tracing import TraceCollector
 
 logger = log.get_logger("mazepa")
 
@@ -40,6 +43,11 @@ class Executor:
     checkpoint: Optional[str] = None
     checkpoint_interval_sec: Optional[float] = None
     raise_on_failed_checkpoint: bool = True
+    metrics_port: Optional[int] = None
+    metrics_summary_path: Optional[str] = None
+    trace_fraction: float = 0.0
+    trace_profile: Optional[ProfileMode] = None
+    trace_output_path: Optional[str] = None
 
     def __call__(self, target: Union[Task, Flow, ExecutionState, ComparablePartial, Callable]):
         assert (self.task_queue is None and self.outcome_queue is None) or (
@@ -58,6 +66,11 @@ class Executor:
             checkpoint=self.checkpoint,
             checkpoint_interval_sec=self.checkpoint_interval_sec,
             raise_on_failed_checkpoint=self.raise_on_failed_checkpoint,
+            metrics_port=self.metrics_port,
+            metrics_summary_path=self.metrics_summary_path,
+            trace_fraction=self.trace_fraction,
+            trace_profile=self.trace_profile,
+            trace_output_path=self.trace_output_path,
         )
 
 
@@ -78,14 +91,31 @@ def execute(
     raise_on_failed_checkpoint: bool = True,
     write_progress_summary: bool = False,
     require_interrupt_confirm: bool = True,
+    metrics_port: Optional[int] = None,
+    metrics_summary_path: Optional[str] = None,
+    trace_fraction: float = 0.0,
+    trace_profile: Optional[ProfileMode] = None,
+    trace_output_path: Optional[str] = None,
 ):
     """
     Executes a target until completion using the given execution queue.
     Execution is performed by making an execution state from the target and passing new task
     batches and completed task ids between the state and the execution queue.
 
+    Metrics shipped with the task outcomes are aggregated per operation name. They are
+    served in the Prometheus text format at ``/metrics`` on ``metrics_port`` during the
+    execution if given, and written as a JSON summary to ``metrics_summary_path`` at the
+    end of the execution if given.
+
+    A ``trace_fraction`` of the tasks, sampled by id, record a trace of their execution,
+    optionally profiled according to ``trace_profile``. The traces are merged into
+    Chrome trace, speedscope and ``cProfile`` files written to the ``trace_output_path``
+    directory at the end of the execution.
+
     Implementation: this function performs misc setup and delegates to _execute_from_state.
     """
+    if trace_fraction > 0 and trace_output_path is None:
+        raise ValueError("`trace_output_path` must be given when `trace_fraction` is positive.")
     if execution_id is None:
         execution_id_final = get_unique_id(
             prefix="default-exec", slug_len=4, add_uuid=False, max_len=50
@@ -129,20 +159,38 @@ def execute(
         logger.debug(f"STARTING: execution of {target}.")
         start_time = time.time()
 
-        _execute_from_state(
-            execution_id=execution_id_final,
-            state=state,
-            task_queue=task_queue_,
-            outcome_queue=outcome_queue_,
-            max_batch_len=max_batch_len,
-            batch_gap_sleep_sec=batch_gap_sleep_sec,
-            do_dryrun_estimation=do_dryrun_estimation,
-            show_progress=show_progress,
-            checkpoint_interval_sec=checkpoint_interval_sec,
-            raise_on_failed_checkpoint=raise_on_failed_checkpoint,
-            write_progress_summary=write_progress_summary,
-            require_interrupt_confirm=require_interrupt_confirm,
-        )
+        metrics_aggregator = MetricsAggregator()
+        trace_collector = None
+        if trace_fraction > 0:
+            trace_collector = TraceCollector(
+                fraction=trace_fraction, profile=trace_profile, output_path=trace_output_path
+            )
+        with ExitStack() as stack:
+            if metrics_port is not None:
+                stack.enter_context(serve_prometheus_metrics(metrics_aggregator, metrics_port))
+            try:
+                _execute_from_state(
+                    execution_id=execution_id_final,
+                    state=state,
+                    task_queue=task_queue_,
+                    outcome_queue=outcome_queue_,
+                    max_batch_len=max_batch_len,
+                    batch_gap_sleep_sec=batch_gap_sleep_sec,
+                    do_dryrun_estimation=do_dryrun_estimation,
+                    show_progress=show_progress,
+                    checkpoint_interval_sec=checkpoint_interval_sec,
+                    raise_on_failed_checkpoint=raise_on_failed_checkpoint,
+                    write_progress_summary=write_progress_summary,
+                    require_interrupt_confirm=require_interrupt_confirm,
+                    metrics_aggregator=metrics_aggregator,
+                    trace_collector=trace_collector,
+                )
+            finally:
+                if metrics_summary_path is not None:
+                    metrics_aggregator.write_summary(metrics_summary_path)
+                if trace_collector is not None:
+                    assert trace_output_path is not None
+                    trace_collector.write(trace_output_path)
 
         end_time = time.time()
         logger.debug(f"DONE: mazepa execution of {target}.")
@@ -162,6 +210,8 @@ def _execute_from_state(
     raise_on_failed_checkpoint: bool,
     write_progress_summary: bool,
     require_interrupt_confirm: bool,
+    metrics_aggregator: MetricsAggregator | None = None,
+    trace_collector: TraceCollector | None = None,
     num_procs: int = 8,
 ):
     if do_dryrun_estimation:
@@ -198,7 +248,14 @@ def _execute_from_state(
                     break
 
                 submit_ready_tasks(
-                    task_queue, outcome_queue, state, execution_id, max_batch_len, pool=pool
+                    task_queue,
+                    outcome_queue,
+                    state,
+                    execution_id,
+                    max_batch_len,
+                    pool=pool,
+                    metrics_aggregator=metrics_aggregator,
+                    trace_collector=trace_collector,
                 )
 
                 if not isinstance(task_queue, AutoexecuteTaskQueue):
@@ -232,12 +289,20 @@ def submit_ready_tasks(
     execution_id: str,
     max_batch_len: int,
     pool: ThreadPoolExecutor,
+    metrics_aggregator: MetricsAggregator | None = None,
+    trace_collector: TraceCollector | None = None,
 ):
     logger.debug("Pulling task outcomes...")
     task_outcomes = outcome_queue.pull(max_num=100)
 
     if len(task_outcomes) > 0:
         logger.debug(f"Received {len(task_outcomes)} completed task outcomes.")
+        if metrics_aggregator is not None:
+            for e in task_outcomes:
+                metrics_aggregator.add_outcome(e.payload.outcome)
+        if trace_collector is not None:
+            for e in task_outcomes:
+                trace_collector.add_outcome(e.payload.outcome)
         logger.debug("Updating execution state with task outcomes.")
         # breakpoint()
         state.update_with_task_outcomes(
@@ -260,8 +325,12 @@ def submit_ready_tasks(
     task_batch = state.get_task_batch(max_batch_len=max_batch_len)
     logger.debug(f"A batch of {len(task_batch)} tasks ready for execution.")
 
+    submission_ts = time.time()
     for task in task_batch:
         task.execution_id = execution_id
+        task.submission_ts = submission_ts
+        if trace_collector is not None:
+            trace_collector.sample_task(task)
     logger.debug("Pushing task batch to queue.")
     task_queue.push(task_batch)
     for task in task_batch:
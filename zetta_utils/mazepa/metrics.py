@@ -0,0 +1,167 @@
+"""
+Aggregation of the metrics shipped with task outcomes, per operation name.
+"""
+from __future__ import annotations
+
+import contextlib
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Generator
+
+import attrs
+import fsspec
+
+from zetta_utils import log
+from zetta_utils.common.metrics import MetricsSnapshot
+
+from .task_outcome import TaskOutcome
+
+logger = log.get_logger("mazepa")
+
+UNKNOWN_OPERATION_NAME = "unknown"
+PROMETHEUS_PREFIX = "mazepa_"
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+SUMMARY_QUANTILES = (0.5, 0.9, 0.99)
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _get_prometheus_name(name: str) -> str:
+    return PROMETHEUS_PREFIX + re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+def _format_float(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+@attrs.mutable
+class MetricsAggregator:
+    """
+    Accumulates the metrics of task outcomes per operation name, and exports them.
+    """
+
+    tasks_count: dict[str, int] = attrs.field(factory=dict)
+    metrics: dict[str, MetricsSnapshot] = attrs.field(factory=dict)
+    _lock: threading.Lock = attrs.field(factory=threading.Lock, repr=False, eq=False)
+
+    def add_outcome(self, outcome: TaskOutcome) -> None:
+        operation_name = outcome.operation_name or UNKNOWN_OPERATION_NAME
+        with self._lock:
+            self.tasks_count[operation_name] = self.tasks_count.get(operation_name, 0) + 1
+            if outcome.metrics is not None:
+                if operation_name not in self.metrics:
+                    self.metrics[operation_name] = MetricsSnapshot()
+                self.metrics[operation_name].merge(outcome.metrics)
+
+    def get_prometheus_text(self) -> str:
+        """Renders the metrics in the Prometheus text exposition format."""
+        counters: dict[str, list[str]] = {}
+        histograms: dict[str, list[str]] = {}
+        with self._lock:
+            tasks_name = _get_prometheus_name("tasks_completed_total")
+            counters[tasks_name] = [
+                f'{tasks_name}{{operation="{_escape_label_value(op)}"}} {count}'
+                for op, count in self.tasks_count.items()
+            ]
+            for op, snapshot in self.metrics.items():
+                label = f'operation="{_escape_label_value(op)}"'
+                for name, value in snapshot.counters.items():
+                    prom_name = _get_prometheus_name(name + "_total")
+                    counters.setdefault(prom_name, []).append(
+                        f"{prom_name}{{{label}}} {_format_float(value)}"
+                    )
+                for name, histogram in snapshot.histograms.items():
+                    prom_name = _get_prometheus_name(name)
+                    lines = histograms.setdefault(prom_name, [])
+                    cumulative = 0
+                    for bound, bucket_count in zip(
+                        histogram.bounds + (float("inf"),), histogram.bucket_counts
+                    ):
+                        cumulative += bucket_count
+                        lines.append(
+                            f'{prom_name}_bucket{{{label},le="{_format_float(bound)}"}} '
+                            f"{cumulative}"
+                        )
+                    lines.append(f"{prom_name}_sum{{{label}}} {_format_float(histogram.total)}")
+                    lines.append(f"{prom_name}_count{{{label}}} {histogram.count}")
+
+        result = []
+        for prom_name, lines in counters.items():
+            result.append(f"# TYPE {prom_name} counter")
+            result.extend(lines)
+        for prom_name, lines in histograms.items():
+            result.append(f"# TYPE {prom_name} histogram")
+            result.extend(lines)
+        return "\n".join(result) + "\n"
+
+    def get_summary(self) -> dict[str, Any]:
+        """Summarizes the metrics per operation, with approximate quantiles of histograms."""
+        result: dict[str, Any] = {}
+        with self._lock:
+            for op, count in self.tasks_count.items():
+                snapshot = self.metrics.get(op, MetricsSnapshot())
+                result[op] = {
+                    "tasks_completed": count,
+                    "counters": dict(snapshot.counters),
+                    "histograms": {
+                        name: {
+                            "count": histogram.count,
+                            "sum": histogram.total,
+                            "mean": histogram.mean,
+                            **{
+                                f"p{round(q * 100)}": histogram.quantile(q)
+                                for q in SUMMARY_QUANTILES
+                            },
+                        }
+                        for name, histogram in snapshot.histograms.items()
+                    },
+                }
+        return result
+
+    def write_summary(self, path: str) -> None:
+        """Writes the summary as JSON to the given local or remote path."""
+        with fsspec.open(path, "w") as f:
+            json.dump(self.get_summary(), f, indent=2)
+        logger.info(f"Wrote metrics summary to {path}.")
+
+
+@contextlib.contextmanager
+def serve_prometheus_metrics(
+    aggregator: MetricsAggregator, port: int, host: str = "0.0.0.0"
+) -> Generator[ThreadingHTTPServer, None, None]:
+    """
+    Serves the aggregated metrics at ``http://{host}:{port}/metrics`` while the
+    context is active.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):  # pylint: disable=invalid-name
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = aggregator.get_prometheus_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", PROMETHEUS_CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    logger.info(f"Serving mazepa metrics at http://{host}:{server.server_address[1]}/metrics")
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
@@ -0,0 +1,337 @@
+"""
+Adaptive tuning of the effective width of semaphores.
+
+The semaphore is created with the maximum allowed width, and the controller holds
+the permits above the current limit. At a fixed interval, the controller observes
+the number of releases and the total wait and hold times of the semaphore since
+the previous observation, and a policy decides on the next limit.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Literal, Protocol
+
+import attrs
+
+from zetta_utils import log
+
+logger = log.get_logger("mazepa")
+
+SemaphorePolicyName = Literal["aimd", "hill_climbing"]
+
+
+@attrs.frozen
+class SemaphoreUsage:
+    """
+    Cumulative usage counters of a semaphore.
+
+    :param releases: Number of completed acquire/release cycles.
+    :param wait_sec: Total time spent waiting to acquire the semaphore.
+    :param hold_sec: Total time the semaphore was held.
+    """
+
+    releases: int = 0
+    wait_sec: float = 0.0
+    hold_sec: float = 0.0
+
+
+@attrs.frozen
+class SemaphoreObservation:
+    """
+    Usage of a semaphore over an interval, at the given limit.
+    """
+
+    duration_sec: float
+    limit: int
+    releases: int
+    wait_sec: float
+    hold_sec: float
+
+    @property
+    def throughput(self) -> float:
+        return self.releases / self.duration_sec if self.duration_sec > 0 else 0.0
+
+    @property
+    def utilization(self) -> float:
+        # Average number of held permits (Little's law) over the limit
+        if self.duration_sec <= 0 or self.limit <= 0:
+            return 0.0
+        return self.hold_sec / self.duration_sec / self.limit
+
+    @property
+    def mean_wait_sec(self) -> float:
+        return self.wait_sec / self.releases if self.releases > 0 else 0.0
+
+    @property
+    def mean_hold_sec(self) -> float:
+        return self.hold_sec / self.releases if self.releases > 0 else 0.0
+
+    def is_constrained(self, saturation_threshold: float, wait_ratio: float) -> bool:
+        """Whether the permits are mostly in use while acquisitions have to wait."""
+        return (
+            self.utilization >= saturation_threshold
+            and self.mean_wait_sec > wait_ratio * self.mean_hold_sec
+        )
+
+
+class SemaphorePolicy(Protocol):
+    def decide(
+        self, observation: SemaphoreObservation, min_limit: int, max_limit: int
+    ) -> tuple[int, str]:
+        """Returns the next limit, and the reason for it."""
+
+
+@attrs.mutable
+class AIMDPolicy:
+    """
+    Additive increase while the semaphore is constrained, and multiplicative decrease
+    when an increase does not pay off in throughput, which indicates that the guarded
+    resource is saturated. While constrained at the maximum limit, the limit is
+    periodically decreased to probe whether the resource is oversubscribed.
+
+    :param increase_step: Additive increase of the limit.
+    :param decrease_factor: Multiplicative decrease of the limit.
+    :param min_gain: Fraction of the proportional throughput gain that an increase
+        must bring to be kept.
+    :param saturation_threshold: Utilization above which the semaphore may be
+        constrained.
+    :param wait_ratio: Ratio of the mean wait time to the mean hold time above which
+        the semaphore may be constrained.
+    :param probe_interval: Number of decisions at the maximum limit between probes.
+    """
+
+    increase_step: int = 1
+    decrease_factor: float = 0.75
+    min_gain: float = 0.5
+    saturation_threshold: float = 0.8
+    wait_ratio: float = 0.05
+    probe_interval: int = 30
+    _previous: SemaphoreObservation | None = attrs.field(init=False, default=None)
+    _increased: bool = attrs.field(init=False, default=False)
+    _decisions_at_max: int = attrs.field(init=False, default=0)
+
+    def _decrease(self, limit: int, min_limit: int) -> int:
+        return max(min_limit, min(limit - 1, int(limit * self.decrease_factor)))
+
+    def decide(
+        self, observation: SemaphoreObservation, min_limit: int, max_limit: int
+    ) -> tuple[int, str]:
+        limit = observation.limit
+        if observation.releases == 0:
+            return limit, "no releases"
+        previous = self._previous
+        increased = self._increased
+        self._previous = observation
+        self._increased = False
+        if increased and previous is not None and previous.limit < limit:
+            expected_gain = (limit - previous.limit) / previous.limit
+            required = previous.throughput * (1 + self.min_gain * expected_gain)
+            # Throughput also drops with demand, which leaves the permits unused
+            saturated = observation.utilization >= self.saturation_threshold
+            if saturated and observation.throughput < required and limit > min_limit:
+                return (
+                    self._decrease(limit, min_limit),
+                    f"decrease: throughput {observation.throughput:.2f}/s at {limit} "
+                    f"from {previous.throughput:.2f}/s at {previous.limit}",
+                )
+        if not observation.is_constrained(self.saturation_threshold, self.wait_ratio):
+            self._decisions_at_max = 0
+            return limit, "hold: not constrained"
+        if limit < max_limit:
+            self._decisions_at_max = 0
+            self._increased = True
+            return (
+                min(max_limit, limit + self.increase_step),
+                f"increase: utilization {observation.utilization:.2f}, "
+                f"mean wait {observation.mean_wait_sec:.3f}s",
+            )
+        self._decisions_at_max += 1
+        if self._decisions_at_max >= self.probe_interval and limit > min_limit:
+            self._decisions_at_max = 0
+            return self._decrease(limit, min_limit), "probe: decrease from the maximum"
+        return limit, "hold: at maximum"
+
+
+@attrs.mutable
+class HillClimbingPolicy:
+    """
+    Steps the limit in one direction while the throughput does not drop, and reverses
+    the direction when it does. Increases are only attempted while the semaphore is
+    constrained.
+
+    :param step: Change of the limit per decision.
+    :param tolerance: Relative drop in throughput that reverses the direction.
+    :param saturation_threshold: Utilization above which the semaphore may be
+        constrained.
+    :param wait_ratio: Ratio of the mean wait time to the mean hold time above which
+        the semaphore may be constrained.
+    """
+
+    step: int = 1
+    tolerance: float = 0.05
+    saturation_threshold: float = 0.8
+    wait_ratio: float = 0.05
+    _direction: int = attrs.field(init=False, default=1)
+    _previous_throughput: float | None = attrs.field(init=False, default=None)
+
+    def decide(
+        self, observation: SemaphoreObservation, min_limit: int, max_limit: int
+    ) -> tuple[int, str]:
+        limit = observation.limit
+        if observation.releases == 0:
+            return limit, "no releases"
+        throughput = observation.throughput
+        previous_throughput = self._previous_throughput
+        self._previous_throughput = throughput
+        reason = f"throughput {throughput:.2f}/s"
+        if previous_throughput is not None and throughput < previous_throughput * (
+            1 - self.tolerance
+        ):
+            self._direction = -self._direction
+            reason = f"reverse: throughput {throughput:.2f}/s from {previous_throughput:.2f}/s"
+        if self._direction > 0 and not observation.is_constrained(
+            self.saturation_threshold, self.wait_ratio
+        ):
+            return limit, "hold: not constrained"
+        new_limit = min(max_limit, max(min_limit, limit + self._direction * self.step))
+        if new_limit == limit:
+            self._direction = -self._direction
+            return limit, f"hold: at bound, {reason}"
+        return new_limit, reason
+
+
+def get_semaphore_policy(name: SemaphorePolicyName) -> SemaphorePolicy:
+    if name == "aimd":
+        return AIMDPolicy()
+    if name == "hill_climbing":
+        return HillClimbingPolicy()
+    raise ValueError(f"`{name}` is not a valid semaphore policy.")
+
+
+@attrs.frozen
+class SemaphoreDecision:
+    timestamp: float
+    observation: SemaphoreObservation
+    limit: int
+    reason: str
+
+
+@attrs.mutable
+class SemaphoreController:  # pylint: disable=too-many-instance-attributes
+    """
+    Adjusts the effective width of a semaphore between ``min_limit`` and ``max_limit``.
+
+    :param name: Name of the semaphore, for logging.
+    :param sema: Semaphore of width ``max_limit``, supporting ``acquire(timeout=0)``
+        and ``release()``.
+    :param read_usage: Returns the cumulative usage counters of the semaphore.
+    :param policy: Policy deciding on the limits.
+    :param initial_limit: Limit to start from.
+    :param interval_sec: Interval between decisions.
+    :param busy_error_cls: Exception raised by ``sema.acquire`` when the semaphore
+        cannot be acquired without waiting.
+    """
+
+    name: str
+    sema: Any
+    read_usage: Any
+    policy: SemaphorePolicy
+    min_limit: int
+    max_limit: int
+    initial_limit: int
+    interval_sec: float = 5.0
+    busy_error_cls: type[Exception] = Exception
+    decisions: list[SemaphoreDecision] = attrs.field(init=False, factory=list)
+    _target_limit: int = attrs.field(init=False)
+    _held: int = attrs.field(init=False, default=0)
+    _last_usage: SemaphoreUsage = attrs.field(init=False, factory=SemaphoreUsage)
+    _last_ts: float = attrs.field(init=False, default=0.0)
+    _finished: threading.Event = attrs.field(init=False, factory=threading.Event)
+    _thread: threading.Thread | None = attrs.field(init=False, default=None)
+
+    def __attrs_post_init__(self):
+        if not 0 < self.min_limit <= self.initial_limit <= self.max_limit:
+            raise ValueError(
+                f"Semaphore `{self.name}` limits must satisfy "
+                f"0 < min ({self.min_limit}) <= initial ({self.initial_limit}) "
+                f"<= max ({self.max_limit})."
+            )
+        self._target_limit = self.initial_limit
+
+    @property
+    def limit(self) -> int:
+        """The current effective limit, which may lag the target while permits are held."""
+        return self.max_limit - self._held
+
+    def _apply_target_limit(self) -> None:
+        while self._held > self.max_limit - self._target_limit:
+            self.sema.release()
+            self._held -= 1
+        while self._held < self.max_limit - self._target_limit:
+            try:
+                self.sema.acquire(timeout=0)
+            except self.busy_error_cls:
+                # All permits are in use; the rest is taken as they are released
+                break
+            self._held += 1
+
+    def step(self) -> None:
+        """Observes the usage since the previous step, and applies the next limit."""
+        now = time.time()
+        usage = self.read_usage()
+        observation = SemaphoreObservation(
+            duration_sec=now - self._last_ts,
+            limit=self.limit,
+            releases=usage.releases - self._last_usage.releases,
+            wait_sec=usage.wait_sec - self._last_usage.wait_sec,
+            hold_sec=usage.hold_sec - self._last_usage.hold_sec,
+        )
+        self._last_usage = usage
+        self._last_ts = now
+
+        new_limit, reason = self.policy.decide(observation, self.min_limit, self.max_limit)
+        self.decisions.append(
+            SemaphoreDecision(
+                timestamp=now, observation=observation, limit=new_limit, reason=reason
+            )
+        )
+        if new_limit != self._target_limit:
+            logger.info(
+                f"Semaphore `{self.name}` limit {self._target_limit} -> {new_limit} ({reason}); "
+                f"throughput {observation.throughput:.2f}/s, "
+                f"utilization {observation.utilization:.2f}, "
+                f"mean wait {observation.mean_wait_sec:.3f}s, "
+                f"mean hold {observation.mean_hold_sec:.3f}s."
+            )
+        else:
+            logger.debug(f"Semaphore `{self.name}` limit {new_limit} ({reason}).")
+        self._target_limit = new_limit
+        self._apply_target_limit()
+
+    def _run(self) -> None:
+        while not self._finished.wait(self.interval_sec):
+            try:
+                self.step()
+            except Exception as e:  # pylint: disable=broad-except
+                logger.exception(e)
+        self._target_limit = self.max_limit
+        self._apply_target_limit()
+
+    def start(self) -> None:
+        self._last_usage = self.read_usage()
+        self._last_ts = time.time()
+        self._apply_target_limit()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        logger.info(
+            f"Adaptively tuning semaphore `{self.name}` between {self.min_limit} and "
+            f"{self.max_limit}, starting from {self.initial_limit}."
+        )
+
+    def stop(self) -> None:
+        """Stops tuning and releases the held permits."""
+        self._finished.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -1,35 +1,163 @@
 from __future__ import annotations
 
 import contextlib
+import mmap
 import os
-from typing import List, Literal, get_args
+import struct
+import time
+from typing import Any, List, Literal, Sequence, get_args
 
 import attrs
 from posix_ipc import (  # pylint: disable=no-name-in-module
     O_CREX,
+    BusyError,
     ExistentialError,
     Semaphore,
+    SharedMemory,
 )
 
 from zetta_utils import log
+from zetta_utils.common import metrics
+
+from .semaphore_controller import (
+    SemaphoreController,
+    SemaphorePolicyName,
+    SemaphoreUsage,
+    get_semaphore_policy,
+)
 
 logger = log.get_logger("mazepa")
 SemaphoreType = Literal["read", "write", "cuda", "cpu"]
 
 DEFAULT_SEMA_COUNT = 1
+DEFAULT_TUNING_INTERVAL_SEC = 5.0
+
+# Number of releases, total wait seconds, total hold seconds
+_USAGE_FORMAT = "=q2d"
+# The counters are only locked for a few microseconds, so a lock that cannot be
+# acquired within this time was left by a worker killed while updating them
+USAGE_LOCK_TIMEOUT_SEC = 1.0
 
 
 def name_to_posix_name(name: SemaphoreType, pid: int) -> str:  # pragma: no cover
     return f"zetta_utils_{pid}_{name}_semaphore"
 
 
+def name_to_posix_usage_name(name: SemaphoreType, pid: int) -> str:  # pragma: no cover
+    return f"zetta_utils_{pid}_{name}_semaphore_usage"
+
+
+class SharedSemaphoreUsage:
+    """
+    Cumulative usage counters of a semaphore in POSIX shared memory, so that the
+    usage from all worker processes is visible to the semaphore controller.
+    """
+
+    def __init__(self, name: SemaphoreType, pid: int, create: bool = False):
+        self.name = name_to_posix_usage_name(name, pid)
+        flags = O_CREX if create else 0
+        # The semaphore guards the counters as a mutex
+        self._lock = Semaphore(self.name, flags=flags, initial_value=1)
+        try:
+            memory = SharedMemory(
+                self.name, flags=flags, size=struct.calcsize(_USAGE_FORMAT) if create else 0
+            )
+        except ExistentialError:
+            if create:
+                self._lock.unlink()
+            raise
+        self._map = mmap.mmap(memory.fd, memory.size)
+        memory.close_fd()
+
+    def add(self, wait_sec: float, hold_sec: float) -> None:
+        try:
+            self._lock.acquire(USAGE_LOCK_TIMEOUT_SEC)
+        except BusyError:
+            # The sample is dropped until `read` recovers the lock
+            return
+        try:
+            releases, total_wait_sec, total_hold_sec = struct.unpack_from(
+                _USAGE_FORMAT, self._map
+            )
+            struct.pack_into(
+                _USAGE_FORMAT,
+                self._map,
+                0,
+                releases + 1,
+                total_wait_sec + wait_sec,
+                total_hold_sec + hold_sec,
+            )
+        finally:
+            self._lock.release()
+
+    def read(self) -> SemaphoreUsage:
+        try:
+            self._lock.acquire(USAGE_LOCK_TIMEOUT_SEC)
+        except BusyError:
+            # Releasing the lock below recovers it for the workers
+            logger.warning(f"Recovering the lock of `{self.name}` left by a killed worker.")
+        try:
+            releases, wait_sec, hold_sec = struct.unpack_from(_USAGE_FORMAT, self._map)
+        finally:
+            self._lock.release()
+        return SemaphoreUsage(releases=releases, wait_sec=wait_sec, hold_sec=hold_sec)
+
+    def unlink(self) -> None:
+        SharedMemory(self.name).unlink()
+        self._lock.unlink()
+
+
+# Shared usage counters are mapped once per process and semaphore
+_shared_usages: dict[str, SharedSemaphoreUsage] = {}
+
+
+def _get_shared_usage(name: SemaphoreType, pid: int) -> SharedSemaphoreUsage | None:
+    posix_name = name_to_posix_usage_name(name, pid)
+    if posix_name not in _shared_usages:
+        try:
+            _shared_usages[posix_name] = SharedSemaphoreUsage(name, pid)
+        except ExistentialError:
+            # The semaphore is not adaptively tuned
+            return None
+    return _shared_usages[posix_name]
+
+
+def _validate_semaphores_bounds(
+    semaphores_bounds: dict[SemaphoreType, Sequence[int]]
+) -> dict[SemaphoreType, tuple[int, int]]:
+    result: dict[SemaphoreType, tuple[int, int]] = {}
+    for name, bounds in semaphores_bounds.items():
+        if name not in get_args(SemaphoreType):
+            raise ValueError(f"`{name}` is not a valid semaphore type.")
+        if len(bounds) != 2 or not 0 < bounds[0] <= bounds[1]:
+            raise ValueError(
+                f"Bounds of semaphore `{name}` must be `[min, max]` with 0 < min <= max; "
+                f"got {list(bounds)}."
+            )
+        result[name] = (bounds[0], bounds[1])
+    return result
+
+
 @contextlib.contextmanager
 def configure_semaphores(
-    semaphores_spec: dict[SemaphoreType, int] | None = None
-):  # pylint: disable=too-many-branches
+    semaphores_spec: dict[SemaphoreType, int] | None = None,
+    semaphores_bounds: dict[SemaphoreType, Sequence[int]] | None = None,
+    semaphores_policy: SemaphorePolicyName = "aimd",
+    semaphores_tuning_interval_sec: float = DEFAULT_TUNING_INTERVAL_SEC,
+):  # pylint: disable=too-many-branches, too-many-locals, too-many-statements
     """
     Context manager for creating and destroying semaphores.
+
+    :param semaphores_spec: Width of each semaphore.
+    :param semaphores_bounds: ``[min, max]`` widths of the semaphores to tune adaptively
+        while the context is active, starting from the width in ``semaphores_spec``
+        clamped to the bounds.
+    :param semaphores_policy: Policy used for tuning: ``aimd`` (additive increase while
+        the semaphore is constrained, multiplicative decrease when an increase does not
+        raise the throughput) or ``hill_climbing`` (towards higher throughput).
+    :param semaphores_tuning_interval_sec: Interval between tuning decisions.
     """
+    bounds_ = _validate_semaphores_bounds(semaphores_bounds or {})
 
     sema_types_to_check: List[SemaphoreType] = ["read", "write", "cuda", "cpu"]
     if semaphores_spec is not None:
@@ -51,6 +179,8 @@ def configure_semaphores(
     else:
         semaphores_spec_ = {name: DEFAULT_SEMA_COUNT for name in sema_types_to_check}
 
+    controllers: list[SemaphoreController] = []
+    usages: list[SharedSemaphoreUsage] = []
     try:
         try:
             for name in semaphores_spec_:
@@ -64,15 +194,52 @@ def configure_semaphores(
             logger.info(f"Creating semaphores from within process {os.getpid()}.")
             summary = ""
             for name, width in semaphores_spec_.items():
-                Semaphore(
+                if name not in bounds_:
+                    Semaphore(
+                        name_to_posix_name(name, os.getpid()),
+                        flags=O_CREX,
+                        initial_value=width,
+                    )
+                    summary += f"{name} semaphores: {width}\t\t"
+                    continue
+                # Tuned semaphores are created with the maximum width, and the
+                # controller holds the permits above the current limit
+                min_width, max_width = bounds_[name]
+                initial_width = min(max(width, min_width), max_width)
+                sema = Semaphore(
                     name_to_posix_name(name, os.getpid()),
                     flags=O_CREX,
-                    initial_value=width,
+                    initial_value=max_width,
                 )
-                summary += f"{name} semaphores: {width}\t\t"
+                usage = SharedSemaphoreUsage(name, os.getpid(), create=True)
+                usages.append(usage)
+                controllers.append(
+                    SemaphoreController(
+                        name=name,
+                        sema=sema,
+                        read_usage=usage.read,
+                        policy=get_semaphore_policy(semaphores_policy),
+                        min_limit=min_width,
+                        max_limit=max_width,
+                        initial_limit=initial_width,
+                        interval_sec=semaphores_tuning_interval_sec,
+                        busy_error_cls=BusyError,
+                    )
+                )
+                summary += f"{name} semaphores: {initial_width} in [{min_width}, {max_width}]\t\t"
             logger.info(summary)
+            for controller in controllers:
+                controller.start()
             yield
     finally:
+        for controller in controllers:
+            controller.stop()
+        for usage in usages:
+            _shared_usages.pop(usage.name, None)
+            try:
+                usage.unlink()
+            except ExistentialError:
+                pass
         try:
             for name in semaphores_spec_:
                 sema = Semaphore(name_to_posix_name(name, os.getpid()))
@@ -103,6 +270,47 @@ class DummySemaphore:  # pragma: no cover
         pass
 
 
+class TimedSemaphore:
+    """
+    Wraps a POSIX semaphore to record the time spent waiting for and holding it
+    as the ``semaphore_{name}_wait_seconds`` and ``semaphore_{name}_hold_seconds``
+    metrics, and in the shared usage counters if the semaphore is adaptively tuned.
+    Other attributes are those of the wrapped semaphore.
+    """
+
+    def __init__(
+        self,
+        sema_type: SemaphoreType,
+        sema: Semaphore,
+        usage: SharedSemaphoreUsage | None = None,
+    ):
+        self._sema_type = sema_type
+        self._sema = sema
+        self._usage = usage
+        self._acquired_ts: list[tuple[float, float]] = []
+
+    def __getattr__(self, attr: str) -> Any:
+        if attr.startswith("_"):
+            raise AttributeError(attr)
+        return getattr(self._sema, attr)
+
+    def __enter__(self):
+        start = time.perf_counter()
+        self._sema.acquire()
+        acquired_ts = time.perf_counter()
+        self._acquired_ts.append((acquired_ts, acquired_ts - start))
+        metrics.observe(f"semaphore_{self._sema_type}_wait_seconds", acquired_ts - start)
+        return self
+
+    def __exit__(self, *args):
+        self._sema.release()
+        acquired_ts, wait_sec = self._acquired_ts.pop()
+        hold_sec = time.perf_counter() - acquired_ts
+        metrics.observe(f"semaphore_{self._sema_type}_hold_seconds", hold_sec)
+        if self._usage is not None:
+            self._usage.add(wait_sec, hold_sec)
+
+
 def semaphore(name: SemaphoreType) -> Semaphore:
     """
     Fetches and returns either the semaphore associated with the current process,
@@ -111,10 +319,10 @@ def semaphore(name: SemaphoreType) -> Semaphore:
     """
     if not name in get_args(SemaphoreType):
         raise ValueError(f"`{name}` is not a valid semaphore type.")
-    try:
-        return Semaphore(name_to_posix_name(name, os.getpid()))
-    except ExistentialError:
+    for pid in (os.getpid(), os.getppid()):
         try:
-            return Semaphore(name_to_posix_name(name, os.getppid()))
+            sema = Semaphore(name_to_posix_name(name, pid))
         except ExistentialError:
-            return DummySemaphore()
+            continue
+        return TimedSemaphore(name, sema, _get_shared_usage(name, pid))
+    return DummySemaphore()
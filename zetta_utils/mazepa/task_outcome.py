@@ -5,6 +5,9 @@ from typing import Generic, Optional, TypeVar
 
 import attrs
 
+from zetta_utils.common.metrics import MetricsSnapshot
+from zetta_utils.common.tracing import TaskTrace
+
 
 @unique
 class TaskStatus(Enum):
@@ -24,6 +27,11 @@ class TaskOutcome(Generic[R_co]):
     traceback_text: Optional[str] = None
     execution_sec: Optional[float] = None
     return_value: Optional[R_co] = None
+    operation_name: Optional[str] = None
+    metrics: Optional[MetricsSnapshot] = None
+    trace: Optional[TaskTrace] = None
+    # Path the trace was written to by the worker, instead of shipping it with the outcome
+    trace_path: Optional[str] = None
 
 
 @attrs.frozen
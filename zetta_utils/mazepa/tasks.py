@@ -1,6 +1,8 @@
 from __future__ import annotations
 
+import contextlib
 import functools
+import os
 import sys
 import time
 import traceback
@@ -24,6 +26,7 @@ from pebble import concurrent
 from typing_extensions import ParamSpec
 
 from zetta_utils import log
+from zetta_utils.common import metrics, tracing
 
 from . import constants, exceptions, id_generation
 from .task_outcome import TaskOutcome, TaskStatus
@@ -40,6 +43,14 @@ class TaskUpkeepSettings:
     interval_sec: float | None = None
 
 
+@attrs.mutable
+class TaskTraceSettings:
+    profile: tracing.ProfileMode | None = None
+    stack_sample_interval_sec: float = tracing.DEFAULT_STACK_SAMPLE_INTERVAL_SEC
+    # Directory the trace is written to, so that outcome messages stay small
+    output_dir: str | None = None
+
+
 @attrs.mutable
 class Task(Generic[R_co]):  # pylint: disable=too-many-instance-attributes
     """
@@ -56,6 +67,10 @@ class Task(Generic[R_co]):  # pylint: disable=too-many-instance-attributes
 
     upkeep_settings: TaskUpkeepSettings = attrs.field(factory=TaskUpkeepSettings)
     execution_id: str | None = attrs.field(init=False, default=None)
+    # Set by the executor when the task is pushed to the queue
+    submission_ts: float | None = attrs.field(init=False, default=None)
+    # Set by the executor for the tasks sampled for tracing
+    trace_settings: TaskTraceSettings | None = attrs.field(init=False, default=None)
 
     status: TaskStatus = TaskStatus.NOT_SUBMITTED
     outcome: TaskOutcome[R_co] | None = None
@@ -91,29 +106,61 @@ class Task(Generic[R_co]):  # pylint: disable=too-many-instance-attributes
 
         exception = None
         traceback_text = None
-        if handle_exceptions:
-            try:
+        # Metrics and spans recorded in the subprocess used to enforce `runtime_limit_sec`
+        # are not collected
+        trace = None
+        with metrics.collect_metrics() as recorder, contextlib.ExitStack() as stack:
+            if self.trace_settings is not None:
+                trace = stack.enter_context(
+                    tracing.trace_task(
+                        task_id=self.id_,
+                        operation_name=self.operation_name,
+                        profile=self.trace_settings.profile,
+                        stack_sample_interval_sec=self.trace_settings.stack_sample_interval_sec,
+                    )
+                )
+            if self.submission_ts is not None:
+                metrics.observe("task_queue_wait_seconds", max(0, time_start - self.submission_ts))
+            if handle_exceptions:
+                try:
+                    return_value = self._call_task_fn(debug=debug)
+                    logger.debug("Successful task execution.")
+                except (SystemExit, KeyboardInterrupt) as exc:  # pragma: no cover
+                    raise exc
+                except Exception as exc:  # pylint: disable=broad-except
+                    logger.error(f"Failed task execution of {self}.")
+                    logger.exception(exc)
+                    exc_type, exception, tb = sys.exc_info()
+                    traceback_text = "".join(traceback.format_exception(exc_type, exception, tb))
+                    return_value = None
+                    metrics.increment("task_failures")
+            else:
                 return_value = self._call_task_fn(debug=debug)
-                logger.debug("Successful task execution.")
-            except (SystemExit, KeyboardInterrupt) as exc:  # pragma: no cover
-                raise exc
-            except Exception as exc:  # pylint: disable=broad-except
-                logger.error(f"Failed task execution of {self}.")
-                logger.exception(exc)
-                exc_type, exception, tb = sys.exc_info()
-                traceback_text = "".join(traceback.format_exception(exc_type, exception, tb))
-                return_value = None
-        else:
-            return_value = self._call_task_fn(debug=debug)
 
-        time_end = time.time()
+            time_end = time.time()
+            metrics.observe("task_execution_seconds", time_end - time_start)
         logger.info(f"Task done in: {time_end - time_start:.2f}sec.")
 
+        trace_path = None
+        if trace is not None and self.trace_settings is not None:
+            if self.trace_settings.output_dir is not None:
+                trace_path = os.path.join(self.trace_settings.output_dir, f"{self.id_}.pkl")
+                try:
+                    tracing.write_trace(trace, trace_path)
+                except Exception as exc:  # pylint: disable=broad-except
+                    logger.warning(f"Failed to write the trace of task {self.id_}: {exc}")
+                    trace_path = None
+                trace = None
+
         outcome = TaskOutcome(
             exception=exception,
             traceback_text=traceback_text,
             execution_sec=time_end - time_start,
             return_value=return_value,
+            operation_name=self.operation_name,
+            metrics=recorder.snapshot(),
+            trace=trace,
+            trace_path=trace_path,
         )
 
         self.outcome = outcome
@@ -0,0 +1,292 @@
+"""
+Merging of the task traces shipped with task outcomes into Chrome trace
+(``chrome://tracing``, Perfetto) and speedscope files.
+"""
+from __future__ import annotations
+
+import json
+import os
+import pstats
+import tempfile
+import threading
+import zlib
+from typing import Any, Iterator
+
+import attrs
+import fsspec
+
+from zetta_utils import log
+from zetta_utils.common.tracing import ProfileMode, Span, TaskTrace, read_trace
+
+from .task_outcome import TaskOutcome
+from .tasks import Task, TaskTraceSettings
+
+logger = log.get_logger("mazepa")
+
+CHROME_TRACE_FILENAME = "trace.json"
+SPEEDSCOPE_FILENAME = "trace.speedscope.json"
+PROFILE_STATS_FILENAME = "profile.pstats"
+TASK_TRACES_DIRNAME = "tasks"
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+SPEEDSCOPE_NAME = "mazepa traces"
+SPEEDSCOPE_EXPORTER = "zetta_utils"
+
+
+def should_trace_task(task_id: str, fraction: float) -> bool:
+    """Deterministically samples the given fraction of the task ids."""
+    if fraction <= 0:
+        return False
+    return zlib.crc32(task_id.encode("utf-8")) / 2**32 < fraction
+
+
+@attrs.mutable
+class _StatsHolder:
+    # Interface expected by `pstats.Stats` for loading statistics from an object,
+    # which empties `stats` once loaded
+    stats: dict
+
+    def create_stats(self) -> None:
+        pass
+
+
+def _get_span_end_ts(span: Span) -> float:
+    return span.end_ts if span.end_ts is not None else span.start_ts
+
+
+def _get_chrome_events(trace: TaskTrace, pid: int) -> list[dict[str, Any]]:
+    return [
+        {
+            "name": span.name,
+            "cat": trace.operation_name,
+            "ph": "X",
+            "ts": span.start_ts * 1e6,
+            "dur": span.duration * 1e6,
+            "pid": pid,
+            "tid": span.thread_id,
+            "args": {"task_id": trace.task_id},
+        }
+        for span in trace.spans
+    ]
+
+
+def _get_process_name_event(host: str, os_pid: int, pid: int) -> dict[str, Any]:
+    return {
+        "name": "process_name",
+        "ph": "M",
+        "pid": pid,
+        "tid": 0,
+        "args": {"name": f"{host}:{os_pid}"},
+    }
+
+
+def _get_speedscope_events(spans: list[Span], get_frame_id) -> list[dict[str, Any]]:
+    # Spans of a thread are nested, so open and close events are emitted in
+    # depth first order, closing each span before the next sibling opens.
+    events: list[dict[str, Any]] = []
+    open_spans: list[Span] = []
+    for span in sorted(spans, key=lambda e: (e.start_ts, -_get_span_end_ts(e))):
+        while open_spans and _get_span_end_ts(open_spans[-1]) <= span.start_ts:
+            closed = open_spans.pop()
+            events.append({"type": "C", "frame": get_frame_id(closed.name), "at": closed.end_ts})
+        end_ts = _get_span_end_ts(span)
+        if open_spans:
+            # Guard against clock adjustments breaking the nesting
+            end_ts = min(end_ts, _get_span_end_ts(open_spans[-1]))
+        events.append({"type": "O", "frame": get_frame_id(span.name), "at": span.start_ts})
+        open_spans.append(attrs.evolve(span, end_ts=end_ts))
+    while open_spans:
+        closed = open_spans.pop()
+        events.append({"type": "C", "frame": get_frame_id(closed.name), "at": closed.end_ts})
+    return events
+
+
+def _get_speedscope_profiles(trace: TaskTrace, get_frame_id) -> list[dict[str, Any]]:
+    """An evented profile of the spans per thread, and a sampled profile of the stack
+    samples, if any."""
+    profiles: list[dict[str, Any]] = []
+    spans_by_thread: dict[int, list[Span]] = {}
+    for span in trace.spans:
+        spans_by_thread.setdefault(span.thread_id, []).append(span)
+    for thread_id, spans in spans_by_thread.items():
+        profiles.append(
+            {
+                "type": "evented",
+                "name": f"{trace.operation_name} {trace.task_id} [{thread_id}]",
+                "unit": "seconds",
+                "startValue": min(span.start_ts for span in spans),
+                "endValue": max(_get_span_end_ts(span) for span in spans),
+                "events": _get_speedscope_events(spans, get_frame_id),
+            }
+        )
+    samples = trace.stack_samples
+    if samples is not None and len(samples.stacks) > 0:
+        profiles.append(
+            {
+                "type": "sampled",
+                "name": f"{trace.operation_name} {trace.task_id} [samples]",
+                "unit": "seconds",
+                "startValue": samples.timestamps[0] - samples.interval_sec,
+                "endValue": samples.timestamps[-1],
+                "samples": [[get_frame_id(frame) for frame in stack] for stack in samples.stacks],
+                "weights": [samples.interval_sec] * len(samples.stacks),
+            }
+        )
+    return profiles
+
+
+class _FrameTable:
+    def __init__(self):
+        self.frames: list[dict[str, str]] = []
+        self.frame_ids: dict[str, int] = {}
+
+    def get_frame_id(self, name: str) -> int:
+        if name not in self.frame_ids:
+            self.frame_ids[name] = len(self.frames)
+            self.frames.append({"name": name})
+        return self.frame_ids[name]
+
+
+class _ProfileStatsMerger:
+    def __init__(self):
+        self.stats: pstats.Stats | None = None
+
+    def add(self, trace: TaskTrace) -> None:
+        if trace.profile_stats is None:
+            return
+        holder = _StatsHolder(stats=dict(trace.profile_stats))
+        if self.stats is None:
+            self.stats = pstats.Stats(holder)  # type: ignore[arg-type]
+        else:
+            self.stats.add(holder)  # type: ignore[arg-type]
+
+
+@attrs.mutable
+class TraceCollector:
+    """
+    Samples the tasks to be traced, and exports the traces. With an ``output_path``,
+    workers write the traces of their tasks to it and only their paths are shipped
+    with the outcomes and kept by the collector; the traces are read back one by
+    one when exporting.
+
+    :param fraction: Fraction of the tasks to trace.
+    :param profile: Whether to profile the traced tasks with ``cProfile`` or stack samples.
+    :param output_path: Directory the traces are written to.
+    """
+
+    fraction: float = 1.0
+    profile: ProfileMode | None = None
+    output_path: str | None = None
+    traces: list[TaskTrace] = attrs.field(factory=list)
+    trace_paths: list[str] = attrs.field(factory=list)
+    _lock: threading.Lock = attrs.field(factory=threading.Lock, repr=False, eq=False)
+
+    def sample_task(self, task: Task) -> None:
+        if should_trace_task(task.id_, self.fraction):
+            task.trace_settings = TaskTraceSettings(
+                profile=self.profile,
+                output_dir=(
+                    os.path.join(self.output_path, TASK_TRACES_DIRNAME)
+                    if self.output_path is not None
+                    else None
+                ),
+            )
+
+    def add_outcome(self, outcome: TaskOutcome) -> None:
+        with self._lock:
+            if outcome.trace is not None:
+                self.traces.append(outcome.trace)
+            if outcome.trace_path is not None:
+                self.trace_paths.append(outcome.trace_path)
+
+    def _iter_traces(self) -> Iterator[TaskTrace]:
+        yield from self.traces
+        for path in self.trace_paths:
+            try:
+                yield read_trace(path)
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.warning(f"Failed to read the trace at {path}: {exc}")
+
+    def get_chrome_trace(self) -> dict[str, Any]:
+        """Renders the spans in the Chrome trace event format, with one process per worker."""
+        worker_ids: dict[tuple[str, int], int] = {}
+        events: list[dict[str, Any]] = []
+        for trace in self._iter_traces():
+            key = (trace.host, trace.pid)
+            if key not in worker_ids:
+                worker_ids[key] = len(worker_ids) + 1
+                events.append(_get_process_name_event(trace.host, trace.pid, worker_ids[key]))
+            events.extend(_get_chrome_events(trace, worker_ids[key]))
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def get_speedscope(self) -> dict[str, Any]:
+        """
+        Renders the traces in the speedscope format: an evented profile of the spans
+        per task and thread, and a sampled profile per task with stack samples.
+        """
+        frame_table = _FrameTable()
+        profiles: list[dict[str, Any]] = []
+        for trace in self._iter_traces():
+            profiles.extend(_get_speedscope_profiles(trace, frame_table.get_frame_id))
+        return {
+            "$schema": SPEEDSCOPE_SCHEMA,
+            "shared": {"frames": frame_table.frames},
+            "profiles": profiles,
+            "name": SPEEDSCOPE_NAME,
+            "exporter": SPEEDSCOPE_EXPORTER,
+        }
+
+    def get_profile_stats(self) -> pstats.Stats | None:
+        """Merges the ``cProfile`` statistics of the traces, if any."""
+        merger = _ProfileStatsMerger()
+        for trace in self._iter_traces():
+            merger.add(trace)
+        return merger.stats
+
+    def write(self, path: str) -> None:
+        """
+        Writes the Chrome trace, speedscope and merged ``cProfile`` files to the given
+        local or remote directory. The traces are read and rendered one at a time.
+        """
+        worker_ids: dict[tuple[str, int], int] = {}
+        frame_table = _FrameTable()
+        merger = _ProfileStatsMerger()
+        num_traces = 0
+        with fsspec.open(os.path.join(path, CHROME_TRACE_FILENAME), "w") as chrome_f:
+            with fsspec.open(os.path.join(path, SPEEDSCOPE_FILENAME), "w") as speedscope_f:
+                chrome_f.write('{"displayTimeUnit": "ms", "traceEvents": [')
+                speedscope_f.write(
+                    f'{{"$schema": {json.dumps(SPEEDSCOPE_SCHEMA)}, '
+                    f'"name": {json.dumps(SPEEDSCOPE_NAME)}, '
+                    f'"exporter": {json.dumps(SPEEDSCOPE_EXPORTER)}, "profiles": ['
+                )
+                num_events = 0
+                num_profiles = 0
+                for trace in self._iter_traces():
+                    num_traces += 1
+                    events = []
+                    key = (trace.host, trace.pid)
+                    if key not in worker_ids:
+                        worker_ids[key] = len(worker_ids) + 1
+                        events.append(
+                            _get_process_name_event(trace.host, trace.pid, worker_ids[key])
+                        )
+                    events.extend(_get_chrome_events(trace, worker_ids[key]))
+                    for event in events:
+                        chrome_f.write(("," if num_events else "") + json.dumps(event))
+                        num_events += 1
+                    for profile in _get_speedscope_profiles(trace, frame_table.get_frame_id):
+                        speedscope_f.write(("," if num_profiles else "") + json.dumps(profile))
+                        num_profiles += 1
+                    merger.add(trace)
+                chrome_f.write("]}")
+                speedscope_f.write(
+                    f'], "shared": {{"frames": {json.dumps(frame_table.frames)}}}}}'
+                )
+        if merger.stats is not None:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                local_path = os.path.join(tmp_dir, PROFILE_STATS_FILENAME)
+                merger.stats.dump_stats(local_path)
+                with open(local_path, "rb") as src:
+                    with fsspec.open(os.path.join(path, PROFILE_STATS_FILENAME), "wb") as dst:
+                        dst.write(src.read())
+        logger.info(f"Wrote traces of {num_traces} tasks to {path}.")
@@ -83,7 +83,9 @@ def run_worker(
                             ack_task, outcome = process_task_message(msg=msg, debug=debug)
                         else:
                             ack_task = True
-                            outcome = TaskOutcome(exception=MazepaCancel())
+                            outcome = TaskOutcome(
+                                exception=MazepaCancel(), operation_name=task.operation_name
+                            )
 
                         if ack_task:
                             outcome_report = OutcomeReport(
@@ -9,8 +9,10 @@ from typeguard import typechecked
 
 from zetta_utils import builder, log
 from zetta_utils.common import ComparablePartial
+from zetta_utils.common.tracing import ProfileMode
 from zetta_utils.mazepa import Flow, SemaphoreType, Task, configure_semaphores, execute
 from zetta_utils.mazepa.execution_state import ExecutionState, InMemoryExecutionState
+from zetta_utils.mazepa.semaphore_controller import SemaphorePolicyName
 from zetta_utils.message_queues import FileQueue
 
 from .worker_pool import setup_local_worker_pool
@@ -35,8 +37,15 @@ def execute_locally(
     raise_on_failed_checkpoint: bool = True,
     num_procs: int = 1,
     semaphores_spec: dict[SemaphoreType, int] | None = None,
+    semaphores_bounds: dict[SemaphoreType, list[int]] | None = None,
+    semaphores_policy: SemaphorePolicyName = "aimd",
     debug: bool = False,
     write_progress_summary: bool = False,
+    metrics_port: Optional[int] = None,
+    metrics_summary_path: Optional[str] = None,
+    trace_fraction: float = 0.0,
+    trace_profile: Optional[ProfileMode] = None,
+    trace_output_path: Optional[str] = None,
 ):
 
     queues_dir_ = queues_dir if queues_dir else ""
@@ -46,7 +55,9 @@ def execute_locally(
             "Configuring for local execution: "
             "creating local queues, allocating semaphores, and starting local workers."
         )
-        stack.enter_context(configure_semaphores(semaphores_spec))
+        stack.enter_context(
+            configure_semaphores(semaphores_spec, semaphores_bounds, semaphores_policy)
+        )
 
         if debug:
             logger.info("Debug mode: Using single process execution without local queues.")
@@ -75,4 +86,9 @@ def execute_locally(
             checkpoint_interval_sec=checkpoint_interval_sec,
             raise_on_failed_checkpoint=raise_on_failed_checkpoint,
             write_progress_summary=write_progress_summary,
+            metrics_port=metrics_port,
+            metrics_summary_path=metrics_summary_path,
+            trace_fraction=trace_fraction,
+            trace_profile=trace_profile,
+            trace_output_path=trace_output_path,
         )
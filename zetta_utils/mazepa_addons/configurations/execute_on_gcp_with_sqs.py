@@ -12,7 +12,9 @@ from typing_extensions import NotRequired
 
 from zetta_utils import builder, log, mazepa, run
 from zetta_utils.cloud_management.resource_allocation import aws_sqs, gcloud, k8s
+from zetta_utils.common.tracing import ProfileMode
 from zetta_utils.mazepa import SemaphoreType, execute
+from zetta_utils.mazepa.semaphore_controller import SemaphorePolicyName
 from zetta_utils.mazepa.task_outcome import OutcomeReport
 from zetta_utils.mazepa.task_router import TaskRouter
 from zetta_utils.mazepa.tasks import Task
@@ -69,6 +71,8 @@ class WorkerGroup:
     idle_worker_timeout: int = 300
     labels: dict[str, str] | None = None
     gpu_accelerator_type: str | None = None
+    semaphores_bounds: dict[SemaphoreType, list[int]] | None = None
+    semaphores_policy: SemaphorePolicyName = "aimd"
 
 
 class WorkerGroupDict(TypedDict, total=False):
@@ -82,6 +86,8 @@ class WorkerGroupDict(TypedDict, total=False):
     idle_worker_timeout: NotRequired[int]
     labels: NotRequired[dict[str, str]]
     gpu_accelerator_type: NotRequired[str]
+    semaphores_bounds: NotRequired[dict[SemaphoreType, list[int]]]
+    semaphores_policy: NotRequired[SemaphorePolicyName]
 
 
 def _get_group_taskqueue_and_contexts(
@@ -110,6 +116,8 @@ def _get_group_taskqueue_and_contexts(
             group.num_procs,
             group.semaphores_spec,
             idle_timeout=group.idle_worker_timeout,
+            semaphores_bounds=group.semaphores_bounds,
+            semaphores_policy=group.semaphores_policy,
         )
         pod_spec = k8s.get_mazepa_pod_spec(
             image=image,
@@ -150,6 +158,8 @@ def _get_group_taskqueue_and_contexts(
             provisioning_model=group.provisioning_model,
             gpu_accelerator_type=group.gpu_accelerator_type,
             adc_available=adc_available,
+            semaphores_bounds=group.semaphores_bounds,
+            semaphores_policy=group.semaphores_policy,
         )
         deployment_ctx_mngr = k8s.deployment_ctx_mngr(
             execution_id,
@@ -215,6 +225,8 @@ def execute_on_gcp_with_sqs(  # pylint: disable=too-many-locals
     batch_gap_sleep_sec: float = 0.5,
     num_procs: int = 1,
     semaphores_spec: dict[SemaphoreType, int] | None = None,
+    semaphores_bounds: dict[SemaphoreType, list[int]] | None = None,
+    semaphores_policy: SemaphorePolicyName = "aimd",
     extra_ctx_managers: Iterable[AbstractContextManager] = (),
     show_progress: bool = True,
     do_dryrun_estimation: bool = True,
@@ -225,6 +237,11 @@ def execute_on_gcp_with_sqs(  # pylint: disable=too-many-locals
     checkpoint_interval_sec: float = 300.0,
     raise_on_failed_checkpoint: bool = True,
     write_progress_summary: bool = False,
+    metrics_port: Optional[int] = None,
+    metrics_summary_path: Optional[str] = None,
+    trace_fraction: float = 0.0,
+    trace_profile: Optional[ProfileMode] = None,
+    trace_output_path: Optional[str] = None,
 ):
     if debug and not local_test:
         raise ValueError("`debug` can only be set to `True` when `local_test` is also `True`.")
@@ -243,8 +260,15 @@ def execute_on_gcp_with_sqs(  # pylint: disable=too-many-locals
             raise_on_failed_checkpoint=raise_on_failed_checkpoint,
             num_procs=num_procs,
             semaphores_spec=semaphores_spec,
+            semaphores_bounds=semaphores_bounds,
+            semaphores_policy=semaphores_policy,
             debug=debug,
             write_progress_summary=write_progress_summary,
+            metrics_port=metrics_port,
+            metrics_summary_path=metrics_summary_path,
+            trace_fraction=trace_fraction,
+            trace_profile=trace_profile,
+            trace_output_path=trace_output_path,
         )
     else:
         assert gcloud.check_image_exists(worker_image), worker_image
@@ -306,5 +330,10 @@ def execute_on_gcp_with_sqs(  # pylint: disable=too-many-locals
                 checkpoint_interval_sec=checkpoint_interval_sec,
                 raise_on_failed_checkpoint=raise_on_failed_checkpoint,
                 write_progress_summary=write_progress_summary,
+                metrics_port=metrics_port,
+                metrics_summary_path=metrics_summary_path,
+                trace_fraction=trace_fraction,
+                trace_profile=trace_profile,
+                trace_output_path=trace_output_path,
                 require_interrupt_confirm=False,
             )
@@ -11,6 +11,7 @@ import pebble
 
 from zetta_utils import builder, log, try_load_train_inference
 from zetta_utils.mazepa import SemaphoreType, Task, configure_semaphores, run_worker
+from zetta_utils.mazepa.semaphore_controller import SemaphorePolicyName
 from zetta_utils.mazepa.task_outcome import OutcomeReport
 from zetta_utils.message_queues import FileQueue, SQSQueue
 
@@ -106,9 +107,13 @@ def run_worker_manager(
     num_procs: int = 1,
     semaphores_spec: dict[SemaphoreType, int] | None = None,
     idle_timeout: int = 60,
+    semaphores_bounds: dict[SemaphoreType, list[int]] | None = None,
+    semaphores_policy: SemaphorePolicyName = "aimd",
 ):
     with ExitStack() as stack:
-        stack.enter_context(configure_semaphores(semaphores_spec))
+        stack.enter_context(
+            configure_semaphores(semaphores_spec, semaphores_bounds, semaphores_policy)
+        )
         stack.enter_context(
             setup_local_worker_pool(
                 num_procs,
@@ -19,4 +19,9 @@ from .volumetric_callable_operation import (
     build_chunked_volumetric_callable_flow_schema,
 )
 from .. import ChunkableOpProtocol, VolumetricOpProtocol
-from .interpolate_flow import build_interpolate_flow
+from .interpolate_flow import (
+    InterpolatePyramidOperation,
+    build_interpolate_flow,
+    build_interpolate_pyramid_flow,
+)
+from .filter_cc3d_flow import build_filter_cc3d_flow
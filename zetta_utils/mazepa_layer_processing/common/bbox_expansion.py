@@ -0,0 +1,76 @@
+"""
+Expansion of bounding boxes to the alignment required by chunked flows, as set by
+the `expand_bbox_resolution` and `expand_bbox_processing` options of the flows.
+"""
+from __future__ import annotations
+
+from typing import Sequence
+
+from zetta_utils import log
+from zetta_utils.geometry import BBox3D, Vec3D
+from zetta_utils.geometry.vec import VEC3D_PRECISION
+
+logger = log.get_logger("zetta_utils")
+
+
+def expand_bbox_to_resolution(  # pylint: disable=line-too-long
+    bbox: BBox3D,
+    dst_resolution: Vec3D,
+) -> BBox3D:
+    bbox_new = bbox.snapped(Vec3D[float](0, 0, 0), dst_resolution, "expand")
+    if bbox_new != bbox:
+        logger.info(
+            f"`expand_bbox_resolution` was set and the `bbox` was not integral in `dst_resolution`, "
+            f"so the bbox has been modified: (in {dst_resolution.pformat()} {bbox.unit} pixels))\n"
+            f"Received bbox:\t{bbox.pformat()} {bbox.unit}\n\t\t{bbox.pformat(dst_resolution)} px\n"
+            f"\tshape:\t{(bbox.shape / dst_resolution).pformat()} px\n"
+            f"New bbox:\t{bbox_new.pformat()} {bbox_new.unit}\n\t\t{bbox_new.pformat(dst_resolution)} px\n"
+            f"\tshape:\t{(bbox_new.shape // dst_resolution).int().pformat()} px\n"
+            f"Please note that this may affect chunk alignment requirements."
+        )
+    else:
+        logger.info(
+            "`expand_bbox_resolution` was set, but the `bbox` was already integral in `dst_resolution`, "
+            "so no action has been taken."
+        )
+
+    return bbox_new
+
+
+def expand_bbox_to_processing_chunks(  # pylint: disable=line-too-long
+    bbox: BBox3D,
+    dst_resolution: Vec3D,
+    processing_chunk_sizes: Sequence[Vec3D[int]],
+    processing_gap: Vec3D[int],
+) -> BBox3D:
+    bbox_shape_in_res = round(bbox.shape / dst_resolution)
+    bbox_shape_in_res_raw = round(bbox.shape / dst_resolution, VEC3D_PRECISION)
+    if bbox_shape_in_res != bbox_shape_in_res_raw:
+        raise ValueError(
+            "To use `expand_bbox_processing`, the `bbox` must be integral in the "
+            f"`dst_resolution`. Received {bbox.pformat()}, which is "
+            f"{bbox.pformat(dst_resolution)} at the `dst_resolution` of "
+            f"{dst_resolution.pformat()}. You may set `expand_bbox_resolution = True` to "
+            "automatically expand the bbox to the nearest integral pixel."
+        )
+    bbox_old = bbox
+    chunk_size_top = processing_chunk_sizes[0]
+    translation_end = (chunk_size_top - bbox_shape_in_res) % (chunk_size_top + processing_gap)
+    bbox = bbox.translated_end(translation_end, dst_resolution)
+    if translation_end != Vec3D[int](0, 0, 0):
+        logger.info(
+            f"`expand_bbox_processing` was set and the `bbox` was not aligned to the top level "
+            f"`processing_chunk_size` (with `processing_gap`s if applicable) in at least one dimension, "
+            f"so the bbox has been modified: (in {dst_resolution.pformat()} {bbox_old.unit} pixels))\n"
+            f"Received bbox:\t{bbox_old.pformat()} {bbox_old.unit}\n\t\t{bbox_old.pformat(dst_resolution)} px\n"
+            f"\tshape:\t{(bbox_old.shape // dst_resolution).int().pformat()} px\n"
+            f"New bbox:\t{bbox.pformat()} {bbox.unit}\n\t\t{bbox.pformat(dst_resolution)} px\n"
+            f"\tshape:\t{(bbox.shape // dst_resolution).int().pformat()} px\n"
+            f"Please note that this may affect chunk alignment requirements."
+        )
+    else:
+        logger.info(
+            "`expand_bbox_processing` was set, but the `bbox` was already aligned to processing chunks,  "
+            "so no action has been taken."
+        )
+    return bbox
@@ -5,6 +5,7 @@ import attrs
 from typing_extensions import Concatenate, ParamSpec
 
 from zetta_utils import builder, mazepa
+from zetta_utils.common import tracing
 from zetta_utils.layer import IndexChunker, Layer
 from zetta_utils.layer.protocols import LayerWithIndexT
 
@@ -45,7 +46,8 @@ class CallableOperation(Generic[P, IndexT, R]):
     ) -> None:
         assert len(args) == 0
         fn_kwargs = _process_callable_kwargs(idx, kwargs)
-        result = self.fn(**fn_kwargs)
+        with tracing.span("op"):
+            result = self.fn(**fn_kwargs)
         dst[idx] = result
 
 
@@ -0,0 +1,387 @@
+from __future__ import annotations
+
+import io
+import itertools
+from os import path
+from typing import Literal, Sequence
+
+import attrs
+import cc3d
+import fastremap
+import numpy as np
+from cloudfiles import CloudFiles
+from numpy import typing as npt
+
+from zetta_utils import builder, log, mazepa, tensor_ops
+from zetta_utils.geometry import BBox3D, Vec3D
+from zetta_utils.layer.volumetric import VolumetricIndex, VolumetricLayer
+from zetta_utils.layer.volumetric.cloudvol.build import build_cv_layer
+from zetta_utils.mazepa import semaphore
+from zetta_utils.mazepa.flows import sequential_flow
+from zetta_utils.tensor_ops.mask import MaskFilteringModes
+
+from .bbox_expansion import expand_bbox_to_processing_chunks, expand_bbox_to_resolution
+from .subchunkable_apply_flow import (
+    build_subchunkable_apply_flow,
+    parse_bbox,
+)
+
+logger = log.get_logger("zetta_utils")
+
+
+@attrs.frozen
+class CCChunkGrid:
+    """
+    Regular grid of processing chunks covering the flow ``bbox``. Each chunk owns a
+    disjoint range of ``prod(chunk_size)`` component ids, so that the labels produced
+    by different chunks never collide, and a directory of metadata files in ``tmp_dir``.
+    """
+
+    origin: Sequence[int]
+    grid_shape: Sequence[int]
+    chunk_size: Sequence[int]
+    tmp_dir: str
+
+    def get_grid_coord(self, idx: VolumetricIndex) -> tuple[int, int, int]:
+        start = round(idx.bbox.start / idx.resolution) - Vec3D[int](*self.origin)
+        grid_coord = start // Vec3D[int](*self.chunk_size)
+        assert grid_coord * Vec3D[int](*self.chunk_size) == start, "Unaligned chunk."
+        return (int(grid_coord[0]), int(grid_coord[1]), int(grid_coord[2]))
+
+    def get_id_offset(self, grid_coord: Sequence[int]) -> int:
+        linear_idx = int(np.ravel_multi_index(tuple(grid_coord), tuple(self.grid_shape)))
+        return linear_idx * int(np.prod(self.chunk_size))
+
+    def get_grid_coords(self) -> list[tuple[int, int, int]]:
+        return list(itertools.product(*(range(e) for e in self.grid_shape)))  # type: ignore
+
+    def save(self, kind: str, grid_coord: Sequence[int], **arrays: npt.NDArray) -> None:
+        buf = io.BytesIO()
+        np.savez(buf, **arrays)
+        CloudFiles(self.tmp_dir).put(_get_key(kind, grid_coord), buf.getvalue())
+
+    def load(self, kind: str, grid_coord: Sequence[int]) -> dict[str, npt.NDArray]:
+        content = CloudFiles(self.tmp_dir).get(_get_key(kind, grid_coord))
+        if content is None:
+            raise FileNotFoundError(
+                f"Missing `{kind}` metadata for chunk {tuple(grid_coord)} in {self.tmp_dir}"
+            )
+        with np.load(io.BytesIO(content)) as data:
+            return dict(data)
+
+
+def _get_key(kind: str, grid_coord: Sequence[int]) -> str:
+    return f"{kind}/{'_'.join(str(e) for e in grid_coord)}.npz"
+
+
+def _get_half_neighborhood(connectivity_3d: Literal[6, 18, 26]) -> list[tuple[int, int, int]]:
+    # Offsets that are lexicographically positive, so that each neighbouring voxel
+    # pair is visited once per direction.
+    result = []
+    for offset in itertools.product((-1, 0, 1), repeat=3):
+        num_nonzero = sum(e != 0 for e in offset)
+        if offset > (0, 0, 0) and (
+            num_nonzero == 1
+            or (num_nonzero == 2 and connectivity_3d >= 18)
+            or (num_nonzero == 3 and connectivity_3d == 26)
+        ):
+            result.append(offset)
+    return result
+
+
+@attrs.frozen
+class _CC3DChunkOperationBase:
+    grid: CCChunkGrid
+
+    def get_input_resolution(self, dst_resolution: Vec3D) -> Vec3D:  # pylint: disable=no-self-use
+        return dst_resolution
+
+    def with_added_crop_pad(self, crop_pad: Vec3D[int]):
+        if crop_pad != Vec3D[int](0, 0, 0):
+            raise ValueError(f"`{type(self).__name__}` does not support crop pads.")
+        return self
+
+
+@mazepa.taskable_operation_cls
+@attrs.frozen
+class CC3DLabelOperation(_CC3DChunkOperationBase):
+    """
+    First pass of ``build_filter_cc3d_flow``: labels the connected components of the
+    non-zero voxels of a chunk, writes the labels with the chunk's id offset to ``dst``
+    and saves the voxel count of each label.
+    """
+
+    connectivity_3d: Literal[6, 18, 26] = 6
+
+    def get_operation_name(self) -> str:  # pylint: disable=no-self-use
+        return "CC3DLabel"
+
+    def __call__(self, idx: VolumetricIndex, dst: VolumetricLayer, src: VolumetricLayer) -> None:
+        grid_coord = self.grid.get_grid_coord(idx)
+        with semaphore("read"):
+            data = tensor_ops.convert.to_np(src[idx])
+        with semaphore("cpu"):
+            labels = cc3d.connected_components(
+                data[0] != 0, connectivity=self.connectivity_3d, out_dtype=np.uint64
+            )
+            ids, counts = fastremap.unique(labels, return_counts=True)
+            nonzero = ids != 0
+            id_offset = np.uint64(self.grid.get_id_offset(grid_coord))
+            labels[labels != 0] += id_offset
+        self.grid.save("sizes", grid_coord, ids=ids[nonzero] + id_offset, counts=counts[nonzero])
+        with semaphore("write"):
+            dst[idx] = labels[np.newaxis]
+
+
+@mazepa.taskable_operation_cls
+@attrs.frozen
+class CC3DAdjacencyOperation(_CC3DChunkOperationBase):
+    """
+    Second pass of ``build_filter_cc3d_flow``: reads the chunk's labels with a one voxel
+    margin and saves the pairs of labels that touch across the chunk faces.
+    """
+
+    connectivity_3d: Literal[6, 18, 26] = 6
+
+    def get_operation_name(self) -> str:  # pylint: disable=no-self-use
+        return "CC3DAdjacency"
+
+    def __call__(
+        self, idx: VolumetricIndex, dst: VolumetricLayer | None, labels: VolumetricLayer
+    ) -> None:
+        grid_coord = self.grid.get_grid_coord(idx)
+        with semaphore("read"):
+            data = tensor_ops.convert.to_np(labels[idx.padded(Vec3D[int](1, 1, 1))])[0]
+        with semaphore("cpu"):
+            size = np.array(data.shape) - 1
+            edges = []
+            for offset in _get_half_neighborhood(self.connectivity_3d):
+                # Pairs are only collected from voxels inside the chunk, and voxels of
+                # one chunk can never touch a different label of the same chunk.
+                a = data[tuple(slice(1, e) for e in size)]
+                b = data[tuple(slice(1 + o, e + o) for o, e in zip(offset, size))]
+                touching = (a != 0) & (b != 0) & (a != b)
+                if touching.any():
+                    edges.append(np.stack([a[touching], b[touching]], axis=1))
+            if len(edges) > 0:
+                edges_arr = np.unique(np.concatenate(edges), axis=0)
+            else:
+                edges_arr = np.zeros((0, 2), dtype=np.uint64)
+        self.grid.save("edges", grid_coord, edges=edges_arr)
+
+
+@mazepa.taskable_operation_cls
+@attrs.frozen
+class CC3DFilterOperation(_CC3DChunkOperationBase):
+    """
+    Last pass of ``build_filter_cc3d_flow``: zeroes out the voxels of ``src`` whose
+    global component was not kept, and writes the result to ``dst``.
+    """
+
+    def get_operation_name(self) -> str:  # pylint: disable=no-self-use
+        return "CC3DFilter"
+
+    def __call__(
+        self,
+        idx: VolumetricIndex,
+        dst: VolumetricLayer,
+        src: VolumetricLayer,
+        labels: VolumetricLayer,
+    ) -> None:
+        grid_coord = self.grid.get_grid_coord(idx)
+        keep_ids = self.grid.load("keep", grid_coord)["ids"]
+        with semaphore("read"):
+            data = src[idx]
+            labels_data = tensor_ops.convert.to_np(labels[idx])
+        with semaphore("cpu"):
+            keep_mask = fastremap.mask_except(labels_data, keep_ids.tolist(), in_place=True) != 0
+            result = tensor_ops.convert.to_np(data).copy()
+            result[keep_mask == 0] = 0
+        with semaphore("write"):
+            dst[idx] = tensor_ops.convert.astype(result, data)
+
+
+def _union_find(ids: npt.NDArray, edges: npt.NDArray) -> npt.NDArray:
+    """
+    Returns the representative (smallest) id of the component of each of the sorted
+    ``ids``, given the pairs of ids in ``edges`` that belong to the same component.
+    Union by hooking the larger root onto the smaller one, with full path compression
+    after every round, vectorized over all edges.
+    """
+    parent = np.arange(len(ids))
+    if len(edges) == 0:
+        return ids
+    a = np.searchsorted(ids, edges[:, 0])
+    b = np.searchsorted(ids, edges[:, 1])
+    while True:
+        root_a = parent[a]
+        root_b = parent[b]
+        if (root_a == root_b).all():
+            break
+        np.minimum.at(parent, np.maximum(root_a, root_b), np.minimum(root_a, root_b))
+        while True:
+            grandparent = parent[parent]
+            if (grandparent == parent).all():
+                break
+            parent = grandparent
+    return ids[parent]
+
+
+@mazepa.taskable_operation
+def merge_cc3d_chunks_op(grid: CCChunkGrid, mode: MaskFilteringModes, thr: int) -> None:
+    """
+    Merges the components of all chunks across the chunk faces and saves, for
+    each chunk, the labels of the components that pass the size filter.
+    """
+    grid_coords = grid.get_grid_coords()
+    sizes = [grid.load("sizes", grid_coord) for grid_coord in grid_coords]
+    ids = np.concatenate([e["ids"] for e in sizes]).astype(np.uint64)
+    counts = np.concatenate([e["counts"] for e in sizes]).astype(np.int64)
+    edges = np.concatenate(
+        [np.zeros((0, 2), dtype=np.uint64)]
+        + [grid.load("edges", grid_coord)["edges"] for grid_coord in grid_coords]
+    ).astype(np.uint64)
+
+    order = np.argsort(ids)
+    ids = ids[order]
+    counts = counts[order]
+    roots = _union_find(ids, edges)
+    root_ids, root_inverse = np.unique(roots, return_inverse=True)
+    root_counts = np.bincount(root_inverse, weights=counts, minlength=len(root_ids))
+    if mode == "keep_large":
+        root_keep = root_counts > thr
+    else:
+        root_keep = root_counts <= thr
+    logger.info(
+        f"Merged {len(ids)} chunk components into {len(root_ids)} components, "
+        f"keeping {root_keep.sum()}."
+    )
+
+    kept_ids = ids[root_keep[root_inverse]]
+    chunk_volume = int(np.prod(grid.chunk_size))
+    for grid_coord in grid_coords:
+        id_offset = grid.get_id_offset(grid_coord)
+        start, stop = np.searchsorted(kept_ids, [id_offset + 1, id_offset + chunk_volume + 1])
+        grid.save("keep", grid_coord, ids=kept_ids[start:stop])
+
+
+@builder.register("build_filter_cc3d_flow")
+def build_filter_cc3d_flow(  # pylint: disable=too-many-locals
+    src: VolumetricLayer,
+    dst: VolumetricLayer,
+    dst_resolution: Sequence[float],
+    processing_chunk_size: Sequence[int],
+    tmp_dir: str,
+    mode: MaskFilteringModes = "keep_small",
+    thr: int = 100,
+    connectivity_3d: Literal[6, 18, 26] = 6,
+    expand_bbox_resolution: bool = False,
+    expand_bbox_processing: bool = True,
+    bbox: BBox3D | None = None,
+    start_coord: Sequence[int] | None = None,
+    end_coord: Sequence[int] | None = None,
+    coord_resolution: Sequence | None = None,
+    auto_bbox: bool = False,
+) -> mazepa.Flow:
+    """
+    Chunked version of ``tensor_ops.mask.filter_cc3d``: removes the 3D connected
+    components of the non-zero voxels of ``src`` by their size over the whole ``bbox``,
+    so that components crossing chunk boundaries are filtered by their full size, while
+    each task only holds a single processing chunk in memory.
+
+    The flow runs in four passes:
+    (1) label the components of each chunk and count their voxels;
+    (2) collect the pairs of labels that touch across chunk faces;
+    (3) merge the chunk components with union-find into global components in a single
+    task, which only handles the per-chunk metadata;
+    (4) zero out the voxels of the filtered components and write to ``dst``.
+
+    :param src: Input layer (single channel).
+    :param dst: Output layer.
+    :param dst_resolution: Resolution at which to process.
+    :param processing_chunk_size: Size of the processing chunks.
+    :param tmp_dir: Directory for the chunk labels layer and the per-chunk metadata.
+        Must be accessible by all workers.
+    :param mode: Filtering mode.
+    :param thr: Voxel size threshold.
+    :param connectivity_3d: Voxel connectivity of the components.
+    :param expand_bbox_resolution: See ``build_subchunkable_apply_flow``.
+    :param expand_bbox_processing: See ``build_subchunkable_apply_flow``.
+    :param bbox: See ``build_subchunkable_apply_flow``.
+    :param start_coord: See ``build_subchunkable_apply_flow``.
+    :param end_coord: See ``build_subchunkable_apply_flow``.
+    :param coord_resolution: See ``build_subchunkable_apply_flow``.
+    :param auto_bbox: See ``build_subchunkable_apply_flow``.
+    """
+    dst_resolution_ = Vec3D(*dst_resolution)
+    chunk_size = Vec3D[int](*processing_chunk_size)
+    bbox_ = parse_bbox(
+        dst=dst,
+        bbox=bbox,
+        start_coord=start_coord,
+        end_coord=end_coord,
+        coord_resolution=coord_resolution,
+        dst_resolution=dst_resolution_,
+        auto_bbox=auto_bbox,
+    )
+    if expand_bbox_resolution:
+        bbox_ = expand_bbox_to_resolution(bbox_, dst_resolution_)
+    if expand_bbox_processing:
+        bbox_ = expand_bbox_to_processing_chunks(
+            bbox_, dst_resolution_, [chunk_size], Vec3D[int](0, 0, 0)
+        )
+    bbox_shape = round(bbox_.shape / dst_resolution_)
+    if bbox_shape % chunk_size != Vec3D[int](0, 0, 0):
+        raise ValueError(
+            f"The `bbox` shape of {bbox_shape.pformat()} px must be divisible by the "
+            f"`processing_chunk_size` of {chunk_size.pformat()}; you may set "
+            "`expand_bbox_processing = True`."
+        )
+
+    grid = CCChunkGrid(
+        origin=list(round(bbox_.start / dst_resolution_)),
+        grid_shape=list(bbox_shape // chunk_size),
+        chunk_size=list(chunk_size),
+        tmp_dir=tmp_dir,
+    )
+    labels = build_cv_layer(
+        path=path.join(tmp_dir, "labels"),
+        info_type="segmentation",
+        info_data_type="uint64",
+        info_num_channels=1,
+        info_chunk_size=chunk_size,
+        info_bbox=bbox_,
+        info_encoding="raw",
+        info_scales=[dst_resolution_],
+        info_overwrite=True,
+    )
+    subchunkable_kwargs = {
+        "dst_resolution": dst_resolution_,
+        "processing_chunk_sizes": [chunk_size],
+        "skip_intermediaries": True,
+        "expand_bbox_processing": False,
+        "bbox": bbox_,
+    }
+    return sequential_flow(
+        [
+            build_subchunkable_apply_flow(
+                dst=labels,
+                op=CC3DLabelOperation(grid=grid, connectivity_3d=connectivity_3d),
+                op_kwargs={"src": src},
+                **subchunkable_kwargs,  # type: ignore
+            ),
+            build_subchunkable_apply_flow(
+                dst=None,
+                op=CC3DAdjacencyOperation(grid=grid, connectivity_3d=connectivity_3d),
+                op_kwargs={"labels": labels},
+                **subchunkable_kwargs,  # type: ignore
+            ),
+            merge_cc3d_chunks_op.make_task(grid=grid, mode=mode, thr=thr),
+            build_subchunkable_apply_flow(
+                dst=dst,
+                op=CC3DFilterOperation(grid=grid),
+                op_kwargs={"src": src, "labels": labels},
+                **subchunkable_kwargs,  # type: ignore
+            ),
+        ]
+    )
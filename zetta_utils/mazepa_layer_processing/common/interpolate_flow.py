@@ -2,18 +2,27 @@ from __future__ import annotations
 
 from typing import Sequence, Union, cast
 
+import attrs
 from numpy import typing as npt
 
 from zetta_utils import builder, mazepa, tensor_ops
 from zetta_utils.common import ComparablePartial
 from zetta_utils.geometry import BBox3D, Vec3D
+from zetta_utils.geometry.vec import VEC3D_PRECISION
+from zetta_utils.layer.volumetric import VolumetricIndex, VolumetricIndexChunker
 from zetta_utils.layer.volumetric.layer import VolumetricLayer
+from zetta_utils.mazepa import semaphore
 from zetta_utils.mazepa.flows import sequential_flow
+from zetta_utils.mazepa_layer_processing.common.bbox_expansion import (
+    expand_bbox_to_processing_chunks,
+    expand_bbox_to_resolution,
+)
 from zetta_utils.mazepa_layer_processing.common.subchunkable_apply_flow import (
     build_subchunkable_apply_flow,
+    parse_bbox,
 )
 
-from . import VolumetricCallableOperation
+from . import VolumetricCallableOperation, build_chunked_apply_flow
 
 
 def _interpolate(
@@ -52,6 +61,28 @@ def make_interpolate_operation(
     return op
 
 
+def _sort_dst_resolutions(
+    dst_resolutions: Sequence[Sequence[float]] | Sequence[float],
+) -> list[Vec3D]:
+    if isinstance(dst_resolutions[0], float):
+        dst_resolutions_list = cast(Sequence[Sequence[float]], [dst_resolutions])
+    else:
+        dst_resolutions_list = cast(Sequence[Sequence[float]], dst_resolutions)
+
+    dst_resolutions_vec = [Vec3D(*e) for e in dst_resolutions_list]
+
+    dst_resolutions_vec_sorted = sorted(dst_resolutions_vec, key=tuple)
+
+    for i in range(len(dst_resolutions_vec_sorted) - 1):
+        a = dst_resolutions_vec_sorted[i]
+        b = dst_resolutions_vec_sorted[i + 1]
+        if not a <= b:
+            raise RuntimeError(
+                "Cannot find a strictly increasing order for the given resolutions: " f"{a} {b}"
+            )
+    return dst_resolutions_vec_sorted
+
+
 @builder.register("build_interpolate_flow")
 def build_interpolate_flow(  # pylint: disable=too-many-locals
     src: VolumetricLayer,
@@ -74,22 +105,7 @@ def build_interpolate_flow(  # pylint: disable=too-many-locals
     if dst is None:
         dst = src
 
-    if isinstance(dst_resolutions[0], float):
-        dst_resolutions_list = cast(Sequence[Sequence[float]], [dst_resolutions])
-    else:
-        dst_resolutions_list = cast(Sequence[Sequence[float]], dst_resolutions)
-
-    dst_resolutions_vec = [Vec3D(*e) for e in dst_resolutions_list]
-
-    dst_resolutions_vec_sorted = sorted(dst_resolutions_vec, key=tuple)
-
-    for i in range(len(dst_resolutions_vec_sorted) - 1):
-        a = dst_resolutions_vec_sorted[i]
-        b = dst_resolutions_vec_sorted[i + 1]
-        if not a <= b:
-            raise RuntimeError(
-                "Cannot find a strictly increasing order for the given resolutions: " f"{a} {b}"
-            )
+    dst_resolutions_vec_sorted = _sort_dst_resolutions(dst_resolutions)
 
     stages = []
     last_res = Vec3D(*src_resolution)
@@ -121,3 +137,119 @@ def build_interpolate_flow(  # pylint: disable=too-many-locals
         last_src = dst
     result = sequential_flow(stages=stages)
     return result
+
+
+@builder.register("InterpolatePyramidOperation")
+@mazepa.taskable_operation_cls
+@attrs.frozen
+class InterpolatePyramidOperation:
+    """
+    Reads ``src`` once at ``src_resolution`` and writes every level of the interpolation
+    pyramid to ``dst``, computing all levels in memory with ``tensor_ops.interpolate_pyramid``.
+
+    :param src_resolution: Resolution at which ``src`` is read.
+    :param dst_resolutions: Resolutions of the levels written to ``dst``.
+    :param mode: Interpolation mode, same semantics as in ``tensor_ops.interpolate``.
+    :param mask_value_thr: When ``mode == 'mask'``, threshold above which the interpolated
+        value will be considered as ``True``.
+    :param num_threads: Maximum number of threads used for computing the pyramid.
+    """
+
+    src_resolution: Sequence[float]
+    dst_resolutions: Sequence[Sequence[float]]
+    mode: tensor_ops.InterpolationMode
+    mask_value_thr: float = 0
+    num_threads: int | None = None
+
+    def get_operation_name(self) -> str:
+        return f"InterpolatePyramid<{self.mode}>"
+
+    def __call__(self, idx: VolumetricIndex, dst: VolumetricLayer, src: VolumetricLayer) -> None:
+        src_resolution = Vec3D(*self.src_resolution)
+        with semaphore("read"):
+            data = src[VolumetricIndex(resolution=src_resolution, bbox=idx.bbox)]
+        with semaphore("cpu"):
+            levels = tensor_ops.interpolate_pyramid(
+                data,
+                scale_factors=[src_resolution / Vec3D(*e) for e in self.dst_resolutions],
+                mode=self.mode,
+                mask_value_thr=self.mask_value_thr,
+                unsqueeze_input_to=5,
+                num_threads=self.num_threads,
+            )
+        with semaphore("write"):
+            for dst_res, level in zip(self.dst_resolutions, levels):
+                dst[VolumetricIndex(resolution=Vec3D(*dst_res), bbox=idx.bbox)] = level
+
+
+@builder.register("build_interpolate_pyramid_flow")
+def build_interpolate_pyramid_flow(  # pylint: disable=too-many-locals
+    src: VolumetricLayer,
+    dst: VolumetricLayer | None,
+    src_resolution: Sequence[float],
+    dst_resolutions: Sequence[Sequence[float]] | Sequence[float],
+    mode: tensor_ops.InterpolationMode,
+    processing_chunk_size: Sequence[int],
+    mask_value_thr: float = 0,
+    num_threads: int | None = None,
+    expand_bbox_resolution: bool = False,
+    expand_bbox_processing: bool = True,
+    bbox: BBox3D | None = None,
+    start_coord: Sequence[int] | None = None,
+    end_coord: Sequence[int] | None = None,
+    coord_resolution: Sequence | None = None,
+    auto_bbox: bool = False,
+) -> mazepa.Flow:
+    """
+    Single-pass alternative to ``build_interpolate_flow``: each task reads its region of
+    ``src`` once and writes all of the ``dst_resolutions`` levels, instead of running one
+    flow per level that reads back the previous level from storage.
+
+    ``processing_chunk_size`` is given in voxels of the coarsest destination resolution,
+    and must correspond to an integral number of voxels at every other resolution.
+    """
+    if dst is None:
+        dst = src
+
+    dst_resolutions_vec_sorted = _sort_dst_resolutions(dst_resolutions)
+    top_resolution = dst_resolutions_vec_sorted[-1]
+    chunk_size = Vec3D[int](*processing_chunk_size)
+    for res in [Vec3D(*src_resolution)] + dst_resolutions_vec_sorted:
+        chunk_size_in_res = chunk_size * top_resolution / res
+        if round(chunk_size_in_res) != round(chunk_size_in_res, VEC3D_PRECISION):
+            raise ValueError(
+                f"`processing_chunk_size` of {chunk_size.pformat()} at the coarsest "
+                f"resolution {top_resolution.pformat()} is not integral at resolution "
+                f"{res.pformat()}: {chunk_size_in_res.pformat()}"
+            )
+
+    bbox_ = parse_bbox(
+        dst=dst,
+        bbox=bbox,
+        start_coord=start_coord,
+        end_coord=end_coord,
+        coord_resolution=coord_resolution,
+        dst_resolution=top_resolution,
+        auto_bbox=auto_bbox,
+    )
+    if expand_bbox_resolution:
+        bbox_ = expand_bbox_to_resolution(bbox_, top_resolution)
+    if expand_bbox_processing:
+        bbox_ = expand_bbox_to_processing_chunks(
+            bbox_, top_resolution, [chunk_size], Vec3D[int](0, 0, 0)
+        )
+
+    operation = InterpolatePyramidOperation(
+        src_resolution=src_resolution,
+        dst_resolutions=[list(e) for e in dst_resolutions_vec_sorted],
+        mode=mode,
+        mask_value_thr=mask_value_thr,
+        num_threads=num_threads,
+    )
+    return build_chunked_apply_flow(
+        operation=operation,  # type: ignore
+        chunker=VolumetricIndexChunker(chunk_size=chunk_size, resolution=top_resolution),
+        idx=VolumetricIndex(resolution=top_resolution, bbox=bbox_),
+        dst=dst,
+        src=src,
+    )
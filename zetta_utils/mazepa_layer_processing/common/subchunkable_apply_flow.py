@@ -33,6 +33,7 @@ from zetta_utils.ng.link_builder import make_ng_link
 from zetta_utils.typing import ensure_seq_of_seq
 
 from ..operation_protocols import VolumetricOpProtocol
+from .bbox_expansion import expand_bbox_to_processing_chunks, expand_bbox_to_resolution
 from .volumetric_apply_flow import VolumetricApplyFlowSchema
 from .volumetric_callable_operation import VolumetricCallableOperation
 
@@ -622,30 +623,6 @@ def _path_join_if_not_none(base: str | None, suffix: str) -> str | None:
         return path.join(base, suffix)  # f"chunks_level_{level}"
 
 
-def _expand_bbox_resolution(  # pylint: disable=line-too-long
-    bbox: BBox3D,
-    dst_resolution: Vec3D,
-) -> BBox3D:
-    bbox_new = bbox.snapped(Vec3D[float](0, 0, 0), dst_resolution, "expand")
-    if bbox_new != bbox:
-        logger.info(
-            f"`expand_bbox_resolution` was set and the `bbox` was not integral in `dst_resolution`, "
-            f"so the bbox has been modified: (in {dst_resolution.pformat()} {bbox.unit} pixels))\n"
-            f"Received bbox:\t{bbox.pformat()} {bbox.unit}\n\t\t{bbox.pformat(dst_resolution)} px\n"
-            f"\tshape:\t{(bbox.shape / dst_resolution).pformat()} px\n"
-            f"New bbox:\t{bbox_new.pformat()} {bbox_new.unit}\n\t\t{bbox_new.pformat(dst_resolution)} px\n"
-            f"\tshape:\t{(bbox_new.shape // dst_resolution).int().pformat()} px\n"
-            f"Please note that this may affect chunk alignment requirements."
-        )
-    else:
-        logger.info(
-            "`expand_bbox_resolution` was set, but the `bbox` was already integral in `dst_resolution`, "
-            "so no action has been taken."
-        )
-
-    return bbox_new
-
-
 def _auto_divisibility(  # pylint: disable=line-too-long
     processing_chunk_sizes: Sequence[Vec3D[int]],
     processing_crop_pads: Sequence[Vec3D[int]],
@@ -718,45 +695,6 @@ def _expand_bbox_backend(  # pylint: disable=line-too-long
     return bbox_new
 
 
-def _expand_bbox_processing(  # pylint: disable=line-too-long
-    bbox: BBox3D,
-    dst_resolution: Vec3D,
-    processing_chunk_sizes: Sequence[Vec3D[int]],
-    processing_gap: Vec3D[int],
-) -> BBox3D:
-    bbox_shape_in_res = round(bbox.shape / dst_resolution)
-    bbox_shape_in_res_raw = round(bbox.shape / dst_resolution, VEC3D_PRECISION)
-    if bbox_shape_in_res != bbox_shape_in_res_raw:
-        raise ValueError(
-            "To use `expand_bbox_processing`, the `bbox` must be integral in the "
-            f"`dst_resolution`. Received {bbox.pformat()}, which is "
-            f"{bbox.pformat(dst_resolution)} at the `dst_resolution` of "
-            f"{dst_resolution.pformat()}. You may set `expand_bbox_resolution = True` to "
-            "automatically expand the bbox to the nearest integral pixel."
-        )
-    bbox_old = bbox
-    chunk_size_top = processing_chunk_sizes[0]
-    translation_end = (chunk_size_top - bbox_shape_in_res) % (chunk_size_top + processing_gap)
-    bbox = bbox.translated_end(translation_end, dst_resolution)
-    if translation_end != Vec3D[int](0, 0, 0):
-        logger.info(
-            f"`expand_bbox_processing` was set and the `bbox` was not aligned to the top level "
-            f"`processing_chunk_size` (with `processing_gap`s if applicable) in at least one dimension, "
-            f"so the bbox has been modified: (in {dst_resolution.pformat()} {bbox_old.unit} pixels))\n"
-            f"Received bbox:\t{bbox_old.pformat()} {bbox_old.unit}\n\t\t{bbox_old.pformat(dst_resolution)} px\n"
-            f"\tshape:\t{(bbox_old.shape // dst_resolution).int().pformat()} px\n"
-            f"New bbox:\t{bbox.pformat()} {bbox.unit}\n\t\t{bbox.pformat(dst_resolution)} px\n"
-            f"\tshape:\t{(bbox.shape // dst_resolution).int().pformat()} px\n"
-            f"Please note that this may affect chunk alignment requirements."
-        )
-    else:
-        logger.info(
-            "`expand_bbox_processing` was set, but the `bbox` was already aligned to processing chunks,  "
-            "so no action has been taken."
-        )
-    return bbox
-
-
 def _shrink_processing_chunk(  # pylint: disable=line-too-long
     bbox: BBox3D,
     dst_resolution: Vec3D,
@@ -1085,7 +1023,7 @@ def _build_subchunkable_apply_flow(  # pylint: disable=keyword-arg-before-vararg
     original_bbox = deepcopy(bbox)
 
     if expand_bbox_resolution:
-        bbox = _expand_bbox_resolution(bbox, dst_resolution)
+        bbox = expand_bbox_to_resolution(bbox, dst_resolution)
 
     original_bbox_resolution = deepcopy(bbox)
 
@@ -1097,7 +1035,7 @@ def _build_subchunkable_apply_flow(  # pylint: disable=keyword-arg-before-vararg
             bbox, dst_resolution, processing_chunk_sizes
         )
     elif expand_bbox_processing:
-        bbox = _expand_bbox_processing(
+        bbox = expand_bbox_to_processing_chunks(
             bbox, dst_resolution, processing_chunk_sizes, processing_gap
         )
 
@@ -16,6 +16,7 @@ from typeguard import suppress_type_checks
 from typing_extensions import ParamSpec
 
 from zetta_utils import log, mazepa
+from zetta_utils.common import tracing
 from zetta_utils.geometry import Vec3D
 from zetta_utils.layer.volumetric import (
     VolumetricBasedLayerProtocol,
@@ -82,7 +83,7 @@ class ReduceNaive(ReduceOperation):
         dst: VolumetricBasedLayerProtocol,
         processing_blend_pad: Vec3D[int],
     ) -> None:
-        with suppress_type_checks():
+        with tracing.span("reduce"), suppress_type_checks():
             if len(src_layers) == 0:
                 return
             res = torch.zeros(
@@ -132,7 +133,7 @@ class ReduceByWeightedSum(ReduceOperation):
         dst: VolumetricBasedLayerProtocol,
         processing_blend_pad: Vec3D[int],
     ) -> None:
-        with suppress_type_checks():
+        with tracing.span("reduce"), suppress_type_checks():
             if len(src_layers) == 0:
                 return
             if not is_floating_point_dtype(dst.backend.dtype) and processing_blend_pad != Vec3D[
@@ -11,6 +11,7 @@ from numpy import typing as npt
 from typing_extensions import ParamSpec
 
 from zetta_utils import builder, mazepa, tensor_ops
+from zetta_utils.common import tracing
 from zetta_utils.geometry import Vec3D
 from zetta_utils.layer import IndexChunker
 from zetta_utils.layer.volumetric import VolumetricIndex, VolumetricLayer
@@ -92,7 +93,8 @@ class VolumetricCallableOperation(Generic[P]):
             if self.fn_semaphores is not None:
                 for semaphore_type in self.fn_semaphores:
                     semaphore_stack.enter_context(semaphore(semaphore_type))
-            result_raw = self.fn(**task_kwargs)
+            with tracing.span("op"):
+                result_raw = self.fn(**task_kwargs)
             torch.cuda.empty_cache()
 
         # If no destination layer, we can bail out now.  Possibly we
@@ -1,10 +1,15 @@
 """cuelang parsing."""
+import hashlib
 import os
 import pathlib
+import re
 import shutil
 import subprocess
 import tempfile
+import threading
+from typing import Optional
 
+import cachetools
 import fsspec
 
 from zetta_utils import log
@@ -14,17 +19,113 @@ logger = log.get_logger("zetta_utils")
 
 cue_exe = os.environ.get("CUE_EXE", "cue")
 
+# Exported JSON by hash of the spec text and the CUE executable
+_CACHE: Optional[cachetools.LRUCache] = cachetools.LRUCache(maxsize=256)
+_CACHE_LOCK = threading.Lock()
+_cache_dir: Optional[str] = os.environ.get("ZETTA_CUE_CACHE_DIR")
+
+_IMPORT_RE = re.compile(r"^\s*import\s*(\(.*?\)|[^\n]*)", re.MULTILINE | re.DOTALL)
+
+
+def configure_cache(maxsize: int = 256, cache_dir: Optional[str] = None) -> None:
+    """Configure the cache of exported specs, emptying the in-memory cache.
+
+    :param maxsize: Number of specs kept in memory; 0 disables the cache.
+    :param cache_dir: Local directory to also keep the exported specs in, so that
+        they are shared between processes. Defaults to ``$ZETTA_CUE_CACHE_DIR``.
+    """
+    global _CACHE, _cache_dir  # pylint: disable=global-statement
+    with _CACHE_LOCK:
+        _CACHE = cachetools.LRUCache(maxsize=maxsize) if maxsize > 0 else None
+        _cache_dir = cache_dir if cache_dir is not None else os.environ.get("ZETTA_CUE_CACHE_DIR")
+
+
+def _has_non_std_imports(s: str) -> bool:
+    """Whether the spec imports packages other than the CUE standard library, whose
+    contents are not part of the cache key."""
+    for imports in _IMPORT_RE.findall(s):
+        for import_path in re.findall(r'"([^"]+)"', imports):
+            if "." in import_path.split("/")[0]:
+                return True
+    return False
+
+
+def _get_cache_key(s: str) -> Optional[str]:
+    if _CACHE is None and _cache_dir is None:
+        return None
+    if _has_non_std_imports(s):
+        return None
+    exe_path = shutil.which(cue_exe)
+    if exe_path is None:  # pragma: no cover
+        return None
+    # The executable stands in for the CUE version, which would cost a process to query
+    stat = os.stat(exe_path)
+    hasher = hashlib.sha256(f"{exe_path}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+    hasher.update(s.encode())
+    return hasher.hexdigest()
+
+
+def _get_cached(key: Optional[str]) -> Optional[bytes]:
+    if key is None:
+        return None
+    with _CACHE_LOCK:
+        if _CACHE is not None and key in _CACHE:
+            return _CACHE[key]
+    if _cache_dir is not None:
+        try:
+            with open(os.path.join(_cache_dir, f"{key}.json"), "rb") as f:
+                result = f.read()
+        except FileNotFoundError:
+            return None
+        _put_memory(key, result)
+        return result
+    return None
+
+
+def _put_cached(key: Optional[str], exported: bytes) -> None:
+    if key is None:
+        return
+    _put_memory(key, exported)
+    if _cache_dir is not None:
+        os.makedirs(_cache_dir, exist_ok=True)
+        path = os.path.join(_cache_dir, f"{key}.json")
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(exported)
+        os.replace(tmp_path, path)
+
+
+def _put_memory(key: str, exported: bytes) -> None:
+    with _CACHE_LOCK:
+        if _CACHE is not None:
+            _CACHE[key] = exported
+
 
 def loads(s: str):
-    with tempfile.TemporaryDirectory() as tmp_dir:
-        local_tmp_path = os.path.join(tmp_dir, "tmp_spec.cue")
-        with open(local_tmp_path, "w", encoding="utf8") as tmp_f:
-            tmp_f.write(s)
-        result = load_local(local_tmp_path)
-    return result
+    key = _get_cache_key(s)
+    exported = _get_cached(key)
+    if exported is None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            local_tmp_path = os.path.join(tmp_dir, "tmp_spec.cue")
+            with open(local_tmp_path, "w", encoding="utf8") as tmp_f:
+                tmp_f.write(s)
+            exported = _export(local_tmp_path)
+        _put_cached(key, exported)
+    return json.loads(exported)
 
 
 def load_local(local_path: str):
+    local_path_str = _to_str_path(local_path)
+    with open(local_path_str, "r", encoding="utf8") as f:
+        key = _get_cache_key(f.read())
+    exported = _get_cached(key)
+    if exported is None:
+        exported = _export(local_path_str)
+        _put_cached(key, exported)
+    return json.loads(exported)
+
+
+def _export(local_path: str) -> bytes:
     if shutil.which(cue_exe) is None:  # pragma: no cover
         raise RuntimeError(
             f"{cue_exe} not found.  Please ensure cuelang is installed ( https://cuelang.org/ )"
@@ -40,9 +141,7 @@ def load_local(local_path: str):
             f"CUE failed parsing {local_path_str}: {command_result.stderr.decode('utf-8')}"
         )
 
-    result_str = command_result.stdout
-    result = json.loads(result_str)
-    return result
+    return command_result.stdout
 
 
 def _to_str_path(path):
@@ -58,17 +157,23 @@ def _to_str_path(path):
 def load(path):
     path_str = _to_str_path(path)
 
+    with fsspec.open(path_str, "r", encoding="utf8") as f:
+        contents = f.read()
+    key = _get_cache_key(contents)
+    exported = _get_cached(key)
+    if exported is not None:
+        return json.loads(exported)
+
     # Files are always copied to a tempfolder to avoid different cases for local/remote
     with tempfile.TemporaryDirectory() as tmp_dir:
         local_tmp_path = os.path.join(tmp_dir, "remote_file.cue")
         with open(local_tmp_path, "w", encoding="utf8") as tmp_f:
             logger.info(f"Copying '{path_str}' to {local_tmp_path} for parsing...")
-            with fsspec.open(path_str, "r", encoding="utf8") as f:
-                contents = f.read()
-                tmp_f.write(contents)
-                tmp_f.flush()
+            tmp_f.write(contents)
+            tmp_f.flush()
             # Do a quick check for valid CUE before proceeding any further
-            result = subprocess.run(["cue", "vet", "-c", local_tmp_path], check=True)
-            # Then, return file contents
-            result = load_local(local_tmp_path)
-    return result
+            subprocess.run(["cue", "vet", "-c", local_tmp_path], check=True)
+            # Then, export the file contents
+            exported = _export(local_tmp_path)
+    _put_cached(key, exported)
+    return json.loads(exported)
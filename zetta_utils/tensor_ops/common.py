@@ -1,4 +1,6 @@
 # pylint: disable=missing-docstring
+import os
+from concurrent.futures import ThreadPoolExecutor
 from typing import (
     Any,
     Callable,
@@ -513,6 +515,134 @@ def _interpolate_with_tinybrain(
     return result_final
 
 
+@builder.register("interpolate_pyramid")
+@typechecked
+def interpolate_pyramid(  # pylint: disable=too-many-locals
+    data: TensorTypeVar,
+    scale_factors: Sequence[Union[float, Sequence[float]]],
+    mode: InterpolationMode = "img",
+    mask_value_thr: float = 0,
+    allow_slice_rounding: bool = False,
+    unsqueeze_input_to: Optional[int] = 5,
+    num_threads: Optional[int] = None,
+) -> list[TensorTypeVar]:
+    """
+    Compute several interpolation levels of the given tensor in a single call, e.g. all
+    the mips of a pyramid from one in-memory input.
+
+    Each level is computed from the previous one, so ``result[i]`` is identical to
+    chaining ``interpolate`` calls with the relative scale factor between consecutive
+    levels. The work is split into blocks along the channel dimension and, when none of
+    the levels scales it, along the last spatial dimension, and the blocks are processed
+    by a thread pool.
+
+    :param data: Input tensor.
+    :param scale_factors: Scale factor of each level with respect to ``data``.
+        When provided as ``float``, applied to all spatial dimensions of the data.
+    :param mode: Algorithm according to which the tensor should be interpolated.
+        Same semantics as in ``interpolate``.
+    :param mask_value_thr: When ``mode == 'mask'``, threshold above which the interpolated
+        value will be considered as ``True``.
+    :param allow_slice_rounding: Whether to allow interpolation with scale factors that
+        result in non-integer tensor shapes.
+    :param unsqueeze_input_to: If provided, the tensor will be unsqueezed to the given number
+        of dimensions before interpolating. Same semantics as in ``interpolate``.
+    :param num_threads: Maximum number of blocks processed in parallel.
+        Defaults to the number of CPUs.
+    :return: List of interpolated tensors of the same type as the input tensor, one per
+        scale factor.
+    """
+    if len(scale_factors) == 0:
+        return []
+    original_ndim = data.ndim
+    data = unsqueeze_to(data, unsqueeze_input_to)
+
+    relative_factors = []
+    last_factor = (1.0,) * (data.ndim - 2)
+    for scale_factor in scale_factors:
+        factor = _standardize_scale_factor(data_ndim=data.ndim, scale_factor=scale_factor)
+        assert factor is not None
+        relative_factors.append(tuple(e / last for e, last in zip(factor, last_factor)))
+        last_factor = tuple(factor)
+
+    split_axis = _get_pyramid_split_axis(data, relative_factors, mode)
+    if num_threads is None:
+        num_threads = os.cpu_count() or 1
+    num_blocks = 1 if split_axis is None else min(num_threads, data.shape[split_axis])
+    if num_blocks <= 1:
+        levels = _interpolate_pyramid_block(
+            data, relative_factors, mode, mask_value_thr, allow_slice_rounding
+        )
+    else:
+        assert split_axis is not None
+        bounds = np.linspace(0, data.shape[split_axis], num_blocks + 1).astype(int)
+        blocks = []
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            block_slice = [slice(None)] * data.ndim
+            block_slice[split_axis] = slice(start, end)
+            blocks.append(data[tuple(block_slice)])
+        with ThreadPoolExecutor(max_workers=num_blocks) as pool:
+            block_levels = list(
+                pool.map(
+                    lambda block: _interpolate_pyramid_block(
+                        block, relative_factors, mode, mask_value_thr, allow_slice_rounding
+                    ),
+                    blocks,
+                )
+            )
+        levels = [
+            _concatenate([e[i] for e in block_levels], axis=split_axis)
+            for i in range(len(relative_factors))
+        ]
+    return [squeeze_to(e, original_ndim) for e in levels]
+
+
+def _get_pyramid_split_axis(
+    data: Tensor,
+    relative_factors: Sequence[Sequence[float]],
+    mode: InterpolationMode,
+) -> Optional[int]:
+    # Splitting the batch dimension could change the kernel that ``interpolate`` picks,
+    # and field interpolation needs all of the field channels at once.
+    candidates = []
+    if all(factor[-1] == 1 for factor in relative_factors):
+        candidates.append(data.ndim - 1)
+    if mode != "field":
+        candidates.append(1)
+    candidates = [e for e in candidates if data.shape[e] > 1]
+    if len(candidates) == 0:
+        return None
+    return max(candidates, key=lambda e: data.shape[e])
+
+
+def _interpolate_pyramid_block(
+    data: TensorTypeVar,
+    relative_factors: Sequence[Sequence[float]],
+    mode: InterpolationMode,
+    mask_value_thr: float,
+    allow_slice_rounding: bool,
+) -> list[TensorTypeVar]:
+    result = []
+    level = data
+    for factor in relative_factors:
+        level = interpolate(
+            level,
+            scale_factor=factor,
+            mode=mode,
+            mask_value_thr=mask_value_thr,
+            allow_slice_rounding=allow_slice_rounding,
+            unsqueeze_input_to=None,
+        )
+        result.append(level)
+    return result
+
+
+def _concatenate(data: Sequence[TensorTypeVar], axis: int) -> TensorTypeVar:
+    if isinstance(data[0], torch.Tensor):
+        return torch.cat(list(data), dim=axis)  # type: ignore
+    return np.concatenate(data, axis=axis)  # type: ignore
+
+
 CompareMode = Literal[
     "eq",
     "==",
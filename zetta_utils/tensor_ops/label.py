@@ -3,6 +3,8 @@ from __future__ import annotations
 from typing import Sequence, overload
 
 import numpy as np
+import torch
+from numpy import typing as npt
 from typeguard import typechecked
 
 from zetta_utils import builder
@@ -34,16 +36,24 @@ def get_disp_pair(
     for a, b in zip(data.shape[-ndim:], np.absolute(disp)):
         assert a > b
 
+    slices1, slices2 = _get_disp_slices(data.shape, disp)
+    return data[slices1], data[slices2]
+
+
+def _get_disp_slices(
+    shape: Sequence[int], disp: Sequence[int]
+) -> tuple[tuple[slice, ...], tuple[slice, ...]]:
+    ndim = len(disp)
     disp1 = np.maximum(disp, 0)
-    disp2 = np.maximum(-disp, 0)
+    disp2 = np.maximum(-np.array(disp), 0)
 
-    slices1 = [slice(0, None) for _ in range(data.ndim - ndim)]
-    slices2 = [slice(0, None) for _ in range(data.ndim - ndim)]
-    for shape, offset1, offset2 in zip(data.shape[-ndim:], disp1, disp2):
-        slices1.append(slice(offset1, shape - offset2))
-        slices2.append(slice(offset2, shape - offset1))
+    slices1 = [slice(0, None) for _ in range(len(shape) - ndim)]
+    slices2 = [slice(0, None) for _ in range(len(shape) - ndim)]
+    for size, offset1, offset2 in zip(shape[-ndim:], disp1, disp2):
+        slices1.append(slice(offset1, size - offset2))
+        slices2.append(slice(offset2, size - offset1))
 
-    return data[tuple(slices1)], data[tuple(slices2)]
+    return tuple(slices1), tuple(slices2)
 
 
 @overload
@@ -93,6 +103,119 @@ def seg_to_aff(
     return result
 
 
+@overload
+def seg_to_affs(  # type: ignore # fixed in mypy 1.11.1, but waiting for 1.12
+    data: TensorTypeVar,
+    edges: Sequence[Sequence[int]],
+    mask: TensorTypeVar = ...,
+) -> tuple[TensorTypeVar, TensorTypeVar]:
+    ...
+
+
+@overload
+def seg_to_affs(
+    data: TensorTypeVar,
+    edges: Sequence[Sequence[int]],
+    mask: None = ...,
+) -> TensorTypeVar:
+    ...
+
+
+@builder.register("convert_seg_to_affs")
+@typechecked
+def seg_to_affs(
+    data,
+    edges,
+    mask=None,
+):
+    """
+    Transform a segmentation into an affinity map with one channel per edge, computed
+    in a single pass into a preallocated output.
+
+    Channel ``i`` holds the result of ``seg_to_aff(data, edges[i])`` at the positions
+    of the first volume of ``get_disp_pair(data, edges[i])``, and zeros at the positions
+    where the displaced voxel falls outside of ``data``. The same holds for the mask.
+
+    :param data: Input segmentation 3D volume; leading dimensions must be of size 1.
+    :param edges: Edges, meaning offset vectors
+    :param mask: Binary mask for `data`
+    :return: Affinity map of shape ``(len(edges), X, Y, Z)``, and the affinity mask
+        of the same shape if ``mask`` is given.
+    """
+    data_3d = squeeze_to(data, 3)
+    mask_3d = None
+    if mask is not None:
+        assert data.shape == mask.shape
+        mask_3d = squeeze_to(mask, 3)
+    for edge in edges:
+        assert len(edge) == 3
+        for a, b in zip(data_3d.shape, np.absolute(edge)):
+            assert a > b
+
+    if isinstance(data_3d, torch.Tensor):
+        aff, affmsk = _seg_to_affs_torch(data_3d, edges, mask_3d)
+    else:
+        aff, affmsk = _seg_to_affs_np(data_3d, edges, mask_3d)
+
+    result = aff
+    if mask is not None:
+        result = aff, affmsk
+
+    return result
+
+
+def _seg_to_affs_np(
+    data: npt.NDArray, edges: Sequence[Sequence[int]], mask: npt.NDArray | None
+) -> tuple[npt.NDArray, npt.NDArray | None]:
+    aff = np.zeros((len(edges),) + data.shape, dtype=data.dtype)
+    # Pairs of equal ids where one of them is nonzero are nonzero on both sides
+    nonzero = data != 0
+    work = np.empty(data.size, dtype=bool)
+    affmsk = None
+    if mask is not None:
+        affmsk = np.zeros((len(edges),) + mask.shape, dtype=mask.dtype)
+
+    for i, edge in enumerate(edges):
+        slices1, slices2 = _get_disp_slices(data.shape, edge)
+        pair_shape = data[slices1].shape
+        equal = work[: int(np.prod(pair_shape))].reshape(pair_shape)
+        np.equal(data[slices1], data[slices2], out=equal)
+        np.logical_and(equal, nonzero[slices1], out=equal)
+        aff[i][slices1] = equal
+        if mask is not None:
+            assert affmsk is not None
+            np.multiply(mask[slices1], mask[slices2], out=affmsk[i][slices1])
+
+    return aff, affmsk
+
+
+def _seg_to_affs_torch(
+    data: torch.Tensor, edges: Sequence[Sequence[int]], mask: torch.Tensor | None
+) -> tuple[torch.Tensor, torch.Tensor | None]:
+    aff = torch.zeros((len(edges),) + tuple(data.shape), dtype=data.dtype, device=data.device)
+    # Pairs of equal ids where one of them is nonzero are nonzero on both sides
+    nonzero = data != 0
+    work = torch.empty(data.numel(), dtype=torch.bool, device=data.device)
+    affmsk = None
+    if mask is not None:
+        affmsk = torch.zeros(
+            (len(edges),) + tuple(mask.shape), dtype=mask.dtype, device=mask.device
+        )
+
+    for i, edge in enumerate(edges):
+        slices1, slices2 = _get_disp_slices(data.shape, edge)
+        pair_shape = data[slices1].shape
+        equal = work[: pair_shape.numel()].view(pair_shape)
+        torch.eq(data[slices1], data[slices2], out=equal)
+        torch.logical_and(equal, nonzero[slices1], out=equal)
+        aff[i][slices1] = equal
+        if mask is not None:
+            assert affmsk is not None
+            torch.mul(mask[slices1], mask[slices2], out=affmsk[i][slices1])
+
+    return aff, affmsk
+
+
 @builder.register("seg_to_rgb")
 @typechecked
 def seg_to_rgb(
@@ -1,6 +1,8 @@
 import copy
+import os
+from concurrent.futures import ThreadPoolExecutor
 from functools import reduce
-from typing import Callable, Literal, Protocol, Sequence, TypeVar, Union
+from typing import Callable, Literal, Optional, Protocol, Sequence, TypeVar, Union
 
 import cc3d
 import einops
@@ -60,15 +62,19 @@ def filter_cc(
     data: TensorTypeVar,
     mode: MaskFilteringModes = "keep_small",
     thr: int = 100,
+    num_threads: Optional[int] = None,
 ) -> TensorTypeVar:
     """
     Remove connected components from the given input tensor_ops.
 
-    Clustering is performed based on non-zero values.
+    Clustering is performed based on non-zero values. Each Z section is processed
+    separately, and sections are processed concurrently by a thread pool.
 
     :param data: Input tensor (CXYZ).
     :param mode: Filtering mode.
     :param thr:  Pixel size threshold.
+    :param num_threads: Maximum number of sections processed in parallel.
+        Defaults to the number of CPUs.
     :return: Tensor with the filtered clusters removed.
     """
     data_np = convert.to_np(data)
@@ -78,25 +84,40 @@ def filter_cc(
 
     result_raw = np.zeros_like(data_np)
 
-    for z in range(data_np.shape[0]):
+    def _filter_section(z: int) -> None:
         if (data_np[z] != 0).sum() > 0:
             cc_labels = cc3d.connected_components(data_np[z] != 0)
-            segids, counts = np.unique(cc_labels, return_counts=True)
+            # Labels are contiguous, so the counts can be used as a lookup table
+            counts = np.bincount(cc_labels.ravel())
             if mode == "keep_large":
-                segids = [segid for segid, ct in zip(segids, counts) if ct > thr]
+                keep = counts > thr
             else:
-                segids = [segid for segid, ct in zip(segids, counts) if ct <= thr]
+                keep = counts <= thr
+            keep[0] = False
+            filtered_mask = keep[cc_labels]
 
-            filtered_mask = fastremap.mask_except(cc_labels, segids, in_place=True) != 0
+            result_raw[z][filtered_mask] = data_np[z][filtered_mask]
 
-            result_raw[z] = copy.copy(data_np[z])
-            result_raw[z][filtered_mask == 0] = 0
+    _map_sections(_filter_section, data_np.shape[0], num_threads)
 
     result_raw = einops.rearrange(result_raw, "Z C X Y -> C X Y Z")
     result = convert.astype(result_raw, data)
     return result
 
 
+def _map_sections(fn: Callable[[int], None], num_sections: int, num_threads: Optional[int]):
+    if num_threads is None:
+        num_threads = os.cpu_count() or 1
+    num_threads = min(num_threads, num_sections)
+    if num_threads <= 1:
+        for z in range(num_sections):
+            fn(z)
+    else:
+        with ThreadPoolExecutor(max_workers=num_threads) as pool:
+            # Consume the iterator to propagate exceptions
+            list(pool.map(fn, range(num_sections)))
+
+
 @builder.register("filter_cc3d")
 @supports_dict
 @skip_on_empty_data
@@ -160,6 +181,40 @@ def _normalize_kernel(
     return convert.to_torch(kernel, device=device)
 
 
+def _apply_morphology_by_sections(  # pylint: disable=too-many-arguments
+    fn: Callable[..., torch.Tensor],
+    data: TensorTypeVar,
+    kernel: Union[Tensor, str],
+    device: torch.types.Device,
+    width: int,
+    section_batch_size: Optional[int],
+    kwargs: dict,
+) -> TensorTypeVar:
+    data_torch_cxyz = convert.to_torch(data, device=device)
+    kernel_torch = _normalize_kernel(kernel, width, device=data_torch_cxyz.device)
+    data_torch = einops.rearrange(data_torch_cxyz, "C X Y Z -> Z C X Y")
+    max_val = kwargs.pop("max_val", kernel_torch.max())
+
+    # Empty sections stay empty under a flat structuring element, so only the
+    # non-empty ones are processed, batched along Z.
+    if "structuring_element" in kwargs:
+        sections = torch.arange(data_torch.shape[0], device=data_torch.device)
+    else:
+        sections = (data_torch != 0).flatten(1).any(1).nonzero().flatten()
+    if section_batch_size is None:
+        section_batch_size = max(len(sections), 1)
+
+    result_torch = torch.zeros_like(data_torch)
+    for start in range(0, len(sections), section_batch_size):
+        batch = sections[start : start + section_batch_size]
+        result_torch[batch] = fn(
+            data_torch[batch], kernel=kernel_torch, max_val=max_val, **kwargs
+        ).to(data_torch.dtype)
+
+    result = convert.astype(einops.rearrange(result_torch, "Z C X Y -> C X Y Z"), data)
+    return result
+
+
 @builder.register("kornia_opening")
 @supports_dict
 @skip_on_empty_data
@@ -169,6 +224,7 @@ def kornia_opening(
     kernel: Union[Tensor, str] = "square",
     device: torch.types.Device = None,
     width: int = 3,
+    section_batch_size: Optional[int] = None,
     **kwargs,
 ) -> TensorTypeVar:
     """
@@ -184,24 +240,15 @@ def kornia_opening(
                    defaults to "square".
     :param device: Target device for opening operation, defaults to None (using data.device)
     :param width: Follows skimage convention, defaults to 3, ignored if kernel is a `Tensor`.
+    :param section_batch_size: Maximum number of Z sections processed in one call,
+        defaults to None (all of the non-empty sections at once).
     :param kwargs: Additional keyword arguments passed to kornia.morphology.opening
     :return: The opened mask, same type as input.
     """
-    data_torch_cxyz = convert.to_torch(data, device=device)
-    kernel_torch = _normalize_kernel(kernel, width, device=data_torch_cxyz.device)
-    data_torch = einops.rearrange(data_torch_cxyz, "C X Y Z -> Z C X Y")
-
-    result_torch = morphology.opening(
-        data_torch,
-        kernel=kernel_torch,
-        max_val=kwargs.pop("max_val", kernel_torch.max()),
-        **kwargs,
+    return _apply_morphology_by_sections(
+        morphology.opening, data, kernel, device, width, section_batch_size, kwargs
     )
 
-    result_torch = result_torch.to(data_torch.dtype)
-    result = convert.astype(einops.rearrange(result_torch, "Z C X Y -> C X Y Z"), data)
-    return result
-
 
 @builder.register("kornia_closing")
 @supports_dict
@@ -212,6 +259,7 @@ def kornia_closing(
     kernel: Union[Tensor, str] = "square",
     device: torch.types.Device = None,
     width: int = 3,
+    section_batch_size: Optional[int] = None,
     **kwargs,
 ) -> TensorTypeVar:
     """
@@ -227,24 +275,15 @@ def kornia_closing(
                    defaults to "square".
     :param device: Target device for closing operation, defaults to None (using data.device)
     :param width: Follows skimage convention, defaults to 3, ignored if kernel is a `Tensor`.
+    :param section_batch_size: Maximum number of Z sections processed in one call,
+        defaults to None (all of the non-empty sections at once).
     :param kwargs: Additional keyword arguments passed to kornia.morphology.closing
     :return: The closed mask, same type as input.
     """
-    data_torch_cxyz = convert.to_torch(data, device=device)
-    kernel_torch = _normalize_kernel(kernel, width, device=data_torch_cxyz.device)
-    data_torch = einops.rearrange(data_torch_cxyz, "C X Y Z -> Z C X Y")
-
-    result_torch = morphology.closing(
-        data_torch,
-        kernel=kernel_torch,
-        max_val=kwargs.pop("max_val", kernel_torch.max()),
-        **kwargs,
+    return _apply_morphology_by_sections(
+        morphology.closing, data, kernel, device, width, section_batch_size, kwargs
     )
 
-    result_torch = result_torch.to(data_torch.dtype)
-    result = convert.astype(einops.rearrange(result_torch, "Z C X Y -> C X Y Z"), data)
-    return result
-
 
 @builder.register("kornia_erosion")
 @supports_dict
@@ -255,6 +294,7 @@ def kornia_erosion(
     kernel: Union[Tensor, str] = "square",
     device: torch.types.Device = None,
     width: int = 3,
+    section_batch_size: Optional[int] = None,
     **kwargs,
 ) -> TensorTypeVar:
     """
@@ -270,24 +310,15 @@ def kornia_erosion(
                    defaults to "square".
     :param device: Target device for erosion operation, defaults to None (using data.device)
     :param width: Follows skimage convention, defaults to 3, ignored if kernel is a `Tensor`.
+    :param section_batch_size: Maximum number of Z sections processed in one call,
+        defaults to None (all of the non-empty sections at once).
     :param kwargs: Additional keyword arguments passed to kornia.morphology.erosion
     :return: The eroded mask, same type as input.
     """
-    data_torch_cxyz = convert.to_torch(data, device=device)
-    kernel_torch = _normalize_kernel(kernel, width, device=data_torch_cxyz.device)
-    data_torch = einops.rearrange(data_torch_cxyz, "C X Y Z -> Z C X Y")
-
-    result_torch = morphology.erosion(
-        data_torch,
-        kernel=kernel_torch,
-        max_val=kwargs.pop("max_val", kernel_torch.max()),
-        **kwargs,
+    return _apply_morphology_by_sections(
+        morphology.erosion, data, kernel, device, width, section_batch_size, kwargs
     )
 
-    result_torch = result_torch.to(data_torch.dtype)
-    result = convert.astype(einops.rearrange(result_torch, "Z C X Y -> C X Y Z"), data)
-    return result
-
 
 @builder.register("kornia_dilation")
 @supports_dict
@@ -298,6 +329,7 @@ def kornia_dilation(
     kernel: Union[Tensor, str] = "square",
     device: torch.types.Device = None,
     width: int = 3,
+    section_batch_size: Optional[int] = None,
     **kwargs,
 ) -> TensorTypeVar:
     """
@@ -313,26 +345,17 @@ def kornia_dilation(
                    defaults to "square".
     :param device: Target device for dilation operation, defaults to None (using data.device)
     :param width: Follows skimage convention, defaults to 3, ignored if kernel is a `Tensor`.
+    :param section_batch_size: Maximum number of Z sections processed in one call,
+        defaults to None (all of the non-empty sections at once).
     :param kwargs: Additional keyword arguments passed to kornia.morphology.dilation
     :return: The dilated mask, same type as input.
     """
-    data_torch_cxyz = convert.to_torch(data, device=device)
-    kernel_torch = _normalize_kernel(kernel, width, device=data_torch_cxyz.device)
-    data_torch = einops.rearrange(data_torch_cxyz, "C X Y Z -> Z C X Y")
-
-    result_torch = morphology.dilation(
-        data_torch,
-        kernel=kernel_torch,
-        max_val=kwargs.pop("max_val", kernel_torch.max()),
-        border_type=kwargs.pop("border_type", "constant"),
-        border_value=kwargs.pop("border_value", 0.0),
-        **kwargs,
+    kwargs.setdefault("border_type", "constant")
+    kwargs.setdefault("border_value", 0.0)
+    return _apply_morphology_by_sections(
+        morphology.dilation, data, kernel, device, width, section_batch_size, kwargs
     )
 
-    result_torch = result_torch.to(data_torch.dtype)
-    result = convert.astype(einops.rearrange(result_torch, "Z C X Y -> C X Y Z"), data)
-    return result
-
 
 @builder.register("mask_out_with_fn")
 @supports_dict
@@ -3,5 +3,6 @@
 from . import joint_dataset, layer_dataset, sample_indexers
 from .joint_dataset import JointDataset
 from .layer_dataset import LayerDataset
+from .prefetching_layer_dataset import PrefetchingLayerDataset
 from .sample_indexers import RandomIndexer, VolumetricStridedIndexer
 from .collection_dataset import build_collection_dataset
@@ -1,6 +1,11 @@
-from typing import Any, Dict, Literal
+from __future__ import annotations
+
+import bisect
+from itertools import accumulate
+from typing import Any, Dict, Literal, Sequence
 
 import attrs
+import numpy as np
 import torch
 from typeguard import typechecked
 
@@ -23,43 +28,81 @@ class JointDataset(torch.utils.data.Dataset):
         given during initialization.
     :param datasets: Dictionary containing the datasets that make up the JointDataset.
 
+    The lengths of the datasets are read once at construction.
     """
 
     mode: Literal["horizontal", "vertical"]
     datasets: Dict[str, Any]
     # TODO: Make torch.utils.data.Dataset pass mypy checks
     # datasets: Dict[str, torch.utils.data.Dataset]
+    dataset_list: list[Any] = attrs.field(init=False, repr=False)
+    num_samples: list[int] = attrs.field(init=False, repr=False)
+    num_samples_arr: np.ndarray = attrs.field(init=False, repr=False, eq=False)
 
     def __attrs_pre_init__(self):
         super().__init__()
 
     def __attrs_post_init__(self):
+        # Use `__setattr__` to keep the object frozen.
+        dataset_list = list(self.datasets.values())
+        lens = [len(d) for d in dataset_list]
+        # Cumulative sample counts, starting from 0, for vertical lookups.
+        num_samples = [0] + list(accumulate(lens))
+        object.__setattr__(self, "dataset_list", dataset_list)
+        object.__setattr__(self, "num_samples", num_samples)
+        object.__setattr__(self, "num_samples_arr", np.array(num_samples, dtype=np.int64))
+
         if self.mode == "horizontal":
-            num_samples = min(len(d) for d in self.datasets.values())
-            for key in self.datasets.keys():
-                if num_samples == len(self.datasets[key]):
+            num_samples_h = min(lens)
+            for key, num in zip(self.datasets.keys(), lens):
+                if num_samples_h == num:
                     logger.warning(
-                        f"JointDataset: Dataset '{key}' has {len(self.datasets[key])} samples, "
+                        f"JointDataset: Dataset '{key}' has {num} samples, "
                         f"which is the minimum number of samples for this horizontally joint "
                         "dataset."
                     )
-                if num_samples < len(self.datasets[key]):
+                if num_samples_h < num:
                     logger.warning(
-                        f"JointDataset: Dataset '{key}' has {len(self.datasets[key])} samples, "
-                        f"but only {num_samples} samples will be used."
+                        f"JointDataset: Dataset '{key}' has {num} samples, "
+                        f"but only {num_samples_h} samples will be used."
                     )
 
     def __len__(self) -> int:
         if self.mode == "horizontal":
-            num_samples = min(len(d) for d in self.datasets.values())
+            num_samples = int(np.diff(self.num_samples_arr).min())
 
         elif self.mode == "vertical":
-            num_samples = sum(len(d) for d in self.datasets.values())
+            num_samples = self.num_samples[-1]
         else:
             assert False, "Type checker error."  # pragma: no cover
 
         return num_samples
 
+    def locate(self, indices: Sequence[int] | np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Find the datasets that own the given vertical indices, for samplers that
+        request many indices at once.
+
+        :param indices: Indices into the vertically joined dataset.
+        :return: Positions of the owning datasets in ``datasets`` and the indices
+            within those datasets.
+        """
+        indices_arr = np.asarray(indices, dtype=np.int64)
+        if indices_arr.size != 0 and (
+            indices_arr.min() < 0 or indices_arr.max() >= self.num_samples[-1]
+        ):
+            raise IndexError(f"Indices expected to be in range [0, {self.num_samples[-1]}).")
+        dataset_ids = np.searchsorted(self.num_samples_arr, indices_arr, side="right") - 1
+        return dataset_ids, indices_arr - self.num_samples_arr[dataset_ids]
+
+    def __getitems__(self, indices: list[int]) -> list[Any]:
+        if self.mode == "horizontal":
+            return [self[idx] for idx in indices]
+        dataset_ids, inner_indices = self.locate(indices)
+        return [
+            self.dataset_list[dataset_id][inner_idx]
+            for dataset_id, inner_idx in zip(dataset_ids.tolist(), inner_indices.tolist())
+        ]
+
     def __getitem__(self, idx: int) -> Any:
         if self.mode == "horizontal":
             sample = {}
@@ -67,12 +110,11 @@ class JointDataset(torch.utils.data.Dataset):
                 sample[key] = dset[idx]
 
         elif self.mode == "vertical":
-            sum_num_samples = 0
-            for dset in self.datasets.values():
-                sum_num_samples_new = sum_num_samples + len(dset)
-                if idx < sum_num_samples_new:
-                    sample = dset[idx - sum_num_samples]
-                    break
-                sum_num_samples = sum_num_samples_new
+            if idx not in range(0, self.num_samples[-1]):
+                raise IndexError(
+                    f"idx expected to be in range [0, {self.num_samples[-1]}), but got {idx}."
+                )
+            dataset_id = bisect.bisect_right(self.num_samples, idx) - 1
+            sample = self.dataset_list[dataset_id][idx - self.num_samples[dataset_id]]
 
         return sample
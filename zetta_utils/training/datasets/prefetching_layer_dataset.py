@@ -0,0 +1,298 @@
+from __future__ import annotations
+
+import contextlib
+import copy
+import hashlib
+import os
+import pickle
+import random
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any
+
+import attrs
+import cachetools
+import numpy as np
+import torch
+from typeguard import typechecked
+
+from zetta_utils import builder
+from zetta_utils.layer import Backend, Layer
+from zetta_utils.layer.layer_set.backend import LayerSetBackend
+from zetta_utils.layer.volumetric.layer_set.backend import VolumetricSetBackend
+
+from .layer_dataset import _convert_to_torch_nested
+from .sample_indexers import SampleIndexer
+
+
+def _get_nbytes(data: Any) -> int:
+    if isinstance(data, np.ndarray):
+        return data.nbytes
+    if isinstance(data, torch.Tensor):
+        return data.element_size() * data.numel()
+    if isinstance(data, dict):
+        return sum(_get_nbytes(v) for v in data.values())
+    if isinstance(data, (list, tuple)):
+        return sum(_get_nbytes(v) for v in data)
+    return 0
+
+
+@contextlib.contextmanager
+def _preserved_rng_state():
+    """Restores the global random number generators on exit."""
+    python_state = random.getstate()
+    numpy_state = np.random.get_state()
+    torch_state = torch.get_rng_state()
+    try:
+        yield
+    finally:
+        random.setstate(python_state)
+        np.random.set_state(numpy_state)
+        torch.set_rng_state(torch_state)
+
+
+def _seed_rngs(seed: int) -> None:
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.random.default_generator.manual_seed(seed)
+
+
+class _RawSampleCache:
+    """
+    Thread-safe store of raw samples, keyed by backend index: an in-memory LRU cache
+    bounded by ``max_bytes`` and/or a local directory bounded by ``dir_max_bytes``.
+    The directory bound is tracked per process.
+    """
+
+    def __init__(self, max_bytes: int, cache_dir: str | None, dir_max_bytes: int):
+        self.lock = threading.Lock()
+        self.memory: cachetools.LRUCache | None = None
+        if max_bytes > 0:
+            self.memory = cachetools.LRUCache(maxsize=max_bytes, getsizeof=_get_nbytes)
+        self.cache_dir = cache_dir
+        self.dir_max_bytes = dir_max_bytes
+        self.dir_sizes: OrderedDict[str, int] = OrderedDict()
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def get(self, key: str) -> Any | None:
+        with self.lock:
+            if self.memory is not None and key in self.memory:
+                return copy.deepcopy(self.memory[key])
+        if self.cache_dir is not None:
+            path = os.path.join(self.cache_dir, key)
+            try:
+                with open(path, "rb") as f:
+                    data = pickle.load(f)
+            except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+                return None
+            self._put_memory(key, data)
+            return copy.deepcopy(data)
+        return None
+
+    def put(self, key: str, data: Any) -> None:
+        self._put_memory(key, data)
+        if self.cache_dir is not None:
+            content = pickle.dumps(data)
+            if len(content) > self.dir_max_bytes:
+                return
+            path = os.path.join(self.cache_dir, key)
+            with open(path + ".tmp", "wb") as f:
+                f.write(content)
+            os.replace(path + ".tmp", path)
+            with self.lock:
+                self.dir_sizes[key] = len(content)
+                while sum(self.dir_sizes.values()) > self.dir_max_bytes:
+                    evicted, _ = self.dir_sizes.popitem(last=False)
+                    try:
+                        os.remove(os.path.join(self.cache_dir, evicted))
+                    except FileNotFoundError:  # pragma: no cover
+                        pass
+
+    def _put_memory(self, key: str, data: Any) -> None:
+        if self.memory is not None and _get_nbytes(data) <= self.memory.maxsize:
+            with self.lock:
+                self.memory[key] = copy.deepcopy(data)
+
+
+class _PrefetchState:
+    def __init__(self, dataset: PrefetchingLayerDataset):
+        self.pid = os.getpid()
+        self.is_predictable = (
+            dataset._is_backend_idx_predictable()  # pylint: disable=protected-access
+        )
+        self.prefetch_pool = ThreadPoolExecutor(max_workers=max(dataset.prefetch, 1))
+        self.read_pool = ThreadPoolExecutor(max_workers=dataset.num_read_threads)
+        self.cache = _RawSampleCache(
+            max_bytes=dataset.cache_bytes,
+            cache_dir=dataset.cache_dir,
+            dir_max_bytes=dataset.cache_dir_bytes,
+        )
+        # Only touched from the thread calling `__getitem__`
+        self.pending: OrderedDict[str, Future] = OrderedDict()
+        self.layer = attrs.evolve(
+            dataset.layer, backend=_PrefetchedBackend(dataset.layer.backend, self)
+        )
+
+    def read_raw(self, backend: Backend, idx: Any, key: str) -> Any:
+        data = self.cache.get(key)
+        if data is None:
+            if isinstance(backend, (LayerSetBackend, VolumetricSetBackend)):
+                # Overlap the reads of all of the layers of the set
+                futures = {
+                    k: self.read_pool.submit(v.read_with_procs, idx)
+                    for k, v in backend.layers.items()
+                }
+                data = {k: v.result() for k, v in futures.items()}
+            else:
+                data = backend.read(idx)
+            self.cache.put(key, data)
+        return data
+
+
+class _PrefetchedBackend(Backend):
+    """
+    Delegating backend that serves reads from the prefetched samples and the
+    raw sample cache of a ``PrefetchingLayerDataset`` before reading ``backend``.
+    """
+
+    def __init__(self, backend: Backend, state: _PrefetchState):
+        self.backend = backend
+        self.state = state
+
+    @property
+    def name(self) -> str:  # pragma: no cover
+        return self.backend.name
+
+    def read(self, idx: Any) -> Any:
+        key = _get_key(idx)
+        future = self.state.pending.pop(key, None)
+        if future is not None:
+            return future.result()
+        return self.state.read_raw(self.backend, idx, key)
+
+    def write(self, idx: Any, data: Any):  # pragma: no cover
+        raise IOError("`PrefetchingLayerDataset` layers are read only.")
+
+    def with_changes(self, **kwargs) -> Backend:  # pragma: no cover
+        return _PrefetchedBackend(self.backend.with_changes(**kwargs), self.state)
+
+    def __getattr__(self, name: str) -> Any:  # pragma: no cover
+        return getattr(self.backend, name)
+
+
+def _get_key(idx: Any) -> str:
+    return hashlib.sha1(repr(idx).encode()).hexdigest()
+
+
+@builder.register("PrefetchingLayerDataset")
+@typechecked
+@attrs.mutable
+class PrefetchingLayerDataset(torch.utils.data.Dataset):
+    """`LayerDataset` that reads the raw data of the following samples ahead of time.
+
+    On every ``__getitem__(idx)``, the raw data for indices ``idx + 1`` to
+    ``idx + prefetch`` (wrapping around) is read in a background thread pool, so
+    sequential access, as done by DataLoader workers for each batch or by block-wise
+    samplers, overlaps reading with training. When the layer is a layer set, the layers
+    of the set are read concurrently. Read processors (augmentations) are still
+    applied in the calling thread, so random augmentations are not affected.
+
+    Raw samples, i.e. the backend data before the layer's read processors, can
+    optionally be kept in a bounded in-memory cache and/or a bounded local directory,
+    so that repeated epochs over the same samples do not hit the remote storage again.
+
+    Prefetching is keyed by the backend index after the layer's index processors,
+    which are evaluated ahead of time without consuming the draws of the global random
+    number generators. If the sample indexer or the index processors are random, the
+    backend index cannot be predicted and prefetching is disabled. Samples whose index
+    is changed by random joint processors are read synchronously.
+
+    :param layer: Layer which will be used as a source of data.
+    :param sample_indexer: Indexer which will be used to translate integer sample
+        index to a corresponding index understood by the layer backend.
+    :param prefetch: Number of following samples to read ahead.
+    :param num_read_threads: Number of threads for reading the layers of a layer set.
+    :param cache_bytes: Size of the in-memory raw sample cache; 0 disables it.
+    :param cache_dir: Local directory for the on-disk raw sample cache.
+    :param cache_dir_bytes: Size of the on-disk raw sample cache, per process.
+    """
+
+    layer: Layer
+    sample_indexer: SampleIndexer
+    prefetch: int = 8
+    num_read_threads: int = 8
+    cache_bytes: int = 0
+    cache_dir: str | None = None
+    cache_dir_bytes: int = 10 * 2 ** 30
+    _state: _PrefetchState | None = attrs.field(init=False, default=None, eq=False, repr=False)
+
+    def __attrs_pre_init__(self):
+        super().__init__()
+
+    def __getstate__(self) -> dict:
+        # Thread pools cannot be pickled, and must not be shared with DataLoader workers
+        return {
+            field.name: getattr(self, field.name)
+            for field in attrs.fields(type(self))
+            if field.name != "_state"
+        }
+
+    def __setstate__(self, state: dict) -> None:
+        for k, v in state.items():
+            object.__setattr__(self, k, v)
+        object.__setattr__(self, "_state", None)
+
+    def __len__(self) -> int:
+        return len(self.sample_indexer)
+
+    def __getitem__(self, idx: int) -> Any:
+        state = self._get_state()
+        self._schedule_prefetch(state, idx)
+        layer_idx = self.sample_indexer(idx)
+        sample_raw = state.layer.read_with_procs(layer_idx)
+        sample = _convert_to_torch_nested(sample_raw)
+        return sample
+
+    def _get_state(self) -> _PrefetchState:
+        if self._state is None or self._state.pid != os.getpid():
+            self._state = _PrefetchState(self)
+        return self._state
+
+    def _get_backend_idx(self, idx: int) -> Any:
+        # Random indexers or index processors must draw the same values when the
+        # sample is actually read, as done by `LayerDataset`
+        with _preserved_rng_state():
+            result = self.sample_indexer(idx)
+            for proc_idx in self.layer.index_procs:
+                result = proc_idx(result)
+        return result
+
+    def _is_backend_idx_predictable(self) -> bool:
+        if len(self) == 0:
+            return True
+        keys = set()
+        for seed in range(2):
+            with _preserved_rng_state():
+                _seed_rngs(seed)
+                keys.add(_get_key(self._get_backend_idx(0)))
+        return len(keys) == 1
+
+    def _schedule_prefetch(self, state: _PrefetchState, idx: int) -> None:
+        if not state.is_predictable:
+            return
+        num_samples = len(self)
+        for offset in range(1, min(self.prefetch, num_samples - 1) + 1):
+            backend_idx = self._get_backend_idx((idx + offset) % num_samples)
+            key = _get_key(backend_idx)
+            if key in state.pending:
+                state.pending.move_to_end(key)
+            else:
+                state.pending[key] = state.prefetch_pool.submit(
+                    state.read_raw, self.layer.backend, backend_idx, key
+                )
+        # Drop the reads that were never used, e.g. after a jump in the sampled indices
+        while len(state.pending) > 2 * self.prefetch + 1:
+            _, future = state.pending.popitem(last=False)
+            future.cancel()
@@ -9,3 +9,4 @@ from .random_indexer import RandomIndexer
 from .volumetric_strided_indexer import VolumetricStridedIndexer
 from .loop_indexer import LoopIndexer
 from .volumetric_ngl_indexer import VolumetricNGLIndexer
+from .precomputed_indexer import PrecomputedIndexer, compile_sample_indexer
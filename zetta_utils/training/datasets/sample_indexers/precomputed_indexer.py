@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import os
+
+import attrs
+import numpy as np
+from typeguard import typechecked
+
+from zetta_utils import builder
+from zetta_utils.geometry import BBox3D, Vec3D
+from zetta_utils.layer.volumetric import VolumetricIndex
+
+from .base import SampleIndexer
+
+RECORD_DTYPE = np.dtype([("start", "<f8", 3), ("stop", "<f8", 3), ("resolution", "<f8", 3)])
+
+
+@builder.register("PrecomputedIndexer")
+@typechecked
+@attrs.frozen
+class PrecomputedIndexer(SampleIndexer):
+    """SampleIndexer which serves volumetric indices from an index file written by
+    ``compile_sample_indexer``. The file is memory mapped, so construction is
+    independent of the number of samples and the records are shared between
+    the processes reading it.
+
+    :param path: Local path to the index file.
+    """
+
+    path: str
+    records: np.ndarray = attrs.field(init=False, eq=False, repr=False)
+
+    def __attrs_post_init__(self):
+        # Use `__setattr__` to keep the object frozen.
+        records = np.load(self.path, mmap_mode="r")
+        if records.dtype != RECORD_DTYPE or records.ndim != 1:
+            raise ValueError(f"'{self.path}' is not a sample index file.")
+        object.__setattr__(self, "records", records)
+
+    def __getstate__(self) -> dict:
+        # Re-map the file instead of copying the records into each DataLoader worker
+        return {"path": self.path}
+
+    def __setstate__(self, state: dict) -> None:
+        object.__setattr__(self, "path", state["path"])
+        self.__attrs_post_init__()
+
+    def __len__(self):
+        return len(self.records)
+
+    def __call__(self, idx: int) -> VolumetricIndex:
+        """Read the volumetric index of the given sample from the index file.
+
+        :param idx: Integer sample index.
+        :return: VolumetricIndex.
+        """
+        record = self.records[idx]
+        return VolumetricIndex(
+            bbox=BBox3D(bounds=tuple(zip(record["start"].tolist(), record["stop"].tolist()))),
+            resolution=Vec3D(*record["resolution"].tolist()),
+        )
+
+
+@builder.register("compile_sample_indexer")
+@typechecked
+def compile_sample_indexer(indexer: SampleIndexer, path: str) -> PrecomputedIndexer:
+    """Evaluate every sample of a volumetric ``indexer`` and write the results to an
+    index file at ``path`` with one (start, stop, resolution) record per sample,
+    so that it can be served by a ``PrecomputedIndexer``.
+
+    :param indexer: Indexer returning `VolumetricIndex`es.
+    :param path: Local path of the index file to write.
+    :return: ``PrecomputedIndexer`` reading the written file.
+    """
+    records = np.empty(len(indexer), dtype=RECORD_DTYPE)
+    for i in range(len(records)):
+        idx = indexer(i)
+        if not isinstance(idx, VolumetricIndex):
+            raise TypeError(
+                f"Only indexers returning `VolumetricIndex` can be compiled, got {type(idx)}."
+            )
+        records[i] = (idx.bbox.start, idx.bbox.end, idx.resolution)
+        restored = VolumetricIndex(bbox=BBox3D(bounds=idx.bbox.bounds), resolution=idx.resolution)
+        if restored != idx:
+            raise ValueError(f"Sample {i} cannot be represented in an index file: {idx}")
+
+    # Write atomically, as the file may be read by other processes
+    tmp_path = f"{path}.{os.getpid()}.tmp.npy"
+    np.save(tmp_path, records)
+    os.replace(tmp_path, path)
+    return PrecomputedIndexer(path)
@@ -199,9 +199,10 @@ def _lightning_train_local(
     full_state_ckpt_path: str = "last",
 ):
     logger.info("Starting training...")
-    if "CURRENT_BUILD_SPEC" in os.environ:
+    build_spec = builder.get_current_build_spec()
+    if build_spec is not None:
         if hasattr(trainer, "log_config"):
-            trainer.log_config(json.loads(os.environ["CURRENT_BUILD_SPEC"]))
+            trainer.log_config(json.loads(build_spec))
         else:
             logger.warning("Incompatible custom trainer used: Unable to save configuration.")
     else:
@@ -1,8 +1,13 @@
-from typing import Iterator
+from __future__ import annotations
 
+from typing import Iterator, Sequence
+
+import numpy as np
+import torch.distributed
 import torch.utils.data
 
 from zetta_utils import builder
+from zetta_utils.training.datasets.sample_indexers import VolumetricStridedIndexer
 
 builder.register("TorchRandomSampler")(torch.utils.data.RandomSampler)
 
@@ -40,3 +45,104 @@ class SamplerWrapper(torch.utils.data.Sampler[int]):
             epoch (int): Epoch number.
         """
         self.epoch = epoch
+
+
+@builder.register("VolumetricBlockSampler")
+class VolumetricBlockSampler(torch.utils.data.Sampler[int]):
+    """
+    Sampler for datasets indexed by a ``VolumetricStridedIndexer`` that shuffles at
+    the granularity of spatial blocks of neighbouring chunks, so that consecutive
+    samples overlap the same backend chunks and hit the backend caches.
+
+    Every epoch, the blocks are put in random order and the samples within each block
+    are optionally shuffled. The resulting sequence is split into contiguous,
+    equally sized parts, one per rank, padding it by wrapping around unless
+    ``drop_last`` is set. The order only depends on ``seed`` and the epoch, so all
+    ranks agree on it without communication.
+
+    When training with pytorch-lightning on multiple devices, disable
+    ``use_distributed_sampler`` in the trainer, as this sampler shards by itself.
+
+    :param indexer: Indexer of the dataset to sample from.
+    :param block_size: Number of strided chunks along each dimension in a block.
+    :param num_replicas: Number of ranks. Defaults to the distributed world size.
+    :param rank: Rank of the current process. Defaults to the distributed rank.
+    :param shuffle_within_block: Whether to shuffle the samples within each block.
+    :param seed: Seed shared by all ranks.
+    :param drop_last: Whether to drop the tail of the sequence instead of padding it
+        when it does not divide evenly between ranks.
+    """
+
+    def __init__(
+        self,
+        indexer: VolumetricStridedIndexer,
+        block_size: Sequence[int] = (8, 8, 1),
+        num_replicas: int | None = None,
+        rank: int | None = None,
+        shuffle_within_block: bool = True,
+        seed: int = 0,
+        drop_last: bool = False,
+    ) -> None:
+        super().__init__(None)
+        if num_replicas is None:
+            num_replicas = (
+                torch.distributed.get_world_size() if torch.distributed.is_initialized() else 1
+            )
+        if rank is None:
+            rank = torch.distributed.get_rank() if torch.distributed.is_initialized() else 0
+        if not 0 <= rank < num_replicas:
+            raise ValueError(f"Invalid rank {rank}, rank should be in [0, {num_replicas}).")
+        if any(e <= 0 for e in block_size):
+            raise ValueError(f"`block_size` must be positive, got {tuple(block_size)}.")
+
+        self.num_replicas = num_replicas
+        self.rank = rank
+        self.shuffle_within_block = shuffle_within_block
+        self.seed = seed
+        self.drop_last = drop_last
+        self.epoch = 0
+
+        # Chunk grid coordinates in the order of `BBoxStrider.get_nth_chunk_bbox`
+        grid = indexer.bbox_strider.step_limits
+        self.num_samples_total = len(indexer)
+        idx = np.arange(self.num_samples_total, dtype=np.int64)
+        coords = (idx % grid[0], (idx // grid[0]) % grid[1], idx // (grid[0] * grid[1]))
+        num_blocks = [-(-grid[i] // block_size[i]) for i in range(3)]
+        self.block_ids = (coords[0] // block_size[0]) + num_blocks[0] * (
+            (coords[1] // block_size[1]) + num_blocks[1] * (coords[2] // block_size[2])
+        )
+        self.num_blocks = num_blocks[0] * num_blocks[1] * num_blocks[2]
+
+        if drop_last:
+            self.num_samples = self.num_samples_total // num_replicas
+        else:
+            self.num_samples = -(-self.num_samples_total // num_replicas)
+
+    def get_epoch_order(self) -> np.ndarray:
+        """Returns the order of all samples for the current epoch, before sharding."""
+        rng = np.random.default_rng([self.seed, self.epoch])
+        block_ranks = rng.permutation(self.num_blocks)[self.block_ids]
+        if self.shuffle_within_block:
+            within_keys = rng.random(self.num_samples_total)
+        else:
+            within_keys = np.arange(self.num_samples_total)
+        return np.lexsort((within_keys, block_ranks))
+
+    def __iter__(self) -> Iterator[int]:
+        order = self.get_epoch_order()
+        total_size = self.num_samples * self.num_replicas
+        if total_size > len(order):
+            order = np.resize(order, total_size)
+        shard = order[self.rank * self.num_samples : (self.rank + 1) * self.num_samples]
+        return iter(shard.tolist())
+
+    def __len__(self) -> int:
+        return self.num_samples
+
+    def set_epoch(self, epoch: int) -> None:
+        """
+        Sets the epoch for this sampler, which selects the order of the blocks and samples.
+
+        :param epoch: Epoch number.
+        """
+        self.epoch = epoch